@@ -1,17 +1,33 @@
 # api_server.py
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Flask, jsonify, send_from_directory, request, stream_with_context
 from flask_cors import CORS
 import pandas as pd
 import json
 import os
+import sys
 from datetime import datetime
 import subprocess
 import threading
+import itertools
 
 app = Flask(__name__)
 CORS(app)
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 
+sys.path.append(os.path.dirname(PROJECT_ROOT))
+from scripts.order_store import OrderStore, ORDER_STORE_FILE, to_dashboard_format, dashboard_record
+from scripts.columnar_export import read_latest, ORDERS_COLUMNAR_FILE, PRODUCTS_COLUMNAR_FILE
+from scripts.order_query import DatasetCache, file_version
+from scripts.data_manifest import get_manifest, ManifestWatcher
+from scripts.ndjson_stream import stream_records, frame_records, media_type, NDJSON_MEDIA_TYPE
+from scripts.job_runner import JobRunner, JobLimitError, run_command_job, is_finished
+from scripts.event_bus import sse_stream, last_event_id, SSE_MEDIA_TYPE, SSE_HEADERS
+
+# Dữ liệu đã parse, dùng lại giữa các request cho tới khi file nguồn đổi
+dataset_cache = DatasetCache()
+# Lệnh automation chạy trong worker process, theo dõi qua /api/jobs/<job_id>
+job_runner = JobRunner()
+
 @app.route('/')
 def root():
     """Serve default dashboard HTML if available, else a simple status"""
@@ -48,30 +64,170 @@ def serve_enterprise_dashboard():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _orders_dataset():
+    """
+    Kho SQLite nếu có, ngược lại bản Parquet / CSV mới nhất - parse lại chỉ khi file đổi
+
+    Đơn từ kho được chiếu sang cột / giá trị của orders_latest.csv (hợp đồng API frontend đang dùng)
+    """
+    if os.path.exists(ORDER_STORE_FILE):
+        version = file_version(ORDER_STORE_FILE, f"{ORDER_STORE_FILE}-wal")
+        return dataset_cache.get('orders', version, lambda: (
+            to_dashboard_format(OrderStore(ORDER_STORE_FILE).query_orders()), ORDER_STORE_FILE
+        ))
+
+    latest_file = get_manifest().latest_path(('dashboard', 'orders'), ext='.csv')
+    version = file_version(ORDERS_COLUMNAR_FILE, latest_file)
+    if version is None:
+        return None
+    return dataset_cache.get('orders', version, lambda: read_latest(ORDERS_COLUMNAR_FILE, latest_file))
+
+
+def _products_dataset():
+    latest_file = get_manifest().latest_path('products', ext='.csv')
+    version = file_version(PRODUCTS_COLUMNAR_FILE, latest_file)
+    if version is None:
+        return None
+    return dataset_cache.get('products', version, lambda: read_latest(PRODUCTS_COLUMNAR_FILE, latest_file))
+
+
+def _query_args():
+    """Tham số lọc / phân trang chung của /api/orders và /api/products"""
+    return {
+        'platform': request.args.get('platform') or None,
+        'status': request.args.get('status') or None,
+        'date_from': request.args.get('from') or None,
+        'date_to': request.args.get('to') or None,
+        'fields': request.args.get('fields') or None,
+        'limit': request.args.get('limit', type=int),
+        'offset': request.args.get('offset', default=0, type=int)
+    }
+
+
+def _stream_format():
+    """?stream=ndjson|json, hoặc Accept: application/x-ndjson → trả dạng luồng"""
+    stream_format = request.args.get('stream')
+    if stream_format is None and NDJSON_MEDIA_TYPE in request.headers.get('Accept', ''):
+        stream_format = 'ndjson'
+    return stream_format
+
+
+def _stream_response(records, stream_format):
+    return app.response_class(stream_with_context(stream_records(records, stream_format)),
+                              mimetype=media_type(stream_format))
+
+
+def _store_records(args):
+    """Đơn đọc dần từ cursor SQLite, chiếu sang cột của orders_latest.csv (chỉ các cột trong fields nếu có)"""
+    def values(value):
+        return value.split(',') if value and ',' in value else value
+
+    statuses = values(args['status'])
+    # status trên API là giá trị đã map (confirmed, pending...) → lọc sau khi chiếu, limit / offset sau bộ lọc
+    records = OrderStore(ORDER_STORE_FILE).iter_orders(
+        platform=values(args['platform']), date_from=args['date_from'], date_to=args['date_to'],
+        limit=None if statuses else args['limit'], offset=0 if statuses else args['offset']
+    )
+    records = (dashboard_record(record) for record in records)
+    if statuses:
+        wanted = {statuses} if isinstance(statuses, str) else set(statuses)
+        stop = None if args['limit'] is None else args['offset'] + args['limit']
+        records = itertools.islice((record for record in records if record['status'] in wanted),
+                                   args['offset'], stop)
+    if not args['fields']:
+        return records
+    fields = [field.strip() for field in args['fields'].split(',')]
+    return ({field: record[field] for field in fields if field in record} for record in records)
+
+
+def _dataset_response(dataset):
+    """
+    Trang dữ liệu theo ?platform=&status=&from=&to=&fields=a,b&limit=&offset=
+
+    ETag = phiên bản file + query string → client polling gửi If-None-Match nhận 304 không cần body
+    """
+    stream_format = _stream_format()
+    if stream_format:
+        frame, _ = dataset.select(**_query_args())
+        return _stream_response(frame_records(frame), stream_format)
+
+    etag = dataset.etag(request.query_string.decode('utf-8'))
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    args = _query_args()
+    offset = args['offset']
+    data, total = dataset.query(**args)
+    next_offset = offset + len(data)
+    response = jsonify({
+        'success': True,
+        'data': data,
+        'count': len(data),
+        'total': total,
+        'offset': offset,
+        'next_offset': next_offset if next_offset < total else None,
+        'source': dataset.source,
+        'timestamp': dataset.loaded_at
+    })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
 @app.route('/api/orders')
 def get_orders():
     """API endpoint cho orders data"""
     try:
-        # Tìm file CSV mới nhất
-        csv_files = []
-        if os.path.exists('data'):
-            for file in os.listdir('data'):
-                if file.startswith('orders_') and file.endswith('.csv'):
-                    csv_files.append(f'data/{file}')
-
-        if csv_files:
-            latest_file = max(csv_files, key=os.path.getmtime)
-            df = pd.read_csv(latest_file)
-            return jsonify({
-                'success': True,
-                'data': df.to_dict('records'),
-                'count': len(df),
-                'source': latest_file,
-                'timestamp': datetime.now().isoformat()
-            })
-        else:
+        # Luồng từ kho SQLite: gửi từng lô đơn ngay khi đọc từ cursor, không dựng cả danh sách
+        stream_format = _stream_format()
+        if stream_format and os.path.exists(ORDER_STORE_FILE):
+            return _stream_response(_store_records(_query_args()), stream_format)
+
+        dataset = _orders_dataset()
+        if dataset is None:
             return jsonify({'success': False, 'error': 'No CSV files found'})
+        return _dataset_response(dataset)
 
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/orders/stats')
+def get_order_stats():
+    """
+    Thống kê đơn hàng tính sẵn trên server: ?group_by=platform,status&metric=count,sum:order_value&from=&to=
+
+    Kết quả cache theo phiên bản dữ liệu + tham số → vài trăm byte thay vì tải toàn bộ đơn về client
+    """
+    try:
+        dataset = _orders_dataset()
+        if dataset is None:
+            return jsonify({'success': False, 'error': 'No CSV files found'})
+
+        etag = dataset.etag('stats', request.query_string.decode('utf-8'))
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+        stats = dataset.stats(
+            group_by=request.args.get('group_by') or None,
+            metrics=request.args.get('metric') or None,
+            platform=request.args.get('platform') or None,
+            status=request.args.get('status') or None,
+            date_from=request.args.get('from') or None,
+            date_to=request.args.get('to') or None
+        )
+        response = jsonify({'success': True, **stats, 'source': dataset.source, 'timestamp': dataset.loaded_at})
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -168,38 +324,56 @@ def run_action():
             'test_system': 'source venv/bin/activate && python system_check.py',
             'start_dashboard': 'source venv/bin/activate && streamlit run dashboard.py --server.port 8501 --server.address 0.0.0.0'
         }
+        # Server chạy lâu, không phải job có kết thúc → không chiếm worker
+        services = {'start_dashboard'}
 
         if action not in commands:
             return jsonify({'success': False, 'error': 'Unsupported action'}), 400
 
-        run_background(commands[action])
-        return jsonify({'success': True, 'started': True, 'action': action})
+        if action in services:
+            run_background(commands[action])
+            return jsonify({'success': True, 'started': True, 'action': action})
+
+        job = job_runner.submit(action, run_command_job, command=commands[action], cwd=PROJECT_ROOT)
+        return jsonify({'success': True, 'started': True, 'action': action, 'job_id': job['id'], 'job': job}), 202
+    except JobLimitError as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/jobs')
+def list_jobs():
+    """Các job gần đây, mới nhất trước"""
+    return jsonify({'success': True, 'data': job_runner.list()})
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Trạng thái / tiến trình / kết quả / lỗi của một job"""
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': f'Job not found: {job_id}'}), 404
+    return jsonify({'success': True, 'data': job})
+
+@app.route('/api/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-Sent Events của một job: tiến trình, thời gian + số dòng từng bước, kết thúc bằng 'finished'"""
+    if job_runner.get(job_id) is None:
+        return jsonify({'success': False, 'error': f'Job not found: {job_id}'}), 404
+    subscription = job_runner.subscribe(job_id, after_id=last_event_id(request.headers.get('Last-Event-ID')))
+    return app.response_class(stream_with_context(sse_stream(subscription, until=is_finished)),
+                              mimetype=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
 @app.route('/api/products')
 def get_products():
     """API endpoint cho products data"""
     try:
-        # Tương tự cho products
-        csv_files = []
-        if os.path.exists('data'):
-            for file in os.listdir('data'):
-                if file.startswith('products_') and file.endswith('.csv'):
-                    csv_files.append(f'data/{file}')
-
-        if csv_files:
-            latest_file = max(csv_files, key=os.path.getmtime)
-            df = pd.read_csv(latest_file)
-            return jsonify({
-                'success': True,
-                'data': df.to_dict('records'),
-                'count': len(df),
-                'source': latest_file
-            })
-        else:
+        dataset = _products_dataset()
+        if dataset is None:
             return jsonify({'success': False, 'error': 'No product files found'})
+        return _dataset_response(dataset)
 
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -207,15 +381,10 @@ def get_products():
 def get_sla():
     """API endpoint cho SLA data"""
     try:
-        # Đọc SLA summary file
-        sla_files = []
-        if os.path.exists('data'):
-            for file in os.listdir('data'):
-                if file.startswith('sla_summary_') and file.endswith('.txt'):
-                    sla_files.append(f'data/{file}')
-
-        if sla_files:
-            latest_file = max(sla_files, key=os.path.getmtime)
+        # Đọc SLA summary file mới nhất theo manifest
+        latest_file = get_manifest().latest_path('sla_summary', ext='.txt')
+
+        if latest_file:
             with open(latest_file, 'r', encoding='utf-8') as f:
                 content = f.read()
 
@@ -231,4 +400,6 @@ def get_sla():
         return jsonify({'success': False, 'error': str(e)})
 
 if __name__ == '__main__':
+    # Giữ data/manifest.json khớp thư mục data cho mọi reader
+    ManifestWatcher(get_manifest()).start()
     app.run(debug=True, port=5000)
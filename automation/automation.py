@@ -13,17 +13,14 @@ import json
 import logging
 import time
 import pickle
+import itertools
 import schedule
 import pandas as pd
 from datetime import datetime
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException
-from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import load_dotenv
 import smtplib
 from email.mime.text import MIMEText
@@ -33,6 +30,24 @@ from email import encoders
 from selenium.webdriver.common.keys import Keys
 import numpy as np
 
+from scripts.driver_pool import (
+    get_driver_pool, driver_pool_enabled, create_chrome_driver, release_driver
+)
+from scripts.http_scraper import HttpOrderScraper
+from scripts.page_readiness import PageReadiness
+from scripts.date_customizer import DateCustomizer
+from scripts.incremental import (
+    WatermarkStore, WATERMARK_FILE, INCREMENTAL_STORE_FILE,
+    load_incremental_store, save_incremental_store, merge_incremental_orders
+)
+from scripts.order_store import (
+    open_order_store, DASHBOARD_STATUS_MAP, DEFAULT_DASHBOARD_STATUS, PLATFORM_REGIONS, DEFAULT_REGION,
+    PLATFORM_CUSTOMER_TYPES, DEFAULT_CUSTOMER_TYPE
+)
+from scripts.columnar_export import write_columnar, ORDERS_COLUMNAR_FILE
+from scripts.excel_export import write_excel, ORDERS_SHEET, PRODUCTS_SHEET
+from scripts.data_manifest import register_artifacts
+
 class SessionManager:
     """Quản lý session để tránh login lại"""
 
@@ -90,6 +105,7 @@ class OneAutomationSystem:
         self.session_data = {}
         self.session_manager = SessionManager()
         self.is_logged_in = False
+        self.last_scrape_error = None
 
     def load_config(self, config_path):
         """Tải cấu hình từ file JSON"""
@@ -147,96 +163,31 @@ class OneAutomationSystem:
         self.logger.addHandler(console_handler)
 
     def setup_driver(self):
-        """Thiết lập WebDriver với tối ưu hiệu suất tối đa"""
+        """Thiết lập WebDriver - lấy từ driver pool (khởi động sẵn) nếu được bật"""
         try:
-            options = Options()
-
-            # Core performance arguments
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-gpu')
-            options.add_argument('--window-size=1920,1080')
-            options.add_argument('--disable-blink-features=AutomationControlled')
-
-            # AGGRESSIVE PERFORMANCE OPTIMIZATION
-            # Block unnecessary content to speed up loading
-            options.add_experimental_option("prefs", {
-                "profile.default_content_setting_values": {
-                    "images": 2,        # Block images (60-80% faster loading)
-                    "plugins": 2,       # Block plugins
-                    "popups": 2,        # Block popups
-                    "geolocation": 2,   # Block location requests
-                    "notifications": 2, # Block notifications
-                    "media_stream": 2,  # Block media stream
-                }
-            })
-
-            # Advanced performance flags
-            performance_args = [
-                '--disable-extensions',
-                '--disable-plugins',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor',
-                '--disable-background-timer-throttling',
-                '--disable-background-networking',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-renderer-backgrounding',
-                '--aggressive-cache-discard',
-                '--memory-pressure-off',
-                '--disable-ipc-flooding-protection',
-                '--disable-hang-monitor',
-                '--disable-prompt-on-repost',
-                '--no-first-run',
-                '--disable-default-apps',
-                '--log-level=3'
-            ]
-
-            for arg in performance_args:
-                options.add_argument(arg)
-
-            # JavaScript optimization
-            options.add_argument('--js-flags=--expose-gc')
-            options.add_argument('--js-flags=--max_old_space_size=4096')
+            pool_settings = self.config.get('driver_pool', {})
+            headless = os.getenv('HEADLESS', 'true').lower() == 'true'
 
-            # Disable automation detection
-            options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            options.add_experimental_option('useAutomationExtension', False)
-
-            # Headless mode for production
-            if os.getenv('HEADLESS', 'true').lower() == 'true':
-                options.add_argument('--headless=new')  # Use new headless mode
-
-            # Chrome binary path for macOS
-            chrome_binary = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
-            if os.path.exists(chrome_binary):
-                options.binary_location = chrome_binary
-
-            # Setup driver
-            try:
-                service = Service(ChromeDriverManager().install())
-                self.driver = webdriver.Chrome(service=service, options=options)
-            except Exception as e:
-                self.logger.warning(f"ChromeDriverManager failed: {e}")
-                service = Service()
-                self.driver = webdriver.Chrome(service=service, options=options)
-
-            # OPTIMIZED TIMEOUTS (Tối ưu #2)
-            self.driver.implicitly_wait(3)  # Giảm từ 10s xuống 3s
-            self.driver.set_page_load_timeout(15)  # Giảm từ 30s xuống 15s
-            self.driver.set_script_timeout(3)  # Giảm từ 5s xuống 3s
-
-            # Hide automation detection
-            self.driver.execute_script(
-                "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-            )
+            if driver_pool_enabled(pool_settings):
+                # Driver đã khởi động sẵn, chromedriver path đã cache trên đĩa
+                self.driver = get_driver_pool(pool_settings, self.logger, headless=headless).acquire()
+                self.logger.info("✅ WebDriver lấy từ driver pool đã sẵn sàng")
+            else:
+                self.driver = create_chrome_driver(headless=headless, logger=self.logger)
+                self.logger.info("✅ WebDriver tối ưu đã sẵn sàng")
 
-            self.logger.info("✅ WebDriver tối ưu đã sẵn sàng")
             return True
 
         except Exception as e:
             self.logger.error(f"❌ Lỗi khởi tạo WebDriver: {e}")
             return False
 
+    def release_driver(self, reset_session=False):
+        """Trả WebDriver về pool (hoặc quit nếu không dùng pool)"""
+        if self.driver:
+            release_driver(self.driver, reset_session=reset_session)
+            self.driver = None
+
     def check_existing_session(self):
         """Kiểm tra session hiện tại có còn hợp lệ không (Tối ưu #1)"""
         try:
@@ -460,120 +411,271 @@ class OneAutomationSystem:
             self.logger.error(f"❌ Lỗi điều hướng đến trang đơn hàng: {e}")
             return False
 
-    def scrape_order_data(self):
-        """Lấy dữ liệu đơn hàng từ trang web - PHIÊN BẢN TỐI ƯU PRO"""
+    # Lấy từng cửa sổ dòng dưới dạng 1 chuỗi phân tách (\x1e giữa các dòng, \x1f giữa các ô)
+    # thay vì 1 nested list khổng lồ cho cả bảng
+    ROW_COUNT_SCRIPT = """
+    window.__oneOrderRows = Array.from(document.querySelectorAll('table tbody tr, tbody tr, .table tbody tr'))
+        .filter(row => row.querySelectorAll('td').length > 0);
+    return window.__oneOrderRows.length;
+    """
+
+    ROW_WINDOW_SCRIPT = """
+    const rows = (window.__oneOrderRows || []).slice(arguments[0], arguments[1]);
+    return rows.map(row => Array.from(row.querySelectorAll('td'))
+        .map(cell => cell.innerText.trim().replace(/[\\x1e\\x1f]/g, ' '))
+        .join('\\x1f'))
+        .join('\\x1e');
+    """
+
+    def iter_table_rows(self, window_size=200):
+        """Generator: lấy bảng đơn hàng theo từng cửa sổ `window_size` dòng, yield text từng ô của mỗi dòng"""
+        total_rows = self.driver.execute_script(self.ROW_COUNT_SCRIPT) or 0
+
+        if total_rows:
+            self.logger.info(f"✅ Tìm thấy {total_rows} dòng dữ liệu (đọc theo cửa sổ {window_size} dòng)")
+            for window_start in range(0, total_rows, window_size):
+                window_data = self.driver.execute_script(
+                    self.ROW_WINDOW_SCRIPT, window_start, window_start + window_size
+                )
+                if not window_data:
+                    continue
+                for row_text in window_data.split('\x1e'):
+                    yield row_text.split('\x1f')
+            return
+
+        self.logger.error("❌ Không tìm thấy dữ liệu thông qua JavaScript")
+
+        # Fallback sang cách cũ nếu JS không hoạt động
+        simple_selectors = ["table tbody tr", "tbody tr", ".table tbody tr"]
+
+        for selector in simple_selectors:
+            try:
+                rows = self.driver.find_elements(By.CSS_SELECTOR, selector)
+            except Exception:
+                continue
+            if rows:
+                for row in rows:
+                    cells = row.find_elements(By.CSS_SELECTOR, "td")
+                    if cells:
+                        yield [cell.text.strip() for cell in cells]
+                return
+
+    def scrape_order_data(self, stream=False):
+        """Lấy dữ liệu đơn hàng từ trang web - PHIÊN BẢN TỐI ƯU PRO
+
+        Args:
+            stream (bool): True → trả về generator order dict (xử lý chồng lấp với việc đọc bảng)
+        """
+        if stream:
+            return self.iter_order_data()
+        return list(self.iter_order_data())
+
+    def iter_order_data(self):
+        """Generator order dict đọc trực tiếp từ bảng theo từng cửa sổ dòng"""
+        self.last_scrape_error = None
         try:
             self.logger.info("📊 Bắt đầu lấy dữ liệu đơn hàng...")
 
             start_time = time.time()
-            orders = []
+            window_size = self.config.get('data_processing', {}).get('row_window_size', 200)
+            count = 0
 
-            # Sử dụng JavaScript để tăng tốc truy vấn DOM
-            js_script = """
-            return Array.from(document.querySelectorAll('table tbody tr, tbody tr, .table tbody tr'))
-                .filter(row => row.querySelectorAll('td').length > 0)
-                .map(row => {
-                    const cells = Array.from(row.querySelectorAll('td'));
-                    return cells.map(cell => cell.innerText.trim());
-                });
-            """
+            # Chờ DOM ổn định (AJAX xong + bảng ngừng render) thay vì sleep cố định
+            PageReadiness(self.driver, self.logger).wait_for_ajax_idle("table tbody", timeout=3)
 
-            try:
-                # Chờ ngắn cho DOM ổn định
-                time.sleep(0.3)
+            for order in self.iter_orders_from_rows(self.iter_table_rows(window_size), start_time):
+                count += 1
+                # Log vài dòng đầu để kiểm tra
+                if count <= 2:
+                    summary = f"ID={order.get('id', 'N/A')}, Code={order.get('order_code', 'N/A')}"
+                    self.logger.info(f"📝 Mẫu dữ liệu {count}: {summary}")
+                yield order
 
-                # Thực thi script JS để lấy dữ liệu trực tiếp - nhanh hơn nhiều
-                rows_data = self.driver.execute_script(js_script)
+            elapsed_time = time.time() - start_time
+            self.logger.info(f"✅ Hoàn thành lấy {count} đơn hàng trong {elapsed_time:.2f} giây")
 
-                if not rows_data or len(rows_data) == 0:
-                    self.logger.error("❌ Không tìm thấy dữ liệu thông qua JavaScript")
+        except Exception as e:
+            self.logger.error(f"❌ Lỗi lấy dữ liệu đơn hàng: {e}")
+            # Stream kết thúc sớm → run_automation phân biệt "lỗi đọc bảng" với "không có đơn"
+            self.last_scrape_error = str(e)
+            return
 
-                    # Fallback sang cách cũ nếu JS không hoạt động
-                    simple_selectors = ["table tbody tr", "tbody tr", ".table tbody tr"]
+    def scrape_order_data_http(self, date_from=None, date_to=None):
+        """Lấy dữ liệu đơn hàng qua HTTP (không mở trình duyệt) - None → fallback sang Selenium, [] = không có đơn"""
+        scraper = None
+        try:
+            self.logger.info("🌐 Thử lấy dữ liệu đơn hàng qua HTTP...")
 
-                    for selector in simple_selectors:
-                        try:
-                            rows = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                            if rows:
-                                rows_data = []
-                                for row in rows:
-                                    cells = row.find_elements(By.CSS_SELECTOR, "td")
-                                    if cells:
-                                        rows_data.append([cell.text.strip() for cell in cells])
-                                break
-                        except Exception:
-                            continue
+            start_time = time.time()
+            scraper = HttpOrderScraper(self.config, self.logger, self.session_manager)
+            rows_data = scraper.scrape_rows(date_from, date_to)
+            if rows_data is None:
+                self.logger.info("↩️ HTTP không lấy được dữ liệu - chuyển sang Selenium")
+                return None
 
-                self.logger.info(f"✅ Tìm thấy {len(rows_data)} dòng dữ liệu")
+            orders = self.build_orders_from_rows(rows_data, start_time)
 
-                # Giới hạn số dòng dựa vào config
-                max_rows_config = self.config.get('data_processing', {}).get('max_rows_for_testing', None)
-                fast_mode = self.config.get('data_processing', {}).get('enable_fast_mode', True)
+            elapsed_time = time.time() - start_time
+            self.logger.info(f"✅ HTTP: hoàn thành lấy {len(orders)} đơn hàng trong {elapsed_time:.2f} giây")
+            return orders
 
-                if fast_mode and max_rows_config and len(rows_data) > max_rows_config:
-                    self.logger.info(f"⚡ Fast mode: Giới hạn lấy {max_rows_config} dòng đầu tiên từ {len(rows_data)} dòng")
-                    rows_data = rows_data[:max_rows_config]
-                else:
-                    self.logger.info(f"🐌 Full mode: Lấy tất cả {len(rows_data)} dòng")
+        except Exception as e:
+            self.logger.warning(f"⚠️ Lỗi lấy dữ liệu qua HTTP: {e}")
+            return None
+        finally:
+            if scraper:
+                scraper.close()
 
-                # Xử lý dữ liệu từ JavaScript
-                for i, cell_texts in enumerate(rows_data):
-                    try:
-                        if not cell_texts or len(cell_texts) < 2:  # Bỏ qua dòng không có đủ dữ liệu
-                            continue
+    def build_orders_from_rows(self, rows_data, start_time=None):
+        """Chuyển các dòng (text từng ô) thành danh sách order dict - dùng chung cho Selenium và HTTP"""
+        self.logger.info(f"✅ Tìm thấy {len(rows_data)} dòng dữ liệu")
+        return list(self.iter_orders_from_rows(rows_data, start_time))
 
-                        # Tạo order data nhanh chóng
-                        order_data = {
-                            'row_index': i + 1,
-                            'total_columns': len(cell_texts),
-                            'scraped_at': datetime.now().isoformat()
-                        }
-
-                        # Mapping nhanh các cột quan trọng
-                        if len(cell_texts) > 0:
-                            order_data['col_1'] = cell_texts[0]
-                        if len(cell_texts) > 1:
-                            order_data['id'] = cell_texts[1]
-                        if len(cell_texts) > 2:
-                            order_data['order_code'] = cell_texts[2]
-                        if len(cell_texts) > 3:
-                            order_data['col_4'] = cell_texts[3]
-                        if len(cell_texts) > 4:
-                            order_data['customer'] = cell_texts[4]
-
-                        # Lưu tất cả dữ liệu cột (để backup)
-                        for j, text in enumerate(cell_texts):
-                            if text:  # Chỉ lưu nếu có dữ liệu
-                                order_data[f'col_{j+1}'] = text
-
-                        orders.append(order_data)
-
-                        # Log progress mỗi 50 dòng thay vì 20 (giảm output log)
-                        if (i + 1) % 50 == 0:
-                            elapsed = time.time() - start_time
-                            self.logger.info(f"⚡ Đã xử lý {i+1}/{len(rows_data)} dòng trong {elapsed:.1f}s")
+    def iter_orders_from_rows(self, rows, start_time=None):
+        """Generator: chuyển từng dòng (list hoặc generator các dòng) thành order dict"""
+        start_time = start_time or time.time()
 
-                    except Exception as e:
-                        self.logger.warning(f"⚠️ Lỗi dòng {i+1}: {str(e)[:100]}")
-                        continue
+        # Giới hạn số dòng dựa vào config
+        max_rows_config = self.config.get('data_processing', {}).get('max_rows_for_testing', None)
+        fast_mode = self.config.get('data_processing', {}).get('enable_fast_mode', True)
+
+        if fast_mode and max_rows_config:
+            self.logger.info(f"⚡ Fast mode: Giới hạn lấy {max_rows_config} dòng đầu tiên")
+            rows = itertools.islice(rows, max_rows_config)
+        else:
+            self.logger.info("🐌 Full mode: Lấy tất cả các dòng")
+
+        # Xử lý từng dòng (từ JavaScript hoặc HTTP)
+        for i, cell_texts in enumerate(rows):
+            try:
+                if not cell_texts or len(cell_texts) < 2:  # Bỏ qua dòng không có đủ dữ liệu
+                    continue
+
+                # Tạo order data nhanh chóng
+                order_data = {
+                    'row_index': i + 1,
+                    'total_columns': len(cell_texts),
+                    'scraped_at': datetime.now().isoformat()
+                }
+
+                # Mapping nhanh các cột quan trọng
+                if len(cell_texts) > 0:
+                    order_data['col_1'] = cell_texts[0]
+                if len(cell_texts) > 1:
+                    order_data['id'] = cell_texts[1]
+                if len(cell_texts) > 2:
+                    order_data['order_code'] = cell_texts[2]
+                if len(cell_texts) > 3:
+                    order_data['col_4'] = cell_texts[3]
+                if len(cell_texts) > 4:
+                    order_data['customer'] = cell_texts[4]
+
+                # Lưu tất cả dữ liệu cột (để backup)
+                for j, text in enumerate(cell_texts):
+                    if text:  # Chỉ lưu nếu có dữ liệu
+                        order_data[f'col_{j+1}'] = text
+
+                yield order_data
+
+                # Log progress mỗi 50 dòng thay vì 20 (giảm output log)
+                if (i + 1) % 50 == 0:
+                    elapsed = time.time() - start_time
+                    self.logger.info(f"⚡ Đã xử lý {i+1} dòng trong {elapsed:.1f}s")
 
             except Exception as e:
-                self.logger.error(f"❌ Lỗi khi thực thi JavaScript: {e}")
-                return []
+                self.logger.warning(f"⚠️ Lỗi dòng {i+1}: {str(e)[:100]}")
+                continue
+
+    def _orders_to_dataframe(self, orders, chunk_size=500):
+        """Tạo DataFrame từ list hoặc generator order dict - generator được gom theo từng chunk"""
+        if isinstance(orders, list):
+            return pd.DataFrame(orders)
+
+        chunks = []
+        orders = iter(orders)
+        while True:
+            chunk = list(itertools.islice(orders, chunk_size))
+            if not chunk:
+                break
+            chunks.append(pd.DataFrame(chunk))
+
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True, sort=False)
 
-            elapsed_time = time.time() - start_time
-            self.logger.info(f"✅ Hoàn thành lấy {len(orders)} đơn hàng trong {elapsed_time:.2f} giây")
+    def get_incremental_window(self):
+        """Khoảng ngày (date_from, date_to) cho chế độ incremental, None nếu cần lấy toàn bộ"""
+        settings = self.config.get('incremental', {})
+        if not settings.get('enabled', False):
+            return None
+
+        watermarks = WatermarkStore(settings.get('watermark_file', WATERMARK_FILE))
+        window_start = watermarks.window_start(settings.get('overlap_hours', 2))
+        if window_start is None:
+            self.logger.info("🔁 Incremental: chưa có watermark - lấy toàn bộ lần đầu")
+            return None
 
-            # Log vài dòng đầu để kiểm tra
-            for i, order in enumerate(orders[:2]):  # Giảm từ 3 xuống 2 dòng
-                summary = f"ID={order.get('id', 'N/A')}, Code={order.get('order_code', 'N/A')}"
-                self.logger.info(f"📝 Mẫu dữ liệu {i+1}: {summary}")
+        date_from = window_start.strftime('%Y-%m-%d')
+        date_to = datetime.now().strftime('%Y-%m-%d')
+        self.logger.info(f"🔁 Incremental: chỉ lấy đơn từ {date_from} đến {date_to} "
+                         f"(watermark - {settings.get('overlap_hours', 2)}h overlap)")
+        return date_from, date_to
 
-            return orders
+    def apply_date_window(self, date_from, date_to):
+        """Thu hẹp bộ lọc ngày trên trang đơn hàng (thời gian sàn) rồi tải lại bảng"""
+        date_customizer = DateCustomizer(self.driver, self.logger)
+        if not date_customizer.set_date_range(date_from, date_to, 'ecom'):
+            return False
+        return date_customizer.apply_filters(wait_for_load=True)
+
+    def merge_incremental_data(self, delta_df):
+        """Gộp đơn vừa lấy vào dữ liệu cũ theo order id, cập nhật watermark theo sàn"""
+        try:
+            settings = self.config.get('incremental', {})
+            store_file = settings.get('store_file', INCREMENTAL_STORE_FILE)
+            watermarks = WatermarkStore(settings.get('watermark_file', WATERMARK_FILE))
+
+            previous_df = load_incremental_store(store_file)
+            new_orders = watermarks.count_new_orders(delta_df)
+            merged_df = merge_incremental_orders(previous_df, delta_df)
+
+            save_incremental_store(merged_df, store_file)
+            watermarks.update_from_orders(merged_df)
+            watermarks.save()
+
+            self.logger.info(f"🔁 Incremental: {len(delta_df)} dòng delta ({new_orders} đơn mới) "
+                             f"+ {len(previous_df)} đơn cũ → {len(merged_df)} đơn")
+            return merged_df
 
         except Exception as e:
-            self.logger.error(f"❌ Lỗi lấy dữ liệu đơn hàng: {e}")
-            return []
+            self.logger.error(f"❌ Lỗi gộp dữ liệu incremental: {e}")
+            return delta_df
+
+    def mark_incremental_checked(self, checked_at):
+        """Không có đơn mới trong cửa sổ incremental → đẩy watermark tới thời điểm bắt đầu lần chạy"""
+        try:
+            settings = self.config.get('incremental', {})
+            watermarks = WatermarkStore(settings.get('watermark_file', WATERMARK_FILE))
+            watermarks.mark_checked(checked_at)
+            watermarks.save()
+            self.logger.info(f"🔁 Incremental: không có đơn mới - watermark tiến tới {checked_at:%Y-%m-%d %H:%M}")
+        except Exception as e:
+            self.logger.error(f"❌ Lỗi cập nhật watermark incremental: {e}")
+
+    def store_orders(self, df):
+        """Upsert đơn hàng vào kho SQLite (config order_store), trả về số đơn đã ghi"""
+        try:
+            store = open_order_store(self.config)
+            if store is None:
+                return 0
+
+            stored = store.upsert_orders(df)
+            self.logger.info(f"🗄️ Đã upsert {stored} đơn vào kho {store.db_path}")
+            return stored
+
+        except Exception as e:
+            self.logger.error(f"❌ Lỗi ghi kho đơn hàng: {e}")
+            return 0
 
     def process_order_data(self, orders):
         """Xử lý và làm sạch dữ liệu đơn hàng"""
@@ -584,8 +686,12 @@ class OneAutomationSystem:
                 self.logger.warning("⚠️ Không có dữ liệu để xử lý")
                 return pd.DataFrame()
 
-            # Chuyển đổi sang DataFrame
-            df = pd.DataFrame(orders)
+            # Chuyển đổi sang DataFrame (orders có thể là generator đang stream từ bảng)
+            chunk_size = self.config.get('data_processing', {}).get('row_window_size', 200)
+            df = self._orders_to_dataframe(orders, chunk_size)
+            if df.empty:
+                self.logger.warning("⚠️ Không có dữ liệu để xử lý")
+                return df
             original_count = len(df)
 
             self.logger.info(f"📊 Dữ liệu gốc: {original_count} đơn hàng")
@@ -665,8 +771,12 @@ class OneAutomationSystem:
             export_files = {}
             export_config = self.config.get('export', {})
 
+            # Khi đã có kho SQLite thì bản CSV theo timestamp là tuỳ chọn
+            store_config = self.config.get('order_store', {})
+            csv_snapshots = not store_config.get('enabled', False) or store_config.get('csv_snapshots', False)
+
             # 1. Xuất CSV raw data (mặc định)
-            if export_config.get('csv', {}).get('enabled', True):
+            if csv_snapshots and export_config.get('csv', {}).get('enabled', True):
                 csv_filename = f"data/orders_export_{timestamp}.csv"
                 try:
                     df.to_csv(csv_filename, index=False, encoding='utf-8-sig')
@@ -679,15 +789,23 @@ class OneAutomationSystem:
             try:
                 dashboard_df = self.create_dashboard_format(df)
                 if not dashboard_df.empty:
-                    dashboard_filename = f"data/orders_dashboard_{timestamp}.csv"
-                    dashboard_df.to_csv(dashboard_filename, index=False, encoding='utf-8-sig')
-                    export_files['dashboard_csv'] = dashboard_filename
-                    self.logger.info(f"✅ Đã xuất Dashboard CSV: {dashboard_filename}")
+                    if csv_snapshots:
+                        dashboard_filename = f"data/orders_dashboard_{timestamp}.csv"
+                        dashboard_df.to_csv(dashboard_filename, index=False, encoding='utf-8-sig')
+                        export_files['dashboard_csv'] = dashboard_filename
+                        self.logger.info(f"✅ Đã xuất Dashboard CSV: {dashboard_filename}")
 
                     # Cập nhật file mới nhất để dashboard tự động load
                     latest_filename = "data/orders_latest.csv"
                     dashboard_df.to_csv(latest_filename, index=False, encoding='utf-8-sig')
                     self.logger.info(f"✅ Đã cập nhật file mới nhất: {latest_filename}")
+
+                    # Bản Parquet có kiểu (category / timestamp / số) cho các consumer đọc theo cột
+                    if export_config.get('parquet', {}).get('enabled', True):
+                        columnar_filename = write_columnar(dashboard_df, ORDERS_COLUMNAR_FILE)
+                        if columnar_filename:
+                            export_files['parquet'] = columnar_filename
+                            self.logger.info(f"✅ Đã xuất Parquet: {columnar_filename}")
             except Exception as e:
                 self.logger.error(f"❌ Lỗi xuất Dashboard format: {e}")
 
@@ -695,22 +813,11 @@ class OneAutomationSystem:
             if export_config.get('excel', {}).get('enabled', False):
                 excel_filename = f"data/orders_export_{timestamp}.xlsx"
                 try:
-                    with pd.ExcelWriter(excel_filename, engine='openpyxl') as writer:
-                        df.to_excel(writer, sheet_name='Đơn hàng', index=False)
-
-                        # Tự động điều chỉnh độ rộng cột
-                        worksheet = writer.sheets['Đơn hàng']
-                        for column in worksheet.columns:
-                            max_length = 0
-                            column_letter = column[0].column_letter
-                            for cell in column:
-                                try:
-                                    if len(str(cell.value)) > max_length:
-                                        max_length = len(str(cell.value))
-                                except:
-                                    pass
-                            adjusted_width = min(max_length + 2, 50)
-                            worksheet.column_dimensions[column_letter].width = adjusted_width
+                    # Đơn hàng + sản phẩm ghi trong một lần mở file, độ rộng cột tính sẵn từ DataFrame
+                    write_excel(excel_filename, {
+                        ORDERS_SHEET: df,
+                        PRODUCTS_SHEET: self.create_products_export(df)
+                    })
 
                     export_files['excel'] = excel_filename
                     self.logger.info(f"✅ Đã xuất Excel: {excel_filename}")
@@ -762,6 +869,9 @@ class OneAutomationSystem:
                 except Exception as e:
                     self.logger.error(f"❌ Lỗi tạo báo cáo: {e}")
 
+            # Cập nhật manifest để API / dashboard tìm file mới nhất không cần quét data/
+            register_artifacts(*export_files.values(), "data/orders_latest.csv")
+
             self.logger.info(f"🎉 Hoàn thành xuất dữ liệu: {len(export_files)} file")
             return export_files
 
@@ -863,12 +973,14 @@ class OneAutomationSystem:
         except Exception as e:
             self.logger.error(f"❌ Lỗi gửi thông báo: {e}")
 
-    def run_automation(self, progress_callback=None):
+    def run_automation(self, progress_callback=None, metrics_callback=None):
         """Chạy quy trình tự động hóa chính
 
         Args:
             progress_callback: Callback function để cập nhật tiến trình
                                Format: progress_callback(status_message, progress_percentage)
+            metrics_callback: Callback số dòng của bước vừa báo qua progress_callback
+                              Format: metrics_callback(rows)
         """
         result = {
             'success': False,
@@ -885,52 +997,106 @@ class OneAutomationSystem:
             if progress_callback:
                 progress_callback("Khởi tạo quy trình", 5)
 
-            # 1. Khởi tạo WebDriver
-            if progress_callback:
-                progress_callback("Đang khởi tạo WebDriver...", 10)
-
-            if not self.setup_driver():
-                raise Exception("Không thể khởi tạo WebDriver")
-
-            # 2. Đăng nhập
-            if progress_callback:
-                progress_callback("Đang đăng nhập vào hệ thống...", 20)
-
-            if not self.login_to_one():
-                raise Exception("Đăng nhập thất bại")
-
-            # 3. Điều hướng đến đơn hàng
-            if progress_callback:
-                progress_callback("Đang truy cập trang đơn hàng...", 30)
-
-            if not self.navigate_to_orders():
-                raise Exception("Không thể truy cập trang đơn hàng")
-
-            # 4. Lấy dữ liệu
-            if progress_callback:
-                progress_callback("Đang lấy dữ liệu đơn hàng...", 40)
-
-            orders = self.scrape_order_data()
-            if not orders:
-                raise Exception("Không lấy được dữ liệu đơn hàng")
+            orders = None
+            self.last_scrape_error = None
+
+            # Incremental: chỉ lấy từ watermark - overlap (None → lấy toàn bộ như cũ)
+            date_window = self.get_incremental_window()
+
+            # 0. Backend HTTP (không cần trình duyệt) nếu được bật
+            if self.config.get('scraper', {}).get('backend', 'selenium') == 'http':
+                if progress_callback:
+                    progress_callback("Đang lấy dữ liệu đơn hàng qua HTTP...", 10)
+
+                orders = self.scrape_order_data_http(*(date_window or (None, None)))
+
+            # HTTP trả [] = truy vấn thành công nhưng không có đơn → không mở trình duyệt
+            if orders is None:
+                # 1. Khởi tạo WebDriver
+                if progress_callback:
+                    progress_callback("Đang khởi tạo WebDriver...", 10)
+
+                if not self.setup_driver():
+                    raise Exception("Không thể khởi tạo WebDriver")
+
+                # 2. Đăng nhập
+                if progress_callback:
+                    progress_callback("Đang đăng nhập vào hệ thống...", 20)
+
+                if not self.login_to_one():
+                    raise Exception("Đăng nhập thất bại")
+
+                # 3. Điều hướng đến đơn hàng
+                if progress_callback:
+                    progress_callback("Đang truy cập trang đơn hàng...", 30)
+
+                if not self.navigate_to_orders():
+                    raise Exception("Không thể truy cập trang đơn hàng")
+
+                if date_window and not self.apply_date_window(*date_window):
+                    raise Exception("Không thể thu hẹp khoảng ngày cho incremental")
+
+                # 4. Lấy dữ liệu
+                if progress_callback:
+                    progress_callback("Đang lấy dữ liệu đơn hàng...", 40)
+
+                # Stream: các dòng được xử lý ngay khi từng cửa sổ của bảng được đọc
+                orders = self.scrape_order_data(stream=True)
+
+            # Generator luôn "truthy" → lấy thử dòng đầu để biết có dữ liệu hay không
+            orders = iter(orders)
+            first_order = next(orders, None)
+            if first_order is None:
+                if not date_window or self.last_scrape_error:
+                    raise Exception("Không lấy được dữ liệu đơn hàng")
+
+                # Incremental: bảng đọc xong mà không có đơn nào trong cửa sổ → lần chạy thành công, 0 dòng
+                self.mark_incremental_checked(result['start_time'])
+                if progress_callback:
+                    progress_callback("Hoàn thành quy trình", 100)
+                if metrics_callback:
+                    metrics_callback(0)
+                result.update({
+                    'success': True,
+                    'delta_count': 0,
+                    'end_time': datetime.now()
+                })
+                return result
+            orders = itertools.chain([first_order], orders)
 
             # 5. Xử lý dữ liệu
             if progress_callback:
                 progress_callback("Đang xử lý dữ liệu...", 60)
 
             df = self.process_order_data(orders)
+            # Stream dừng giữa chừng → bảng thiếu dòng: không ghi đè export / kho / watermark
+            if self.last_scrape_error:
+                raise Exception(f"Lấy dữ liệu đơn hàng bị gián đoạn: {self.last_scrape_error}")
             if df.empty:
                 raise Exception("Dữ liệu rỗng sau khi xử lý")
 
+            # 5b. Gộp phần delta vào dữ liệu các lần chạy trước
+            if self.config.get('incremental', {}).get('enabled', False):
+                delta_count = len(df)
+                df = self.merge_incremental_data(df)
+                result['delta_count'] = delta_count
+
+            # 5c. Upsert vào kho đơn hàng SQLite (API / dashboard / SLA đọc từ đây)
+            result['stored_count'] = self.store_orders(df)
+
             # 6. Xuất dữ liệu
             if progress_callback:
                 progress_callback("Đang xuất dữ liệu...", 80)
+            if metrics_callback:
+                metrics_callback(len(df))
 
             export_files = self.export_data(df)
 
             # 7. Cập nhật kết quả
             if progress_callback:
                 progress_callback("Hoàn thành quy trình", 100)
+            if metrics_callback:
+                metrics_callback(len(df))
 
             result.update({
                 'success': True,
@@ -952,10 +1118,10 @@ class OneAutomationSystem:
                 progress_callback(f"Lỗi: {error_message}", 0)
 
         finally:
-            # Đóng driver
+            # Trả driver về pool
             if self.driver:
                 try:
-                    self.driver.quit()
+                    self.release_driver()
                     if progress_callback:
                         progress_callback("Đã đóng trình duyệt", 95)
                 except:
@@ -1262,6 +1428,10 @@ class OneAutomationSystem:
             self.logger.error(f"❌ Lỗi bấm tab 'Đơn chờ xuất kho': {e}")
             return False
 
+    def create_products_export(self, df):
+        """Bảng sản phẩm cho sheet Excel thứ hai (bản cơ bản không lấy chi tiết sản phẩm)"""
+        return pd.DataFrame()
+
     def create_dashboard_format(self, df):
         """Chuyển đổi dữ liệu thô sang format dashboard"""
         try:
@@ -1288,30 +1458,14 @@ class OneAutomationSystem:
                 dashboard_df['order_date'] = datetime.now()
 
             # 3. Trạng thái từ col_7
-            status_mapping = {
-                'Xác nhận': 'confirmed',
-                'Hủy': 'cancelled',
-                'Chờ xử lý': 'pending',
-                'Hoàn thành': 'delivered',
-                'Giao hàng': 'delivered'
-            }
-
             if 'col_7' in df.columns:
-                dashboard_df['status'] = df['col_7'].map(status_mapping).fillna('confirmed')
+                dashboard_df['status'] = df['col_7'].map(DASHBOARD_STATUS_MAP).fillna(DEFAULT_DASHBOARD_STATUS)
             else:
                 dashboard_df['status'] = 'confirmed'
 
             # 4. Vùng từ platform
-            region_mapping = {
-                'Shopee': 'TP.HCM',
-                'Tiktok': 'Hà Nội',
-                'MIA.vn website': 'TP.HCM',
-                'Lazada': 'Đà Nẵng',
-                'Sendo': 'Cần Thơ'
-            }
-
             if 'col_18' in df.columns:
-                dashboard_df['region'] = df['col_18'].map(region_mapping).fillna('Khác')
+                dashboard_df['region'] = df['col_18'].map(PLATFORM_REGIONS).fillna(DEFAULT_REGION)
             else:
                 regions = ['TP.HCM', 'Hà Nội', 'Đà Nẵng', 'Cần Thơ', 'Hải Phòng', 'Khác']
                 dashboard_df['region'] = np.random.choice(regions, size=len(dashboard_df))
@@ -1333,16 +1487,9 @@ class OneAutomationSystem:
             dashboard_df['is_delivered_ontime'] = np.random.choice([True, False], size=len(dashboard_df), p=[0.8, 0.2])
 
             # 8. Loại khách hàng từ platform
-            customer_type_mapping = {
-                'Shopee': 'Regular',
-                'Tiktok': 'New',
-                'MIA.vn website': 'VIP',
-                'Lazada': 'Regular',
-                'Sendo': 'New'
-            }
-
             if 'col_18' in df.columns:
-                dashboard_df['customer_type'] = df['col_18'].map(customer_type_mapping).fillna('Regular')
+                dashboard_df['customer_type'] = (df['col_18'].map(PLATFORM_CUSTOMER_TYPES)
+                                                 .fillna(DEFAULT_CUSTOMER_TYPE))
             else:
                 customer_types = ['New', 'Regular', 'VIP']
                 dashboard_df['customer_type'] = np.random.choice(customer_types, size=len(dashboard_df))
@@ -7,13 +7,19 @@ import os
 import sys
 import json
 from datetime import datetime
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import FastAPI, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import uvicorn
 
 # Add current directory to Python path
 sys.path.append('.')
 
+from scripts.ndjson_stream import stream_records, media_type, dumps, STREAM_FORMATS
+from scripts.job_runner import JobRunner, JobLimitError, run_automation_job, is_finished
+from scripts.event_bus import sse_stream, last_event_id, SSE_MEDIA_TYPE, SSE_HEADERS
+
 # Import automation system
 try:
     from automation import OneAutomationSystem
@@ -38,6 +44,8 @@ app.add_middleware(
 # Global storage
 orders_storage = []
 automation_status = {"running": False, "last_run": None}
+# Automation chạy trong worker process; endpoint chỉ trả job id
+job_runner = JobRunner()
 
 @app.get("/")
 async def root():
@@ -47,42 +55,81 @@ async def root():
 async def health():
     return {"status": "healthy", "automation_available": automation_available}
 
+def _on_automation_finished(job):
+    """Cập nhật trạng thái / kho đơn khi job automation kết thúc (chạy ở process chính)"""
+    result = job.get("result") or {}
+    automation_status.update({"last_run": job["finished_at"], "last_job": job["id"]})
+    # Store orders if successful
+    if result.get("success") and result.get("orders"):
+        orders_storage.extend(result["orders"])
+
 @app.post("/api/automation/start")
-async def start_automation():
-    """Start automation process"""
+async def start_automation(enhanced: bool = False):
+    """Start automation process (trả job id ngay, theo dõi qua /api/automation/jobs/{job_id})"""
     if not automation_available:
         return {"success": False, "message": "Automation system not available"}
 
     try:
-        # Initialize and run automation
-        automation = OneAutomationSystem()
-        result = automation.run_automation()
-
-        # Store orders if successful
-        if result.get("success") and result.get("orders"):
-            global orders_storage
-            orders_storage.extend(result["orders"])
-
-        return {"success": True, "message": "Automation completed", "data": result}
+        job = job_runner.submit("automation", run_automation_job, on_finish=_on_automation_finished,
+                                enhanced=enhanced)
+        return {"success": True, "message": "Automation started", "data": job}
 
+    except JobLimitError as e:
+        return Response(dumps({"success": False, "message": str(e)}), status_code=429,
+                        media_type="application/json")
     except Exception as e:
         return {"success": False, "message": f"Error: {str(e)}"}
 
+@app.get("/api/automation/jobs")
+async def list_jobs():
+    """Các job automation gần đây, mới nhất trước"""
+    return {"success": True, "data": job_runner.list()}
+
+@app.get("/api/automation/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Trạng thái / tiến trình / kết quả / lỗi của một job"""
+    job = job_runner.get(job_id)
+    if job is None:
+        return Response(dumps({"success": False, "message": f"Job not found: {job_id}"}), status_code=404,
+                        media_type="application/json")
+    return {"success": True, "data": job}
+
+@app.get("/api/automation/jobs/{job_id}/events")
+async def job_events(job_id: str, last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")):
+    """Server-Sent Events của một job thay cho polling trạng thái"""
+    if job_runner.get(job_id) is None:
+        return Response(dumps({"success": False, "message": f"Job not found: {job_id}"}), status_code=404,
+                        media_type="application/json")
+    subscription = job_runner.subscribe(job_id, after_id=last_event_id(last_event_id_header))
+    return StreamingResponse(sse_stream(subscription, until=is_finished), media_type=SSE_MEDIA_TYPE,
+                             headers=SSE_HEADERS)
+
 @app.get("/api/orders")
-async def get_orders():
-    """Get all orders"""
-    return {
+async def get_orders(stream: Optional[str] = None):
+    """Get all orders (?stream=ndjson|json → gửi dần từng lô, bộ nhớ không phụ thuộc số đơn)"""
+    if stream:
+        if stream not in STREAM_FORMATS:
+            return Response(dumps({"success": False, "message": f"Unsupported stream format: {stream}"}),
+                            status_code=400, media_type="application/json")
+        # Chỉ gửi các đơn đã có lúc bắt đầu; lần chạy automation mới chỉ nối thêm vào cuối list
+        count = len(orders_storage)
+        records = (orders_storage[index] for index in range(count))
+        return StreamingResponse(stream_records(records, stream), media_type=media_type(stream))
+
+    return Response(dumps({
         "success": True,
         "data": {
             "orders": orders_storage,
             "count": len(orders_storage)
         }
-    }
+    }), media_type="application/json")
 
 @app.get("/api/automation/status")
 async def get_status():
     """Get automation status"""
-    return {"success": True, "data": automation_status}
+    active = job_runner.active_jobs()
+    return {"success": True, "data": {**automation_status, "running": bool(active),
+                                      "active_jobs": [job["id"] for job in active]}}
 
 if __name__ == "__main__":
     print("🚀 Starting MIA Automation Bridge...")
@@ -7,7 +7,7 @@ Web-based dashboard cho Automation System
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 import uvicorn
 import json
 import os
@@ -21,6 +21,10 @@ from pathlib import Path
 sys.path.append('./automation')
 sys.path.append('./automation/automation_new')
 
+from scripts.data_manifest import get_manifest
+from scripts.job_runner import JobRunner, JobLimitError, run_automation_job, is_finished, JOB_SUCCEEDED, ACTIVE_STATES
+from scripts.event_bus import sse_stream, SSE_MEDIA_TYPE, SSE_HEADERS
+
 app = FastAPI(
     title="MIA Automation Dashboard",
     description="Dashboard cho Warehouse Automation System",
@@ -37,6 +41,9 @@ app.add_middleware(
 
 # Global automation instance
 automation_system = None
+# Lần chạy thật trong worker process; tiến trình theo dõi qua SSE /automation/runs/{run_id}/events
+job_runner = JobRunner()
+AUTOMATION_DIR = os.path.dirname(os.path.abspath(__file__))
 
 @app.get("/")
 async def root():
@@ -119,18 +126,23 @@ async def health_check():
             "/automation/status",
             "/automation/data",
             "/automation/sla",
-            "/automation/run"
+            "/automation/run",
+            "/automation/runs/{run_id}/events"
         ]
     }
 
 @app.get("/automation/status")
 async def automation_status():
+    jobs = job_runner.list()
+    finished = [job for job in jobs if job["status"] not in ACTIVE_STATES]
+    succeeded = [job for job in finished if job["status"] == JOB_SUCCEEDED]
     return {
         "automation_service": "running",
-        "last_run": datetime.now().isoformat(),
-        "total_runs": 0,
-        "success_rate": 100.0,
-        "errors": [],
+        "last_run": finished[0]["finished_at"] if finished else None,
+        "total_runs": len(finished),
+        "success_rate": round(len(succeeded) / len(finished) * 100, 1) if finished else None,
+        "errors": [job["error"] for job in finished if job["error"]][:5],
+        "active_runs": [job["id"] for job in jobs if job["status"] in ACTIVE_STATES],
         "next_scheduled": "Not scheduled"
     }
 
@@ -139,15 +151,23 @@ async def automation_data():
     # Try to read recent data
     try:
         data_files = []
+        total_size = 0
         data_dir = Path("./automation/data")
         if data_dir.exists():
-            data_files = [f.name for f in data_dir.glob("*.json")][:10]
+            # Đọc từ manifest (mới nhất trước) thay vì glob + stat cả thư mục
+            manifest = get_manifest(str(data_dir))
+            json_files = manifest.files(ext=".json")
+            data_files = [entry["name"] for entry in json_files[:10]]
+            processed_files = len(json_files)
+            total_size = manifest.total_size()
+        else:
+            processed_files = 0
 
         return {
-            "processed_files": len(data_files),
+            "processed_files": processed_files,
             "recent_files": data_files,
             "data_directory": str(data_dir),
-            "total_size": "0 MB"
+            "total_size": f"{total_size / (1024 * 1024):.1f} MB"
         }
     except Exception as e:
         return {
@@ -175,16 +195,27 @@ async def sla_monitoring():
 async def run_automation():
     """Trigger automation run manually"""
     try:
-        # Simulate automation run
+        job = job_runner.submit("automation", run_automation_job, workdir=AUTOMATION_DIR)
         return {
             "status": "success",
             "message": "Automation started successfully",
-            "run_id": f"run_{int(datetime.now().timestamp())}",
+            "run_id": job["id"],
+            "events": f"/automation/runs/{job['id']}/events",
             "estimated_duration": "5-10 minutes"
         }
+    except JobLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/automation/runs/{run_id}/events")
+async def run_events(run_id: str):
+    """Server-Sent Events của một lần chạy (tiến trình, thời gian + số dòng từng bước)"""
+    if job_runner.get(run_id) is None:
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+    return StreamingResponse(sse_stream(job_runner.subscribe(run_id), until=is_finished),
+                             media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
 @app.get("/automation/logs")
 async def get_logs():
     """Get recent automation logs"""
@@ -6,7 +6,6 @@ Hệ thống tự động hóa warehouse với tính năng SLA monitoring và pr
 """
 
 import json
-import requests
 import pandas as pd
 from datetime import datetime
 import time
@@ -23,6 +22,15 @@ import os
 
 # Import base automation
 from automation import OneAutomationSystem, SessionManager
+from scripts.invoice_fetcher import AsyncInvoiceFetcher, INVOICE_JSON_PATH, cookies_from_driver
+from scripts.batch_controller import AdaptiveBatchController
+from scripts.page_readiness import PageReadiness
+from scripts.product_parser import (
+    build_product_details, product_details_frame, products_table, join_product_details
+)
+from scripts.product_cache import open_product_cache, statuses_from_orders
+from scripts.sla_engine import order_sla_table, attach_sla_columns
+from scripts.data_manifest import register_artifacts
 
 
 class EnhancedOneAutomationSystem(OneAutomationSystem):
@@ -46,6 +54,8 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
         self.is_logged_in = False
         self.sla_monitor = self.setup_sla_monitor()
         self.sheets_config_service = self.setup_sheets_config()
+        self.product_cache = open_product_cache(self.config)
+        self.products_df = pd.DataFrame()
 
     def setup_basic_logging(self):
         """Setup basic logging for initialization"""
@@ -124,37 +134,66 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
             self.logger.warning("⚠️ SLA Monitor not available")
             return None
 
-    def extract_product_details_batch(self, order_ids, batch_size=10):
-        """Lấy chi tiết sản phẩm theo batch để tối ưu performance"""
+    def extract_product_details_batch(self, order_ids, batch_size=10, statuses=None):
+        """Lấy chi tiết sản phẩm theo batch - các batch chạy song song qua asyncio
+
+        Args:
+            statuses: {order_id: trạng thái đã scrape} - đơn đổi trạng thái thì bỏ qua cache
+        """
         try:
             self.logger.info(f"📦 Bắt đầu lấy chi tiết sản phẩm cho {len(order_ids)} đơn hàng...")
 
+            settings = self.config.get('product_details', {})
             product_details = {}
-            total_batches = (len(order_ids) + batch_size - 1) // batch_size
-
-            for batch_num in range(total_batches):
-                start_idx = batch_num * batch_size
-                end_idx = min(start_idx + batch_size, len(order_ids))
-                batch_ids = order_ids[start_idx:end_idx]
-
-                self.logger.info(f"📦 Batch {batch_num + 1}/{total_batches}: {len(batch_ids)} đơn hàng")
-
-                # Method 1: Try direct API call first (fastest)
-                batch_details = self.fetch_json_api_direct(batch_ids)
-
-                if not batch_details:
-                    # Method 2: Fallback to UI interaction
-                    batch_details = self.fetch_json_via_ui(batch_ids)
-
-                # Merge results
-                product_details.update(batch_details)
+            fetched_records = []
+            processed = [0]
+
+            # Chỉ cache miss (chưa có, quá TTL, đổi trạng thái) mới gọi mạng
+            cache = getattr(self, 'product_cache', None)
+            if cache:
+                cached, order_ids = cache.get_many(order_ids, statuses)
+                product_details.update(cached)
+                self.logger.info(f"🧊 Cache: {len(cached)} đơn có sẵn, {len(order_ids)} đơn cần lấy mới")
+                if not order_ids:
+                    return product_details
+
+            def on_batch(batch_ids, records, error):
+                # Gom bản ghi thô, parse một lần (vectorized) cho cả lượt sau khi fetch xong
+                processed[0] += len(batch_ids)
+                if records:
+                    fetched_records.extend(records)
+                self.logger.info(f"⚡ Đã xử lý {processed[0]}/{len(order_ids)} đơn hàng")
+
+            # Batch size tự điều chỉnh (AIMD) theo endpoint, trừ khi tắt adaptive_batch
+            base_url = self.config['system']['one_url'].rstrip('/')
+            controller = None
+            if settings.get('adaptive_batch', True):
+                controller = AdaptiveBatchController.load(
+                    f"{base_url}{INVOICE_JSON_PATH}",
+                    initial_size=batch_size,
+                    max_size=settings.get('max_batch_size', 500)
+                )
+
+            # Method 1: API direct - cookies sync 1 lần, keep-alive pool, giới hạn concurrency
+            fetcher = AsyncInvoiceFetcher(
+                cookies_from_driver(self.driver),
+                base_url=base_url,
+                max_concurrency=settings.get('max_concurrency', 8),
+                timeout=settings.get('timeout', 15),
+                user_agent=self.driver.execute_script("return navigator.userAgent"),
+                logger=self.logger,
+                controller=controller
+            )
+            failed_batches = fetcher.fetch(order_ids, batch_size=batch_size, on_batch=on_batch)
+            fetched = self.parse_json_response(fetched_records)
 
-                # Progress logging
-                processed = min(end_idx, len(order_ids))
-                self.logger.info(f"⚡ Đã xử lý {processed}/{len(order_ids)} đơn hàng")
+            # Method 2: Fallback to UI interaction cho các batch lỗi
+            for batch_ids in failed_batches:
+                fetched.update(self.fetch_json_via_ui(batch_ids))
 
-                # Small delay between batches
-                time.sleep(0.5)
+            if cache:
+                cache.put_many(fetched, statuses)
+            product_details.update(fetched)
 
             self.logger.info(f"✅ Hoàn thành lấy chi tiết {len(product_details)} đơn hàng")
             return product_details
@@ -163,31 +202,6 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
             self.logger.error(f"❌ Lỗi lấy chi tiết sản phẩm: {e}")
             return {}
 
-    def fetch_json_api_direct(self, order_ids):
-        """Method 1: Direct API call (fastest)"""
-        try:
-            # Build API URL
-            ids_str = ','.join(map(str, order_ids))
-            api_url = f"https://one.tga.com.vn/so/invoiceJSON?id={ids_str}"
-
-            # Get cookies from current session
-            cookies = {cookie['name']: cookie['value'] for cookie in self.driver.get_cookies()}
-
-            # Make API request
-            response = requests.get(api_url, cookies=cookies, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
-                if not data.get('error', True) and data.get('data'):
-                    self.logger.info(f"✅ API Direct: Lấy được {len(data['data'])} đơn hàng")
-                    return self.parse_json_response(data['data'])
-
-            return {}
-
-        except Exception as e:
-            self.logger.warning(f"⚠️ API Direct failed: {e}")
-            return {}
-
     def fetch_json_via_ui(self, order_ids):
         """Method 2: UI interaction fallback"""
         try:
@@ -293,8 +307,8 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
             json_button.click()
             self.logger.info("✅ Clicked 'Lấy JSON' button")
 
-            # Wait for new page/response
-            time.sleep(2)
+            # Wait for new page/response (trả về ngay khi đã sang trang invoiceJSON)
+            PageReadiness(self.driver, self.logger).wait_for_url("invoiceJSON", timeout=10)
 
             # Check if redirected to JSON page
             current_url = self.driver.current_url
@@ -318,70 +332,14 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
             return None
 
     def parse_json_response(self, json_data):
-        """Parse JSON response and extract product details"""
+        """Parse JSON response and extract product details (cả batch một lần, vectorized)"""
         try:
-            product_details = {}
-
-            for order in json_data:
-                order_id = str(order.get('id', ''))
-                detail = order.get('detail', '')
-
-                if order_id and detail:
-                    # Parse product details
-                    products = self.parse_product_detail(detail)
-
-                    product_details[order_id] = {
-                        'products': products,
-                        'product_count': len(products),
-                        'raw_detail': detail,
-                        'customer': order.get('customer', ''),
-                        'amount_total': order.get('amount_total', ''),
-                        'transporter': order.get('transporter', ''),
-                        'address': order.get('address', ''),
-                        'phone': order.get('phone', '')
-                    }
-
-            return product_details
+            return build_product_details(json_data)
 
         except Exception as e:
             self.logger.error(f"❌ Error parsing JSON response: {e}")
             return {}
 
-    def parse_product_detail(self, detail_string):
-        """Parse product detail string into structured data"""
-        try:
-            products = []
-
-            # Split by comma
-            items = detail_string.split(',')
-
-            for item in items:
-                item = item.strip()
-                if not item:
-                    continue
-
-                # Extract quantity using regex
-                quantity_match = re.search(r'\((\d+)\)$', item)
-
-                if quantity_match:
-                    quantity = int(quantity_match.group(1))
-                    product_name = item[:quantity_match.start()].strip()
-                else:
-                    quantity = 1
-                    product_name = item
-
-                if product_name:
-                    products.append({
-                        'name': product_name,
-                        'quantity': quantity
-                    })
-
-            return products
-
-        except Exception as e:
-            self.logger.error(f"❌ Error parsing product detail: {e}")
-            return []
-
     def enhanced_scrape_order_data(self):
         """Enhanced scraping with product details"""
         try:
@@ -389,6 +347,7 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
 
             # Step 1: Get basic order data (existing method)
             orders = self.scrape_order_data()
+            self.products_df = pd.DataFrame()
 
             if not orders:
                 return []
@@ -404,7 +363,11 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
 
             # Step 3: Get product details in batches
             if order_ids:
-                product_details = self.extract_product_details_batch(order_ids, batch_size=5)
+                product_details = self.extract_product_details_batch(
+                    order_ids,
+                    batch_size=self.config.get('product_details', {}).get('batch_size', 5),
+                    statuses=statuses_from_orders(orders)
+                )
 
                 # Step 4: Merge product details with order data
                 enhanced_orders = self.merge_product_details(orders, product_details)
@@ -419,50 +382,16 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
             return []
 
     def merge_product_details(self, orders, product_details):
-        """Merge product details with basic order data"""
-        try:
-            enhanced_orders = []
+        """Merge product details with basic order data (DataFrame join theo order id)
 
-            for order in orders:
-                order_id = str(order.get('id', ''))
-
-                # Copy original order data
-                enhanced_order = order.copy()
-
-                # Add product details if available
-                if order_id in product_details:
-                    details = product_details[order_id]
-
-                    # Add product information
-                    enhanced_order['products'] = details['products']
-                    enhanced_order['product_count'] = details['product_count']
-                    enhanced_order['raw_product_detail'] = details['raw_detail']
-
-                    # Add additional API data
-                    enhanced_order['api_customer'] = details.get('customer', '')
-                    enhanced_order['api_amount'] = details.get('amount_total', '')
-                    enhanced_order['api_transporter'] = details.get('transporter', '')
-                    enhanced_order['api_address'] = details.get('address', '')
-                    enhanced_order['api_phone'] = details.get('phone', '')
-
-                    # Create product summary
-                    if details['products']:
-                        product_names = [p['name'] for p in details['products']]
-                        enhanced_order['product_summary'] = '; '.join(product_names[:3])  # First 3 products
-                        enhanced_order['total_items'] = sum(p['quantity'] for p in details['products'])
-                    else:
-                        enhanced_order['product_summary'] = 'No products'
-                        enhanced_order['total_items'] = 0
-                else:
-                    # No product details available
-                    enhanced_order['products'] = []
-                    enhanced_order['product_count'] = 0
-                    enhanced_order['product_summary'] = 'Details not available'
-                    enhanced_order['total_items'] = 0
-
-                enhanced_orders.append(enhanced_order)
+        Sản phẩm được tách ra bảng dài self.products_df (order_id, product_name, quantity)
+        """
+        try:
+            orders_df = orders if isinstance(orders, pd.DataFrame) else pd.DataFrame(orders)
+            details_df = product_details_frame(product_details)
 
-            return enhanced_orders
+            self.products_df = products_table(details_df)
+            return join_product_details(orders_df, details_df, key='id')
 
         except Exception as e:
             self.logger.error(f"❌ Error merging product details: {e}")
@@ -480,7 +409,7 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
 
             # 1. Products-only CSV
-            if 'products' in df.columns:
+            if not getattr(self, 'products_df', pd.DataFrame()).empty:
                 try:
                     products_df = self.create_products_export(df)
                     products_filename = f"data/products_detail_{timestamp}.csv"
@@ -499,6 +428,8 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
             except Exception as e:
                 self.logger.error(f"❌ Lỗi tạo Enhanced Summary: {e}")
 
+            register_artifacts(export_files.get('products'), export_files.get('enhanced_summary'))
+
             return export_files
 
         except Exception as e:
@@ -506,26 +437,22 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
             return {}
 
     def create_products_export(self, df):
-        """Create products-only export"""
+        """Create products-only export (bảng dài sản phẩm join thông tin đơn)"""
         try:
-            products_data = []
-
-            for _, row in df.iterrows():
-                order_id = row.get('id', '')
-                products = row.get('products', [])
+            products_df = getattr(self, 'products_df', pd.DataFrame())
+            if products_df.empty or 'id' not in df.columns:
+                return pd.DataFrame()
 
-                if isinstance(products, list):
-                    for product in products:
-                        products_data.append({
-                            'order_id': order_id,
-                            'order_code': row.get('order_code', ''),
-                            'customer': row.get('customer', ''),
-                            'product_name': product.get('name', ''),
-                            'quantity': product.get('quantity', 0),
-                            'scraped_at': row.get('scraped_at', '')
-                        })
+            order_columns = [column for column in ('order_code', 'customer', 'scraped_at') if column in df.columns]
+            orders_info = (df[['id'] + order_columns]
+                           .assign(id=df['id'].astype(str).str.strip())
+                           .drop_duplicates('id')
+                           .rename(columns={'id': 'order_id'}))
 
-            return pd.DataFrame(products_data)
+            export_df = products_df.merge(orders_info, on='order_id', how='left')
+            export_df = export_df.reindex(columns=['order_id', 'order_code', 'customer', 'product_name',
+                                                   'quantity', 'scraped_at'])
+            return export_df.fillna({'order_code': '', 'customer': '', 'scraped_at': ''})
 
         except Exception as e:
             self.logger.error(f"❌ Error creating products export: {e}")
@@ -541,7 +468,7 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
                 f.write(f"📦 Tổng đơn hàng: {len(df)}\n")
 
                 # Product statistics
-                if 'products' in df.columns:
+                if 'product_count' in df.columns:
                     total_products = df['product_count'].sum() if 'product_count' in df.columns else 0
                     orders_with_products = len(df[df['product_count'] > 0]) if 'product_count' in df.columns else 0
 
@@ -549,6 +476,13 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
                     f.write(f"📋 Đơn có sản phẩm: {orders_with_products}/{len(df)}\n")
                     f.write(f"📊 Tỷ lệ thành công: {orders_with_products/len(df)*100:.1f}%\n")
 
+                # Product cache statistics
+                if getattr(self, 'product_cache', None):
+                    cache_stats = self.product_cache.stats()
+                    f.write(f"🧊 Cache chi tiết sản phẩm: {cache_stats['hits']} hit / {cache_stats['misses']} miss "
+                            f"(hit ratio {cache_stats['hit_ratio']*100:.1f}%, {cache_stats['invalidated']} đổi trạng thái, "
+                            f"{cache_stats['expired']} hết hạn)\n")
+
                 f.write(f"\n📋 Cấu trúc dữ liệu Enhanced:\n")
                 for i, col in enumerate(df.columns, 1):
                     f.write(f"  {i}. {col}\n")
@@ -556,8 +490,11 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
         except Exception as e:
             self.logger.error(f"❌ Error creating enhanced summary: {e}")
 
-    def run_enhanced_automation(self, progress_callback=None):
-        """Run enhanced automation with product details"""
+    def run_enhanced_automation(self, progress_callback=None, metrics_callback=None):
+        """Run enhanced automation with product details
+
+        progress_callback(status_message, progress_percentage); metrics_callback(rows) nhận số dòng của bước
+        """
         result = {
             'success': False,
             'start_time': datetime.now(),
@@ -594,12 +531,14 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
                 progress_callback("Lấy dữ liệu ENHANCED với chi tiết sản phẩm...", 50)
 
             orders = self.enhanced_scrape_order_data()
-            if not orders:
+            if len(orders) == 0:
                 raise Exception("Không lấy được dữ liệu đơn hàng")
 
             # Step 5: Process enhanced data
             if progress_callback:
                 progress_callback("Xử lý dữ liệu ENHANCED...", 70)
+            if metrics_callback:
+                metrics_callback(len(orders))
 
             df, sla_report = self.process_order_data(orders)
             if df.empty:
@@ -608,11 +547,15 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
             # Step 6: Export enhanced data
             if progress_callback:
                 progress_callback("Xuất dữ liệu ENHANCED...", 85)
+            if metrics_callback:
+                metrics_callback(len(df))
 
             export_files = self.export_enhanced_data(df)
 
             # Calculate enhanced metrics
             enhanced_count = len(df[df['product_count'] > 0]) if 'product_count' in df.columns else 0
+            if self.product_cache:
+                result['product_cache'] = self.product_cache.stats()
 
             result.update({
                 'success': True,
@@ -625,8 +568,14 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
 
             if progress_callback:
                 progress_callback("Hoàn thành ENHANCED automation", 100)
+            if metrics_callback:
+                metrics_callback(len(df))
 
             self.logger.info(f"🎉 ENHANCED automation hoàn thành: {len(df)} đơn hàng, {enhanced_count} có chi tiết sản phẩm")
+            if 'product_cache' in result:
+                cache_stats = result['product_cache']
+                self.logger.info(f"🧊 Product cache: {cache_stats['hits']} hit / {cache_stats['misses']} miss "
+                                 f"(hit ratio {cache_stats['hit_ratio']*100:.1f}%)")
 
         except Exception as e:
             result['error'] = str(e)
@@ -637,7 +586,7 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
         finally:
             if self.driver:
                 try:
-                    self.driver.quit()
+                    self.release_driver()
                 except:
                     pass
 
@@ -655,8 +604,11 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
         try:
             self.logger.info("📊 Processing order data with SLA analysis...")
 
-            # Convert raw data to DataFrame
-            if isinstance(raw_data, list) and raw_data:
+            # Convert raw data to DataFrame (đã là DataFrame khi product details được join)
+            if isinstance(raw_data, pd.DataFrame) and not raw_data.empty:
+                processed_data = raw_data
+                self.logger.info(f"✅ Received {len(processed_data)} orders as DataFrame")
+            elif isinstance(raw_data, list) and raw_data:
                 processed_data = pd.DataFrame(raw_data)
                 self.logger.info(f"✅ Converted {len(processed_data)} orders to DataFrame")
             else:
@@ -688,43 +640,8 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
     def add_sla_info_to_orders(self, orders_df, sla_report):
         """Add SLA information to orders dataframe"""
         try:
-            # Add SLA columns
-            orders_df['sla_platform'] = 'other'
-            orders_df['sla_deadline'] = None
-            orders_df['sla_status'] = 'normal'
-            orders_df['sla_priority'] = 'low'
-
-            # Process Shopee orders
-            shopee_statuses = sla_report.get('shopee', {}).get('sla_status', [])
-            for status in shopee_statuses:
-                order_id = status.get('order_id')
-                mask = orders_df['id'] == order_id
-                orders_df.loc[mask, 'sla_platform'] = 'shopee'
-                orders_df.loc[mask, 'sla_deadline'] = status.get('handover_deadline', '')
-
-                if status.get('handover_overdue') or status.get('confirm_overdue'):
-                    orders_df.loc[mask, 'sla_status'] = 'overdue'
-                    orders_df.loc[mask, 'sla_priority'] = 'critical'
-                elif status.get('time_to_handover', 24) < 2:
-                    orders_df.loc[mask, 'sla_status'] = 'urgent'
-                    orders_df.loc[mask, 'sla_priority'] = 'high'
-
-            # Process TikTok orders
-            tiktok_statuses = sla_report.get('tiktok', {}).get('sla_status', [])
-            for status in tiktok_statuses:
-                order_id = status.get('order_id')
-                mask = orders_df['id'] == order_id
-                orders_df.loc[mask, 'sla_platform'] = 'tiktok'
-                orders_df.loc[mask, 'sla_deadline'] = status.get('handover_deadline', '')
-
-                if status.get('handover_overdue'):
-                    orders_df.loc[mask, 'sla_status'] = 'overdue'
-                    orders_df.loc[mask, 'sla_priority'] = 'critical'
-                elif status.get('time_to_handover', 24) < 4:
-                    orders_df.loc[mask, 'sla_status'] = 'urgent'
-                    orders_df.loc[mask, 'sla_priority'] = 'high'
-
-            return orders_df
+            # One keyed update from the report's per-order SLA statuses (Shopee, then TikTok)
+            return attach_sla_columns(orders_df, order_sla_table(sla_report))
 
         except Exception as e:
             self.logger.error(f"❌ Error adding SLA info: {e}")
@@ -6,6 +6,8 @@ import plotly.graph_objects as go
 from datetime import datetime
 import os
 
+from scripts.dashboard_data import DashboardData, load_orders, orders_version
+
 # Page config
 st.set_page_config(
     page_title="Warehouse Automation Dashboard",
@@ -19,40 +21,46 @@ st.title("🏭 Warehouse Automation Dashboard")
 st.markdown("---")
 
 # Load data
-@st.cache_data
-def load_data():
+# Khoá theo phiên bản nguồn (inode/size/mtime của kho SQLite hoặc Parquet + CSV): dữ liệu mới → nạp lại,
+# không đổi → dùng lại object đã chuẩn hoá kiểu + chỉ mục lọc (cache_resource không copy mỗi lần rerun)
+@st.cache_resource(max_entries=2, show_spinner="Đang nạp dữ liệu...")
+def load_data(version):
     try:
-        if os.path.exists('data/orders_latest.csv'):
-            df = pd.read_csv('data/orders_latest.csv')
-            return df
-        else:
-            st.error("❌ Không tìm thấy file dữ liệu: data/orders_latest.csv")
-            return pd.DataFrame()
+        # Kho SQLite nếu có, ngược lại Parquet (chỉ đọc các cột dashboard dùng) / CSV
+        df, source = load_orders()
+        if df is not None and not df.empty:
+            return DashboardData(df, version, source)
+        st.error("❌ Không tìm thấy file dữ liệu: data/orders_latest.csv")
     except Exception as e:
         st.error(f"❌ Lỗi đọc dữ liệu: {e}")
-        return pd.DataFrame()
+    return None
 
-df = load_data()
+data = load_data(orders_version())
+df = data.df if data is not None else pd.DataFrame()
 
 if not df.empty:
     # Sidebar filters
     st.sidebar.header("🔍 Bộ lọc")
+    selected = {}
 
     # Platform filter
     if 'platform' in df.columns:
-        platforms = ['Tất cả'] + list(df['platform'].unique())
+        platforms = ['Tất cả'] + data.options('platform')
         selected_platform = st.sidebar.selectbox("Platform", platforms)
 
         if selected_platform != 'Tất cả':
-            df = df[df['platform'] == selected_platform]
+            selected['platform'] = selected_platform
 
     # Status filter
     if 'status' in df.columns:
-        statuses = ['Tất cả'] + list(df['status'].unique())
+        statuses = ['Tất cả'] + data.options('status')
         selected_status = st.sidebar.selectbox("Trạng thái", statuses)
 
         if selected_status != 'Tất cả':
-            df = df[df['status'] == selected_status]
+            selected['status'] = selected_status
+
+    # Lọc bằng chỉ mục vị trí dòng tính sẵn, không quét lại cả DataFrame
+    df = data.filter(**selected)
 
     # Metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -64,6 +72,9 @@ if not df.empty:
         if 'amount' in df.columns:
             total_amount = df['amount'].str.replace('[^0-9]', '', regex=True).astype(int).sum()
             st.metric("💰 Tổng doanh thu", f"{total_amount:,} VNĐ")
+        elif 'order_value' in df.columns:
+            total_amount = int(df['order_value'].fillna(0).sum())
+            st.metric("💰 Tổng doanh thu", f"{total_amount:,} VNĐ")
         else:
             st.metric("💰 Tổng doanh thu", "N/A")
 
@@ -76,8 +87,7 @@ if not df.empty:
 
     with col4:
         if 'created_at' in df.columns:
-            df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
-            today_orders = len(df[df['created_at'].dt.date == datetime.now().date()])
+            today_orders = int((df['created_at'].dt.date == datetime.now().date()).sum())
             st.metric("📅 Đơn hôm nay", today_orders)
         else:
             st.metric("📅 Đơn hôm nay", "N/A")
@@ -91,6 +101,7 @@ if not df.empty:
         st.subheader("📊 Đơn hàng theo Platform")
         if 'platform' in df.columns:
             platform_counts = df['platform'].value_counts()
+            platform_counts = platform_counts[platform_counts > 0]
             fig = px.pie(
                 values=platform_counts.values,
                 names=platform_counts.index,
@@ -104,6 +115,7 @@ if not df.empty:
         st.subheader("📈 Đơn hàng theo Trạng thái")
         if 'status' in df.columns:
             status_counts = df['status'].value_counts()
+            status_counts = status_counts[status_counts > 0]
             fig = px.bar(
                 x=status_counts.index,
                 y=status_counts.values,
@@ -116,9 +128,8 @@ if not df.empty:
     # Time series
     if 'created_at' in df.columns:
         st.subheader("📅 Xu hướng đơn hàng theo thời gian")
-        df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
-        df['date'] = df['created_at'].dt.date
-        daily_orders = df.groupby('date').size().reset_index(name='orders')
+        # df có thể là DataFrame dùng chung trong cache → không gán thêm cột
+        daily_orders = df.groupby(df['created_at'].dt.date.rename('date')).size().reset_index(name='orders')
 
         fig = px.line(
             daily_orders,
@@ -10,6 +10,9 @@ import pandas as pd
 from datetime import datetime
 import os
 
+from scripts.columnar_export import write_columnar, ORDERS_COLUMNAR_FILE, PRODUCTS_COLUMNAR_FILE
+from scripts.data_manifest import register_artifacts
+
 class DashboardIntegration:
     def __init__(self):
         self.data_dir = "data"
@@ -35,6 +38,11 @@ class DashboardIntegration:
 
         print(f"✅ Exported orders: {orders_file}")
 
+        orders_parquet = write_columnar(orders_df, f"{self.data_dir}/{os.path.basename(ORDERS_COLUMNAR_FILE)}")
+        if orders_parquet:
+            files_created['orders_parquet'] = orders_parquet
+            print(f"✅ Exported orders parquet: {orders_parquet}")
+
         # 2. Export products nếu có
         if products_df is not None and not products_df.empty:
             products_file = f"{self.data_dir}/products_detail_{timestamp}.csv"
@@ -46,6 +54,12 @@ class DashboardIntegration:
 
             print(f"✅ Exported products: {products_file}")
 
+            products_parquet = write_columnar(products_df,
+                                              f"{self.data_dir}/{os.path.basename(PRODUCTS_COLUMNAR_FILE)}")
+            if products_parquet:
+                files_created['products_parquet'] = products_parquet
+                print(f"✅ Exported products parquet: {products_parquet}")
+
         # 3. Export SLA data
         if sla_data:
             sla_file = f"{self.data_dir}/sla_summary_{timestamp}.txt"
@@ -81,6 +95,10 @@ class DashboardIntegration:
         files_created['config'] = config_file
         print(f"✅ Exported config: {config_file}")
 
+        # Manifest: reader lấy file mới nhất theo kind thay vì quét thư mục
+        register_artifacts(*files_created.values(), latest_orders, f"{self.data_dir}/products_latest.csv",
+                           f"{self.data_dir}/sla_latest.txt", data_dir=self.data_dir)
+
         return files_created
 
     def format_sla_for_dashboard(self, sla_data):
@@ -9,34 +9,56 @@ import sys
 import time
 import os
 import json
-import requests
 import re
+import queue
+import threading
 from datetime import datetime
 
+import pandas as pd
+
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from scripts.login_manager import CompleteLoginManager
 from scripts.date_customizer import DateCustomizer
 from scripts.pagination_handler import PaginationHandler
 from scripts.enhanced_scraper import EnhancedScraper
+from scripts.driver_pool import get_driver_pool, driver_pool_enabled
+from scripts.invoice_fetcher import AsyncInvoiceFetcher, INVOICE_JSON_PATH, cookies_from_driver
+from scripts.batch_controller import AdaptiveBatchController
+from scripts.page_readiness import PageReadiness
+from scripts.product_parser import (
+    build_product_details, product_details_frame, products_table, join_product_details
+)
+from scripts.product_cache import ProductDetailCache, statuses_from_orders
 
 
 class JuneFreshSessionWithProducts:
     """🔄 Fresh session per page processor WITH product analysis"""
 
-    def __init__(self):
+    def __init__(self, workers=None, page_delay=5, use_cache=True):
         self.target_records = 23452
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.processed_pages = 0
         self.total_extracted = 0
         self.total_products_extracted = 0
 
-    def login_and_setup(self):
+        # Số worker chạy song song (mỗi worker một trình duyệt/session riêng)
+        self.workers = int(workers or os.getenv('PAGE_WORKERS', 1))
+        self.page_delay = page_delay
+        self._lock = threading.Lock()
+
+        # Bảng dài sản phẩm (order_id, product_name, quantity) của từng page
+        self.page_products = {}
+
+        # Cache chi tiết sản phẩm dùng chung cho mọi page/worker (chỉ cache miss mới gọi invoiceJSON)
+        self.product_cache = ProductDetailCache() if use_cache else None
+
+    def login_and_setup(self, session_file=None):
         """🔐 Fresh login and setup for each page"""
         try:
             print("🔐 Fresh login and setup...")
 
-            login_manager = CompleteLoginManager()
+            login_manager = CompleteLoginManager(session_file=session_file)
             login_result = login_manager.complete_login_process()
 
             if not login_result['success']:
@@ -56,8 +78,8 @@ class JuneFreshSessionWithProducts:
             if not date_customizer.apply_filters(wait_for_load=True):
                 return None, None, None, None, None
 
-            # Wait for data load
-            time.sleep(5)
+            # Wait for data load (bảng có dòng + AJAX xong)
+            PageReadiness(driver, logger).wait_for_table_ready(timeout=15)
 
             pagination_handler = PaginationHandler(driver, logger)
             enhanced_scraper = EnhancedScraper(driver, logger)
@@ -88,12 +110,17 @@ class JuneFreshSessionWithProducts:
             return false;
             """
 
+            readiness = PageReadiness(pagination_handler.driver, pagination_handler.logger)
+            key = readiness.arm("#orderTB tbody")
+
             success = pagination_handler.driver.execute_script(navigate_script)
             if success:
                 print(f"✅ Navigation API called for page {target_page}")
 
-                # Wait for page load
-                time.sleep(8)
+                # Wait for page load: bảng được vẽ lại và AJAX xong
+                if not readiness.wait(key, selector="#orderTB tbody", timeout=30, require_change=True):
+                    print(f"❌ Page {target_page} did not finish loading")
+                    return False
 
                 print(f"✅ Successfully navigated to page {target_page}")
                 return True
@@ -110,8 +137,8 @@ class JuneFreshSessionWithProducts:
         try:
             print(f"📊 Extracting data from page {page_number}...")
 
-            # Wait for stability
-            time.sleep(3)
+            # Wait for stability (AJAX xong + bảng ngừng render)
+            PageReadiness(driver, logger).wait_for_table_ready(timeout=10)
 
             # Step 1: Extract basic data
             page_data = enhanced_scraper.extract_single_page_data()
@@ -127,75 +154,42 @@ class JuneFreshSessionWithProducts:
             # Step 3: Get product details
             product_details = {}
             if order_ids:
-                product_details = self.extract_product_details_batch(order_ids, driver, logger)
+                product_details = self.extract_product_details_batch(
+                    order_ids, driver, logger, statuses=statuses_from_orders(page_data)
+                )
                 print(f"🛍️ Got product details for {len(product_details)} orders")
 
-            # Step 4: Merge and enhance data
-            enhanced_data = []
-            for i, order in enumerate(page_data):
-                order['session_id'] = self.session_id
-                order['page_number'] = page_number
-                order['page_position'] = i + 1
-                order['processing_timestamp'] = datetime.now().isoformat()
-                order['extraction_method'] = 'Fresh Session Per Page WITH Products'
-
-                # Clean basic data
-                order_id = order.get('id') or order.get('col_1', '')
-                if order_id:
-                    order['order_id_clean'] = str(order_id).strip()
-
-                customer = order.get('customer') or order.get('col_4', '')
-                if customer:
-                    order['customer_name_clean'] = str(customer).strip()
-
-                order_code = order.get('order_code') or order.get('col_2', '')
-                if order_code:
-                    order['order_code_clean'] = str(order_code).strip()
-
-                order['month'] = 'June'
-                order['year'] = '2025'
-                order['date_range'] = 'June 2025'
-
-                # Add product details if available
-                order_id_str = str(order_id).strip()
-                if order_id_str in product_details:
-                    details = product_details[order_id_str]
-
-                    # Add product information
-                    order['products'] = details['products']
-                    order['product_count'] = details['product_count']
-                    order['raw_product_detail'] = details['raw_detail']
-
-                    # Add additional API data
-                    order['api_customer'] = details.get('customer', '')
-                    order['api_amount'] = details.get('amount_total', '')
-                    order['api_transporter'] = details.get('transporter', '')
-                    order['api_address'] = details.get('address', '')
-                    order['api_phone'] = details.get('phone', '')
-
-                    # Create product summary
-                    if details['products']:
-                        product_names = [p['name'] for p in details['products']]
-                        order['product_summary'] = '; '.join(product_names[:3])
-                        order['total_items'] = sum(p['quantity'] for p in details['products'])
-                    else:
-                        order['product_summary'] = 'No products'
-                        order['total_items'] = 0
-
-                    order['has_product_details'] = True
-                else:
-                    # No product details available
-                    order['products'] = []
-                    order['product_count'] = 0
-                    order['product_summary'] = 'Details not available'
-                    order['total_items'] = 0
-                    order['has_product_details'] = False
-
-                enhanced_data.append(order)
+            # Step 4: Merge and enhance data (join theo order id, sản phẩm ở bảng dài riêng)
+            orders_df = pd.DataFrame(page_data)
+            orders_df['session_id'] = self.session_id
+            orders_df['page_number'] = page_number
+            orders_df['page_position'] = range(1, len(orders_df) + 1)
+            orders_df['processing_timestamp'] = datetime.now().isoformat()
+            orders_df['extraction_method'] = 'Fresh Session Per Page WITH Products'
+
+            # Clean basic data
+            for clean_column, sources in (('order_id_clean', ('id', 'col_1')),
+                                          ('customer_name_clean', ('customer', 'col_4')),
+                                          ('order_code_clean', ('order_code', 'col_2'))):
+                values = self._first_filled(orders_df, sources)
+                orders_df[clean_column] = values.where(values != '', None)
+
+            orders_df['month'] = 'June'
+            orders_df['year'] = '2025'
+            orders_df['date_range'] = 'June 2025'
+
+            details_df = product_details_frame(product_details)
+            with self._lock:
+                self.page_products[page_number] = products_table(details_df)
+
+            orders_df['_order_key'] = orders_df['order_id_clean'].fillna('')
+            enhanced_df = join_product_details(orders_df, details_df, key='_order_key',
+                                               indicator='has_product_details').drop(columns='_order_key')
+            enhanced_data = enhanced_df.astype(object).where(enhanced_df.notna(), None).to_dict('records')
 
             # Count products for tracking
-            total_products = sum(order.get('product_count', 0) for order in enhanced_data)
-            orders_with_products = len([o for o in enhanced_data if o.get('has_product_details', False)])
+            total_products = int(enhanced_df['product_count'].sum())
+            orders_with_products = int(enhanced_df['has_product_details'].sum())
 
             print(f"✅ Enhanced {len(enhanced_data)} orders:")
             print(f"   🛍️ Total products: {total_products}")
@@ -207,6 +201,16 @@ class JuneFreshSessionWithProducts:
             print(f"❌ Data extraction failed: {e}")
             return []
 
+    @staticmethod
+    def _first_filled(df, columns):
+        """Giá trị (đã strip) của cột đầu tiên có dữ liệu trong `columns`, theo từng dòng"""
+        values = pd.Series('', index=df.index, dtype=object)
+        for column in columns:
+            if column in df.columns:
+                candidate = df[column].fillna('').astype(str).str.strip()
+                values = values.where(values != '', candidate)
+        return values
+
     def extract_order_ids_from_data(self, page_data):
         """🆔 Extract order IDs from page data"""
         try:
@@ -225,41 +229,57 @@ class JuneFreshSessionWithProducts:
             print(f"❌ Error extracting order IDs: {e}")
             return []
 
-    def extract_product_details_batch(self, order_ids, driver, logger, batch_size=50):
-        """📦 Extract product details for order IDs (với batch processing)"""
+    def extract_product_details_batch(self, order_ids, driver, logger, batch_size=50, max_concurrency=8,
+                                      statuses=None):
+        """📦 Extract product details for order IDs (batch song song qua asyncio, cache theo order id)"""
         try:
-            print(f"📦 Extracting product details for {len(order_ids)} orders (batch_size={batch_size})...")
+            print(f"📦 Extracting product details for {len(order_ids)} orders "
+                  f"(batch_size={batch_size}, concurrency={max_concurrency})...")
 
             product_details = {}
-            
-            # Chia nhỏ thành batches để tránh URL quá dài
-            total_batches = (len(order_ids) + batch_size - 1) // batch_size
-            
-            for batch_num in range(total_batches):
-                start_idx = batch_num * batch_size
-                end_idx = min(start_idx + batch_size, len(order_ids))
-                batch_ids = order_ids[start_idx:end_idx]
-                
-                print(f"📦 Processing batch {batch_num + 1}/{total_batches}: {len(batch_ids)} orders...")
-
-                # Try direct API call first (fastest method)
-                batch_details = self.fetch_json_api_direct(batch_ids, driver)
-
-                if not batch_details:
-                    print(f"⚠️ API direct failed for batch {batch_num + 1}, trying UI method...")
-                    # Fallback to UI method if needed
-                    batch_details = self.fetch_json_via_ui(batch_ids, driver)
-
-                # Merge results
-                product_details.update(batch_details)
-                
-                # Progress logging
-                processed = min(end_idx, len(order_ids))
-                print(f"⚡ Progress: {processed}/{len(order_ids)} orders processed ({len(product_details)} successful)")
-
-                # Small delay between batches to avoid overwhelming the server
-                if batch_num < total_batches - 1:
-                    time.sleep(0.5)
+            fetched_records = []
+            processed = [0]
+
+            # Đơn đã cache (còn TTL, chưa đổi trạng thái) không cần gọi lại API
+            cache = getattr(self, 'product_cache', None)
+            if cache:
+                cached, order_ids = cache.get_many(order_ids, statuses)
+                product_details.update(cached)
+                print(f"🧊 Cache: {len(cached)} hits, {len(order_ids)} to fetch")
+                if not order_ids:
+                    return product_details
+
+            def on_batch(batch_ids, records, error):
+                # Gom bản ghi thô ngay khi từng batch hoàn thành, parse cả lượt một lần ở cuối
+                processed[0] += len(batch_ids)
+                if records:
+                    fetched_records.extend(records)
+                print(f"⚡ Progress: {processed[0]}/{len(order_ids)} orders processed ({len(fetched_records)} successful)")
+
+            # Batch size tự điều chỉnh (AIMD), bắt đầu từ giá trị đã học ở lần chạy trước
+            controller = AdaptiveBatchController.load(
+                f"https://one.tga.com.vn{INVOICE_JSON_PATH}", initial_size=batch_size
+            )
+
+            # Cookies sync 1 lần từ driver, sau đó mọi batch dùng chung 1 connection pool
+            fetcher = AsyncInvoiceFetcher(
+                cookies_from_driver(driver),
+                max_concurrency=max_concurrency,
+                user_agent=driver.execute_script("return navigator.userAgent"),
+                logger=logger,
+                controller=controller
+            )
+            failed_batches = fetcher.fetch(order_ids, on_batch=on_batch)
+            fetched = self.parse_json_response(fetched_records)
+            print(f"📐 Learned batch size: {controller.batch_size} ids/request")
+
+            for batch_ids in failed_batches:
+                print(f"⚠️ API direct failed for {len(batch_ids)} orders, trying UI method...")
+                fetched.update(self.fetch_json_via_ui(batch_ids, driver))
+
+            if cache:
+                cache.put_many(fetched, statuses)
+            product_details.update(fetched)
 
             print(f"✅ Completed: Got product details for {len(product_details)}/{len(order_ids)} orders")
             return product_details
@@ -268,126 +288,15 @@ class JuneFreshSessionWithProducts:
             print(f"❌ Error extracting product details: {e}")
             return {}
 
-    def fetch_json_api_direct(self, order_ids, driver):
-        """🌐 Direct API call for product details"""
-        try:
-            # Build API URL
-            ids_str = ','.join(map(str, order_ids))
-            api_url = f"https://one.tga.com.vn/so/invoiceJSON?id={ids_str}"
-
-            # Get cookies from current session
-            cookies = {cookie['name']: cookie['value'] for cookie in driver.get_cookies()}
-
-            print(f"🌐 API call: {api_url[:50]}...")
-
-            # Make API request
-            response = requests.get(api_url, cookies=cookies, timeout=15)
-
-            if response.status_code == 200:
-                # Check content-type before parsing
-                content_type = response.headers.get('Content-Type', '').lower()
-                
-                if 'application/json' not in content_type and 'text/json' not in content_type:
-                    # Response is not JSON, likely HTML (error page or login page)
-                    if response.text.strip().startswith('<!DOCTYPE') or response.text.strip().startswith('<html'):
-                        print(f"⚠️ API returned HTML instead of JSON (possible session expired or request too large)")
-                        print(f"   URL length: {len(api_url)} chars, Orders count: {len(order_ids)}")
-                        print(f"   Suggestion: Reduce batch size or check session")
-                        return {}
-                    else:
-                        print(f"⚠️ Unexpected content-type: {content_type}")
-                
-                try:
-                    data = response.json()
-                    if not data.get('error', True) and data.get('data'):
-                        print(f"✅ API success: Got {len(data['data'])} orders")
-                        return self.parse_json_response(data['data'])
-                    else:
-                        print(f"⚠️ API response error: {data.get('error', 'Unknown error')}")
-                except (ValueError, json.JSONDecodeError) as json_error:
-                    print(f"⚠️ API call failed: JSON decode error")
-                    print(f"   Response preview: {response.text[:200]}...")
-                    if len(order_ids) > 100:
-                        print(f"   ⚠️ Too many orders ({len(order_ids)}). Try reducing batch size.")
-                    return {}
-            else:
-                print(f"⚠️ API status code: {response.status_code}")
-                if response.status_code == 403:
-                    print(f"   Possible: Session expired or insufficient permissions")
-                elif response.status_code == 414:
-                    print(f"   URL too long. Try reducing batch size (currently {len(order_ids)} orders)")
-
-            return {}
-
-        except Exception as e:
-            print(f"⚠️ API call failed: {e}")
-            return {}
-
     def parse_json_response(self, json_data):
-        """📋 Parse JSON response and extract product details"""
+        """📋 Parse JSON response and extract product details (cả batch một lần, vectorized)"""
         try:
-            product_details = {}
-
-            for order in json_data:
-                order_id = str(order.get('id', ''))
-                detail = order.get('detail', '')
-
-                if order_id and detail:
-                    # Parse product details
-                    products = self.parse_product_detail(detail)
-
-                    product_details[order_id] = {
-                        'products': products,
-                        'product_count': len(products),
-                        'raw_detail': detail,
-                        'customer': order.get('customer', ''),
-                        'amount_total': order.get('amount_total', ''),
-                        'transporter': order.get('transporter', ''),
-                        'address': order.get('address', ''),
-                        'phone': order.get('phone', '')
-                    }
-
-            return product_details
+            return build_product_details(json_data)
 
         except Exception as e:
             print(f"❌ Error parsing JSON response: {e}")
             return {}
 
-    def parse_product_detail(self, detail_string):
-        """🛍️ Parse product detail string into structured data"""
-        try:
-            products = []
-
-            # Split by comma
-            items = detail_string.split(',')
-
-            for item in items:
-                item = item.strip()
-                if not item:
-                    continue
-
-                # Extract quantity using regex
-                quantity_match = re.search(r'\((\d+)\)$', item)
-
-                if quantity_match:
-                    quantity = int(quantity_match.group(1))
-                    product_name = item[:quantity_match.start()].strip()
-                else:
-                    quantity = 1
-                    product_name = item
-
-                if product_name:
-                    products.append({
-                        'name': product_name,
-                        'quantity': quantity
-                    })
-
-            return products
-
-        except Exception as e:
-            print(f"❌ Error parsing product detail: {e}")
-            return []
-
     def fetch_json_via_ui(self, order_ids, driver):
         """🖱️ UI interaction fallback method"""
         try:
@@ -501,8 +410,8 @@ class JuneFreshSessionWithProducts:
             json_button.click()
             print("✅ Clicked 'Lấy JSON' button")
 
-            # Wait for new page/response
-            time.sleep(2)
+            # Wait for new page/response (trả về ngay khi đã sang trang invoiceJSON)
+            PageReadiness(driver).wait_for_url("invoiceJSON", timeout=10)
 
             # Check if redirected to JSON page
             current_url = driver.current_url
@@ -566,7 +475,8 @@ class JuneFreshSessionWithProducts:
                     'processing_method': 'Fresh Session Per Page WITH Products',
                     'target_total': self.target_records
                 },
-                'orders': page_data
+                'orders': page_data,
+                'products': self.page_products.get(page_number, pd.DataFrame()).to_dict('records')
             }
 
             with open(filename, 'w', encoding='utf-8') as f:
@@ -593,83 +503,215 @@ class JuneFreshSessionWithProducts:
         except Exception as e:
             print(f"⚠️ Cleanup warning: {e}")
 
-    def process_all_pages_with_products(self):
-        """🎯 Process all pages with fresh session + product analysis"""
-        try:
-            start_time = time.time()
+    def process_single_page(self, page_num, worker_label=""):
+        """📄 Login → navigate → extract → save → logout cho 1 page (session riêng của worker)"""
+        prefix = f"[{worker_label}] " if worker_label else ""
+        page_start_time = time.time()
 
-            print("🔄 JUNE 2025 FRESH SESSION + PRODUCT EXTRACTION")
-            print("=" * 70)
-            print("🎯 Strategy: Fresh Login/Logout Per Page + Product Analysis")
-            print(f"📊 Target: {self.target_records:,} orders")
-            print(f"📄 Estimated: 12 pages")
-            print(f"🛍️ Feature: Complete product details extraction")
-            print(f"🆔 Session: {self.session_id}")
-            print("=" * 70)
+        # STEP 1: Fresh login and setup (mỗi worker một file session → cookies không ghi đè lẫn nhau)
+        session_file = f"session_data_{worker_label.lower()}.pkl" if worker_label else None
+        login_manager, driver, logger, pagination_handler, enhanced_scraper = self.login_and_setup(session_file)
 
-            estimated_pages = 12
-            successful_pages = []
-            failed_pages = []
+        if not all([login_manager, driver, logger, pagination_handler, enhanced_scraper]):
+            print(f"❌ {prefix}Page {page_num}: Setup failed")
+            return None
 
-            for page_num in range(1, estimated_pages + 1):
-                print(f"\n🔄 PROCESSING PAGE {page_num}/{estimated_pages}")
-                print("=" * 50)
+        try:
+            # STEP 2: Navigate to target page
+            if not self.navigate_to_page(page_num, pagination_handler):
+                print(f"❌ {prefix}Page {page_num}: Navigation failed")
+                return None
 
-                page_start_time = time.time()
+            # STEP 3: Extract data + products
+            page_data = self.extract_page_data(page_num, enhanced_scraper, driver, logger)
+            if not page_data:
+                print(f"❌ {prefix}Page {page_num}: No data extracted")
+                return None
 
-                # STEP 1: Fresh login and setup
-                login_manager, driver, logger, pagination_handler, enhanced_scraper = self.login_and_setup()
+            # STEP 4: Save enhanced data
+            if not self.save_page_data(page_data, page_num):
+                print(f"❌ {prefix}Page {page_num}: Save failed")
+                return None
 
-                if not all([login_manager, driver, logger, pagination_handler, enhanced_scraper]):
-                    print(f"❌ Page {page_num}: Setup failed")
+            page_products = sum(order.get('product_count', 0) for order in page_data)
+            with self._lock:
+                self.processed_pages += 1
+                self.total_extracted += len(page_data)
+                self.total_products_extracted += page_products
+                progress = (self.total_extracted / self.target_records) * 100
+
+            page_time = time.time() - page_start_time
+            print(f"✅ {prefix}Page {page_num} SUCCESS!")
+            print(f"   📦 Orders: {len(page_data)}")
+            print(f"   🛍️ Products: {page_products}")
+            print(f"   ⏱️ Time: {page_time:.1f}s")
+            print(f"   📈 Total Progress: {self.total_extracted:,}/{self.target_records:,} ({progress:.1f}%)")
+            return page_data
+
+        finally:
+            # STEP 5: Always logout and cleanup
+            self.logout_and_cleanup(login_manager)
+
+    def _page_worker(self, worker_id, page_queue, page_results, failed_pages, worker_stats):
+        """👷 Worker: lấy page number từ queue chung cho đến khi hết"""
+        label = f"W{worker_id}"
+        stats = {'pages': 0, 'failed': 0, 'orders': 0, 'busy_time': 0.0}
+        worker_stats[label] = stats
+
+        while True:
+            try:
+                page_num = page_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            print(f"\n🔄 [{label}] PROCESSING PAGE {page_num}")
+            page_start_time = time.time()
+            try:
+                page_data = self.process_single_page(page_num, label)
+            except Exception as e:
+                print(f"❌ [{label}] Page {page_num} crashed: {e}")
+                page_data = None
+
+            stats['busy_time'] += time.time() - page_start_time
+            with self._lock:
+                if page_data:
+                    page_results[page_num] = page_data
+                    stats['pages'] += 1
+                    stats['orders'] += len(page_data)
+                else:
                     failed_pages.append(page_num)
-                    continue
+                    stats['failed'] += 1
+
+            # Wait between pages (giãn request của từng worker lên server)
+            if not page_queue.empty() and self.page_delay:
+                print(f"⏳ [{label}] Waiting between pages...")
+                time.sleep(self.page_delay)
+
+    def merge_and_deduplicate(self, page_results):
+        """🔗 Gộp kết quả các page theo thứ tự page, loại trùng theo order id"""
+        merged = []
+        seen_ids = set()
+        duplicates = 0
+
+        for page_num in sorted(page_results):
+            for order in page_results[page_num]:
+                order_key = order.get('order_id_clean') or order.get('order_code_clean')
+                if order_key:
+                    if order_key in seen_ids:
+                        duplicates += 1
+                        continue
+                    seen_ids.add(order_key)
+                merged.append(order)
+
+        return merged, duplicates
+
+    def merge_page_products(self, merged_orders):
+        """🛍️ Bảng dài sản phẩm của các đơn đã gộp - đơn trùng chỉ lấy sản phẩm từ page đầu tiên chứa nó"""
+        first_pages = {}
+        for order in merged_orders:
+            order_id = order.get('order_id_clean')
+            if order_id and order.get('page_number') is not None:
+                first_pages.setdefault(order_id, order['page_number'])
+
+        tables = [table.assign(page_number=page_num) for page_num, table in sorted(self.page_products.items())
+                  if not table.empty]
+        if not tables:
+            return pd.DataFrame(columns=['order_id', 'product_name', 'quantity'])
+
+        products = pd.concat(tables, ignore_index=True)
+        keep = products['order_id'].map(first_pages) == products['page_number']
+        return products[keep].drop(columns='page_number').reset_index(drop=True)
+
+    def save_merged_data(self, merged_orders, duplicates):
+        """💾 Lưu file gộp tất cả page (đã loại trùng)"""
+        try:
+            if not merged_orders:
+                return None
 
-                try:
-                    # STEP 2: Navigate to target page
-                    if self.navigate_to_page(page_num, pagination_handler):
+            filename = f"data/june_2025_enhanced_merged_{self.session_id}.json"
+            os.makedirs('data', exist_ok=True)
+
+            products = self.merge_page_products(merged_orders)
+
+            merged_data = {
+                'metadata': {
+                    'session_id': self.session_id,
+                    'extraction_timestamp': datetime.now().isoformat(),
+                    'total_records': len(merged_orders),
+                    'duplicates_removed': duplicates,
+                    'total_products': sum(order.get('product_count', 0) for order in merged_orders),
+                    'date_range': 'June 2025',
+                    'processing_method': 'Fresh Session Per Page WITH Products',
+                    'workers': self.workers,
+                    'target_total': self.target_records
+                },
+                'orders': merged_orders,
+                'products': products.to_dict('records')
+            }
 
-                        # STEP 3: Extract data + products
-                        page_data = self.extract_page_data(page_num, enhanced_scraper, driver, logger)
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(merged_data, f, ensure_ascii=False, indent=2)
 
-                        if page_data:
-                            # STEP 4: Save enhanced data
-                            if self.save_page_data(page_data, page_num):
-                                self.processed_pages += 1
-                                self.total_extracted += len(page_data)
+            print(f"📁 Merged data: {filename}")
+            return filename
 
-                                # Count products
-                                page_products = sum(order.get('product_count', 0) for order in page_data)
-                                self.total_products_extracted += page_products
+        except Exception as e:
+            print(f"❌ Merged save failed: {e}")
+            return None
 
-                                successful_pages.append(page_num)
+    def process_all_pages_with_products(self):
+        """🎯 Process all pages with fresh session + product analysis (N workers song song)"""
+        try:
+            start_time = time.time()
 
-                                page_time = time.time() - page_start_time
-                                progress = (self.total_extracted / self.target_records) * 100
+            estimated_pages = 12
+            workers = max(1, min(self.workers, estimated_pages))
 
-                                print(f"✅ Page {page_num} SUCCESS!")
-                                print(f"   📦 Orders: {len(page_data)}")
-                                print(f"   🛍️ Products: {page_products}")
-                                print(f"   ⏱️ Time: {page_time:.1f}s")
-                                print(f"   📈 Total Progress: {self.total_extracted:,}/{self.target_records:,} ({progress:.1f}%)")
-                                print(f"   🛍️ Total Products: {self.total_products_extracted:,}")
-                            else:
-                                print(f"❌ Page {page_num}: Save failed")
-                                failed_pages.append(page_num)
-                        else:
-                            print(f"❌ Page {page_num}: No data extracted")
-                            failed_pages.append(page_num)
-                    else:
-                        print(f"❌ Page {page_num}: Navigation failed")
-                        failed_pages.append(page_num)
+            print("🔄 JUNE 2025 FRESH SESSION + PRODUCT EXTRACTION")
+            print("=" * 70)
+            print("🎯 Strategy: Fresh Login/Logout Per Page + Product Analysis")
+            print(f"📊 Target: {self.target_records:,} orders")
+            print(f"📄 Estimated: {estimated_pages} pages")
+            print(f"👷 Workers: {workers}")
+            print(f"🛍️ Feature: Complete product details extraction")
+            print(f"🆔 Session: {self.session_id}")
+            print("=" * 70)
+
+            page_results = {}
+            failed_pages = []
+            worker_stats = {}
+
+            # Khởi động sẵn trình duyệt: mỗi page chỉ login lại, không cold-start Chrome
+            # Pool phải đủ driver cho mỗi worker
+            if driver_pool_enabled():
+                get_driver_pool({'size': max(workers, 2)}).warm_up()
 
-                finally:
-                    # STEP 5: Always logout and cleanup
-                    self.logout_and_cleanup(login_manager)
+            page_queue = queue.Queue()
+            for page_num in range(1, estimated_pages + 1):
+                page_queue.put(page_num)
 
-                    # Wait between pages
-                    print("⏳ Waiting between pages...")
-                    time.sleep(5)
+            if workers == 1:
+                self._page_worker(1, page_queue, page_results, failed_pages, worker_stats)
+            else:
+                threads = [
+                    threading.Thread(
+                        target=self._page_worker,
+                        args=(worker_id, page_queue, page_results, failed_pages, worker_stats),
+                        name=f"page-worker-{worker_id}",
+                        daemon=True
+                    )
+                    for worker_id in range(1, workers + 1)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+            # Merge + dedupe by order id
+            merged_orders, duplicates = self.merge_and_deduplicate(page_results)
+            self.total_extracted = len(merged_orders)
+            self.total_products_extracted = sum(order.get('product_count', 0) for order in merged_orders)
+            self.save_merged_data(merged_orders, duplicates)
 
             # Final summary
             total_time = time.time() - start_time
@@ -680,17 +722,31 @@ class JuneFreshSessionWithProducts:
             print("=" * 70)
             print(f"🆔 Session: {self.session_id}")
             print(f"📊 Target: {self.target_records:,} orders")
-            print(f"📦 Extracted: {self.total_extracted:,} orders")
+            print(f"📦 Extracted: {self.total_extracted:,} unique orders ({duplicates:,} duplicates removed)")
             print(f"🛍️ Products: {self.total_products_extracted:,} products")
             print(f"📈 Completion: {completion_rate:.1f}%")
             print(f"📄 Pages: {self.processed_pages}/{estimated_pages}")
             print(f"⏱️ Total Time: {total_time/60:.1f} minutes")
             print(f"⚡ Rate: {self.total_extracted/total_time:.1f} orders/sec")
-
+            if self.product_cache:
+                cache_stats = self.product_cache.stats()
+                print(f"🧊 Product cache: {cache_stats['hits']:,} hits / {cache_stats['misses']:,} misses "
+                      f"(hit ratio {cache_stats['hit_ratio']*100:.1f}%, {cache_stats['invalidated']} status changes, "
+                      f"{cache_stats['expired']} expired)")
+
+            print("👷 Worker throughput:")
+            for label, stats in sorted(worker_stats.items()):
+                busy = stats['busy_time']
+                rate = stats['orders'] / busy if busy else 0
+                pages_per_min = stats['pages'] / busy * 60 if busy else 0
+                print(f"   {label}: {stats['pages']} pages ({stats['failed']} failed), "
+                      f"{stats['orders']:,} orders, {rate:.1f} orders/sec, {pages_per_min:.2f} pages/min")
+
+            successful_pages = sorted(page_results)
             if successful_pages:
                 print(f"✅ Successful pages: {successful_pages}")
             if failed_pages:
-                print(f"❌ Failed pages: {failed_pages}")
+                print(f"❌ Failed pages: {sorted(failed_pages)}")
 
             print("=" * 70)
 
@@ -702,7 +758,11 @@ class JuneFreshSessionWithProducts:
 
 
 def main():
-    processor = JuneFreshSessionWithProducts()
+    workers = None
+    if '--workers' in sys.argv:
+        workers = int(sys.argv[sys.argv.index('--workers') + 1])
+
+    processor = JuneFreshSessionWithProducts(workers=workers, use_cache='--no-cache' not in sys.argv)
 
     try:
         success = processor.process_all_pages_with_products()
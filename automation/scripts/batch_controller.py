@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📐 Batch Controller Module - Tự điều chỉnh số id mỗi request theo kiểu AIMD
+Handles: additive increase khi thành công, halve khi 413/414, lưu batch size tối ưu theo endpoint
+"""
+
+import os
+import json
+import tempfile
+import threading
+from datetime import datetime
+
+
+BATCH_TUNING_FILE = "batch_tuning.json"
+_save_lock = threading.Lock()  # Các worker trong cùng process đọc-sửa-ghi file lần lượt
+
+
+class AdaptiveBatchController:
+    """
+    📐 AIMD controller cho batch size
+    Thành công → tăng thêm `step`; request quá lớn (413/414) → giảm còn một nửa batch vừa lỗi
+    """
+
+    def __init__(self, endpoint, initial_size=50, min_size=1, max_size=500, step=10,
+                 state_file=BATCH_TUNING_FILE):
+        self.endpoint = endpoint
+        self.min_size = max(1, int(min_size))
+        self.max_size = max(self.min_size, int(max_size))
+        self.step = max(1, int(step))
+        self.state_file = state_file
+        self.batch_size = self._clamp(initial_size)
+        self.successes = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, endpoint, initial_size=50, state_file=BATCH_TUNING_FILE, **kwargs):
+        """📥 Tạo controller, khởi đầu từ batch size đã học ở lần chạy trước (nếu có)"""
+        controller = cls(endpoint, initial_size=initial_size, state_file=state_file, **kwargs)
+        try:
+            if state_file and os.path.exists(state_file):
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    learned = json.load(f).get(endpoint, {})
+                if learned.get('batch_size'):
+                    controller.batch_size = controller._clamp(learned['batch_size'])
+        except Exception:
+            pass  # File hỏng → dùng initial_size
+        return controller
+
+    def _clamp(self, size):
+        return max(self.min_size, min(self.max_size, int(size)))
+
+    def record_success(self, size):
+        """✅ Batch `size` id thành công → additive increase"""
+        with self._lock:
+            self.successes += 1
+            if size >= self.batch_size:
+                self.batch_size = self._clamp(self.batch_size + self.step)
+            return self.batch_size
+
+    def record_failure(self, size):
+        """❌ Batch `size` id quá lớn → multiplicative decrease (một nửa batch vừa lỗi)"""
+        with self._lock:
+            self.failures += 1
+            self.batch_size = self._clamp(min(self.batch_size, size // 2))
+            return self.batch_size
+
+    def save(self):
+        """💾 Lưu batch size hiện tại cho endpoint (giữ nguyên các endpoint khác)"""
+        if not self.state_file:
+            return
+        tmp_file = None
+        try:
+            with _save_lock:
+                state = {}
+                if os.path.exists(self.state_file):
+                    with open(self.state_file, 'r', encoding='utf-8') as f:
+                        state = json.load(f)
+                state[self.endpoint] = {
+                    'batch_size': self.batch_size,
+                    'updated_at': datetime.now().isoformat()
+                }
+                # File tạm riêng cho mỗi lần ghi → process khác không ghi xen / replace mất file của mình
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', delete=False, suffix='.tmp',
+                                                 dir=os.path.dirname(os.path.abspath(self.state_file)),
+                                                 prefix=f"{os.path.basename(self.state_file)}.") as f:
+                    tmp_file = f.name
+                    json.dump(state, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_file, self.state_file)
+        except Exception:
+            if tmp_file and os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            # Ignore save errors
+
+    def stats(self):
+        """📊 Thống kê controller"""
+        return {
+            'endpoint': self.endpoint,
+            'batch_size': self.batch_size,
+            'successes': self.successes,
+            'failures': self.failures
+        }
+
+
+if __name__ == "__main__":
+    """Test the batch controller module"""
+    print("📐 Batch Controller Module")
+    print("Use this module to learn the largest safe id batch per endpoint")
+    print("Example: controller = AdaptiveBatchController.load('https://one.tga.com.vn/so/invoiceJSON')")
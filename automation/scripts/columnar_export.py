@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧱 Columnar Export Module - Bản Parquet (Arrow) ghi song song với CSV mỗi lần chạy
+Handles: cột sàn / trạng thái / vùng mã hoá dictionary (category), thời gian và tiền có kiểu,
+         ghi nguyên tử, đọc lại chỉ các cột cần (column projection), fallback CSV khi thiếu engine
+"""
+
+import os
+import logging
+import importlib.util
+
+import pandas as pd
+
+
+ORDERS_COLUMNAR_FILE = "data/orders_latest.parquet"
+PRODUCTS_COLUMNAR_FILE = "data/products_latest.parquet"
+
+# Cột ít giá trị khác nhau → dictionary encoding (pandas category ↔ Arrow dictionary)
+CATEGORY_COLUMNS = (
+    'platform', 'status', 'region', 'customer_type', 'shipping_method', 'product_category',
+    'sla_platform', 'sla_status', 'sla_priority', 'col_7', 'col_13', 'col_18'
+)
+TIMESTAMP_COLUMNS = ('order_date', 'created_at', 'scraped_at', 'updated_at', 'col_19', 'col_20')
+AMOUNT_COLUMNS = ('order_value', 'col_16', 'quantity')
+
+PARQUET_ENGINES = ('pyarrow', 'fastparquet')
+
+logger = logging.getLogger('ColumnarExport')
+
+
+def parquet_engine():
+    """Engine Parquet đang cài (pyarrow ưu tiên) hoặc None - pyarrow là phụ thuộc tuỳ chọn"""
+    for engine in PARQUET_ENGINES:
+        if importlib.util.find_spec(engine) is not None:
+            return engine
+    return None
+
+
+def to_columnar_frame(df):
+    """
+    🧱 Ép kiểu DataFrame trước khi ghi Parquet
+
+    - CATEGORY_COLUMNS → category (Arrow dictionary)
+    - TIMESTAMP_COLUMNS → datetime64 (giá trị lỗi / rỗng → NaT)
+    - AMOUNT_COLUMNS → float ("1,250,000" → 1250000.0)
+    - Cột object còn lại → string để Arrow không gặp kiểu lẫn lộn
+    """
+    frame = df.copy()
+    for column in frame.columns:
+        series = frame[column]
+        if column in CATEGORY_COLUMNS:
+            frame[column] = series.astype('string').str.strip().astype('category')
+        elif column in TIMESTAMP_COLUMNS:
+            if not pd.api.types.is_datetime64_any_dtype(series):
+                frame[column] = pd.to_datetime(series.replace('', None), errors='coerce')
+        elif column in AMOUNT_COLUMNS:
+            if not pd.api.types.is_numeric_dtype(series):
+                cleaned = series.astype(str).str.replace(',', '', regex=False).str.replace('"', '', regex=False)
+                frame[column] = pd.to_numeric(cleaned, errors='coerce')
+        elif series.dtype == object:
+            frame[column] = series.astype('string')
+    return frame
+
+
+def write_columnar(df, path):
+    """
+    💾 Ghi DataFrame ra Parquet (ghi file tạm rồi os.replace → người đọc không thấy file dở)
+
+    Returns:
+        str: Đường dẫn đã ghi, None nếu không có engine hoặc lỗi
+    """
+    engine = parquet_engine()
+    if engine is None:
+        logger.info("ℹ️ Chưa cài pyarrow/fastparquet - bỏ qua bản Parquet")
+        return None
+
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        to_columnar_frame(df).to_parquet(tmp_path, engine=engine, index=False)
+        os.replace(tmp_path, path)
+        return path
+    except Exception as e:
+        logger.error(f"❌ Lỗi ghi Parquet {path}: {e}")
+        return None
+
+
+def columnar_columns(path):
+    """Danh sách cột trong file Parquet (chỉ đọc footer, không đọc dữ liệu)"""
+    engine = parquet_engine()
+    if engine == 'pyarrow':
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    if engine == 'fastparquet':
+        import fastparquet
+        return list(fastparquet.ParquetFile(path).columns)
+    return []
+
+
+def read_columnar(path, columns=None):
+    """
+    📖 Đọc file Parquet, chỉ các cột trong columns (cột không có trong file được bỏ qua)
+
+    Returns:
+        pd.DataFrame: Category/timestamp giữ nguyên kiểu; None nếu không đọc được
+    """
+    engine = parquet_engine()
+    if engine is None or not os.path.exists(path):
+        return None
+
+    try:
+        if columns is not None:
+            available = set(columnar_columns(path))
+            columns = [column for column in columns if column in available]
+        return pd.read_parquet(path, engine=engine, columns=columns)
+    except Exception as e:
+        logger.error(f"❌ Lỗi đọc Parquet {path}: {e}")
+        return None
+
+
+def read_latest(columnar_path, csv_path=None, columns=None):
+    """
+    📖 Đọc bản mới nhất: Parquet nếu có engine và không cũ hơn CSV, ngược lại đọc CSV (cũng chỉ các cột cần)
+
+    Returns:
+        tuple: (DataFrame hoặc None, đường dẫn nguồn)
+    """
+    csv_exists = csv_path is not None and os.path.exists(csv_path)
+    if os.path.exists(columnar_path) and (not csv_exists or
+                                          os.path.getmtime(columnar_path) >= os.path.getmtime(csv_path)):
+        df = read_columnar(columnar_path, columns)
+        if df is not None:
+            return df, columnar_path
+
+    if csv_exists:
+        wanted = None if columns is None else set(columns)
+        usecols = None if wanted is None else (lambda column: column in wanted)
+        return pd.read_csv(csv_path, usecols=usecols), csv_path
+    return None, None
+
+
+def to_records(df):
+    """Chuyển DataFrame (category / datetime / NaN) thành list dict an toàn cho JSON"""
+    frame = df.copy()
+    for column in frame.columns:
+        series = frame[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            frame[column] = series.dt.strftime('%Y-%m-%dT%H:%M:%S')
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None).to_dict('records')
+
+
+if __name__ == "__main__":
+    """Test the columnar export module"""
+    print("🧱 Columnar Export Module")
+    print("Use this module to write typed, dictionary-encoded Parquet next to the CSV exports")
+    print("Example: write_columnar(dashboard_df, ORDERS_COLUMNAR_FILE); read_columnar(path, ['platform', 'order_value'])")
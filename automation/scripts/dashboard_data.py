@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📊 Dashboard Data Module - Dữ liệu đơn hàng cho Streamlit dashboard, nạp lại theo phiên bản nguồn
+Handles: khoá cache theo phiên bản kho SQLite / Parquet / CSV, chỉ đọc các cột dashboard dùng,
+         chuẩn hoá kiểu một lần, chỉ mục vị trí dòng theo từng giá trị platform / status cho bộ lọc
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from scripts.order_store import OrderStore, ORDER_STORE_FILE, to_dashboard_format
+from scripts.columnar_export import read_latest, ORDERS_COLUMNAR_FILE
+from scripts.order_query import file_version
+
+
+ORDERS_CSV_FILE = "data/orders_latest.csv"
+
+# Cột dashboard hiển thị / tính toán (cột không có trong nguồn được bỏ qua)
+DASHBOARD_COLUMNS = (
+    'order_id', 'order_code', 'customer', 'platform', 'status', 'region',
+    'order_value', 'amount', 'created_at'
+)
+FILTER_COLUMNS = ('platform', 'status')
+
+
+def orders_version():
+    """
+    🏷️ Phiên bản dữ liệu dashboard đang đọc: kho SQLite nếu có, ngược lại Parquet + CSV mới nhất
+
+    Returns:
+        str hoặc None nếu chưa có dữ liệu
+    """
+    if os.path.exists(ORDER_STORE_FILE):
+        return file_version(ORDER_STORE_FILE, f"{ORDER_STORE_FILE}-wal")
+    return file_version(ORDERS_COLUMNAR_FILE, ORDERS_CSV_FILE)
+
+
+def load_orders(columns=DASHBOARD_COLUMNS):
+    """
+    📖 Đọc đơn hàng cho dashboard, chỉ các cột trong columns
+
+    Đơn từ kho SQLite được chiếu sang cột / giá trị của orders_latest.csv (status đã map, region theo sàn)
+
+    Returns:
+        tuple: (DataFrame hoặc None, đường dẫn nguồn)
+    """
+    if os.path.exists(ORDER_STORE_FILE):
+        df = to_dashboard_format(OrderStore(ORDER_STORE_FILE).query_orders())
+        if not df.empty:
+            return df[[column for column in columns if column in df.columns]], ORDER_STORE_FILE
+
+    return read_latest(ORDERS_COLUMNAR_FILE, ORDERS_CSV_FILE, columns=list(columns))
+
+
+def prepare_frame(df):
+    """Chuẩn hoá kiểu một lần khi nạp: platform / status → category, created_at → datetime, order_value → số"""
+    frame = df.copy()
+    for column in FILTER_COLUMNS:
+        if column in frame.columns and not isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype('string').str.strip().astype('category')
+    if 'created_at' in frame.columns and not pd.api.types.is_datetime64_any_dtype(frame['created_at']):
+        frame['created_at'] = pd.to_datetime(frame['created_at'].replace('', None), errors='coerce')
+    if 'order_value' in frame.columns and not pd.api.types.is_numeric_dtype(frame['order_value']):
+        cleaned = frame['order_value'].astype(str).str.replace(',', '', regex=False).str.replace('"', '', regex=False)
+        frame['order_value'] = pd.to_numeric(cleaned, errors='coerce')
+    return frame
+
+
+class DashboardData:
+    """
+    📊 Một phiên bản dữ liệu dashboard (không đổi sau khi nạp - dùng chung giữa các lần rerun)
+
+    positions[cột][giá trị] = mảng vị trí dòng, tính một lần → đổi bộ lọc chỉ là lấy / giao các mảng này
+    """
+
+    def __init__(self, df, version=None, source=None):
+        self.df = prepare_frame(df)
+        self.version = version
+        self.source = source
+        self.positions = {}
+        for column in FILTER_COLUMNS:
+            if column in self.df.columns:
+                indices = self.df.groupby(column, observed=True, sort=False).indices
+                # Nhiều đơn nhất trước (thứ tự hiển thị trong selectbox)
+                self.positions[column] = dict(sorted(indices.items(), key=lambda item: len(item[1]), reverse=True))
+
+    def __len__(self):
+        return len(self.df)
+
+    def options(self, column):
+        """Các giá trị của cột lọc, nhiều đơn nhất trước"""
+        return list(self.positions.get(column, {}))
+
+    def filter(self, **selected):
+        """
+        🔍 Lọc theo chỉ mục, ví dụ filter(platform='Shopee', status=None)
+
+        Giá trị None bỏ qua; giá trị không có trong dữ liệu → DataFrame rỗng
+
+        Returns:
+            pd.DataFrame: Các dòng khớp; không lọc gì → chính self.df (dùng chung, chỉ đọc)
+        """
+        rows = None
+        for column, value in selected.items():
+            if value is None or column not in self.positions:
+                continue
+            matched = self.positions[column].get(value, np.empty(0, dtype=np.intp))
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+        if rows is None:
+            return self.df
+        return self.df.iloc[np.sort(rows)]
+
+
+if __name__ == "__main__":
+    """Test the dashboard data module"""
+    print("📊 Dashboard Data Module")
+    print("Use this module to load version-keyed, pre-indexed order data for the Streamlit dashboard")
+    print("Example: DashboardData(load_orders()[0], orders_version()).filter(platform='Shopee')")
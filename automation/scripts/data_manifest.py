@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🗂️ Data Manifest Module - Chỉ mục file trong data/ thay cho listdir + stat mỗi request
+Handles: phân loại file theo kind (orders, dashboard, products, sla_summary, json_page...) và timestamp,
+         "file mới nhất của kind" O(1), ghi manifest.json nguyên tử, khoá file giữa các process khi cập nhật,
+         watchdog giữ chỉ mục luôn khớp thư mục
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ khoá trong process
+    fcntl = None
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+
+DATA_DIR = "data"
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = "manifest.json.lock"
+MANIFEST_VERSION = 1
+
+# Thứ tự quan trọng: luật đầu tiên khớp quyết định kind
+KIND_PATTERNS = [
+    ('dashboard', re.compile(r'^orders_(dashboard_.+|latest)\.(csv|parquet)$')),
+    ('orders', re.compile(r'^orders_.+\.(csv|xlsx|json|parquet)$')),
+    ('products', re.compile(r'^products_.+\.(csv|json|parquet)$')),
+    ('sla_summary', re.compile(r'^sla_(summary_.+|latest)\.txt$')),
+    ('json_page', re.compile(r'^.+_page_\d+_.+\.json$')),
+    ('summary', re.compile(r'^.*summary.*\.(txt|xlsx|json)$')),
+    ('json', re.compile(r'^.+\.json$')),
+]
+# File nội bộ: kho SQLite, file tạm khi ghi nguyên tử, chính manifest
+IGNORED_PATTERN = re.compile(r'(\.db(-wal|-shm|-journal)?|\.tmp|~)$')
+TIMESTAMP_PATTERN = re.compile(r'(\d{8}_\d{4}(\d{2})?)')
+
+logger = logging.getLogger('DataManifest')
+
+
+def classify(name):
+    """Kind của file theo tên (None = không đánh chỉ mục)"""
+    if name.startswith(MANIFEST_NAME) or IGNORED_PATTERN.search(name):
+        return None
+    for kind, pattern in KIND_PATTERNS:
+        if pattern.match(name):
+            return kind
+    return None
+
+
+def name_timestamp(name, fallback):
+    """Timestamp trong tên file (YYYYmmdd_HHMMSS / YYYYmmdd_HHMM), không có thì dùng mtime"""
+    match = TIMESTAMP_PATTERN.search(name)
+    if match:
+        value = match.group(1)
+        try:
+            return datetime.strptime(value, '%Y%m%d_%H%M%S' if len(value) == 15 else '%Y%m%d_%H%M').isoformat()
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(fallback).isoformat(timespec='seconds')
+
+
+class DataManifest:
+    """
+    🗂️ Chỉ mục file của một thư mục data, lưu ở data/manifest.json
+
+    - Exporter gọi register() ngay sau khi ghi file
+    - ManifestWatcher cập nhật theo sự kiện filesystem (file chép tay, xoá, cleanup...)
+    - Reader ở process khác chỉ stat manifest.json để biết cần nạp lại
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self.manifest_file = os.path.join(data_dir, MANIFEST_NAME)
+        self.lock_file = os.path.join(data_dir, LOCK_NAME)
+        self.entries = {}   # tên file → entry
+        self._latest = {}   # (kind, ext) và (kind, None) → entry
+        self._loaded_mtime = None
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+
+    @contextmanager
+    def _locked(self):
+        """
+        🔒 Khoá trong process (RLock) + flock manifest.json.lock giữa các process
+
+        Giữ suốt refresh → sửa → save để exporter / watcher ở process khác không ghi đè mất cập nhật
+        """
+        with self._lock:
+            handle = None
+            if self._lock_depth == 0 and fcntl is not None:
+                os.makedirs(self.data_dir, exist_ok=True)
+                handle = open(self.lock_file, 'a')
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if handle is not None:
+                    handle.close()  # Đóng file = nhả flock
+
+    # ----- chỉ mục trong bộ nhớ -----
+
+    def _entry(self, path):
+        name = os.path.basename(path)
+        kind = classify(name)
+        if kind is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return {
+            'name': name,
+            'kind': kind,
+            'ext': os.path.splitext(name)[1].lower(),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'timestamp': name_timestamp(name, stat.st_mtime)
+        }
+
+    def _index(self, entry):
+        for key in ((entry['kind'], entry['ext']), (entry['kind'], None)):
+            current = self._latest.get(key)
+            if current is None or current['name'] == entry['name'] or entry['mtime'] >= current['mtime']:
+                self._latest[key] = entry
+
+    def _reindex(self):
+        self._latest = {}
+        for entry in sorted(self.entries.values(), key=lambda item: item['mtime']):
+            self._index(entry)
+
+    def _set_entries(self, entries):
+        self.entries = entries
+        self._reindex()
+
+    # ----- lưu / nạp manifest.json -----
+
+    def save(self):
+        """Ghi manifest.json nguyên tử (file tạm + os.replace)"""
+        with self._locked():
+            os.makedirs(self.data_dir, exist_ok=True)
+            payload = {
+                'version': MANIFEST_VERSION,
+                'updated_at': datetime.now().isoformat(),
+                'files': self.entries
+            }
+            tmp_file = f"{self.manifest_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_file, self.manifest_file)
+            self._loaded_mtime = os.stat(self.manifest_file).st_mtime_ns
+
+    def rebuild(self):
+        """🔄 Quét lại toàn bộ thư mục (một lần khi chưa có manifest hoặc khi watcher khởi động)"""
+        with self._locked():
+            entries = {}
+            if os.path.isdir(self.data_dir):
+                for item in os.scandir(self.data_dir):
+                    if item.is_file():
+                        entry = self._entry(item.path)
+                        if entry is not None:
+                            entries[entry['name']] = entry
+            self._set_entries(entries)
+            self.save()
+            logger.info(f"🗂️ Manifest {self.manifest_file}: {len(entries)} file")
+        return self
+
+    def refresh(self):
+        """Nạp lại manifest.json nếu process khác vừa ghi (một lần stat); chưa có manifest → rebuild()"""
+        try:
+            mtime = os.stat(self.manifest_file).st_mtime_ns
+        except OSError:
+            return self.rebuild()
+        if mtime == self._loaded_mtime:
+            return self
+
+        with self._lock:
+            try:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"❌ Lỗi đọc manifest {self.manifest_file}: {e}")
+                return self.rebuild()
+            if payload.get('version') != MANIFEST_VERSION:
+                return self.rebuild()
+            self._set_entries(payload.get('files', {}))
+            self._loaded_mtime = mtime
+        return self
+
+    # ----- cập nhật -----
+
+    def register(self, *paths, save=True):
+        """
+        ➕ Thêm / cập nhật các file vừa ghi (file không thuộc kind nào hoặc không tồn tại bị bỏ qua)
+
+        Returns:
+            int: Số file đã đánh chỉ mục
+        """
+        with self._locked():
+            self.refresh()  # Trong khoá: nạp các cập nhật process khác vừa ghi trước khi sửa
+            count = 0
+            for path in paths:
+                if not path:
+                    continue
+                entry = self._entry(path)
+                if entry is None:
+                    continue
+                self.entries[entry['name']] = entry
+                self._index(entry)
+                count += 1
+            if count and save:
+                self.save()
+            return count
+
+    def remove(self, *paths, save=True):
+        """➖ Bỏ file đã xoá / đổi tên khỏi chỉ mục"""
+        with self._locked():
+            self.refresh()
+            removed = [self.entries.pop(os.path.basename(path), None) for path in paths]
+            removed = [entry for entry in removed if entry is not None]
+            if removed:
+                # Chỉ tính lại khi file bị xoá đang là "mới nhất" của kind
+                if any(self._latest.get(key) is entry for entry in removed
+                       for key in ((entry['kind'], entry['ext']), (entry['kind'], None))):
+                    self._reindex()
+                if save:
+                    self.save()
+            return len(removed)
+
+    # ----- đọc -----
+
+    def latest(self, kind, ext=None):
+        """File mới nhất (theo mtime) của kind, lọc thêm theo đuôi '.csv' nếu có - O(1)"""
+        self.refresh()
+        return self._latest.get((kind, ext))
+
+    def latest_path(self, kinds, ext=None):
+        """Đường dẫn file mới nhất trong các kind (None nếu chưa có)"""
+        if isinstance(kinds, str):
+            kinds = (kinds,)
+        self.refresh()
+        while True:
+            candidates = [self._latest.get((kind, ext)) for kind in kinds]
+            candidates = [entry for entry in candidates if entry is not None]
+            if not candidates:
+                return None
+            # Manifest chỉ lưu tên file: reader ở cwd khác vẫn ghép đúng đường dẫn
+            path = f"{self.data_dir}/{max(candidates, key=lambda entry: entry['mtime'])['name']}"
+            # Không có watcher mà file đã bị xoá → bỏ khỏi chỉ mục rồi chọn lại
+            if os.path.exists(path):
+                return path
+            self.remove(path)
+
+    def files(self, kinds=None, ext=None, limit=None):
+        """Danh sách entry mới nhất trước, lọc theo kind / đuôi file"""
+        self.refresh()
+        if isinstance(kinds, str):
+            kinds = (kinds,)
+        entries = [entry for entry in self.entries.values()
+                   if (kinds is None or entry['kind'] in kinds) and (ext is None or entry['ext'] == ext)]
+        entries.sort(key=lambda entry: entry['mtime'], reverse=True)
+        return entries[:limit] if limit is not None else entries
+
+    def total_size(self):
+        self.refresh()
+        return sum(entry['size'] for entry in self.entries.values())
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_manifest(data_dir=DATA_DIR):
+    """DataManifest dùng chung trong process cho mỗi thư mục data"""
+    # Đường dẫn tương đối phụ thuộc cwd → khoá theo cả hai
+    key = (os.path.abspath(data_dir), data_dir)
+    with _manifests_lock:
+        if key not in _manifests:
+            _manifests[key] = DataManifest(data_dir)
+        return _manifests[key]
+
+
+def register_artifacts(*paths, data_dir=DATA_DIR):
+    """Exporter gọi sau khi ghi file; lỗi manifest không được làm hỏng lần export"""
+    try:
+        return get_manifest(data_dir).register(*paths)
+    except Exception as e:
+        logger.error(f"❌ Lỗi cập nhật manifest: {e}")
+        return 0
+
+
+class _ManifestEventHandler(FileSystemEventHandler):
+    def __init__(self, manifest):
+        self.manifest = manifest
+
+    def _handle(self, action, path):
+        name = os.path.basename(path)
+        if classify(name) is None:
+            return
+        try:
+            action(path)
+        except Exception as e:
+            logger.error(f"❌ Lỗi cập nhật manifest cho {name}: {e}")
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._handle(self.manifest.register, event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._handle(self.manifest.register, event.src_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self._handle(self.manifest.remove, event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._handle(self.manifest.remove, event.src_path)
+            self._handle(self.manifest.register, event.dest_path)
+
+
+class ManifestWatcher:
+    """
+    👀 Theo dõi thư mục data bằng watchdog, cập nhật manifest theo từng sự kiện file
+
+    Dùng trong process chạy lâu (api_server); rebuild() một lần khi start để bắt các thay đổi lúc không chạy
+    """
+
+    def __init__(self, manifest=None):
+        self.manifest = manifest or get_manifest()
+        self.observer = None
+
+    def start(self):
+        os.makedirs(self.manifest.data_dir, exist_ok=True)
+        self.manifest.rebuild()
+        self.observer = Observer()
+        self.observer.schedule(_ManifestEventHandler(self.manifest), self.manifest.data_dir, recursive=False)
+        self.observer.daemon = True
+        self.observer.start()
+        logger.info(f"👀 Watching {self.manifest.data_dir} for data files")
+        return self
+
+    def stop(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join(timeout=5)
+            self.observer = None
+
+
+if __name__ == "__main__":
+    """Test the data manifest module"""
+    print("🗂️ Data Manifest Module")
+    print("Use this module to resolve the latest data file of a kind without listing data/")
+    print("Example: get_manifest().latest_path(('dashboard', 'orders'), ext='.csv')")
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🚗 Driver Pool Module - Pool Chrome WebDriver khởi động sẵn để tái sử dụng
+Handles: chromedriver path cache, pre-launched headless browsers, health check, recycling
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+
+# Cố định theo thư mục automation/data → mọi entry point (chạy từ repo root hay automation/) dùng chung một cache
+DRIVER_CACHE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'data', 'driver_cache.json')
+DRIVER_CACHE_TTL = 24 * 3600  # Re-resolve chromedriver mỗi ngày
+
+
+def resolve_chromedriver_path(cache_file=DRIVER_CACHE_FILE, cache_ttl=DRIVER_CACHE_TTL, logger=None):
+    """
+    📍 Lấy đường dẫn chromedriver, cache trên đĩa để không gọi ChromeDriverManager mỗi lần
+
+    Returns:
+        str: Đường dẫn chromedriver hoặc None (để Selenium Manager tự tìm)
+    """
+    try:
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+
+            path = cached.get('path')
+            if (path and os.path.exists(path) and os.access(path, os.X_OK)
+                    and time.time() - cached.get('timestamp', 0) < cache_ttl):
+                return path
+    except Exception:
+        pass  # Cache hỏng → resolve lại
+
+    try:
+        path = ChromeDriverManager().install()
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump({'path': path, 'timestamp': time.time()}, f)
+        except Exception:
+            pass  # Ignore save errors
+        return path
+    except Exception as e:
+        if logger:
+            logger.warning(f"ChromeDriverManager failed: {e}")
+        return None
+
+
+def build_chrome_options(headless=True, user_agent=None):
+    """⚙️ Chrome options tối ưu hiệu suất (dùng chung cho mọi nơi tạo driver)"""
+    options = Options()
+
+    # Core performance arguments
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument('--disable-blink-features=AutomationControlled')
+
+    # AGGRESSIVE PERFORMANCE OPTIMIZATION
+    # Block unnecessary content to speed up loading
+    options.add_experimental_option("prefs", {
+        "profile.default_content_setting_values": {
+            "images": 2,        # Block images (60-80% faster loading)
+            "plugins": 2,       # Block plugins
+            "popups": 2,        # Block popups
+            "geolocation": 2,   # Block location requests
+            "notifications": 2, # Block notifications
+            "media_stream": 2,  # Block media stream
+        }
+    })
+
+    # Advanced performance flags
+    performance_args = [
+        '--disable-extensions',
+        '--disable-plugins',
+        '--disable-web-security',
+        '--disable-features=VizDisplayCompositor',
+        '--disable-background-timer-throttling',
+        '--disable-background-networking',
+        '--disable-backgrounding-occluded-windows',
+        '--disable-renderer-backgrounding',
+        '--aggressive-cache-discard',
+        '--memory-pressure-off',
+        '--disable-ipc-flooding-protection',
+        '--disable-hang-monitor',
+        '--disable-prompt-on-repost',
+        '--no-first-run',
+        '--disable-default-apps',
+        '--log-level=3'
+    ]
+
+    for arg in performance_args:
+        options.add_argument(arg)
+
+    # JavaScript optimization
+    options.add_argument('--js-flags=--expose-gc')
+    options.add_argument('--js-flags=--max_old_space_size=4096')
+
+    # Disable automation detection
+    options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    options.add_experimental_option('useAutomationExtension', False)
+
+    # Headless mode for production
+    if headless:
+        options.add_argument('--headless=new')  # Use new headless mode
+
+    # Chrome binary path for macOS
+    chrome_binary = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+    if os.path.exists(chrome_binary):
+        options.binary_location = chrome_binary
+
+    if user_agent:
+        options.add_argument(f'--user-agent={user_agent}')
+
+    return options
+
+
+def create_chrome_driver(headless=True, user_agent=None, logger=None):
+    """🌐 Tạo một Chrome WebDriver mới (cold start) với path chromedriver đã cache"""
+    options = build_chrome_options(headless, user_agent)
+
+    driver_path = resolve_chromedriver_path(logger=logger)
+    try:
+        service = Service(driver_path) if driver_path else Service()
+        driver = webdriver.Chrome(service=service, options=options)
+    except Exception as e:
+        if not driver_path:
+            raise
+        # Path cache có thể đã lỗi thời (Chrome vừa update) → để Selenium Manager tự tìm
+        if logger:
+            logger.warning(f"Cached chromedriver failed: {e}")
+        driver = webdriver.Chrome(service=Service(), options=options)
+
+    # OPTIMIZED TIMEOUTS
+    driver.implicitly_wait(3)
+    driver.set_page_load_timeout(15)
+    driver.set_script_timeout(3)
+
+    # Hide automation detection
+    driver.execute_script(
+        "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+    )
+
+    return driver
+
+
+class DriverPool:
+    """
+    🚗 Pool N trình duyệt headless khởi động sẵn
+    Driver được health-check khi lấy ra và được recycle sau max_uses lần dùng hoặc max_age giây
+    """
+
+    def __init__(self, size=2, max_uses=20, max_age=3600, factory=None, logger=None,
+                 headless=None, user_agent=None):
+        self.size = max(1, int(size))
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.logger = logger
+        self.headless = os.getenv('HEADLESS', 'true').lower() == 'true' if headless is None else headless
+        self.user_agent = user_agent
+        self.factory = factory or (lambda: create_chrome_driver(
+            headless=self.headless, user_agent=self.user_agent, logger=self.logger
+        ))
+
+        self._idle = queue.Queue()
+        self._meta = {}  # id(driver) -> {'created_at': float, 'uses': int}
+        self._creating = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def _try_create(self):
+        """Tạo driver mới nếu pool còn slot, ngược lại trả về None"""
+        with self._lock:
+            if len(self._meta) + self._creating >= self.size:
+                return None
+            self._creating += 1
+        try:
+            driver = self.factory()
+            with self._lock:
+                self._meta[id(driver)] = {'created_at': time.time(), 'uses': 0}
+            return driver
+        finally:
+            with self._lock:
+                self._creating -= 1
+
+    def _destroy(self, driver):
+        with self._lock:
+            self._meta.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def owns(self, driver):
+        """Driver này có thuộc pool không"""
+        with self._lock:
+            return id(driver) in self._meta
+
+    def is_healthy(self, driver):
+        """🩺 Kiểm tra driver còn phản hồi và chưa hết tuổi thọ"""
+        with self._lock:
+            meta = self._meta.get(id(driver))
+        if not meta:
+            return False
+        if self.max_uses and meta['uses'] >= self.max_uses:
+            return False
+        if self.max_age and time.time() - meta['created_at'] > self.max_age:
+            return False
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def warm_up(self):
+        """🔥 Khởi động sẵn các driver còn thiếu để đủ size"""
+        created = 0
+        while True:
+            try:
+                driver = self._try_create()
+            except Exception as e:
+                self._log('warning', f"⚠️ Không thể khởi động driver cho pool: {e}")
+                break
+            if driver is None:
+                break
+            self._idle.put(driver)
+            created += 1
+        if created:
+            self._log('info', f"🔥 Driver pool: đã khởi động sẵn {created} trình duyệt")
+        return created
+
+    def acquire(self, timeout=60):
+        """
+        🚗 Lấy một driver sẵn sàng từ pool
+
+        Returns:
+            WebDriver đã health-check
+        """
+        if self._closed:
+            raise RuntimeError("Driver pool đã đóng")
+
+        deadline = time.time() + timeout
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = self._try_create()
+                if driver is None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TimeoutError(f"Không có driver rảnh trong pool sau {timeout}s")
+                    try:
+                        driver = self._idle.get(timeout=remaining)
+                    except queue.Empty:
+                        continue
+
+            if self.is_healthy(driver):
+                with self._lock:
+                    self._meta[id(driver)]['uses'] += 1
+                return driver
+
+            self._log('info', "♻️ Driver pool: recycle driver hết hạn/không phản hồi")
+            self._destroy(driver)
+
+    def release(self, driver, reset_session=False):
+        """
+        🔙 Trả driver về pool
+
+        Args:
+            reset_session (bool): Xoá cookies để lần dùng sau là một session mới
+        """
+        if driver is None or not self.owns(driver):
+            return
+
+        if self._closed:
+            self._destroy(driver)
+            return
+
+        try:
+            if reset_session:
+                driver.delete_all_cookies()
+            driver.get("about:blank")
+        except Exception:
+            self._destroy(driver)
+            return
+
+        if self.is_healthy(driver):
+            self._idle.put(driver)
+        else:
+            self._destroy(driver)
+
+    def grow(self, size):
+        """📈 Tăng số driver tối đa lên size (không bao giờ giảm - driver đang dùng vẫn giữ nguyên)"""
+        with self._lock:
+            self.size = max(self.size, int(size))
+            return self.size
+
+    def stats(self):
+        """📊 Thống kê pool"""
+        with self._lock:
+            total = len(self._meta)
+        return {'size': self.size, 'alive': total, 'idle': self._idle.qsize()}
+
+    def shutdown(self):
+        """🧹 Đóng toàn bộ driver trong pool"""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._destroy(driver)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool(settings=None, logger=None, headless=None, user_agent=None):
+    """
+    🎯 Lấy pool dùng chung trong process (tạo ở lần gọi đầu tiên)
+
+    Lần gọi sau với size lớn hơn sẽ nới pool; headless / user_agent chỉ áp dụng khi tạo pool
+    (driver đã khởi động sẵn) → khác cấu hình đang chạy thì chỉ log cảnh báo
+
+    Args:
+        settings (dict): Section 'driver_pool' trong config.json
+        headless (bool): None = theo env HEADLESS
+        user_agent (str): User agent cho Chrome (None = mặc định của Chrome)
+    """
+    global _pool
+    with _pool_lock:
+        size = int(os.getenv('DRIVER_POOL_SIZE', (settings or {}).get('size', 2)))
+
+        if _pool is None:
+            settings = settings or {}
+            _pool = DriverPool(
+                size=size,
+                max_uses=settings.get('max_uses', 20),
+                max_age=settings.get('max_age_seconds', 3600),
+                logger=logger,
+                headless=headless,
+                user_agent=user_agent
+            )
+            atexit.register(_pool.shutdown)
+            return _pool
+
+        _pool.logger = _pool.logger or logger
+        if settings is not None and size > _pool.size:
+            _pool._log('info', f"📈 Driver pool: tăng size {_pool.size} → {_pool.grow(size)}")
+        if (headless is not None and headless != _pool.headless) or \
+                (user_agent is not None and user_agent != _pool.user_agent):
+            _pool._log('warning', "⚠️ Driver pool đã khởi tạo với headless/user_agent khác - "
+                                  "giữ cấu hình cũ cho các driver trong pool")
+        return _pool
+
+
+def driver_pool_enabled(settings=None):
+    """Pool có được bật không (env DRIVER_POOL_ENABLED ghi đè config)"""
+    env_value = os.getenv('DRIVER_POOL_ENABLED')
+    if env_value is not None:
+        return env_value.lower() == 'true'
+    return (settings or {}).get('enabled', True)
+
+
+def release_driver(driver, reset_session=False):
+    """🔙 Trả driver về pool nếu thuộc pool, ngược lại quit như trước"""
+    if driver is None:
+        return
+    if _pool is not None and _pool.owns(driver):
+        _pool.release(driver, reset_session=reset_session)
+    else:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    """Test the driver pool module"""
+    print("🚗 Driver Pool Module")
+    print("Use this module to reuse pre-launched Chrome drivers across runs")
+    print("Example: driver = get_driver_pool().acquire(); ...; release_driver(driver)")
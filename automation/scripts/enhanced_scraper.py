@@ -12,6 +12,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 
+from scripts.page_readiness import PageReadiness
+
 
 class EnhancedScraper:
     """Class xử lý scraping nâng cao với tối ưu JavaScript"""
@@ -39,8 +41,8 @@ class EnhancedScraper:
             """
 
             try:
-                # Chờ ngắn cho DOM ổn định
-                time.sleep(0.3)
+                # Chờ DOM ổn định (AJAX xong + bảng ngừng render) thay vì sleep cố định
+                PageReadiness(self.driver, self.logger).wait_for_ajax_idle("table tbody", timeout=3)
 
                 # Thực thi script JS để lấy dữ liệu trực tiếp - nhanh hơn nhiều
                 rows_data = self.driver.execute_script(js_script)
@@ -305,17 +307,9 @@ class EnhancedScraper:
                 EC.presence_of_element_located((By.CSS_SELECTOR, "table tbody tr"))
             )
 
-            # Wait for AJAX completion if jQuery is available
-            try:
-                WebDriverWait(self.driver, timeout).until(
-                    lambda driver: driver.execute_script("return typeof $ !== 'undefined' && $.active == 0")
-                )
+            # Wait for AJAX completion ($.active == 0) + DOM của bảng ngừng thay đổi
+            if PageReadiness(self.driver, self.logger).wait_for_table_ready("table tbody", timeout=timeout):
                 self.logger.info("✅ AJAX requests completed")
-            except:
-                self.logger.info("⚠️ jQuery not available, skipping AJAX wait")
-
-            # Additional stability wait
-            time.sleep(1)
 
             self.logger.info("✅ Bảng dữ liệu đã load hoàn toàn")
             return True
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📣 Event Bus Module - Pub/sub trong process cho sự kiện job (tiến trình, thời gian từng bước, số dòng)
+Handles: topic theo job id, phát lại lịch sử cho subscriber đến muộn / kết nối lại (Last-Event-ID),
+         định dạng Server-Sent Events dùng chung cho Flask và FastAPI
+"""
+
+import json
+import queue
+import threading
+import itertools
+from collections import deque
+
+
+HISTORY_SIZE = 200          # Số sự kiện giữ lại mỗi topic để phát lại
+SUBSCRIBER_QUEUE_SIZE = 1000
+HEARTBEAT_SECONDS = 15      # Dòng comment giữ kết nối SSE qua proxy
+SSE_MEDIA_TYPE = 'text/event-stream'
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+ALL_TOPICS = '*'
+
+
+class Subscription:
+    """Hàng đợi riêng của một subscriber (thread-safe, có giới hạn)"""
+
+    def __init__(self, bus, topic, events=()):
+        self.bus = bus
+        self.topic = topic
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        for event in events:
+            self.queue.put_nowait(event)
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Client quá chậm: bỏ sự kiện, không chặn publisher
+            pass
+
+    def get(self, timeout=None):
+        """Sự kiện kế tiếp, None nếu hết timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    📣 Pub/sub trong bộ nhớ: publish(topic, event) → mọi subscriber của topic và của ALL_TOPICS
+
+    Mỗi sự kiện được gán 'id' tăng dần (dùng làm id của SSE)
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.history_size = history_size
+        self._history = {}
+        self._subscribers = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def publish(self, topic, event):
+        with self._lock:
+            event = {**event, 'id': next(self._ids), 'topic': topic}
+            self._history.setdefault(topic, deque(maxlen=self.history_size)).append(event)
+            subscribers = self._subscribers.get(topic, []) + self._subscribers.get(ALL_TOPICS, [])
+        for subscription in subscribers:
+            subscription.put(event)
+        return event
+
+    def subscribe(self, topic, replay=True, after_id=None):
+        """
+        ➕ Đăng ký nhận sự kiện của topic
+
+        Args:
+            replay (bool): Nhận lại các sự kiện đã phát của topic trước khi nhận sự kiện mới
+            after_id (int): Chỉ phát lại sự kiện có id lớn hơn (Last-Event-ID khi client kết nối lại)
+        """
+        with self._lock:
+            history = list(self._history.get(topic, ())) if replay else []
+            if after_id is not None:
+                history = [event for event in history if event['id'] > after_id]
+            subscription = Subscription(self, topic, history)
+            self._subscribers.setdefault(topic, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.topic, None)
+
+    def history(self, topic):
+        with self._lock:
+            return list(self._history.get(topic, ()))
+
+    def drop(self, topic):
+        """Bỏ lịch sử của topic (job đã bị xoá khỏi danh sách)"""
+        with self._lock:
+            self._history.pop(topic, None)
+
+
+def sse_format(event):
+    """Một sự kiện theo định dạng text/event-stream"""
+    return (f"id: {event['id']}\n"
+            f"event: {event.get('event', 'message')}\n"
+            f"data: {json.dumps(event, ensure_ascii=False, default=str)}\n\n")
+
+
+def sse_stream(subscription, until=None, heartbeat=HEARTBEAT_SECONDS):
+    """
+    📡 Generator chuỗi SSE từ một subscription, kết thúc khi until(event) đúng hoặc client ngắt kết nối
+
+    Luôn hủy đăng ký khi generator đóng (GeneratorExit từ server khi client ngắt)
+    """
+    try:
+        yield "retry: 2000\n\n"
+        while True:
+            event = subscription.get(timeout=heartbeat)
+            if event is None:
+                yield ": heartbeat\n\n"
+                continue
+            yield sse_format(event)
+            if until is not None and until(event):
+                return
+    finally:
+        subscription.close()
+
+
+def last_event_id(value):
+    """Header Last-Event-ID → int (None nếu không có / sai định dạng)"""
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    """Test the event bus module"""
+    print("📣 Event Bus Module")
+    print("Use this module to fan out job events to Server-Sent Events subscribers")
+    print("Example: sse_stream(bus.subscribe(job_id), until=lambda event: event['event'] == 'finished')")
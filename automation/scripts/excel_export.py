@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📊 Excel Export Module - Ghi file Excel dạng streaming bằng xlsxwriter
+Handles: độ rộng cột tính một lượt từ DataFrame (không duyệt lại từng ô sau khi ghi),
+         ghi từng dòng ở chế độ constant_memory, nhiều sheet (đơn hàng + sản phẩm) trong một lần mở file
+"""
+
+import logging
+
+import pandas as pd
+import xlsxwriter
+
+
+MAX_COLUMN_WIDTH = 50
+WIDTH_PADDING = 2
+DATETIME_FORMAT = 'yyyy-mm-dd hh:mm:ss'
+
+ORDERS_SHEET = 'Đơn hàng'
+PRODUCTS_SHEET = 'Sản phẩm'
+
+logger = logging.getLogger('ExcelExport')
+
+
+def column_widths(df, max_width=MAX_COLUMN_WIDTH, padding=WIDTH_PADDING):
+    """
+    📏 Độ rộng từng cột = min(độ dài chuỗi dài nhất (kể cả tiêu đề) + padding, max_width)
+
+    Tính theo cột bằng .str.len() thay vì len(str(cell.value)) cho từng ô của worksheet
+    """
+    widths = []
+    for column in df.columns:
+        series = df[column].dropna()
+        longest = series.astype(str).str.len().max() if len(series) else 0
+        widths.append(min(max(int(longest), len(str(column))) + padding, max_width))
+    return widths
+
+
+def _rows(df):
+    """Các dòng dưới dạng tuple giá trị Python (NaN/NaT → None = ô trống)"""
+    frame = df.astype(object)
+    return frame.where(frame.notna(), None).itertuples(index=False, name=None)
+
+
+def write_excel(path, sheets, max_width=MAX_COLUMN_WIDTH):
+    """
+    📊 Ghi nhiều DataFrame vào một file Excel, mỗi DataFrame một sheet
+
+    Ghi theo dòng ở chế độ constant_memory: bộ nhớ chỉ giữ một dòng, không dựng lại toàn bộ workbook
+
+    Args:
+        path (str): File .xlsx đích
+        sheets (dict): Tên sheet → DataFrame (DataFrame rỗng / None bị bỏ qua)
+
+    Returns:
+        dict: Tên sheet → số dòng đã ghi
+    """
+    written = {}
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'default_date_format': DATETIME_FORMAT,
+        'remove_timezone': True,
+        'nan_inf_to_errors': True,
+        'strings_to_formulas': False,
+        'strings_to_urls': False
+    })
+    try:
+        header_format = workbook.add_format({'bold': True, 'border': 1})
+        for sheet_name, df in sheets.items():
+            if df is None or df.empty:
+                continue
+            worksheet = workbook.add_worksheet(sheet_name)
+
+            for index, width in enumerate(column_widths(df, max_width)):
+                worksheet.set_column(index, index, width)
+
+            worksheet.write_row(0, 0, [str(column) for column in df.columns], header_format)
+            for row_index, row in enumerate(_rows(df), start=1):
+                worksheet.write_row(row_index, 0, row)
+            written[sheet_name] = len(df)
+    finally:
+        workbook.close()
+
+    logger.info(f"📊 Excel {path}: " + ", ".join(f"{name} {rows} dòng" for name, rows in written.items()))
+    return written
+
+
+if __name__ == "__main__":
+    """Test the Excel export module"""
+    print("📊 Excel Export Module")
+    print("Use this module to stream DataFrames into an .xlsx file with precomputed column widths")
+    print("Example: write_excel('data/orders.xlsx', {ORDERS_SHEET: orders_df, PRODUCTS_SHEET: products_df})")
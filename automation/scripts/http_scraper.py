@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🌐 HTTP Scraper Module - Lấy danh sách đơn hàng ONE không cần trình duyệt
+Handles: pooled requests.Session, cookie reuse/form login, DataTables JSON feed, lxml table parsing
+"""
+
+import re
+import time
+from datetime import datetime
+from urllib.parse import urljoin
+
+import requests
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+# Bộ lọc mặc định giống tab "Đơn chờ xuất kho" + "Thời gian sàn TMĐT" của bản Selenium
+DEFAULT_FILTER_PARAMS = {
+    'search_text': '',
+    'search': '',
+    'filter_status': 'sale',
+    'filter_ecomstt': 'all',
+    'filter_packed': 'all',
+    'filter_warehouse': 'all',
+    'filter_delivery': 'all',
+    'filter_invoice': 'all',
+    'filter_transporter': 'all',
+    'filter_source': 'all',
+    'filter_emp': 'all',
+    'filter_express': 'all',
+    'time_type': 'ecom',
+}
+
+
+def add_commas(value):
+    """Định dạng số giống hàm addCommas() của trang ONE (1234567 → 1,234,567)"""
+    if value is None:
+        return ''
+    text = str(value)
+    integer, dot, decimal = text.partition('.')
+    integer = re.sub(r'(\d)(?=(\d{3})+$)', r'\1,', integer)
+    return integer + dot + decimal
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+def record_to_cells(record):
+    """
+    🧱 Chuyển 1 bản ghi JSON của /so/all thành danh sách text các ô
+    Thứ tự và nội dung khớp với innerText của bảng #orderTB mà Selenium đọc
+    """
+    try:
+        order_id = int(record.get('id') or 0)
+    except (TypeError, ValueError):
+        order_id = 0
+    is_total_row = order_id < 1
+
+    return_id = record.get('return_id')
+    try:
+        has_return = return_id is not None and int(return_id) >= 10
+    except (TypeError, ValueError):
+        has_return = False
+
+    return [
+        '',                                                    # checkbox
+        '' if is_total_row else _text(record.get('id')),
+        'Tổng cộng' if is_total_row else _text(record.get('name')),
+        _text(record.get('return_name')) if has_return else '',
+        _text(record.get('customer_name')),
+        'HOẢ TỐC' if str(record.get('is_express')) == '1' else '',
+        _text(record.get('state_name')),
+        _text(record.get('ecom_status_name')) if record.get('ecom_status') else '',
+        _text(record.get('status_packed_name')),
+        _text(record.get('status_delivery_name')),
+        _text(record.get('state_paid_name')),
+        _text(record.get('ecom_order_id')),
+        _text(record.get('transporter')),
+        _text(record.get('shipment_code')),
+        _text(record.get('public_code')),
+        add_commas(record.get('total')),
+        add_commas(record.get('cod')),
+        _text(record.get('source')),
+        _text(record.get('ecom_created_at')),
+        _text(record.get('create_date')),
+        _text(record.get('warehouse_name')),
+        _text(record.get('employee')),
+        _text(record.get('note')),
+    ]
+
+
+def parse_table_rows(page_html):
+    """
+    📄 Parse các dòng `tbody tr` của bảng HTML bằng lxml
+
+    Returns:
+        list[list[str]]: Text từng ô của mỗi dòng (bỏ dòng không có <td>)
+    """
+    tree = lxml_html.fromstring(page_html)
+    rows_data = []
+    for row in tree.xpath('//table//tbody/tr'):
+        cells = row.xpath('./td')
+        if not cells:
+            continue
+        rows_data.append([' '.join(cell.text_content().split()) for cell in cells])
+    return rows_data
+
+
+class HttpOrderScraper:
+    """
+    🌐 Backend lấy đơn hàng qua HTTP thuần
+    Dùng lại cookies đã lưu (hoặc đăng nhập bằng form POST), gọi thẳng nguồn dữ liệu của bảng đơn hàng
+    """
+
+    def __init__(self, config, logger, session_manager=None):
+        self.config = config
+        self.logger = logger
+        self.session_manager = session_manager
+
+        scraper_config = config.get('scraper', {})
+        self.settings = scraper_config.get('http', {})
+        self.base_url = config['system']['one_url'].rstrip('/')
+        self.data_url = self.settings.get('data_url', f"{self.base_url}/so/all")
+        self.timeout = self.settings.get('timeout', 30)
+
+        self.session = self._create_session()
+
+    def _create_session(self):
+        """🔌 requests.Session với connection pool keep-alive và retry cho lỗi mạng/5xx"""
+        session = requests.Session()
+        retry = Retry(
+            total=self.settings.get('retries', 2),
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'POST'])
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=retry)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'User-Agent': self.settings.get('user_agent', DEFAULT_USER_AGENT),
+            'Accept-Language': 'vi-VN,vi;q=0.9,en;q=0.8',
+        })
+        return session
+
+    def load_saved_cookies(self):
+        """🍪 Nạp cookies Selenium đã lưu trong SessionManager vào requests.Session"""
+        if not self.session_manager:
+            return False
+
+        session_data = self.session_manager.load_session()
+        if not session_data or not session_data.get('cookies'):
+            return False
+
+        for cookie in session_data['cookies']:
+            try:
+                self.session.cookies.set(
+                    cookie['name'], cookie['value'],
+                    domain=cookie.get('domain'), path=cookie.get('path', '/')
+                )
+            except Exception:
+                continue
+
+        self.logger.info(f"🍪 HTTP: đã nạp {len(session_data['cookies'])} cookies từ session đã lưu")
+        return True
+
+    def save_cookies(self):
+        """💾 Lưu cookies của requests.Session theo định dạng Selenium để 2 backend dùng chung"""
+        if not self.session_manager:
+            return
+        cookies = [
+            {
+                'name': cookie.name,
+                'value': cookie.value,
+                'domain': cookie.domain,
+                'path': cookie.path,
+                'secure': cookie.secure,
+            }
+            for cookie in self.session.cookies
+        ]
+        self.session_manager.save_session(cookies, self.base_url)
+
+    def login(self):
+        """🔐 Đăng nhập bằng POST form login (không cần JavaScript)"""
+        try:
+            credentials = self.config.get('credentials', {})
+            username = credentials.get('username')
+            password = credentials.get('password')
+            if not username or not password or str(username).startswith('${'):
+                self.logger.warning("⚠️ HTTP: thiếu thông tin đăng nhập")
+                return False
+
+            response = self.session.get(self.base_url, timeout=self.timeout)
+            tree = lxml_html.fromstring(response.text)
+
+            forms = [f for f in tree.xpath('//form') if f.xpath(".//input[@type='password']")]
+            if not forms:
+                # Không có form login → cookies hiện tại đã đăng nhập sẵn
+                return 'login' not in response.url.lower()
+
+            form = forms[0]
+            payload = {}
+            for field in form.xpath('.//input[@name]'):
+                if field.get('type') in ('checkbox', 'radio') and field.get('checked') is None:
+                    continue
+                payload[field.get('name')] = field.get('value', '')
+
+            password_name = form.xpath(".//input[@type='password']")[0].get('name', 'password')
+            username_name = None
+            for candidate in ('username', 'email', 'login'):
+                if candidate in payload:
+                    username_name = candidate
+                    break
+            if not username_name:
+                text_inputs = form.xpath(".//input[@name and (not(@type) or @type='text' or @type='email')]")
+                username_name = text_inputs[0].get('name') if text_inputs else 'username'
+
+            payload[username_name] = username
+            payload[password_name] = password
+
+            action_url = urljoin(response.url, form.get('action') or response.url)
+            result = self.session.post(action_url, data=payload, timeout=self.timeout)
+
+            result_tree = lxml_html.fromstring(result.text) if result.text else None
+            still_on_login = result_tree is not None and bool(result_tree.xpath("//input[@type='password']"))
+            if result.status_code >= 400 or still_on_login:
+                self.logger.warning("⚠️ HTTP: đăng nhập bằng form thất bại")
+                return False
+
+            self.logger.info("✅ HTTP: đăng nhập thành công")
+            self.save_cookies()
+            return True
+
+        except Exception as e:
+            self.logger.warning(f"⚠️ HTTP: lỗi đăng nhập: {e}")
+            return False
+
+    def build_params(self, date_from=None, date_to=None):
+        """⚙️ Tham số lọc giống request AJAX của bảng #orderTB"""
+        limit = self.config.get('data_processing', {}).get('max_rows_for_testing') or 2000
+
+        params = dict(DEFAULT_FILTER_PARAMS)
+        params.update({
+            'draw': 1,
+            'start': 0,
+            'length': self.settings.get('limit', limit),
+            'date_from': date_from or self.settings.get('date_from', '2017-01-01'),
+            'date_to': date_to or self.settings.get('date_to', datetime.now().strftime('%Y-%m-%d')),
+        })
+        params.update(self.settings.get('params', {}))
+        return params
+
+    def fetch_rows(self, date_from=None, date_to=None):
+        """
+        📥 Lấy dữ liệu bảng đơn hàng
+
+        Returns:
+            list[list[str]]: Các dòng (text từng ô), [] nếu không có dữ liệu,
+            None nếu chưa đăng nhập/phản hồi không hợp lệ
+        """
+        response = self.session.get(
+            self.data_url,
+            params=self.build_params(date_from, date_to),
+            headers={'X-Requested-With': 'XMLHttpRequest', 'Accept': 'application/json, text/javascript, */*'},
+            timeout=self.timeout
+        )
+
+        if response.status_code in (401, 403) or 'login' in response.url.lower():
+            self.logger.info("🔒 HTTP: session chưa đăng nhập")
+            return None
+        if response.status_code != 200:
+            self.logger.warning(f"⚠️ HTTP: {self.data_url} trả về {response.status_code}")
+            return None
+
+        content_type = response.headers.get('Content-Type', '')
+        if 'json' in content_type or response.text.lstrip().startswith('{'):
+            try:
+                payload = response.json()
+            except ValueError:
+                self.logger.warning("⚠️ HTTP: phản hồi JSON không hợp lệ")
+                return None
+            records = payload.get('data', []) if isinstance(payload, dict) else payload
+            return [record_to_cells(record) for record in records if isinstance(record, dict)]
+
+        # Trang trả HTML: trang login → None, trang có bảng render sẵn → parse trực tiếp
+        if re.search(r'type=["\']password["\']', response.text, re.IGNORECASE):
+            self.logger.info("🔒 HTTP: bị chuyển về trang đăng nhập")
+            return None
+        rows_data = parse_table_rows(response.text)
+        return rows_data if rows_data else None
+
+    def scrape_rows(self, date_from=None, date_to=None):
+        """
+        🚀 Cookies đã lưu → nếu hết hạn thì đăng nhập → lấy dữ liệu
+
+        Returns:
+            list[list[str]]: Các dòng dữ liệu ([] = truy vấn thành công nhưng không có đơn),
+                             None nếu thất bại (để caller fallback sang Selenium)
+        """
+        start_time = time.time()
+        try:
+            rows_data = None
+            if self.load_saved_cookies():
+                rows_data = self.fetch_rows(date_from, date_to)
+
+            if rows_data is None:
+                if not self.login():
+                    return None
+                rows_data = self.fetch_rows(date_from, date_to)
+
+            if rows_data is None:
+                return None
+
+            self.logger.info(
+                f"⚡ HTTP: lấy {len(rows_data)} dòng trong {time.time() - start_time:.2f}s (không dùng trình duyệt)"
+            )
+            return rows_data
+
+        except Exception as e:
+            self.logger.warning(f"⚠️ HTTP scraper lỗi: {e}")
+            return None
+
+    def close(self):
+        """🧹 Đóng connection pool"""
+        try:
+            self.session.close()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    """Test the HTTP scraper module"""
+    print("🌐 HTTP Scraper Module")
+    print("Use this module to fetch ONE orders without launching Chrome")
+    print("Example: rows = HttpOrderScraper(config, logger, session_manager).scrape_rows()")
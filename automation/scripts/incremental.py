@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔁 Incremental Module - Chỉ lấy phần đơn hàng mới kể từ lần chạy trước
+Handles: watermark theo sàn (order id + thời gian tạo lớn nhất), cửa sổ ngày có overlap, merge vào dữ liệu cũ
+"""
+
+import os
+import json
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+
+WATERMARK_FILE = "data/scrape_watermark.json"
+INCREMENTAL_STORE_FILE = "data/orders_incremental.csv"
+
+# Cột của bảng #orderTB: col_18 = sàn, col_19 = thời gian sàn, col_20 = thời gian tạo Odoo
+PLATFORM_COLUMN = 'col_18'
+CREATED_COLUMNS = ('col_19', 'col_20')
+
+
+def _created_at_series(df):
+    """Thời gian tạo đơn: ưu tiên thời gian sàn, thiếu thì dùng thời gian Odoo"""
+    created = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    for column in CREATED_COLUMNS:
+        if column in df.columns:
+            created = created.fillna(pd.to_datetime(df[column], errors='coerce'))
+    return created
+
+
+class WatermarkStore:
+    """
+    🔖 Watermark theo sàn: {platform: {last_order_id, last_created_at, last_checked_at, updated_at}}
+    Lưu JSON trên đĩa, ghi atomic
+    """
+
+    def __init__(self, path=WATERMARK_FILE):
+        self.path = path
+        self.watermarks = self._load()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception:
+            pass  # File hỏng → coi như chưa có watermark (full scrape)
+        return {}
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.watermarks, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, platform):
+        return self.watermarks.get(platform)
+
+    def window_start(self, overlap_hours=2):
+        """
+        📅 Thời điểm bắt đầu truy vấn = watermark cũ nhất trong các sàn - overlap
+
+        Watermark của một sàn = thời gian tạo lớn nhất đã thấy hoặc lần kiểm tra không có đơn mới, lấy mốc sau
+
+        Returns:
+            datetime hoặc None nếu chưa có watermark (cần full scrape)
+        """
+        created_times = []
+        for mark in self.watermarks.values():
+            times = [pd.to_datetime(mark.get(key), errors='coerce') for key in ('last_created_at', 'last_checked_at')]
+            times = [t for t in times if not pd.isna(t)]
+            if times:
+                created_times.append(max(times))
+        if not created_times:
+            return None
+        return min(created_times).to_pydatetime() - timedelta(hours=overlap_hours)
+
+    def count_new_orders(self, df):
+        """🆕 Số đơn có id lớn hơn watermark của sàn tương ứng"""
+        if df.empty or 'id' not in df.columns:
+            return 0
+        ids = pd.to_numeric(df['id'], errors='coerce')
+        platforms = df[PLATFORM_COLUMN] if PLATFORM_COLUMN in df.columns else pd.Series('', index=df.index)
+        last_ids = platforms.map(
+            lambda platform: (self.watermarks.get(platform) or {}).get('last_order_id', -1)
+        ).astype(float)
+        return int((ids > last_ids).sum())
+
+    def update_from_orders(self, df):
+        """⬆️ Nâng watermark từng sàn theo id và thời gian tạo lớn nhất vừa thấy"""
+        if df.empty or 'id' not in df.columns:
+            return self.watermarks
+
+        frame = pd.DataFrame({
+            'platform': df[PLATFORM_COLUMN] if PLATFORM_COLUMN in df.columns else '',
+            'order_id': pd.to_numeric(df['id'], errors='coerce'),
+            'created_at': _created_at_series(df),
+        }).dropna(subset=['order_id'])
+
+        now = datetime.now().isoformat()
+        for platform, group in frame.groupby('platform'):
+            platform = str(platform)
+            current = self.watermarks.get(platform, {})
+
+            last_order_id = int(group['order_id'].max())
+            last_created_at = group['created_at'].max()
+
+            previous_created = pd.to_datetime(current.get('last_created_at'), errors='coerce')
+            if not pd.isna(previous_created) and (pd.isna(last_created_at) or previous_created > last_created_at):
+                last_created_at = previous_created
+
+            self.watermarks[platform] = {
+                'last_order_id': max(last_order_id, current.get('last_order_id', 0)),
+                'last_created_at': None if pd.isna(last_created_at) else last_created_at.isoformat(),
+                'updated_at': now
+            }
+        return self.watermarks
+
+
+    def mark_checked(self, checked_at=None):
+        """
+        ✔️ Lần chạy incremental không có đơn mới: ghi nhận mọi sàn đã được kiểm tra tới checked_at
+        để cửa sổ lần sau tiến lên thay vì giữ mốc của đơn cuối cùng
+        """
+        checked_at = pd.Timestamp(checked_at or datetime.now())
+        now = datetime.now().isoformat()
+        for mark in self.watermarks.values():
+            previous = pd.to_datetime(mark.get('last_checked_at'), errors='coerce')
+            if pd.isna(previous) or checked_at > previous:
+                mark['last_checked_at'] = checked_at.isoformat()
+            mark['updated_at'] = now
+        return self.watermarks
+
+
+def merge_incremental_orders(previous_df, delta_df, key='id'):
+    """
+    🔗 Gộp đơn mới lấy vào dữ liệu cũ theo order id (bản mới ghi đè bản cũ)
+    Dòng không có id (dòng "Tổng cộng") bị bỏ qua
+    """
+    frames = [frame for frame in (previous_df, delta_df) if frame is not None and not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+
+    merged = pd.concat(frames, ignore_index=True, sort=False)
+    if key not in merged.columns:
+        return merged
+
+    merged = merged[merged[key].astype(str).str.strip() != '']
+    merged = merged.drop_duplicates(subset=[key], keep='last')
+    return merged.fillna('').reset_index(drop=True)
+
+
+def load_incremental_store(path=INCREMENTAL_STORE_FILE):
+    """📥 Dữ liệu đã gộp từ các lần chạy trước (toàn bộ cột dạng chuỗi)"""
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return pd.read_csv(path, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+
+
+def save_incremental_store(df, path=INCREMENTAL_STORE_FILE):
+    """💾 Ghi đè dữ liệu đã gộp (atomic)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    """Test the incremental module"""
+    print("🔁 Incremental Module")
+    print("Use this module to scrape only orders newer than the stored watermark")
+    print("Example: start = WatermarkStore().window_start(overlap_hours=2)")
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📦 Invoice Fetcher Module - Lấy chi tiết sản phẩm /so/invoiceJSON song song bằng asyncio
+Handles: keep-alive connection pool, cookies sync từ driver, global concurrency cap, streaming kết quả,
+         adaptive batch size (split + retry batch quá lớn)
+"""
+
+import asyncio
+import json
+import time
+import threading
+from collections import deque
+
+import aiohttp
+
+
+INVOICE_JSON_PATH = "/so/invoiceJSON"
+MAX_SPLIT_DEPTH = 6  # 50 id → tối đa 6 lần chia đôi là về 1 id
+
+
+def cookies_from_driver(driver):
+    """🍪 Lấy cookies của driver một lần (dict name → value)"""
+    return {cookie['name']: cookie['value'] for cookie in driver.get_cookies()}
+
+
+def chunk_ids(order_ids, batch_size):
+    """✂️ Chia danh sách order id thành các batch"""
+    batch_size = max(1, int(batch_size))
+    return [order_ids[i:i + batch_size] for i in range(0, len(order_ids), batch_size)]
+
+
+class InvoiceFetchError(Exception):
+    """Batch invoiceJSON không lấy được dữ liệu (status, HTML thay vì JSON, JSON lỗi)"""
+
+    def __init__(self, reason, status=None, too_large=False, auth_failed=False):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+        self.too_large = too_large  # 413/414 → nên chia nhỏ batch rồi thử lại
+        self.auth_failed = auth_failed  # Trang HTML (login) → phiên hết hạn, chia nhỏ không giúp gì
+
+
+class AsyncInvoiceFetcher:
+    """
+    📦 Gọi /so/invoiceJSON?id=... cho nhiều batch cùng lúc
+    Một aiohttp.ClientSession (keep-alive) dùng chung, số request đồng thời bị giới hạn bởi semaphore
+    """
+
+    def __init__(self, cookies, base_url="https://one.tga.com.vn", max_concurrency=8,
+                 timeout=15, user_agent=None, logger=None, controller=None):
+        self.cookies = dict(cookies or {})
+        self.base_url = base_url.rstrip('/')
+        self.endpoint = f"{self.base_url}{INVOICE_JSON_PATH}"
+        self.controller = controller  # AdaptiveBatchController (None = batch size cố định)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.logger = logger
+
+    def _log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def _create_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            limit_per_host=self.max_concurrency,
+            keepalive_timeout=30
+        )
+        headers = {'Accept': 'application/json, text/javascript, */*',
+                   'X-Requested-With': 'XMLHttpRequest'}
+        if self.user_agent:
+            headers['User-Agent'] = self.user_agent
+        return aiohttp.ClientSession(
+            connector=connector,
+            cookies=self.cookies,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+
+    async def _fetch_batch(self, session, semaphore, batch_ids):
+        """Gọi 1 batch, trả về list bản ghi; raise InvoiceFetchError nếu phản hồi không dùng được"""
+        ids_str = ','.join(map(str, batch_ids))
+        url = f"{self.endpoint}?id={ids_str}"
+
+        async with semaphore:
+            async with session.get(url) as response:
+                text = await response.text()
+                if response.status != 200:
+                    raise InvoiceFetchError(f"HTTP {response.status}", response.status,
+                                            too_large=response.status in (413, 414))
+
+        stripped = text.lstrip()
+        if stripped.startswith('<!DOCTYPE') or stripped.startswith('<html'):
+            raise InvoiceFetchError("HTML instead of JSON (session expired)", 200, auth_failed=True)
+
+        try:
+            data = json.loads(text)
+        except ValueError:
+            raise InvoiceFetchError("JSON decode error", 200)
+
+        if data.get('error', True) or not data.get('data'):
+            raise InvoiceFetchError(f"API response error: {data.get('error', 'Unknown error')}", 200)
+
+        return data['data']
+
+    async def iter_batches(self, batches):
+        """
+        🌊 Async generator: yield (batch_ids, records, error) theo thứ tự batch hoàn thành
+
+        records là None khi batch lỗi, error là InvoiceFetchError/Exception tương ứng
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._create_session() as session:
+
+            async def run(batch_ids):
+                try:
+                    return batch_ids, await self._fetch_batch(session, semaphore, batch_ids), None
+                except Exception as e:
+                    return batch_ids, None, e
+
+            tasks = [asyncio.ensure_future(run(batch_ids)) for batch_ids in batches]
+            try:
+                for finished in asyncio.as_completed(tasks):
+                    yield await finished
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def iter_adaptive(self, order_ids):
+        """
+        🌊 Như iter_batches nhưng kích thước batch do controller quyết định lúc gửi
+
+        Batch bị 413/414 được chia đôi và gửi lại (chỉ batch đó, tối đa MAX_SPLIT_DEPTH lần),
+        controller giảm batch size; batch thành công làm controller tăng dần batch size.
+        Trang HTML (phiên hết hạn) là lỗi xác thực → trả về lỗi luôn, không chia nhỏ
+        """
+        controller = self.controller
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        remaining = deque(order_ids)
+        retry = deque()
+        in_flight = set()
+
+        async with self._create_session() as session:
+
+            async def run(batch_ids, depth):
+                try:
+                    return batch_ids, depth, await self._fetch_batch(session, semaphore, batch_ids), None
+                except Exception as e:
+                    return batch_ids, depth, None, e
+
+            def dispatch():
+                while len(in_flight) < self.max_concurrency and (retry or remaining):
+                    if retry:
+                        batch_ids, depth = retry.popleft()
+                    else:
+                        size = min(controller.batch_size, len(remaining))
+                        batch_ids, depth = [remaining.popleft() for _ in range(size)], 0
+                    in_flight.add(asyncio.ensure_future(run(batch_ids, depth)))
+
+            try:
+                dispatch()
+                while in_flight:
+                    done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        in_flight.discard(task)
+                        batch_ids, depth, records, error = task.result()
+
+                        if records is not None:
+                            controller.record_success(len(batch_ids))
+                        elif (getattr(error, 'too_large', False) and len(batch_ids) > 1
+                              and depth < MAX_SPLIT_DEPTH):
+                            new_size = controller.record_failure(len(batch_ids))
+                            middle = len(batch_ids) // 2
+                            retry.extend([(batch_ids[:middle], depth + 1), (batch_ids[middle:], depth + 1)])
+                            self._log('info', f"✂️ invoiceJSON: batch {len(batch_ids)} id bị từ chối "
+                                              f"({error}) → chia đôi, batch size mới {new_size}")
+                            continue
+
+                        yield batch_ids, records, error
+                    dispatch()
+            finally:
+                for task in in_flight:
+                    task.cancel()
+
+    async def _consume(self, batch_stream, on_batch):
+        failed = []
+        async for batch_ids, records, error in batch_stream:
+            if records is None:
+                self._log('warning', f"⚠️ invoiceJSON batch {len(batch_ids)} đơn lỗi: {error}")
+                failed.append(batch_ids)
+            if on_batch:
+                on_batch(batch_ids, records, error)
+        return failed
+
+    def fetch(self, order_ids, batch_size=50, on_batch=None):
+        """
+        🚀 Lấy chi tiết cho toàn bộ order_ids (blocking), gọi on_batch ngay khi từng batch xong
+
+        Args:
+            batch_size: Kích thước batch cố định (bỏ qua khi có controller)
+            on_batch: callback(batch_ids, records, error) - records là None nếu batch lỗi
+
+        Returns:
+            list[list]: Các batch thất bại (để caller fallback)
+        """
+        order_ids = list(order_ids)
+        if not order_ids:
+            return []
+
+        start_time = time.time()
+        if self.controller:
+            successes = self.controller.successes
+            failed = run_coroutine_sync(self._consume(self.iter_adaptive(order_ids), on_batch))
+            if self.controller.successes > successes:
+                self.controller.save()  # Không batch nào thành công → không học được gì, giữ batch size cũ
+            self._log('info', f"⚡ invoiceJSON: {len(order_ids)} id ({len(failed)} batch lỗi) "
+                              f"trong {time.time() - start_time:.2f}s, batch size học được "
+                              f"{self.controller.batch_size}, concurrency={self.max_concurrency}")
+            return failed
+
+        batches = chunk_ids(order_ids, batch_size)
+        failed = run_coroutine_sync(self._consume(self.iter_batches(batches), on_batch))
+        self._log('info', f"⚡ invoiceJSON: {len(batches)} batch ({len(batches) - len(failed)} OK) "
+                          f"trong {time.time() - start_time:.2f}s, concurrency={self.max_concurrency}")
+        return failed
+
+
+def run_coroutine_sync(coroutine):
+    """Chạy coroutine từ code đồng bộ, kể cả khi thread hiện tại đã có event loop (FastAPI)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    result = {}
+
+    def runner():
+        try:
+            result['value'] = asyncio.run(coroutine)
+        except BaseException as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=runner, name="invoice-fetcher")
+    thread.start()
+    thread.join()
+    if 'error' in result:
+        raise result['error']
+    return result['value']
+
+
+if __name__ == "__main__":
+    """Test the invoice fetcher module"""
+    print("📦 Invoice Fetcher Module")
+    print("Use this module to fetch /so/invoiceJSON batches concurrently")
+    print("Example: AsyncInvoiceFetcher(cookies_from_driver(driver)).fetch(order_ids, on_batch=callback)")
+    print("Adaptive: AsyncInvoiceFetcher(cookies, controller=AdaptiveBatchController.load(endpoint))")
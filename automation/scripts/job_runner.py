@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧵 Job Runner Module - Chạy automation trong process riêng, API trả job id ngay lập tức
+Handles: ProcessPoolExecutor giới hạn số job đồng thời, trạng thái / tiến trình / kết quả / lỗi theo job id,
+         progress_callback từ worker gửi về process chính qua multiprocessing queue, thời gian + số dòng từng bước,
+         phát mọi sự kiện lên EventBus (topic = job id) cho SSE
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import subprocess
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from scripts.event_bus import EventBus
+
+
+DEFAULT_MAX_CONCURRENCY = 1  # Mỗi lần chạy dùng chung phiên đăng nhập ONE → mặc định chạy lần lượt
+MAX_FINISHED_JOBS = 100
+COMMAND_OUTPUT_LINES = 50
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+ACTIVE_STATES = (JOB_QUEUED, JOB_RUNNING)
+FINISHED_EVENT = 'finished'
+
+logger = logging.getLogger('JobRunner')
+
+
+class JobLimitError(RuntimeError):
+    """Đã đủ số job đồng thời cho phép"""
+
+
+# ----- phía worker -----
+
+_events = None
+_job_id = None
+_stage = None   # Bước đang chạy của job trong worker này
+
+
+def _init_worker(events):
+    global _events
+    _events = events
+
+
+def _publish(event, **payload):
+    if _events is not None:
+        _events.put({'job_id': _job_id, 'event': event, 'time': datetime.now().isoformat(), **payload})
+
+
+def _close_stage():
+    """Kết thúc bước hiện tại → sự kiện 'stage' với thời gian chạy và số dòng"""
+    global _stage
+    if _stage is None:
+        return
+    stage, _stage = _stage, None
+    _publish('stage', stage=stage['message'], percent=stage['percent'], started_at=stage['started_at'],
+             duration_ms=round((time.perf_counter() - stage['started']) * 1000, 1), rows=stage['rows'])
+
+
+def _progress(message, percent=None, rows=None):
+    """
+    progress_callback(status_message, progress_percentage) dùng trong worker (rows tùy chọn)
+
+    Mỗi lần gọi có percent mở một bước mới (và đóng bước trước); gọi không có percent
+    (dòng output của lệnh shell) chỉ là sự kiện tiến trình
+    """
+    global _stage
+    if percent is not None:
+        _close_stage()
+        _stage = {'message': message, 'percent': percent, 'rows': rows,
+                  'started': time.perf_counter(), 'started_at': datetime.now().isoformat()}
+    _publish('progress', message=message, percent=percent, rows=rows)
+
+
+def _stage_rows(rows):
+    """metrics_callback(rows) dùng trong worker: gắn số dòng vào bước đang chạy"""
+    if _stage is not None:
+        _stage['rows'] = rows
+
+
+def _json_safe(value):
+    """Bỏ DataFrame / đối tượng không serialize được khỏi kết quả trước khi gửi về process chính"""
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()
+                if not isinstance(item, (pd.DataFrame, pd.Series))}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    return json.loads(json.dumps(value, ensure_ascii=False, default=str))
+
+
+def _run_job(job_id, target, kwargs):
+    global _job_id, _stage
+    _job_id, _stage = job_id, None
+    _publish('started', pid=os.getpid())
+    try:
+        return _json_safe(target(progress_callback=_progress, **kwargs))
+    finally:
+        _close_stage()
+        # Sự kiện cuối của job trên queue: process chính chỉ báo 'finished' sau khi đã nhận hết sự kiện trước đó
+        _publish('drained')
+
+
+def run_automation_job(progress_callback, enhanced=False, config_path=None, workdir=None):
+    """Target job: một lần run_automation() / run_enhanced_automation() trong worker process"""
+    if workdir:
+        # config/, data/, logs/ là đường dẫn tương đối theo thư mục automation
+        os.chdir(workdir)
+    if enhanced:
+        from automation_enhanced import EnhancedOneAutomationSystem
+        system = EnhancedOneAutomationSystem(config_path) if config_path else EnhancedOneAutomationSystem()
+        return system.run_enhanced_automation(progress_callback=progress_callback, metrics_callback=_stage_rows)
+
+    from automation import OneAutomationSystem
+    system = OneAutomationSystem(config_path) if config_path else OneAutomationSystem()
+    return system.run_automation(progress_callback=progress_callback, metrics_callback=_stage_rows)
+
+
+def run_command_job(progress_callback, command, cwd=None):
+    """Target job: lệnh shell không tương tác, mỗi dòng output là một sự kiện tiến trình"""
+    process = subprocess.Popen(['bash', '-lc', command], cwd=cwd, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True, bufsize=1)
+    output = []
+    for line in process.stdout:
+        line = line.rstrip()
+        output = (output + [line])[-COMMAND_OUTPUT_LINES:]
+        progress_callback(line, None)
+    returncode = process.wait()
+    return {'success': returncode == 0, 'returncode': returncode, 'output': output,
+            'error': None if returncode == 0 else f"Command exited with code {returncode}"}
+
+
+def is_finished(event):
+    """Sự kiện cuối cùng của một job (dùng làm điều kiện dừng cho SSE)"""
+    return event.get('event') == FINISHED_EVENT
+
+
+# ----- phía process chính -----
+
+class JobRunner:
+    """
+    🧵 Hàng đợi job chạy trong worker process
+
+    submit() trả job dict ngay; trạng thái cập nhật từ queue sự kiện (tiến trình) và future (kết quả / lỗi).
+    Mọi sự kiện được publish lên bus (topic = job id) và gọi listeners
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, start_method='spawn', bus=None):
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.context = multiprocessing.get_context(start_method)
+        self.bus = bus or EventBus()
+        self.jobs = {}
+        self.listeners = []
+        self._outcomes = {}   # job id → kết quả của future, chờ sự kiện 'drained'
+        self._drained = set()
+        self._executor = None
+        self._events = None
+        self._listener_thread = None
+        self._lock = threading.RLock()
+
+    def _ensure_started(self):
+        if self._executor is not None:
+            return
+        self._events = self.context.Queue()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_concurrency, mp_context=self.context,
+                                             initializer=_init_worker, initargs=(self._events,))
+        self._listener_thread = threading.Thread(target=self._consume_events, name='JobEvents', daemon=True)
+        self._listener_thread.start()
+
+    def active_jobs(self):
+        with self._lock:
+            return [job for job in self.jobs.values() if job['status'] in ACTIVE_STATES]
+
+    def submit(self, kind, target, on_finish=None, **kwargs):
+        """
+        ▶️ Đưa job vào worker pool
+
+        Args:
+            kind (str): Tên loại job ('automation', 'command'...)
+            target (callable): Hàm cấp module (pickle được), nhận progress_callback + kwargs
+            on_finish (callable): Gọi với job dict khi job kết thúc (ở process chính)
+
+        Returns:
+            dict: Bản sao job (id, status = 'queued')
+
+        Raises:
+            JobLimitError: Đã có max_concurrency job đang chờ / chạy
+        """
+        with self._lock:
+            if len(self.active_jobs()) >= self.max_concurrency:
+                raise JobLimitError(f"Đã có {self.max_concurrency} job đang chạy")
+            self._ensure_started()
+
+            job_id = uuid.uuid4().hex[:12]
+            job = {
+                'id': job_id,
+                'kind': kind,
+                'params': _json_safe(kwargs),
+                'status': JOB_QUEUED,
+                'progress': 0,
+                'message': None,
+                'result': None,
+                'error': None,
+                'stages': [],
+                'created_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None
+            }
+            self.jobs[job_id] = job
+            self._prune()
+
+            executor = self._executor
+
+        self._notify({'job_id': job_id, 'event': 'queued', 'time': job['created_at']})
+        future = executor.submit(_run_job, job_id, target, kwargs)
+        future.add_done_callback(lambda done: self._finish(job_id, done, on_finish, executor))
+        return self.get(job_id)
+
+    def get(self, job_id):
+        """Bản sao trạng thái job (None nếu không có)"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job, stages=list(job['stages'])) if job is not None else None
+
+    def list(self):
+        with self._lock:
+            return [dict(job, stages=list(job['stages']))
+                    for job in sorted(self.jobs.values(), key=lambda job: job['created_at'], reverse=True)]
+
+    def subscribe(self, job_id, after_id=None):
+        """Subscription sự kiện của job (phát lại từ đầu hoặc sau Last-Event-ID)"""
+        return self.bus.subscribe(job_id, after_id=after_id)
+
+    def _apply(self, event):
+        with self._lock:
+            job = self.jobs.get(event.get('job_id'))
+            # Sự kiện từ queue có thể đến sau khi future đã xong → không ghi đè trạng thái cuối
+            if job is None or job['status'] not in ACTIVE_STATES:
+                return
+            if event['event'] == 'started':
+                job['status'] = JOB_RUNNING
+                job['started_at'] = event['time']
+            elif event['event'] == 'progress':
+                job['message'] = event.get('message')
+                if event.get('percent') is not None:
+                    job['progress'] = event['percent']
+            elif event['event'] == 'stage':
+                job['stages'].append({key: event.get(key) for key in
+                                      ('stage', 'percent', 'started_at', 'duration_ms', 'rows')})
+
+    def _consume_events(self):
+        while True:
+            try:
+                event = self._events.get()
+            except (EOFError, OSError):
+                return
+            if event is None:
+                return
+            if event['event'] == 'drained':
+                with self._lock:
+                    self._drained.add(event['job_id'])
+                self._complete(event['job_id'])
+                continue
+            self._apply(event)
+            self._notify(event)
+
+    def _finish(self, job_id, future, on_finish, executor=None):
+        crashed = False
+        try:
+            result = future.result()
+            error = result.get('error') if isinstance(result, dict) else None
+            success = result.get('success', True) if isinstance(result, dict) else True
+        except BrokenProcessPool as e:
+            # Worker chết giữa chừng → sẽ không có sự kiện 'drained'
+            result, error, success, crashed = None, f"{type(e).__name__}: {e}", False, True
+        except Exception as e:
+            result, error, success = None, f"{type(e).__name__}: {e}", False
+
+        with self._lock:
+            self._outcomes[job_id] = (result, error, success, on_finish)
+            if crashed:
+                self._drained.add(job_id)
+                if executor is not None and executor is self._executor:
+                    self._discard_broken_executor()
+        self._complete(job_id)
+
+    def _discard_broken_executor(self):
+        """Pool hỏng không nhận job mới nữa → bỏ đi, submit() tiếp theo tạo pool + queue sự kiện mới"""
+        logger.error("❌ Worker process chết giữa chừng - tạo lại worker pool cho job tiếp theo")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        try:
+            self._events.put(None)  # Dừng listener thread của queue cũ sau khi đọc hết sự kiện còn lại
+        except (OSError, ValueError):
+            pass
+        self._executor = None
+        self._events = None
+        self._listener_thread = None
+
+    def _complete(self, job_id):
+        """Chốt job khi đã có kết quả future và đã nhận hết sự kiện từ worker"""
+        with self._lock:
+            if job_id not in self._outcomes or job_id not in self._drained:
+                return
+            result, error, success, on_finish = self._outcomes.pop(job_id)
+            self._drained.discard(job_id)
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job.update({
+                'status': JOB_SUCCEEDED if success else JOB_FAILED,
+                'result': result,
+                'error': error,
+                'progress': 100 if success else job['progress'],
+                'finished_at': datetime.now().isoformat()
+            })
+            job['started_at'] = job['started_at'] or job['created_at']
+            snapshot = dict(job, stages=list(job['stages']))
+
+        self._notify({'job_id': job_id, 'event': FINISHED_EVENT, 'time': snapshot['finished_at'],
+                      'status': snapshot['status'], 'error': error, 'stages': snapshot['stages']})
+        if on_finish:
+            try:
+                on_finish(snapshot)
+            except Exception as e:
+                logger.error(f"❌ Lỗi on_finish của job {job_id}: {e}")
+
+    def _notify(self, event):
+        self.bus.publish(event['job_id'], event)
+        for listener in list(self.listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"❌ Lỗi listener job: {e}")
+
+    def _prune(self):
+        """Chỉ giữ MAX_FINISHED_JOBS job đã kết thúc gần nhất"""
+        finished = sorted((job for job in self.jobs.values() if job['status'] not in ACTIVE_STATES),
+                          key=lambda job: job['created_at'])
+        for job in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            self.jobs.pop(job['id'], None)
+            self.bus.drop(job['id'])
+
+    def shutdown(self, wait=True):
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=wait)
+        try:
+            self._events.put(None)
+        except (OSError, ValueError):
+            pass
+        if self._listener_thread is not None:
+            self._listener_thread.join(timeout=5)
+        self._executor = None
+
+
+if __name__ == "__main__":
+    """Test the job runner module"""
+    print("🧵 Job Runner Module")
+    print("Use this module to run automation in worker processes and track it by job id")
+    print("Example: JobRunner().submit('automation', run_automation_job, enhanced=True)")
@@ -19,6 +19,7 @@ from scripts.initialization import initialize_automation_system
 from scripts.setup import setup_automation_system
 from scripts.login import login_to_automation_system
 from scripts.enhanced_scraper import EnhancedScraper
+from scripts.driver_pool import release_driver
 
 
 class CompleteLoginManager:
@@ -27,8 +28,9 @@ class CompleteLoginManager:
     Sử dụng 4 modules: initialization → setup → login → enhanced_scraper
     """
 
-    def __init__(self, log_level='INFO'):
+    def __init__(self, log_level='INFO', session_file=None):
         self.log_level = log_level
+        self.session_file = session_file  # File session riêng (worker song song), None = mặc định
         self.logger = None
         self.config = None
         self.driver = None
@@ -63,7 +65,7 @@ class CompleteLoginManager:
 
             # ===== MODULE 2: SETUP =====
             print("🔧 [2/4] Setting up components...")
-            setup_result = setup_automation_system(self.logger)
+            setup_result = setup_automation_system(self.logger, session_file=self.session_file)
 
             if not setup_result['success']:
                 return {
@@ -142,7 +144,9 @@ class CompleteLoginManager:
         """🧹 Dọn dẹp resources"""
         try:
             if self.driver:
-                self.driver.quit()
+                # Fresh session: xoá cookies rồi trả driver về pool thay vì quit
+                release_driver(self.driver, reset_session=True)
+                self.driver = None
                 if self.logger:
                     self.logger.info("🧹 WebDriver cleaned up")
                 print("🧹 WebDriver cleaned up")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📡 NDJSON Stream Module - Trả đơn hàng dạng luồng thay vì một body JSON khổng lồ
+Handles: serialize bằng orjson (numpy / datetime / NaN → null), gom dòng thành chunk bytes,
+         NDJSON (một record mỗi dòng) hoặc mảng JSON chunked, đọc DataFrame theo lát để bộ nhớ có giới hạn
+"""
+
+import orjson
+import pandas as pd
+
+from scripts.columnar_export import to_records
+
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+JSON_MEDIA_TYPE = 'application/json'
+STREAM_FORMATS = ('ndjson', 'json')
+CHUNK_ROWS = 500
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    """Kiểu orjson không tự xử lý: pd.Timestamp, pd.NaT, Decimal..."""
+    if value is pd.NaT:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps(value):
+    """orjson.dumps với các option chung của module (trả bytes)"""
+    return orjson.dumps(value, default=_default, option=ORJSON_OPTIONS)
+
+
+def iter_ndjson(records, chunk_rows=CHUNK_ROWS):
+    """
+    📡 NDJSON: mỗi record một dòng, gom chunk_rows dòng thành một lần ghi
+
+    Args:
+        records (iterable): dict đơn hàng (generator đọc dần từ kho là tốt nhất)
+
+    Yields:
+        bytes
+    """
+    buffer = []
+    for record in records:
+        buffer.append(dumps(record))
+        if len(buffer) >= chunk_rows:
+            yield b'\n'.join(buffer) + b'\n'
+            buffer = []
+    if buffer:
+        yield b'\n'.join(buffer) + b'\n'
+
+
+def iter_json_array(records, chunk_rows=CHUNK_ROWS):
+    """
+    📡 Mảng JSON gửi theo chunk: '[' + record, record... + ']' - client JSON thường vẫn parse được
+
+    Yields:
+        bytes
+    """
+    yield b'['
+    first = True
+    buffer = []
+    for record in records:
+        buffer.append(dumps(record))
+        if len(buffer) >= chunk_rows:
+            yield (b'' if first else b',') + b','.join(buffer)
+            first, buffer = False, []
+    if buffer:
+        yield (b'' if first else b',') + b','.join(buffer)
+    yield b']'
+
+
+def stream_records(records, stream_format='ndjson', chunk_rows=CHUNK_ROWS):
+    """Chọn iter_ndjson / iter_json_array theo stream_format ('ndjson' | 'json')"""
+    if stream_format not in STREAM_FORMATS:
+        raise ValueError(f"Unsupported stream format: {stream_format}")
+    if stream_format == 'ndjson':
+        return iter_ndjson(records, chunk_rows)
+    return iter_json_array(records, chunk_rows)
+
+
+def media_type(stream_format):
+    return NDJSON_MEDIA_TYPE if stream_format == 'ndjson' else JSON_MEDIA_TYPE
+
+
+def frame_records(df, chunk_rows=CHUNK_ROWS):
+    """Record JSON-safe của DataFrame, chuyển đổi từng lát chunk_rows dòng (không dựng list toàn bộ)"""
+    for start in range(0, len(df), chunk_rows):
+        yield from to_records(df.iloc[start:start + chunk_rows])
+
+
+if __name__ == "__main__":
+    """Test the NDJSON stream module"""
+    print("📡 NDJSON Stream Module")
+    print("Use this module to stream large order payloads row by row with orjson")
+    print("Example: StreamingResponse(iter_ndjson(store.iter_orders()), media_type=NDJSON_MEDIA_TYPE)")
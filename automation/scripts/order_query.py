@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔎 Order Query Module - Lớp truy vấn đơn hàng / sản phẩm cho API có cache theo phiên bản file
+Handles: cache dữ liệu đã parse theo (inode, size, mtime) của file nguồn, lọc sàn / trạng thái / khoảng ngày,
+         chọn cột, phân trang limit/offset, ETag cho If-None-Match, thống kê groupby (count / sum / mean...)
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+from datetime import datetime
+
+import pandas as pd
+
+from scripts.columnar_export import to_records
+
+
+PLATFORM_COLUMNS = ('platform', 'col_18')
+STATUS_COLUMNS = ('status', 'col_7')
+DATE_COLUMNS = ('created_at', 'order_date', 'col_20', 'col_19')
+VALUE_COLUMNS = ('order_value', 'col_16')
+MAX_CACHED_PAGES = 64
+
+# Tên cột logic → cột thật theo nguồn (kho SQLite / dashboard CSV / CSV thô col_N)
+COLUMN_ALIASES = {
+    'platform': PLATFORM_COLUMNS,
+    'status': STATUS_COLUMNS,
+    'order_value': VALUE_COLUMNS,
+}
+DATE_GROUP = 'date'     # group_by=date → theo ngày tạo đơn
+STAT_AGGREGATIONS = ('sum', 'mean', 'min', 'max')
+
+
+def file_version(*paths):
+    """
+    🏷️ Phiên bản của một nhóm file: inode + size + mtime_ns (file không tồn tại bị bỏ qua)
+
+    Chỉ gọi os.stat → vài micro giây; SQLite WAL: truyền cả orders.db và orders.db-wal
+
+    Returns:
+        str hoặc None nếu không file nào tồn tại
+    """
+    parts = []
+    for path in paths:
+        if not path:
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        parts.append(f"{os.path.basename(path)}:{stat.st_ino}:{stat.st_size}:{stat.st_mtime_ns}")
+    return '|'.join(parts) or None
+
+
+def _first_column(df, candidates):
+    for column in candidates:
+        if column in df.columns:
+            return column
+    return None
+
+
+def _as_list(value):
+    """'Shopee,Tiktok' / ['Shopee'] / None → list hoặc None"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    values = [str(item).strip() for item in value if str(item).strip()]
+    return values or None
+
+
+class OrderDataset:
+    """
+    🔎 Một phiên bản dữ liệu đã parse + cột ngày đã chuyển kiểu sẵn
+
+    Dữ liệu bất biến sau khi nạp → các trang đã serialize được cache theo tham số truy vấn
+    """
+
+    def __init__(self, df, version, source=None):
+        self.version = version
+        self.source = source
+        self.loaded_at = datetime.now().isoformat()
+        self.platform_column = _first_column(df, PLATFORM_COLUMNS)
+        self.status_column = _first_column(df, STATUS_COLUMNS)
+        date_column = _first_column(df, DATE_COLUMNS)
+
+        if date_column is not None:
+            self.created = pd.to_datetime(df[date_column].replace('', None), errors='coerce')
+            # Mới nhất trước, giống OrderStore.query_orders()
+            order = self.created.sort_values(ascending=False, kind='stable', na_position='last').index
+            df = df.loc[order].reset_index(drop=True)
+            self.created = self.created.loc[order].reset_index(drop=True)
+        else:
+            self.created = None
+
+        self.df = df
+        self._pages = OrderedDict()
+        self._numeric = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.df)
+
+    def etag(self, *parts):
+        """ETag = hash(phiên bản dữ liệu + tham số truy vấn)"""
+        key = '|'.join([str(self.version)] + [str(part) for part in parts])
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def mask(self, platform=None, status=None, date_from=None, date_to=None):
+        """Mask bool cho bộ lọc (None = tất cả dòng)"""
+        mask = None
+
+        def combine(condition):
+            return condition if mask is None else mask & condition
+
+        for column, values in ((self.platform_column, _as_list(platform)), (self.status_column, _as_list(status))):
+            if values is not None:
+                if column is None:
+                    return pd.Series(False, index=self.df.index)
+                mask = combine(self.df[column].astype(str).isin(values))
+
+        if self.created is not None:
+            if date_from:
+                mask = combine(self.created >= pd.Timestamp(date_from))
+            if date_to:
+                # Chỉ có ngày → lấy hết ngày đó
+                end = pd.Timestamp(date_to)
+                if len(str(date_to)) == 10:
+                    end += pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+                mask = combine(self.created <= end)
+        return mask
+
+    def select(self, platform=None, status=None, date_from=None, date_to=None, fields=None, limit=None, offset=0):
+        """
+        Lát DataFrame đã lọc / chọn cột / phân trang (chưa serialize)
+
+        Returns:
+            tuple: (pd.DataFrame, tổng số dòng khớp bộ lọc)
+        """
+        fields = _as_list(fields)
+        offset = max(int(offset or 0), 0)
+        mask = self.mask(platform, status, date_from, date_to)
+        frame = self.df if mask is None else self.df[mask.to_numpy()]
+        total = len(frame)
+        if fields is not None:
+            frame = frame[[column for column in fields if column in frame.columns]]
+        end = None if limit is None else offset + max(int(limit), 0)
+        return frame.iloc[offset:end], total
+
+    def query(self, platform=None, status=None, date_from=None, date_to=None, fields=None, limit=None, offset=0):
+        """
+        🔎 Lọc + chọn cột + phân trang
+
+        Args:
+            platform / status: Một giá trị, 'a,b' hoặc list
+            date_from / date_to: 'YYYY-MM-DD' hoặc ISO datetime, so với thời gian tạo đơn
+            fields: Danh sách cột cần trả (cột không tồn tại bị bỏ qua)
+
+        Returns:
+            tuple: (list record JSON-safe, tổng số dòng khớp bộ lọc)
+        """
+        platform, status, fields = _as_list(platform), _as_list(status), _as_list(fields)
+        offset = max(int(offset or 0), 0)
+        key = tuple(tuple(values) if values is not None else None for values in (platform, status, fields))
+        key += (date_from, date_to, limit, offset)
+        return self._cached(key, lambda: self._page(platform, status, date_from, date_to, fields, limit, offset))
+
+    def _page(self, *args):
+        frame, total = self.select(*args)
+        return to_records(frame), total
+
+    def _cached(self, key, compute):
+        """LRU MAX_CACHED_PAGES kết quả đã serialize (dữ liệu bất biến → không cần invalidate)"""
+        with self._lock:
+            if key in self._pages:
+                self._pages.move_to_end(key)
+                return self._pages[key]
+
+        result = compute()
+
+        with self._lock:
+            self._pages[key] = result
+            while len(self._pages) > MAX_CACHED_PAGES:
+                self._pages.popitem(last=False)
+        return result
+
+    def column(self, name):
+        """Cột thật cho tên logic ('platform' → col_18 với CSV thô...), None nếu không có"""
+        return _first_column(self.df, COLUMN_ALIASES.get(name, (name,)))
+
+    def _group_key(self, name):
+        if name == DATE_GROUP:
+            if self.created is None:
+                raise ValueError("Dataset has no order date column")
+            return self.created.dt.strftime('%Y-%m-%d')
+        column = self.column(name)
+        if column is None:
+            raise ValueError(f"Unknown group_by column: {name}")
+        return self.df[column].astype('string').str.strip()
+
+    def _numeric_column(self, name):
+        """Cột số ("1,250,000" → 1250000.0), chuyển một lần cho mỗi phiên bản dữ liệu"""
+        column = self.column(name)
+        if column is None:
+            raise ValueError(f"Unknown metric column: {name}")
+        if column not in self._numeric:
+            series = self.df[column]
+            if not pd.api.types.is_numeric_dtype(series):
+                cleaned = series.astype(str).str.replace(',', '', regex=False).str.replace('"', '', regex=False)
+                series = pd.to_numeric(cleaned, errors='coerce')
+            self._numeric[column] = series
+        return self._numeric[column]
+
+    def stats(self, group_by=None, metrics=None, platform=None, status=None, date_from=None, date_to=None):
+        """
+        📊 Thống kê theo nhóm trên các dòng khớp bộ lọc
+
+        Args:
+            group_by: 'platform,status' / list - tên logic, tên cột, hoặc 'date' (ngày tạo đơn)
+            metrics: 'count,sum:order_value' / list - count, sum|mean|min|max:<cột>
+            platform / status / date_from / date_to: Bộ lọc như query()
+
+        Returns:
+            dict: group_by, metrics, groups (list record), totals, rows (số dòng khớp bộ lọc)
+
+        Raises:
+            ValueError: Cột / metric không hợp lệ
+        """
+        group_by = _as_list(group_by) or []
+        metrics = _as_list(metrics) or ['count']
+        platform, status = _as_list(platform), _as_list(status)
+        key = ('stats', tuple(group_by), tuple(metrics), tuple(platform or ()), tuple(status or ()),
+               date_from, date_to)
+        return self._cached(key, lambda: self._stats(group_by, metrics, platform, status, date_from, date_to))
+
+    def _stats(self, group_by, metrics, platform, status, date_from, date_to):
+        columns = {name: self._group_key(name) for name in group_by}
+        aggregations = {}
+        for metric in metrics:
+            if metric == 'count':
+                continue
+            aggregation, _, column = metric.partition(':')
+            if aggregation not in STAT_AGGREGATIONS or not column:
+                raise ValueError(f"Unsupported metric: {metric}")
+            columns[metric] = self._numeric_column(column)
+            aggregations[metric] = aggregation
+
+        frame = pd.DataFrame(columns, index=self.df.index)
+        mask = self.mask(platform, status, date_from, date_to)
+        if mask is not None:
+            frame = frame[mask.to_numpy()]
+
+        totals = {metric: len(frame) if metric == 'count' else frame[metric].agg(aggregations[metric])
+                  for metric in metrics}
+        if group_by:
+            grouped = frame.groupby(group_by, dropna=False, sort=True)
+            result = pd.DataFrame({metric: grouped.size() if metric == 'count' else
+                                   grouped[metric].agg(aggregations[metric]) for metric in metrics})
+            groups = to_records(result.reset_index())
+        else:
+            groups = []
+
+        return {
+            'group_by': group_by,
+            'metrics': metrics,
+            'groups': groups,
+            'totals': to_records(pd.DataFrame([totals]))[0],
+            'rows': len(frame)
+        }
+
+
+class DatasetCache:
+    """
+    🧊 Cache OrderDataset theo tên nguồn; chỉ nạp lại khi phiên bản file đổi
+
+    Nhiều thread (Flask threaded) dùng chung: mỗi nguồn nạp tối đa một lần cho mỗi phiên bản
+    """
+
+    def __init__(self):
+        self._datasets = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, name, version, loader):
+        """
+        Args:
+            name (str): Tên nguồn ('orders', 'products')
+            version (str): Phiên bản hiện tại (file_version)
+            loader (callable): Trả về (DataFrame hoặc None, đường dẫn nguồn) khi cần nạp lại
+
+        Returns:
+            OrderDataset hoặc None nếu loader không trả dữ liệu
+        """
+        dataset = self._datasets.get(name)
+        if dataset is not None and dataset.version == version:
+            return dataset
+
+        with self._lock:
+            dataset = self._datasets.get(name)
+            if dataset is not None and dataset.version == version:
+                return dataset
+            df, source = loader()
+            if df is None:
+                return None
+            self.loads += 1
+            dataset = OrderDataset(df, version, source)
+            self._datasets[name] = dataset
+            return dataset
+
+    def clear(self):
+        with self._lock:
+            self._datasets.clear()
+            self.loads = 0
+
+
+if __name__ == "__main__":
+    """Test the order query module"""
+    print("🔎 Order Query Module")
+    print("Use this module to serve filtered, paginated order pages from a version-keyed cache")
+    print("Example: DatasetCache().get('orders', file_version(path), lambda: (pd.read_csv(path), path)).query(limit=50)")
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🗄️ Order Store Module - Kho đơn hàng SQLite (WAL) thay cho các file CSV theo timestamp
+Handles: upsert hàng loạt theo order id, index theo sàn / trạng thái / thời gian tạo, API truy vấn có lọc
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+
+ORDER_STORE_FILE = "data/orders.db"
+
+# db đã bật WAL + tạo schema trong process này → OrderStore() tạo mỗi request không chạy lại
+_initialized = set()
+_initialized_lock = threading.Lock()
+
+# Cột của bảng #orderTB: col_7 = trạng thái, col_16 = tổng tiền, col_18 = sàn,
+# col_19 = thời gian sàn, col_20 = thời gian tạo Odoo
+STATUS_COLUMN = 'col_7'
+VALUE_COLUMN = 'col_16'
+PLATFORM_COLUMN = 'col_18'
+CREATED_COLUMNS = ('col_19', 'col_20')
+
+# Giá trị của bản export dashboard (orders_latest.csv) - dùng chung cho create_dashboard_format()
+# và to_dashboard_format() để API / dashboard đọc từ kho vẫn thấy đúng các giá trị cũ
+DASHBOARD_STATUS_MAP = {
+    'Xác nhận': 'confirmed',
+    'Hủy': 'cancelled',
+    'Chờ xử lý': 'pending',
+    'Hoàn thành': 'delivered',
+    'Giao hàng': 'delivered'
+}
+DEFAULT_DASHBOARD_STATUS = 'confirmed'
+PLATFORM_REGIONS = {
+    'Shopee': 'TP.HCM',
+    'Tiktok': 'Hà Nội',
+    'MIA.vn website': 'TP.HCM',
+    'Lazada': 'Đà Nẵng',
+    'Sendo': 'Cần Thơ'
+}
+DEFAULT_REGION = 'Khác'
+PLATFORM_CUSTOMER_TYPES = {
+    'Shopee': 'Regular',
+    'Tiktok': 'New',
+    'MIA.vn website': 'VIP',
+    'Lazada': 'Regular',
+    'Sendo': 'New'
+}
+DEFAULT_CUSTOMER_TYPE = 'Regular'
+DASHBOARD_COLUMNS = [
+    'order_id', 'order_date', 'status', 'region', 'order_value', 'customer_type', 'customer_name', 'platform',
+    'created_at'
+]
+
+ORDER_COLUMNS = [
+    'order_id', 'order_code', 'platform', 'status', 'customer', 'order_value',
+    'created_at', 'scraped_at', 'first_seen_at', 'updated_at', 'status_changed_at'
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    order_code TEXT,
+    platform TEXT,
+    status TEXT,
+    customer TEXT,
+    order_value REAL,
+    created_at TEXT,
+    scraped_at TEXT,
+    first_seen_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    status_changed_at TEXT,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_platform ON orders(platform);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
+CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at);
+"""
+
+# Bản ghi mới ghi đè bản cũ; first_seen_at giữ nguyên, status_changed_at chỉ đổi khi trạng thái đổi
+UPSERT_SQL = """
+INSERT INTO orders (order_id, order_code, platform, status, customer, order_value,
+                    created_at, scraped_at, first_seen_at, updated_at, status_changed_at, payload)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(order_id) DO UPDATE SET
+    order_code = excluded.order_code,
+    platform = excluded.platform,
+    status = excluded.status,
+    customer = excluded.customer,
+    order_value = excluded.order_value,
+    created_at = COALESCE(excluded.created_at, orders.created_at),
+    scraped_at = excluded.scraped_at,
+    updated_at = excluded.updated_at,
+    status_changed_at = CASE WHEN orders.status IS excluded.status
+                             THEN orders.status_changed_at ELSE excluded.updated_at END,
+    payload = excluded.payload
+"""
+
+
+def _column(df, name, default=''):
+    if name in df.columns:
+        return df[name]
+    return pd.Series(default, index=df.index)
+
+
+def _clean_text(series):
+    return series.fillna('').astype(str).str.strip()
+
+
+def orders_to_records(df, updated_at=None):
+    """
+    📋 Chuyển DataFrame đơn hàng thô (id, order_code, customer, col_N...) thành tuple cho UPSERT_SQL
+
+    Dòng không có id (dòng "Tổng cộng") bị bỏ qua
+    """
+    if df is None or df.empty or 'id' not in df.columns:
+        return []
+
+    df = df[_clean_text(df['id']) != '']
+    if df.empty:
+        return []
+
+    updated_at = updated_at or datetime.now().isoformat(timespec='seconds')
+
+    created = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    for column in CREATED_COLUMNS:
+        if column in df.columns:
+            created = created.fillna(pd.to_datetime(df[column], errors='coerce'))
+    created_at = created.dt.strftime('%Y-%m-%dT%H:%M:%S').astype(object).where(created.notna(), None)
+
+    values = pd.to_numeric(
+        _clean_text(_column(df, VALUE_COLUMN)).str.replace(',', '', regex=False).str.replace('"', '', regex=False),
+        errors='coerce'
+    ).astype(object).where(lambda s: s.notna(), None)
+
+    payloads = df.fillna('').astype(str).to_dict('records')
+
+    frame = pd.DataFrame({
+        'order_id': _clean_text(df['id']),
+        'order_code': _clean_text(_column(df, 'order_code')),
+        'platform': _clean_text(_column(df, PLATFORM_COLUMN)),
+        'status': _clean_text(_column(df, STATUS_COLUMN)),
+        'customer': _clean_text(_column(df, 'customer')),
+        'order_value': values,
+        'created_at': created_at,
+        'scraped_at': _clean_text(_column(df, 'scraped_at')),
+    })
+
+    return [
+        row + (updated_at, updated_at, updated_at, json.dumps(payload, ensure_ascii=False))
+        for row, payload in zip(frame.itertuples(index=False, name=None), payloads)
+    ]
+
+
+class OrderStore:
+    """
+    🗄️ Kho đơn hàng SQLite ở chế độ WAL, khoá chính là order id
+    Mỗi thao tác mở kết nối riêng → dùng được từ nhiều thread / process (Flask, Streamlit, SLA monitor)
+    """
+
+    def __init__(self, db_path=ORDER_STORE_FILE, timeout=30):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._initialize()
+
+    def _initialize(self):
+        """Bật WAL + tạo bảng / index một lần cho mỗi file db trong process (file bị xoá → tạo lại)"""
+        key = os.path.abspath(self.db_path)
+        with _initialized_lock:
+            if key in _initialized and os.path.exists(self.db_path):
+                return
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                conn.commit()
+            finally:
+                conn.close()
+            _initialized.add(key)
+
+    def _connect(self, check_same_thread=True):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=check_same_thread)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def exists(self):
+        return os.path.exists(self.db_path)
+
+    def upsert_orders(self, df):
+        """
+        ⬆️ Ghi hàng loạt (một transaction) các đơn trong DataFrame, trùng order id thì cập nhật
+
+        Returns:
+            int: Số đơn đã ghi
+        """
+        records = orders_to_records(df)
+        if not records:
+            return 0
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(UPSERT_SQL, records)
+        finally:
+            conn.close()
+        return len(records)
+
+    def _where(self, platform=None, status=None, date_from=None, date_to=None, order_ids=None):
+        clauses, params = [], []
+        for column, value in (('platform', platform), ('status', status)):
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                value = list(value)
+                clauses.append(f"{column} IN ({','.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if date_from:
+            clauses.append("created_at >= ?")
+            params.append(str(date_from))
+        if date_to:
+            # Chỉ có ngày → lấy hết ngày đó
+            date_to = str(date_to)
+            clauses.append("created_at <= ?")
+            params.append(f"{date_to}T23:59:59" if len(date_to) == 10 else date_to)
+        if order_ids is not None:
+            order_ids = [str(order_id) for order_id in order_ids]
+            clauses.append(f"order_id IN ({','.join('?' * len(order_ids))})")
+            params.extend(order_ids)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def query_orders(self, platform=None, status=None, date_from=None, date_to=None, order_ids=None,
+                     limit=None, offset=0, include_payload=False):
+        """
+        🔎 Lấy đơn hàng theo bộ lọc (dùng index), mới nhất trước
+
+        Args:
+            platform / status: Một giá trị hoặc list
+            date_from / date_to: 'YYYY-MM-DD' hoặc ISO datetime, so với thời gian tạo đơn
+            include_payload (bool): Trả thêm toàn bộ cột gốc của đơn (col_N...)
+
+        Returns:
+            pd.DataFrame
+        """
+        where, params = self._where(platform, status, date_from, date_to, order_ids)
+        columns = ORDER_COLUMNS + (['payload'] if include_payload else [])
+        sql = f"SELECT {', '.join(columns)} FROM orders{where} ORDER BY created_at DESC, order_id DESC"
+        if limit is not None or offset:
+            # SQLite không cho OFFSET thiếu LIMIT → LIMIT -1 = không giới hạn
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else int(limit), int(offset or 0)]
+
+        conn = self._connect()
+        try:
+            df = pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+        if include_payload and not df.empty:
+            raw = pd.DataFrame([json.loads(payload or '{}') for payload in df.pop('payload')], index=df.index)
+            df = df.join(raw[[column for column in raw.columns if column not in df.columns]])
+        return df
+
+    def iter_orders(self, platform=None, status=None, date_from=None, date_to=None, limit=None, offset=0,
+                    batch_size=500):
+        """
+        📡 Như query_orders() nhưng trả từng dict khi đọc từ cursor (fetchmany) - bộ nhớ không phụ thuộc số đơn
+
+        Yields:
+            dict: Cột ORDER_COLUMNS của một đơn
+        """
+        where, params = self._where(platform, status, date_from, date_to)
+        sql = f"SELECT {', '.join(ORDER_COLUMNS)} FROM orders{where} ORDER BY created_at DESC, order_id DESC"
+        if limit is not None or offset:
+            # SQLite không cho OFFSET thiếu LIMIT → LIMIT -1 = không giới hạn
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else int(limit), int(offset or 0)]
+
+        # Generator có thể được đọc tiếp ở thread khác (StreamingResponse chạy trong threadpool)
+        conn = self._connect(check_same_thread=False)
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(ORDER_COLUMNS, row))
+        finally:
+            conn.close()
+
+    def count_orders(self, platform=None, status=None, date_from=None, date_to=None):
+        """🔢 Số đơn khớp bộ lọc"""
+        where, params = self._where(platform, status, date_from, date_to)
+        conn = self._connect()
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM orders{where}", params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def last_updated(self):
+        """🕐 Thời điểm ghi gần nhất (None nếu kho rỗng)"""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT MAX(updated_at) FROM orders").fetchone()[0]
+        finally:
+            conn.close()
+
+
+def to_dashboard_format(orders):
+    """
+    🔁 Chiếu bảng đơn của kho (query_orders) sang tên cột / giá trị của orders_latest.csv
+
+    order_id = mã đơn (order_code), order_date = scraped_at, status đã map sang confirmed / pending...,
+    region / customer_type theo sàn; thêm created_at (thời gian tạo đơn) cho bộ lọc ngày. Cột sinh ngẫu nhiên của create_dashboard_format (confirm_hours,
+    product_category...) không có trong kho nên không được tạo
+    """
+    if orders is None or orders.empty:
+        return pd.DataFrame(columns=DASHBOARD_COLUMNS)
+    platform = _clean_text(_column(orders, 'platform'))
+    code = _clean_text(_column(orders, 'order_code'))
+    return pd.DataFrame({
+        'order_id': code.where(code != '', _clean_text(_column(orders, 'order_id'))),
+        'order_date': _column(orders, 'scraped_at', None),
+        'status': _column(orders, 'status', None).map(DASHBOARD_STATUS_MAP).fillna(DEFAULT_DASHBOARD_STATUS),
+        'region': platform.map(PLATFORM_REGIONS).fillna(DEFAULT_REGION),
+        'order_value': pd.to_numeric(_column(orders, 'order_value', None), errors='coerce').fillna(0),
+        'customer_type': platform.map(PLATFORM_CUSTOMER_TYPES).fillna(DEFAULT_CUSTOMER_TYPE),
+        'customer_name': _column(orders, 'customer'),
+        'platform': platform,
+        'created_at': _column(orders, 'created_at', None)
+    }, columns=DASHBOARD_COLUMNS)
+
+
+def dashboard_record(order):
+    """Như to_dashboard_format() cho một dict của iter_orders() (luồng đọc dần từ cursor)"""
+    platform = (order.get('platform') or '').strip()
+    value = order.get('order_value')
+    return {
+        'order_id': (order.get('order_code') or '').strip() or order.get('order_id'),
+        'order_date': order.get('scraped_at'),
+        'status': DASHBOARD_STATUS_MAP.get(order.get('status'), DEFAULT_DASHBOARD_STATUS),
+        'region': PLATFORM_REGIONS.get(platform, DEFAULT_REGION),
+        'order_value': value if value is not None else 0,
+        'customer_type': PLATFORM_CUSTOMER_TYPES.get(platform, DEFAULT_CUSTOMER_TYPE),
+        'customer_name': order.get('customer'),
+        'platform': platform,
+        'created_at': order.get('created_at')
+    }
+
+
+def open_order_store(config):
+    """🗄️ OrderStore theo config['order_store'], None nếu bị tắt"""
+    settings = (config or {}).get('order_store', {})
+    if not settings.get('enabled', False):
+        return None
+    return OrderStore(settings.get('db_path', ORDER_STORE_FILE))
+
+
+if __name__ == "__main__":
+    """Test the order store module"""
+    print("🗄️ Order Store Module")
+    print("Use this module to keep scraped orders in one SQLite database keyed by order id")
+    print("Example: OrderStore('data/orders.db').query_orders(platform='Shopee', status='Xác nhận')")
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⚡ Page Readiness Module - Chờ trang sẵn sàng theo sự kiện thay vì time.sleep cố định
+Handles: MutationObserver inject vào trang, execute_async_script, jQuery $.active == 0, điều kiện JS tuỳ chọn
+"""
+
+import json
+import time
+import uuid
+
+
+# Cài MutationObserver lên `selector` (hoặc body) và ghi lại thời điểm thay đổi cuối cùng
+ARM_SCRIPT = """
+var key = arguments[0], selector = arguments[1];
+window.__oneReady = window.__oneReady || {};
+if (!window.__oneReady[key]) {
+    var target = (selector && document.querySelector(selector)) || document.body || document.documentElement;
+    var state = {changed: false, mutations: 0, last: Date.now(), observer: null};
+    state.observer = new MutationObserver(function (records) {
+        state.changed = true;
+        state.mutations += records.length;
+        state.last = Date.now();
+    });
+    state.observer.observe(target, {childList: true, subtree: true, characterData: true, attributes: true});
+    window.__oneReady[key] = state;
+}
+return true;
+"""
+
+# Resolve ngay khi: điều kiện JS đúng + AJAX rảnh + DOM yên lặng quiet_ms (+ đã có thay đổi nếu cần)
+# Mỗi lần gọi chỉ chờ tối đa slice_ms để không vượt script timeout của driver
+WAIT_SCRIPT = ARM_SCRIPT.replace("return true;", "") + """
+var requireChange = arguments[2], quietMs = arguments[3], sliceMs = arguments[4];
+var conditionBody = arguments[5], conditionArg = arguments[6];
+var done = arguments[arguments.length - 1];
+var condition = conditionBody ? new Function('arg', conditionBody) : null;
+var st = window.__oneReady[key];
+var started = Date.now();
+
+function ajaxIdle() {
+    if (document.readyState !== 'complete') return false;
+    if (typeof window.jQuery === 'undefined') return true;
+    return window.jQuery.active == 0;
+}
+
+function check() {
+    var ok = false;
+    try {
+        ok = (!requireChange || st.changed)
+            && (!condition || condition(conditionArg))
+            && ajaxIdle()
+            && Date.now() - st.last >= quietMs;
+    } catch (e) {
+        ok = false;
+    }
+    if (ok) {
+        st.observer.disconnect();
+        delete window.__oneReady[key];
+        done({ready: true, mutations: st.mutations});
+    } else if (Date.now() - started >= sliceMs) {
+        done({ready: false, mutations: st.mutations});
+    } else {
+        setTimeout(check, 25);
+    }
+}
+check();
+"""
+
+DISARM_SCRIPT = """
+var st = window.__oneReady && window.__oneReady[arguments[0]];
+if (st) { st.observer.disconnect(); delete window.__oneReady[arguments[0]]; }
+return true;
+"""
+
+# Điều kiện dùng sẵn
+TABLE_HAS_ROWS = "return document.querySelectorAll(arg + ' tr td').length > 0;"
+TABLE_SNAPSHOT_CHANGED = """
+var rows = document.querySelectorAll(arg.selector + ' tr');
+var snapshot = [];
+for (var i = 0; i < Math.min(rows.length, 3); i++) {
+    var cells = rows[i].querySelectorAll('td');
+    if (cells.length > 1) snapshot.push(cells[0].textContent.trim() + '|' + cells[1].textContent.trim());
+}
+return snapshot.length > 0 && JSON.stringify(snapshot) !== arg.snapshot;
+"""
+ELEMENT_VISIBLE = """
+var el = document.querySelector(arg);
+return !!el && el.offsetParent !== null && getComputedStyle(el).visibility !== 'hidden';
+"""
+
+
+class PageReadiness:
+    """
+    ⚡ Chờ bảng / modal / phân trang thay đổi thật sự rồi trả về ngay
+    Dùng: token = arm(selector) → thao tác → wait(token, require_change=True)
+    """
+
+    def __init__(self, driver, logger=None, slice_seconds=2.0):
+        self.driver = driver
+        self.logger = logger
+        self.slice_ms = int(slice_seconds * 1000)
+
+    def _log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def arm(self, selector=None):
+        """🎯 Cài observer trước khi thao tác để không bỏ lỡ thay đổi xảy ra ngay sau click"""
+        key = uuid.uuid4().hex
+        try:
+            self.driver.execute_script(ARM_SCRIPT, key, selector)
+        except Exception as e:
+            self._log('debug', f"⚠️ Readiness arm failed: {e}")
+        return key
+
+    def disarm(self, key):
+        try:
+            self.driver.execute_script(DISARM_SCRIPT, key)
+        except Exception:
+            pass
+
+    def wait(self, key=None, selector=None, timeout=10, require_change=False, quiet_ms=150,
+             condition=None, condition_arg=None):
+        """
+        ⏳ Chờ trang sẵn sàng
+
+        Args:
+            key: token từ arm() (None → tự cài observer lúc bắt đầu chờ)
+            require_change (bool): Phải có ít nhất 1 mutation kể từ khi arm
+            quiet_ms (int): DOM phải yên lặng ít nhất quiet_ms
+            condition (str): Thân hàm JS nhận `arg`, trả về true khi sẵn sàng
+
+        Returns:
+            bool: True nếu sẵn sàng trước timeout
+        """
+        key = key or uuid.uuid4().hex
+        start_time = time.time()
+        deadline = start_time + timeout
+
+        try:
+            while True:
+                remaining_ms = int((deadline - time.time()) * 1000)
+                if remaining_ms <= 0:
+                    break
+                result = self.driver.execute_async_script(
+                    WAIT_SCRIPT, key, selector, require_change, quiet_ms,
+                    min(self.slice_ms, remaining_ms), condition, condition_arg
+                )
+                if result and result.get('ready'):
+                    self._log('debug', f"⚡ Page ready sau {time.time() - start_time:.2f}s")
+                    return True
+        except Exception as e:
+            self._log('debug', f"⚠️ Readiness wait failed: {e}")
+
+        self.disarm(key)
+        self._log('warning', f"⚠️ Page chưa sẵn sàng sau {timeout}s")
+        return False
+
+    def wait_for_ajax_idle(self, selector=None, timeout=10, quiet_ms=100):
+        """🌐 jQuery $.active == 0, document complete và DOM (của `selector`) yên lặng"""
+        return self.wait(selector=selector, timeout=timeout, quiet_ms=quiet_ms)
+
+    def wait_for_table_ready(self, selector="#orderTB tbody", timeout=10, quiet_ms=150):
+        """📊 Bảng có dòng dữ liệu, AJAX xong và không còn render"""
+        return self.wait(selector=selector, timeout=timeout, quiet_ms=quiet_ms,
+                         condition=TABLE_HAS_ROWS, condition_arg=selector)
+
+    def wait_for_table_change(self, old_snapshot, selector="#orderTB tbody", timeout=15, quiet_ms=150):
+        """🔄 3 dòng đầu của bảng khác snapshot cũ (định dạng 'cell0|cell1') và bảng đã ổn định"""
+        return self.wait(selector=selector, timeout=timeout, quiet_ms=quiet_ms,
+                         condition=TABLE_SNAPSHOT_CHANGED,
+                         condition_arg={'selector': selector, 'snapshot': json.dumps(
+                             old_snapshot or [], separators=(',', ':'), ensure_ascii=False)})
+
+    def wait_for_change(self, action, selector="#orderTB tbody", timeout=15, quiet_ms=150):
+        """🖱️ arm → action() → chờ vùng `selector` thay đổi xong"""
+        key = self.arm(selector)
+        action()
+        return self.wait(key, selector=selector, timeout=timeout, require_change=True, quiet_ms=quiet_ms)
+
+    def wait_for_visible(self, selector, timeout=10, quiet_ms=100):
+        """🪟 Modal/phần tử hiển thị và không còn animation"""
+        return self.wait(selector=selector, timeout=timeout, quiet_ms=quiet_ms,
+                         condition=ELEMENT_VISIBLE, condition_arg=selector)
+
+    def wait_for_url(self, fragment, timeout=10, poll=0.05):
+        """🔗 Chờ điều hướng tới URL chứa `fragment` và trang tải xong"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                if (fragment in self.driver.current_url
+                        and self.driver.execute_script("return document.readyState") == 'complete'):
+                    return True
+            except Exception:
+                pass
+            time.sleep(poll)
+        return False
+
+
+if __name__ == "__main__":
+    """Test the page readiness module"""
+    print("⚡ Page Readiness Module")
+    print("Use this module instead of fixed time.sleep() after page interactions")
+    print("Example: PageReadiness(driver).wait_for_change(lambda: button.click())")
@@ -12,6 +12,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
+from scripts.page_readiness import PageReadiness
+
 
 class PaginationHandler:
     """
@@ -22,6 +24,7 @@ class PaginationHandler:
     def __init__(self, driver, logger):
         self.driver = driver
         self.logger = logger
+        self.readiness = PageReadiness(driver, logger)
 
     def get_total_records(self):
         """
@@ -233,7 +236,7 @@ class PaginationHandler:
                     import re
                     new_url = re.sub(r'page=(\d+)', lambda m: f"page={int(m.group(1)) + 1}", current_url)
                     self.driver.get(new_url)
-                    time.sleep(3)
+                    self.readiness.wait_for_table_ready(timeout=10)
 
                     new_page_info = self.get_current_page_info()
                     if new_page_info['current_page'] > current_page:
@@ -302,30 +305,16 @@ class PaginationHandler:
             return []
 
     def _wait_for_table_content_change(self, old_content, timeout=30):
-        """⏳ Đợi table content thay đổi"""
+        """⏳ Đợi table content thay đổi (MutationObserver + AJAX idle, trả về ngay khi bảng ổn định)"""
         try:
             self.logger.info(f"⏳ Waiting for table content to change (timeout: {timeout}s)...")
 
             start_time = time.time()
-            check_interval = 0.5
-
-            while time.time() - start_time < timeout:
-                # Đợi một chút trước khi check
-                time.sleep(check_interval)
-
-                # Lấy content mới
+            if self.readiness.wait_for_table_change(old_content, timeout=timeout):
                 new_content = self._get_table_content_snapshot()
-
-                # So sánh với content cũ
-                if new_content != old_content and len(new_content) > 0:
-                    self.logger.info(f"✅ Table content changed! New content: {len(new_content)} items")
-
-                    # Đợi thêm một chút cho table ổn định
-                    time.sleep(2)
-                    return True
-
-                # Tăng interval để không spam request
-                check_interval = min(check_interval * 1.1, 2.0)
+                self.logger.info(f"✅ Table content changed in {time.time() - start_time:.2f}s! "
+                                 f"New content: {len(new_content)} items")
+                return True
 
             self.logger.warning(f"❌ Timeout waiting for table content change ({timeout}s)")
             return False
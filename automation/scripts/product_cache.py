@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧊 Product Cache Module - Cache chi tiết sản phẩm /so/invoiceJSON trên đĩa theo order id
+Handles: TTL, vô hiệu hoá khi trạng thái đơn (col_7) thay đổi, chỉ cache miss mới gọi mạng, thống kê hit ratio
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+
+PRODUCT_CACHE_FILE = "data/product_cache.db"
+DEFAULT_TTL_HOURS = 168
+
+# Cột trạng thái của bảng #orderTB
+STATUS_COLUMN = 'col_7'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS product_details (
+    order_id TEXT PRIMARY KEY,
+    status TEXT,
+    details TEXT NOT NULL,
+    fetched_at TEXT NOT NULL
+);
+"""
+
+
+def statuses_from_orders(orders, status_column=STATUS_COLUMN):
+    """🏷️ {order_id: trạng thái} từ danh sách order dict đã scrape"""
+    statuses = {}
+    for order in orders:
+        order_id = str(order.get('id') or '').strip()
+        if order_id:
+            statuses[order_id] = str(order.get(status_column) or '').strip()
+    return statuses
+
+
+class ProductDetailCache:
+    """
+    🧊 Kết quả parse_json_response() lưu trong SQLite: {order_id: details}
+    Entry hết hạn sau ttl_hours, hoặc ngay khi trạng thái scrape được khác trạng thái lúc cache
+    """
+
+    def __init__(self, path=PRODUCT_CACHE_FILE, ttl_hours=DEFAULT_TTL_HOURS, timeout=30):
+        self.path = path
+        self.ttl = timedelta(hours=ttl_hours)
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        # File DB chỉ được tạo khi cache thật sự được dùng
+        if not self._initialized:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._initialized = True
+            return conn
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    def get_many(self, order_ids, statuses=None):
+        """
+        🔎 Tách order_ids thành phần có trong cache và phần phải gọi mạng
+
+        Args:
+            statuses: {order_id: trạng thái hiện tại} - khác trạng thái đã cache → coi là miss
+
+        Returns:
+            tuple: (dict các details còn hiệu lực, list order id cần fetch)
+        """
+        order_ids = [str(order_id) for order_id in order_ids]
+        statuses = statuses or {}
+        if not order_ids:
+            return {}, []
+
+        rows = {}
+        conn = self._connect()
+        try:
+            # Giới hạn số tham số của SQLite → truy vấn theo từng khúc
+            for start in range(0, len(order_ids), 500):
+                chunk = order_ids[start:start + 500]
+                cursor = conn.execute(
+                    f"SELECT order_id, status, details, fetched_at FROM product_details "
+                    f"WHERE order_id IN ({','.join('?' * len(chunk))})", chunk
+                )
+                for order_id, status, details, fetched_at in cursor:
+                    rows[order_id] = (status, details, fetched_at)
+        finally:
+            conn.close()
+
+        cutoff = (datetime.now() - self.ttl).isoformat()
+        cached, missing = {}, []
+        expired = invalidated = 0
+        for order_id in order_ids:
+            row = rows.get(order_id)
+            if row is None:
+                missing.append(order_id)
+            elif row[2] < cutoff:
+                expired += 1
+                missing.append(order_id)
+            elif order_id in statuses and statuses[order_id] != (row[0] or ''):
+                invalidated += 1
+                missing.append(order_id)
+            else:
+                cached[order_id] = json.loads(row[1])
+
+        with self._lock:
+            self.hits += len(cached)
+            self.misses += len(missing)
+            self.expired += expired
+            self.invalidated += invalidated
+        return cached, missing
+
+    def put_many(self, product_details, statuses=None):
+        """💾 Ghi (ghi đè) details vừa fetch kèm trạng thái hiện tại của đơn"""
+        if not product_details:
+            return 0
+        statuses = statuses or {}
+        fetched_at = datetime.now().isoformat()
+        records = [
+            (str(order_id), statuses.get(str(order_id), ''), json.dumps(details, ensure_ascii=False), fetched_at)
+            for order_id, details in product_details.items()
+        ]
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO product_details (order_id, status, details, fetched_at) "
+                    "VALUES (?, ?, ?, ?)", records
+                )
+        finally:
+            conn.close()
+        return len(records)
+
+    def purge_expired(self):
+        """🧹 Xoá entry quá TTL, trả về số dòng đã xoá"""
+        cutoff = (datetime.now() - self.ttl).isoformat()
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute("DELETE FROM product_details WHERE fetched_at < ?", (cutoff,)).rowcount
+        finally:
+            conn.close()
+
+    def stats(self):
+        """📊 Thống kê cache trong lượt chạy hiện tại"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'invalidated': self.invalidated,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def open_product_cache(config):
+    """🧊 ProductDetailCache theo config['product_details']['cache'], None nếu bị tắt"""
+    settings = (config or {}).get('product_details', {}).get('cache', {})
+    if not settings.get('enabled', False):
+        return None
+    return ProductDetailCache(
+        settings.get('path', PRODUCT_CACHE_FILE),
+        ttl_hours=settings.get('ttl_hours', DEFAULT_TTL_HOURS)
+    )
+
+
+if __name__ == "__main__":
+    """Test the product cache module"""
+    print("🧊 Product Cache Module")
+    print("Use this module to skip /so/invoiceJSON calls for orders whose details are already cached")
+    print("Example: cached, missing = ProductDetailCache().get_many(order_ids, statuses_from_orders(orders))")
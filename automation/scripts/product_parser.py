@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🛍️ Product Parser Module - Parse chuỗi `detail` của /so/invoiceJSON cho cả batch bằng pandas
+Handles: explode "Tên SP(2), Tên SP khác" thành bảng dài (order_id, product_name, quantity),
+         product_count / total_items / product_summary bằng groupby, join chi tiết vào bảng đơn hàng
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# Một item giữa hai dấu phẩy: "Tên sản phẩm(3)" → name="Tên sản phẩm", quantity="3";
+# không có "(n)" ở cuối item → quantity="" (= 1). Chạy một lần trên cả batch đã nối bằng ','
+# (quantifier possessive: tên sản phẩm chứa "(...)" không gây backtracking)
+ITEM_PATTERN = re.compile(
+    r'([^,(]*+(?:\((?!\d+\)\s*(?:,|\Z))[^,(]*+)*+)(?:\((\d+)\))?\s*(?:,|\Z)'
+)
+
+PRODUCT_COLUMNS = ['order_id', 'product_name', 'quantity']
+SUMMARY_COLUMNS = ['product_count', 'total_items', 'product_summary']
+
+SUMMARY_ITEMS = 3  # Số tên sản phẩm đầu tiên đưa vào product_summary
+
+# Trường của details (parse_json_response) → cột trong bảng đơn hàng
+DETAIL_COLUMNS = {
+    'raw_detail': 'raw_product_detail',
+    'customer': 'api_customer',
+    'amount_total': 'api_amount',
+    'transporter': 'api_transporter',
+    'address': 'api_address',
+    'phone': 'api_phone'
+}
+
+
+def parse_product_details(details):
+    """
+    📋 Tách toàn bộ chuỗi detail thành bảng dài sản phẩm
+
+    Args:
+        details (pd.Series): Chuỗi detail, index là order_id
+
+    Returns:
+        pd.DataFrame: order_id, product_name, quantity (giữ thứ tự sản phẩm trong từng đơn)
+    """
+    if details is None or len(details) == 0:
+        return pd.DataFrame(columns=PRODUCT_COLUMNS)
+
+    details = details.fillna('').astype(str)
+
+    # Mỗi dấu phẩy là ranh giới item → gán order_id cho từng item bằng np.repeat
+    item_counts = details.str.count(',').to_numpy() + 1
+    items = ITEM_PATTERN.findall(','.join(details))[:item_counts.sum()]
+
+    products = pd.DataFrame(items, columns=['product_name', 'quantity'])
+    products.insert(0, 'order_id', np.repeat(details.index.astype(str).to_numpy(), item_counts))
+    products['product_name'] = products['product_name'].str.strip()
+    products = products[products['product_name'] != '']
+    products['quantity'] = products['quantity'].replace('', '1').astype('int64')
+    return products.reset_index(drop=True)
+
+
+def summarize_products(products):
+    """
+    📊 Tổng hợp theo đơn: product_count, total_items, product_summary (3 tên đầu, nối bằng '; ')
+
+    Returns:
+        pd.DataFrame: index order_id
+    """
+    if products.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS, index=pd.Index([], name='order_id'))
+
+    grouped = products.groupby('order_id', sort=False)
+    summary = grouped.agg(product_count=('product_name', 'size'), total_items=('quantity', 'sum'))
+
+    # Ghép 3 tên đầu theo vị trí trong đơn (cumcount) trên mảng object → không gọi hàm Python cho từng đơn
+    position = grouped.cumcount().to_numpy()
+    group_number = grouped.ngroup().to_numpy()
+    names = products['product_name'].to_numpy(dtype=object)
+
+    product_summary = np.empty(len(summary), dtype=object)
+    first = position == 0
+    product_summary[group_number[first]] = names[first]
+    for index in range(1, SUMMARY_ITEMS):
+        rows = position == index
+        product_summary[group_number[rows]] = product_summary[group_number[rows]] + '; ' + names[rows]
+    summary['product_summary'] = product_summary
+    return summary
+
+
+def products_by_order(products):
+    """🔁 {order_id: [{'name', 'quantity'}, ...]} - dạng list lồng nhau cho code cũ / cache"""
+    if products.empty:
+        return {}
+
+    # Sản phẩm của một đơn nằm liền nhau → cắt list theo ranh giới đổi order_id
+    order_ids = products['order_id'].to_numpy()
+    items = [{'name': name, 'quantity': quantity}
+             for name, quantity in zip(products['product_name'].tolist(), products['quantity'].tolist())]
+    starts = np.flatnonzero(np.r_[True, order_ids[1:] != order_ids[:-1]])
+    ends = np.r_[starts[1:], len(items)]
+    return {order_ids[start]: items[start:end] for start, end in zip(starts.tolist(), ends.tolist())}
+
+
+def build_product_details(records):
+    """
+    📦 Dict {order_id: details} cho một batch bản ghi invoiceJSON - định dạng của parse_json_response()
+
+    Bản ghi thiếu id hoặc detail bị bỏ qua. Danh sách sản phẩm không nằm trong details:
+    dựng lại bảng dài bằng products_table() từ raw_detail
+    """
+    # Trùng id → giữ bản ghi sau cùng
+    records = list({str(record['id']): record for record in records
+                    if record.get('id') not in (None, '') and record.get('detail')}.values())
+    if not records:
+        return {}
+
+    order_ids = [str(record['id']) for record in records]
+    products = parse_product_details(pd.Series([str(record['detail']) for record in records], index=order_ids))
+    summary = summarize_products(products)
+    counts = dict(zip(summary.index, summary['product_count'].tolist()))
+    totals = dict(zip(summary.index, summary['total_items'].tolist()))
+    summaries = dict(zip(summary.index, summary['product_summary'].tolist()))
+
+    product_details = {}
+    for order_id, record in zip(order_ids, records):
+        product_details[order_id] = {
+            'product_count': counts.get(order_id, 0),
+            'total_items': totals.get(order_id, 0),
+            'product_summary': summaries.get(order_id, 'No products'),
+            'raw_detail': record['detail'],
+            'customer': record.get('customer', ''),
+            'amount_total': record.get('amount_total', ''),
+            'transporter': record.get('transporter', ''),
+            'address': record.get('address', ''),
+            'phone': record.get('phone', '')
+        }
+    return product_details
+
+
+def product_details_frame(product_details):
+    """
+    📋 Bảng chi tiết theo đơn (index order_id): product_count, total_items, product_summary,
+    raw_product_detail, api_customer, api_amount, api_transporter, api_address, api_phone
+    """
+    columns = SUMMARY_COLUMNS + list(DETAIL_COLUMNS)
+    frame = pd.DataFrame.from_dict(product_details or {}, orient='index')
+    frame = frame.reindex(columns=columns).rename(columns=DETAIL_COLUMNS)
+    frame.index = frame.index.astype(str)
+    frame.index.name = 'order_id'
+    return frame
+
+
+def products_table(details_frame):
+    """🛍️ Bảng dài sản phẩm (order_id, product_name, quantity) cho các đơn trong details_frame"""
+    if details_frame.empty:
+        return pd.DataFrame(columns=PRODUCT_COLUMNS)
+    return parse_product_details(details_frame['raw_product_detail'].dropna())
+
+
+def join_product_details(orders, details_frame, key='id', indicator=None):
+    """
+    🔗 Left join bảng đơn hàng với bảng chi tiết theo order id (không copy từng order dict)
+
+    Đơn không có chi tiết: product_count = total_items = 0, product_summary = 'Details not available'
+
+    Args:
+        key: Cột order id trong orders (so khớp sau khi strip)
+        indicator: Tên cột bool đánh dấu đơn có chi tiết (None = không thêm)
+    """
+    if key in orders.columns:
+        order_keys = orders[key].fillna('').astype(str).str.strip()
+    else:
+        order_keys = pd.Series('', index=orders.index)
+
+    # Hash join theo index order_id (duy nhất) → giữ nguyên thứ tự và index của orders
+    details_frame = details_frame.drop(columns=[c for c in details_frame.columns if c in orders.columns])
+    aligned = details_frame.reindex(order_keys.to_numpy())
+    aligned.index = orders.index
+    merged = pd.concat([orders, aligned], axis=1)
+
+    matched = order_keys.isin(details_frame.index)
+    if 'product_count' in merged.columns:
+        merged['product_count'] = merged['product_count'].fillna(0).astype('int64')
+        merged['total_items'] = merged['total_items'].fillna(0).astype('int64')
+        merged['product_summary'] = merged['product_summary'].fillna('Details not available')
+    if indicator:
+        merged[indicator] = matched.to_numpy()
+    return merged
+
+
+if __name__ == "__main__":
+    """Test the product parser module"""
+    print("🛍️ Product Parser Module")
+    print("Use this module to parse a whole batch of invoiceJSON detail strings at once")
+    print("Example: summarize_products(parse_product_details(pd.Series(details, index=order_ids)))")
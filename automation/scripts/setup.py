@@ -7,111 +7,41 @@ Handles: WebDriver setup, Google Sheets integration, SLA Monitor setup
 
 import os
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+
+from scripts.driver_pool import (
+    get_driver_pool, driver_pool_enabled, create_chrome_driver, release_driver
+)
+
+
+CHROME_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
 
 
 class SystemSetup:
     """Class xử lý setup các thành phần hệ thống"""
 
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, session_file=None):
         self.logger = logger
+        self.session_file = session_file  # None → session_data.pkl mặc định của SessionManager
         self.driver = None
         self.sla_monitor = None
         self.sheets_config_service = None
 
     def setup_driver(self, headless=True):
-        """Setup Chrome WebDriver với tối ưu performance"""
+        """Setup Chrome WebDriver - lấy từ driver pool nếu được bật"""
         try:
             if self.logger:
                 self.logger.info("🌐 Setting up WebDriver...")
 
-            chrome_options = Options()
-
-            # Headless mode
-            if headless:
-                chrome_options.add_argument('--headless=new')
-
-            # Core performance arguments
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-
-            # AGGRESSIVE PERFORMANCE OPTIMIZATION
-            # Block unnecessary content to speed up loading
-            chrome_options.add_experimental_option("prefs", {
-                "profile.default_content_setting_values": {
-                    "images": 2,        # Block images (60-80% faster loading)
-                    "plugins": 2,       # Block plugins
-                    "popups": 2,        # Block popups
-                    "geolocation": 2,   # Block location requests
-                    "notifications": 2, # Block notifications
-                    "media_stream": 2,  # Block media stream
-                }
-            })
-
-            # Advanced performance flags
-            performance_args = [
-                '--disable-extensions',
-                '--disable-plugins',
-                '--disable-web-security',
-                '--disable-features=VizDisplayCompositor',
-                '--disable-background-timer-throttling',
-                '--disable-background-networking',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-renderer-backgrounding',
-                '--aggressive-cache-discard',
-                '--memory-pressure-off',
-                '--disable-ipc-flooding-protection',
-                '--disable-hang-monitor',
-                '--disable-prompt-on-repost',
-                '--no-first-run',
-                '--disable-default-apps',
-                '--log-level=3'
-            ]
-
-            for arg in performance_args:
-                chrome_options.add_argument(arg)
-
-            # JavaScript optimization
-            chrome_options.add_argument('--js-flags=--expose-gc')
-            chrome_options.add_argument('--js-flags=--max_old_space_size=4096')
-
-            # Disable automation detection
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
-
-            # Chrome binary path for macOS
-            chrome_binary = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
-            if os.path.exists(chrome_binary):
-                chrome_options.binary_location = chrome_binary
-
-            # User agent
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36')
-
-            # Setup driver
-            try:
-                service = Service(ChromeDriverManager().install())
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            except Exception as e:
-                if self.logger:
-                    self.logger.warning(f"ChromeDriverManager failed: {e}")
-                service = Service()
-                self.driver = webdriver.Chrome(service=service, options=chrome_options)
-
-            # OPTIMIZED TIMEOUTS
-            self.driver.implicitly_wait(3)  # Giảm từ 10s xuống 3s
-            self.driver.set_page_load_timeout(15)  # Giảm từ 30s xuống 15s
-            self.driver.set_script_timeout(3)  # Giảm từ 5s xuống 3s
-
-            # Hide automation detection
-            self.driver.execute_script(
-                "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-            )
+            if driver_pool_enabled():
+                # Driver khởi động sẵn, chromedriver path đã cache trên đĩa
+                self.driver = get_driver_pool(logger=self.logger, headless=headless,
+                                              user_agent=CHROME_USER_AGENT).acquire()
+            else:
+                self.driver = create_chrome_driver(
+                    headless=headless,
+                    user_agent=CHROME_USER_AGENT,
+                    logger=self.logger
+                )
 
             if self.logger:
                 self.logger.info("✅ WebDriver tối ưu đã sẵn sàng")
@@ -166,7 +96,7 @@ class SystemSetup:
             self.logger.info("💾 Setting up Session Manager...")
 
             from automation import SessionManager
-            session_manager = SessionManager()
+            session_manager = SessionManager(self.session_file) if self.session_file else SessionManager()
 
             self.logger.info("✅ Session Manager initialized")
             return session_manager
@@ -224,13 +154,14 @@ class SystemSetup:
         """Cleanup resources"""
         try:
             if self.driver:
-                self.driver.quit()
+                release_driver(self.driver, reset_session=True)
+                self.driver = None
                 self.logger.info("🧹 WebDriver cleaned up")
         except Exception as e:
             self.logger.warning(f"⚠️ Cleanup warning: {e}")
 
 
-def setup_automation_system(logger, headless=True):
+def setup_automation_system(logger, headless=True, session_file=None):
     """Convenience function để setup hệ thống"""
-    setup_manager = SystemSetup(logger)
+    setup_manager = SystemSetup(logger, session_file)
     return setup_manager.setup_all_components(headless)
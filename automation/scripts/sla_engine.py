@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⏱️ SLA Engine Module - Đánh giá SLA cho toàn bộ đơn hàng bằng cột pandas/numpy
+Handles: biên dịch luật SLA (sla_config.json / Google Sheets SLA_Rules) thành bảng theo sàn,
+         mốc cutoff / hạn xác nhận / hạn bàn giao có chuyển ngày, cờ quá hạn, số giờ còn lại,
+         tổng hợp theo sàn và cảnh báo sinh từ mask boolean (không lặp iterrows)
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# Luật mặc định - cùng định dạng config/sla_config.json
+# Sàn có cutoff_time: đơn sau cutoff ngày N → hạn "HH:MM" của ngày N+1 ("HH:MM+2" = ngày N+2)
+# Sàn không có cutoff_time: hạn "HH:MM" ngay trong ngày tạo đơn; *_hours = số giờ kể từ lúc tạo đơn
+DEFAULT_SLA_CONFIG = {
+    "shopee": {
+        "name": "Shopee",
+        "cutoff_time": "18:00",
+        "rules": {
+            "confirm_deadline": "09:00",
+            "handover_deadline": "12:00",
+            "confirm_label": "9h sáng",
+            "handover_label": "12h trước"
+        }
+    },
+    "tiktok": {
+        "name": "TikTok",
+        "cutoff_time": "14:00",
+        "rules": {
+            "handover_deadline": "21:00"
+        }
+    },
+    "other_platforms": {
+        "name": "Các sàn khác",
+        "rules": {
+            "default_deadline": "17:00"
+        }
+    },
+    "warning_hours": [2, 1, 0.5]
+}
+
+# Mục 'other_platforms' của config = luật cho mọi sàn không khớp tên sàn nào
+FALLBACK_PLATFORM = 'other'
+FALLBACK_KEYS = ('other_platforms', 'other')
+
+DEADLINE_KINDS = ('confirm', 'handover')
+DEADLINE_LABELS = {'confirm': 'xác nhận', 'handover': 'bàn giao'}
+DEADLINE_KEYS = {
+    'confirm': ('confirm_deadline', 'confirm_hours'),
+    'handover': ('handover_deadline', 'handover_hours'),
+}
+DEFAULT_DEADLINE_KEY = 'default_deadline'  # = hạn bàn giao
+
+CLOCK_PATTERN = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*(?:\+\s*(\d+))?\s*$')
+
+RULE_COLUMNS = ['name', 'cutoff'] + [
+    f'{kind}_{field}' for kind in DEADLINE_KINDS for field in ('clock', 'days', 'hours', 'label')
+]
+
+SLA_COLUMNS = [
+    'sla_cutoff', 'confirm_deadline', 'handover_deadline', 'after_cutoff',
+    'needs_confirm', 'needs_handover', 'confirm_overdue', 'handover_overdue',
+    'time_to_confirm', 'time_to_handover'
+]
+
+STATUS_FIELDS = [
+    'order_id', 'platform', 'created_time', 'needs_confirm', 'needs_handover',
+    'confirm_overdue', 'handover_overdue', 'time_to_confirm', 'time_to_handover',
+    'confirm_deadline', 'handover_deadline'
+]
+
+ISO_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+# Gắn SLA vào bảng đơn hàng: còn ít hơn N giờ tới hạn bàn giao → 'urgent'
+URGENT_HOURS = {'shopee': 2, 'tiktok': 4}
+DEFAULT_URGENT_HOURS = 2
+ORDER_SLA_COLUMNS = ['sla_platform', 'sla_deadline', 'sla_status', 'sla_priority']
+
+
+def _parse_clock(value):
+    """'18:00' → (Timedelta 18h, lệch ngày hoặc None); '09:00+2' → (9h, 2)"""
+    match = CLOCK_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid SLA time: {value!r}")
+    hour, minute, days = match.groups()
+    return pd.Timedelta(hours=int(hour), minutes=int(minute)), (int(days) if days else None)
+
+
+def _clock_label(clock):
+    hours, minutes = divmod(int(clock.total_seconds() // 60), 60)
+    return f"{hours}h{minutes:02d}" if minutes else f"{hours}h"
+
+
+def _compile_entry(entry):
+    """Một mục luật (dạng sla_config.json hoặc dạng phẳng của get_sla_rules()) → các trường đã parse"""
+    values = {key: value for key, value in entry.items() if key != 'rules'}
+    if isinstance(entry.get('rules'), dict):
+        values.update(entry['rules'])
+
+    compiled = {}
+    if values.get('name'):
+        compiled['name'] = str(values['name'])
+    if values.get('cutoff_time'):
+        compiled['cutoff'] = _parse_clock(values['cutoff_time'])[0]
+
+    for kind in DEADLINE_KINDS:
+        clock_key, hours_key = DEADLINE_KEYS[kind]
+        if kind == 'handover' and clock_key not in values:
+            clock_key = DEFAULT_DEADLINE_KEY
+        if values.get(clock_key):
+            compiled[kind] = ('clock',) + _parse_clock(values[clock_key])
+        elif values.get(hours_key) not in (None, ''):
+            compiled[kind] = ('hours', float(values[hours_key]))
+        if kind in compiled:
+            # Nhãn hiển thị trong cảnh báo ('9h sáng'); nguồn đổi hạn mà không có nhãn → nhãn tự sinh
+            compiled[f'{kind}_label'] = values.get(f'{kind}_label') or None
+    return compiled
+
+
+def compile_sla_rules(*sources):
+    """
+    📐 Biên dịch luật SLA thành SLARuleSet (một dòng mỗi sàn)
+
+    Args:
+        *sources: dict luật theo sàn - config/sla_config.json, GoogleSheetsConfigService.get_sla_rules(), ...
+                  Nguồn sau ghi đè từng trường (cutoff / xác nhận / bàn giao) của nguồn trước
+
+    Mục không phải dict hoặc không có trường SLA nào (warning_settings, business_rules...) bị bỏ qua
+    """
+    merged = {}
+    for source in sources:
+        for key, entry in (source or {}).items():
+            if not isinstance(entry, dict):
+                continue
+            platform = str(key).lower().strip()
+            platform = FALLBACK_PLATFORM if platform in FALLBACK_KEYS else platform
+            compiled = _compile_entry(entry)
+            if set(compiled) - {'name'} or platform in merged:
+                merged.setdefault(platform, {}).update(compiled)
+
+    rows = {}
+    for platform, compiled in merged.items():
+        has_cutoff = 'cutoff' in compiled
+        row = {
+            'name': compiled.get('name', 'Các sàn khác' if platform == FALLBACK_PLATFORM else platform.title()),
+            'cutoff': compiled.get('cutoff', pd.NaT)
+        }
+        for kind in DEADLINE_KINDS:
+            rule = compiled.get(kind)
+            row[f'{kind}_clock'] = pd.NaT
+            row[f'{kind}_days'] = np.nan
+            row[f'{kind}_hours'] = np.nan
+            row[f'{kind}_label'] = None
+            if rule and rule[0] == 'clock':
+                _, clock, days = rule
+                row[f'{kind}_clock'] = clock
+                # Có cutoff: hạn thuộc ngày hôm sau của lô đơn; không có: trong ngày
+                row[f'{kind}_days'] = days if days is not None else (1 if has_cutoff else 0)
+                row[f'{kind}_label'] = compiled.get(f'{kind}_label') or _clock_label(clock)
+            elif rule:
+                row[f'{kind}_hours'] = rule[1]
+                row[f'{kind}_label'] = compiled.get(f'{kind}_label') or f"{rule[1]:g}h"
+        rows[platform] = row
+
+    dtypes = {'name': object, 'cutoff': 'timedelta64[ns]'}
+    for kind in DEADLINE_KINDS:
+        dtypes.update({f'{kind}_clock': 'timedelta64[ns]', f'{kind}_days': 'float64',
+                       f'{kind}_hours': 'float64', f'{kind}_label': object})
+    index = pd.Index(list(rows), name='platform', dtype=object)
+    table = pd.DataFrame({
+        column: pd.Series([row[column] for row in rows.values()], index=index, dtype=dtypes[column])
+        for column in RULE_COLUMNS
+    })
+    return SLARuleSet(table)
+
+
+class SLARuleSet:
+    """
+    📐 Bảng luật SLA đã biên dịch: mỗi dòng một sàn với cutoff, giờ hạn + số ngày lệch hoặc số giờ từ lúc tạo
+    Mốc tuyệt đối của từng ngày (for_day) được tính một lần rồi giữ lại
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._days = {}
+
+    @property
+    def platforms(self):
+        """Tên sàn theo thứ tự config (gồm cả sàn dự phòng 'other' nếu có)"""
+        return list(self.table.index)
+
+    def has(self, platform, kind):
+        """Sàn có hạn loại kind ('confirm' / 'handover') không"""
+        if platform not in self.table.index:
+            return False
+        row = self.table.loc[platform]
+        return pd.notna(row[f'{kind}_clock']) or pd.notna(row[f'{kind}_hours'])
+
+    def name(self, platform):
+        return self.table['name'].get(platform, platform)
+
+    def label(self, platform, kind):
+        return self.table[f'{kind}_label'].get(platform) or ''
+
+    def match_platforms(self, values):
+        """
+        🏷️ Chuẩn hoá tên sàn: khoá luật đầu tiên nằm trong chuỗi sàn (không phân biệt hoa thường),
+        không khớp sàn nào → 'other'
+        """
+        lowered = values.fillna('').astype(str).str.lower()
+        matched = pd.Series(FALLBACK_PLATFORM, index=values.index, dtype=object)
+        assigned = np.zeros(len(values), dtype=bool)
+        for platform in self.platforms:
+            if platform == FALLBACK_PLATFORM:
+                continue
+            hit = ~assigned & lowered.str.contains(platform, regex=False).to_numpy()
+            matched[hit] = platform
+            assigned |= hit
+        return matched
+
+    def for_day(self, day):
+        """
+        📅 Mốc SLA của ngày `day`, index là tên sàn
+
+        sla_cutoff: đơn tạo sau mốc này còn được theo dõi (cutoff hôm qua; sàn không có cutoff: 0h hôm nay)
+        confirm_deadline / handover_deadline: hạn của lô đơn đang mở (NaT nếu luật tính theo giờ từ lúc tạo)
+        """
+        day = pd.Timestamp(day).normalize()
+        if day not in self._days:
+            table = self.table
+            has_cutoff = table['cutoff'].notna()
+            cohort = pd.Series(day, index=table.index).where(~has_cutoff, day - pd.Timedelta(days=1))
+            frame = pd.DataFrame(index=table.index)
+            frame['sla_cutoff'] = (cohort + table['cutoff']).where(has_cutoff, day)
+            for kind in DEADLINE_KINDS:
+                deadline = cohort + pd.to_timedelta(table[f'{kind}_days'], unit='D') + table[f'{kind}_clock']
+                # Hạn của lô phải sau đơn sớm nhất của lô (mốc cutoff)
+                frame[f'{kind}_deadline'] = _after(deadline, frame['sla_cutoff'])
+            self._days[day] = frame.astype('datetime64[ns]')
+        return self._days[day]
+
+
+DEFAULT_SLA_RULES = compile_sla_rules(DEFAULT_SLA_CONFIG)
+
+
+def _after(deadline, created):
+    """Lùi hạn sang ngày kế tiếp khi hạn không sau thời điểm tạo đơn"""
+    return deadline.where(~(deadline <= created), deadline + pd.Timedelta(days=1))
+
+
+def evaluate_sla(df, now, rules=None, platform_column='platform_clean', time_column='created_datetime'):
+    """
+    ⚡ Gắn các cột SLA cho mọi đơn trong một lượt
+
+    Hạn của từng đơn tính theo lô của nó: tạo sau cutoff ngày N → lô ngày N, trước cutoff → lô ngày N-1
+
+    Args:
+        df (pd.DataFrame): Đơn hàng đã chuẩn hoá (platform_clean, created_datetime)
+        now (datetime): Thời điểm đánh giá
+        rules (SLARuleSet): Luật đã biên dịch (mặc định DEFAULT_SLA_RULES)
+
+    Returns:
+        pd.DataFrame: Bản sao df kèm SLA_COLUMNS; time_to_* là số giờ còn lại (NaN nếu không áp dụng / đã quá hạn)
+    """
+    rules = rules or DEFAULT_SLA_RULES
+    evaluated = df.copy()
+    now = pd.Timestamp(now)
+    table = rules.table
+
+    platform = evaluated[platform_column]
+    created = pd.to_datetime(evaluated[time_column], errors='coerce')
+
+    evaluated['sla_cutoff'] = platform.map(rules.for_day(now)['sla_cutoff']).astype('datetime64[ns]')
+    after_cutoff = (created > evaluated['sla_cutoff']).to_numpy()
+
+    # Lô của đơn: ngày tạo, lùi một ngày nếu tạo trước (hoặc đúng) giờ cutoff
+    cutoff = platform.map(table['cutoff']).astype('timedelta64[ns]')
+    created_day = created.dt.normalize()
+    cohort = created_day.where(~((created - created_day) <= cutoff), created_day - pd.Timedelta(days=1))
+
+    for kind in DEADLINE_KINDS:
+        clock = platform.map(table[f'{kind}_clock']).astype('timedelta64[ns]')
+        days = pd.to_timedelta(platform.map(table[f'{kind}_days']).astype('float64'), unit='D')
+        hours = pd.to_timedelta(platform.map(table[f'{kind}_hours']).astype('float64'), unit='h')
+        # Đơn tạo sau giờ hạn của lô (vd. Shopee 10h, giữa hạn 9h và cutoff 18h) → hạn của lô kế tiếp
+        deadline = _after(cohort + days + clock, created).where(clock.notna(), created + hours)
+        evaluated[f'{kind}_deadline'] = deadline.astype('datetime64[ns]')
+
+    evaluated['after_cutoff'] = after_cutoff
+    for kind in DEADLINE_KINDS:
+        deadline = evaluated[f'{kind}_deadline']
+        needs = evaluated['after_cutoff'] & deadline.notna()
+        overdue = needs & (deadline < now)
+        hours_left = (deadline - now).dt.total_seconds() / 3600
+        evaluated[f'needs_{kind}'] = needs
+        evaluated[f'{kind}_overdue'] = overdue
+        evaluated[f'time_to_{kind}'] = hours_left.where(needs & ~overdue)
+
+    return evaluated
+
+
+def _iso_strings(values, date_format=ISO_FORMAT):
+    # Mốc deadline lặp lại rất nhiều → chỉ format các giá trị khác nhau rồi take theo mã
+    codes, uniques = pd.factorize(values)
+    formatted = np.array([value.strftime(date_format) for value in uniques] + [None], dtype=object)
+    return formatted[codes].tolist()
+
+
+def sla_status_records(evaluated, platform, id_column='id', time_column='created_datetime'):
+    """📋 Danh sách trạng thái SLA từng đơn (sau cutoff) của một sàn - định dạng 'sla_status' của báo cáo"""
+    rows = evaluated[(evaluated['platform_clean'] == platform) & evaluated['after_cutoff']]
+    if rows.empty:
+        return []
+
+    columns = [
+        rows[id_column].tolist() if id_column in rows.columns else ['Unknown'] * len(rows),
+        [platform] * len(rows),
+        [created.isoformat() for created in rows[time_column]]
+    ]
+    for column in STATUS_FIELDS[3:7]:
+        columns.append(rows[column].tolist())
+    for column in ('time_to_confirm', 'time_to_handover'):
+        columns.append(rows[column].astype(object).where(rows[column].notna(), None).tolist())
+    for column in ('confirm_deadline', 'handover_deadline'):
+        columns.append(_iso_strings(rows[column]))
+
+    return [dict(zip(STATUS_FIELDS, values)) for values in zip(*columns)]
+
+
+def summarize_platform(evaluated, platform, now, rules=None):
+    """📊 Tổng hợp SLA của một sàn: số đơn sau cutoff, cần xử lý, quá hạn, kèm danh sách trạng thái"""
+    rules = rules or DEFAULT_SLA_RULES
+    platform_rows = evaluated[evaluated['platform_clean'] == platform]
+    if platform_rows.empty:
+        return {'total_orders': 0, 'after_cutoff': 0, 'sla_status': []}
+
+    kinds = [kind for kind in DEADLINE_KINDS if rules.has(platform, kind)]
+    summary = {
+        'total_orders': len(platform_rows),
+        'after_cutoff': int(platform_rows['after_cutoff'].sum())
+    }
+    for kind in kinds:
+        summary[f'need_{kind}'] = int(platform_rows[f'needs_{kind}'].sum())
+    for kind in kinds:
+        summary[f'overdue_{kind}'] = int(platform_rows[f'{kind}_overdue'].sum())
+
+    summary['sla_status'] = sla_status_records(platform_rows, platform)
+
+    # Mốc của lô đơn đang mở (None nếu luật tính theo số giờ từ lúc tạo đơn)
+    day_table = rules.for_day(now)
+    if platform in day_table.index:
+        deadlines = day_table.loc[platform]
+        summary['cutoff_time'] = deadlines['sla_cutoff'].isoformat()
+        for kind in kinds:
+            deadline = deadlines[f'{kind}_deadline']
+            summary[f'{kind}_deadline'] = deadline.isoformat() if pd.notna(deadline) else None
+    return summary
+
+
+def order_sla_table(sla_report, urgent_hours=URGENT_HOURS):
+    """
+    🏷️ Bảng SLA theo order id từ các 'sla_status' của báo cáo
+
+    Returns:
+        pd.DataFrame: index order_id (duy nhất, sàn sau ghi đè sàn trước),
+                      sla_platform, sla_deadline, sla_status, sla_priority
+    """
+    frames = []
+    for platform, section in (sla_report or {}).items():
+        if not isinstance(section, dict) or 'sla_status' not in section:
+            continue
+        statuses = pd.DataFrame(section['sla_status'])
+        if statuses.empty or 'order_id' not in statuses.columns:
+            continue
+
+        hours = urgent_hours.get(platform, DEFAULT_URGENT_HOURS)
+        statuses = statuses.reindex(columns=['order_id', 'handover_deadline', 'confirm_overdue',
+                                             'handover_overdue', 'time_to_handover'])
+        overdue = (statuses['confirm_overdue'].eq(True) | statuses['handover_overdue'].eq(True)).to_numpy()
+        time_left = pd.to_numeric(statuses['time_to_handover'], errors='coerce').fillna(24).to_numpy()
+        urgent = ~overdue & (time_left < hours)
+        frames.append(pd.DataFrame({
+            'order_id': statuses['order_id'].fillna('').astype(str).str.strip(),
+            # Mục 'other_platforms' của báo cáo → nhãn 'other' như các đơn không có trong báo cáo
+            'sla_platform': FALLBACK_PLATFORM if platform in FALLBACK_KEYS else platform,
+            'sla_deadline': statuses['handover_deadline'].fillna(''),
+            'sla_status': np.select([overdue, urgent], ['overdue', 'urgent'], 'normal'),
+            'sla_priority': np.select([overdue, urgent], ['critical', 'high'], 'low')
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=ORDER_SLA_COLUMNS, index=pd.Index([], name='order_id'))
+    table = pd.concat(frames, ignore_index=True).drop_duplicates('order_id', keep='last')
+    return table.set_index('order_id')
+
+
+def attach_sla_columns(orders_df, sla_table, key='id'):
+    """
+    🔗 Gắn sla_platform / sla_deadline / sla_status / sla_priority vào orders_df bằng một lần reindex
+
+    Đơn không có trong sla_table: 'other' / None / 'normal' / 'low'
+    """
+    if key in orders_df.columns:
+        order_keys = orders_df[key].fillna('').astype(str).str.strip().to_numpy()
+    else:
+        order_keys = np.full(len(orders_df), '', dtype=object)
+
+    aligned = sla_table.reindex(order_keys)
+    orders_df['sla_platform'] = aligned['sla_platform'].fillna('other').to_numpy()
+    orders_df['sla_deadline'] = aligned['sla_deadline'].astype(object).where(aligned['sla_deadline'].notna(), None).to_numpy()
+    orders_df['sla_status'] = aligned['sla_status'].fillna('normal').to_numpy()
+    orders_df['sla_priority'] = aligned['sla_priority'].fillna('low').to_numpy()
+    return orders_df
+
+
+def sla_alerts(evaluated, warning_hours, rules=None, id_column='id'):
+    """
+    🚨 Cảnh báo SLA từ mask boolean
+
+    CRITICAL: một cảnh báo cho mỗi (sàn, loại hạn) có đơn quá hạn
+    WARNING: mỗi đơn còn <= max(warning_hours) giờ tới hạn xác nhận / bàn giao
+    """
+    rules = rules or DEFAULT_SLA_RULES
+    alerts = []
+    platform = evaluated['platform_clean']
+
+    for name in rules.platforms:
+        in_platform = platform == name
+        for kind in DEADLINE_KINDS:
+            if not rules.has(name, kind):
+                continue
+            count = int((in_platform & evaluated[f'{kind}_overdue']).sum())
+            if count > 0:
+                alerts.append({
+                    'type': 'CRITICAL',
+                    'platform': rules.name(name),
+                    'message': f"🚨 {count} đơn hàng QUÁ HẠN {DEADLINE_LABELS[kind]} ({rules.label(name, kind)})",
+                    'count': count
+                })
+
+    if not warning_hours:
+        return alerts
+
+    limit = max(warning_hours)
+    platform_rank = platform.map({name: rank for rank, name in enumerate(rules.platforms)})
+    order_ids = (evaluated[id_column] if id_column in evaluated.columns
+                 else pd.Series('Unknown', index=evaluated.index)).astype(str)
+    position = np.arange(len(evaluated))
+
+    warnings = []
+    for kind_rank, kind in enumerate(DEADLINE_KINDS):
+        hours = evaluated[f'time_to_{kind}']
+        mask = ((hours > 0) & (hours <= limit) & platform_rank.notna()).to_numpy()
+        if not mask.any():
+            continue
+        hours_left = hours[mask]
+        warnings.append(pd.DataFrame({
+            'platform_rank': platform_rank[mask].to_numpy(),
+            'position': position[mask],
+            'kind_rank': kind_rank,
+            'type': 'WARNING',
+            'platform': platform[mask].map(rules.table['name']).to_numpy(),
+            'message': ("⚠️ Đơn " + order_ids[mask] + f" sắp hết hạn {DEADLINE_LABELS[kind]} ("
+                        + hours_left.map('{:.1f}'.format) + "h)").to_numpy(),
+            'hours_left': hours_left.to_numpy()
+        }))
+
+    if warnings:
+        # Giữ thứ tự cũ: theo sàn, theo thứ tự đơn, hạn xác nhận trước hạn bàn giao
+        warnings = pd.concat(warnings, ignore_index=True).sort_values(
+            ['platform_rank', 'position', 'kind_rank'], kind='stable'
+        )
+        alerts.extend(warnings[['type', 'platform', 'message', 'hours_left']].to_dict('records'))
+    return alerts
+
+
+if __name__ == "__main__":
+    """Test the SLA engine module"""
+    print("⏱️ SLA Engine Module")
+    print("Use this module to evaluate SLA deadlines for all orders in one vectorized pass")
+    print("Example: sla_alerts(evaluate_sla(prepared_df, datetime.now(), compile_sla_rules(sla_config)), [2, 1])")
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⏰ SLA Watcher Module - Theo dõi SLA liên tục giữa các lần scrape
+Handles: min-heap theo mốc cảnh báo kế tiếp (còn 2h / 1h / 0.5h / quá hạn) của từng đơn,
+         ngủ tới sự kiện gần nhất, chỉ phát cảnh báo khi trạng thái đổi, nạp lại khi kho đơn hàng có lần scrape mới
+"""
+
+import os
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from scripts.order_store import OrderStore, ORDER_STORE_FILE
+from scripts.sla_engine import DEADLINE_KINDS, DEADLINE_LABELS, evaluate_sla
+
+
+DEFAULT_WARNING_HOURS = [2, 1, 0.5]
+DEFAULT_POLL_SECONDS = 60
+LOOKBACK_DAYS = 2  # Đơn tạo trước đó đã nằm ngoài cửa sổ cutoff của hôm qua
+ORDER_ID_COLUMNS = ('order_id', 'id')   # Kho SQLite: order_id; CSV thô: id
+STATUS_COLUMNS = ('status', 'col_7')
+# Đơn đã giao / đã huỷ không còn hạn SLA nào cần theo dõi (so sánh không phân biệt hoa thường)
+DEFAULT_CLOSED_STATUSES = [
+    'Hủy', 'Đã hủy', 'Hoàn thành', 'Đã giao', 'Giao thành công', 'Hoàn hàng', 'Đã hoàn',
+    'cancelled', 'canceled', 'completed', 'delivered', 'done'
+]
+
+
+class SLAWatcher:
+    """
+    ⏰ Min-heap (thời điểm vượt ngưỡng kế tiếp, order id, loại hạn)
+
+    Mức của một hạn: 0 = bình thường, 1..n = đã vào ngưỡng cảnh báo thứ i (giờ giảm dần), n+1 = quá hạn.
+    Chỉ phát cảnh báo khi mức thay đổi - không quét lại toàn bộ đơn mỗi phút
+    """
+
+    def __init__(self, monitor, on_alert=None, warning_hours=None, poll_seconds=DEFAULT_POLL_SECONDS,
+                 source=None, version=None, clock=datetime.now, closed_statuses=None):
+        """
+        Args:
+            monitor (SLAMonitor): Cung cấp luật SLA đã biên dịch và prepare_order_data()
+            on_alert (callable): Nhận từng alert dict khi trạng thái đổi (mặc định: log)
+            source (callable): Trả về DataFrame đơn hàng cần theo dõi (mặc định: kho SQLite qua monitor.load_orders)
+            version (callable): Phiên bản dữ liệu nguồn - đổi giá trị → nạp lại (mặc định: OrderStore.last_updated)
+            clock (callable): Thời gian hiện tại (thay được trong test)
+            closed_statuses (list): Trạng thái đơn đã đóng, bỏ khỏi theo dõi (mặc định: sla_config 'closed_statuses')
+        """
+        self.monitor = monitor
+        self.logger = logging.getLogger('SLAWatcher')
+        self.on_alert = on_alert or self._log_alert
+        self.poll_seconds = poll_seconds
+        self.clock = clock
+        self.source = source or self._load_open_orders
+        self.version = version or self._store_version
+
+        config = getattr(monitor, 'sla_config', {}) or {}
+        if warning_hours is None:
+            warning_hours = config.get('warning_hours',
+                                       config.get('warning_settings', {}).get('warning_hours', DEFAULT_WARNING_HOURS))
+        if closed_statuses is None:
+            closed_statuses = config.get('closed_statuses', DEFAULT_CLOSED_STATUSES)
+        self.closed_statuses = {str(status).strip().lower() for status in closed_statuses}
+        # Ngưỡng giờ còn lại, giảm dần; 0 = quá hạn
+        self.thresholds = sorted({float(hours) for hours in warning_hours if hours > 0}, reverse=True) + [0.0]
+
+        self.heap = []
+        self.deadlines = {}  # (order_id, kind) → (deadline, platform)
+        self.levels = {}     # (order_id, kind) → mức đã phát
+        self.loaded_version = None
+        self.loaded_day = None
+
+    def _load_open_orders(self):
+        date_from = (self.clock() - timedelta(days=LOOKBACK_DAYS)).date().isoformat()
+        return self.monitor.load_orders(date_from=date_from)
+
+    def _store_version(self):
+        if not os.path.exists(ORDER_STORE_FILE):
+            return None
+        return OrderStore(ORDER_STORE_FILE).last_updated()
+
+    def _log_alert(self, alert):
+        log = self.logger.warning if alert['type'] == 'CRITICAL' else self.logger.info
+        log(alert['message'])
+
+    def level_at(self, deadline, now):
+        """Số ngưỡng đã vượt tại thời điểm now"""
+        hours_left = (deadline - now).total_seconds() / 3600
+        return sum(1 for threshold in self.thresholds if hours_left <= threshold)
+
+    def _next_crossing(self, deadline, level):
+        if level >= len(self.thresholds):
+            return None
+        return deadline - timedelta(hours=self.thresholds[level])
+
+    def open_orders(self, orders_df):
+        """Chỉ các đơn có order id và chưa đóng (đã giao / đã huỷ), cột 'watch_id' = order id dạng chuỗi"""
+        id_column = next((column for column in ORDER_ID_COLUMNS if column in orders_df.columns), None)
+        if id_column is None:
+            self.logger.warning("⚠️ Không có cột order id - không theo dõi được SLA")
+            return orders_df.iloc[0:0]
+
+        order_ids = orders_df[id_column].fillna('').astype(str).str.strip()
+        keep = order_ids != ''
+        status_column = next((column for column in STATUS_COLUMNS if column in orders_df.columns), None)
+        if status_column is not None:
+            status = orders_df[status_column].fillna('').astype(str).str.strip().str.lower()
+            keep &= ~status.isin(self.closed_statuses)
+        return orders_df[keep].assign(watch_id=order_ids[keep])
+
+    def load(self, orders_df, now=None):
+        """
+        📥 Nạp đơn đang mở từ lần scrape gần nhất và dựng lại heap (heapify O(n))
+
+        Đơn không có order id hoặc đã giao / đã huỷ bị bỏ qua; trạng thái chống lặp cảnh báo khoá theo order id
+
+        Returns:
+            list: Cảnh báo của các hạn có mức khác lần nạp trước (đơn mới đã vào ngưỡng, hạn bị đổi...)
+        """
+        now = pd.Timestamp(now or self.clock())
+        self.loaded_day = now.date()
+        if orders_df is not None and not orders_df.empty:
+            orders_df = self.open_orders(orders_df)
+        if orders_df is None or orders_df.empty:
+            self.heap, self.deadlines = [], {}
+            self.levels = {}
+            return []
+
+        rules = self.monitor.sla_rules
+        evaluated = evaluate_sla(self.monitor.prepare_order_data(orders_df), now, rules)
+        order_ids = evaluated['watch_id']
+
+        deadlines, levels, heap = {}, {}, []
+        thresholds = np.array(self.thresholds)
+        for kind in DEADLINE_KINDS:
+            tracked = (evaluated[f'needs_{kind}'] & (order_ids != '')).to_numpy()
+            if not tracked.any():
+                continue
+            deadline = evaluated.loc[tracked, f'{kind}_deadline']
+            hours_left = ((deadline - now).dt.total_seconds() / 3600).to_numpy()
+            # Mức hiện tại cho mọi đơn một lượt: số ngưỡng có hours_left <= ngưỡng
+            kind_levels = (hours_left[:, None] <= thresholds[None, :]).sum(axis=1)
+
+            for order_id, platform, when, level in zip(order_ids[tracked].tolist(),
+                                                       evaluated.loc[tracked, 'platform_clean'].tolist(),
+                                                       deadline.tolist(), kind_levels.tolist()):
+                key = (order_id, kind)
+                deadlines[key] = (when, platform)
+                levels[key] = level
+                crossing = self._next_crossing(when, level)
+                if crossing is not None:
+                    heap.append((crossing, order_id, kind))
+
+        heapq.heapify(heap)
+        previous = self.levels
+        self.heap, self.deadlines, self.levels = heap, deadlines, levels
+
+        alerts = []
+        for key, level in levels.items():
+            if level > 0 and previous.get(key) != level:
+                alerts.append(self._alert(key, level, now))
+        self.logger.info(f"⏰ Watching {len(deadlines)} SLA deadlines, {len(heap)} upcoming events")
+        return alerts
+
+    def process_due(self, now=None):
+        """
+        ⏱️ Lấy các sự kiện đã tới hạn khỏi heap, cập nhật mức và đẩy mốc kế tiếp
+
+        Returns:
+            list: Cảnh báo cho các hạn vừa đổi mức
+        """
+        now = now or self.clock()
+        if isinstance(now, pd.Timestamp):
+            now = now.to_pydatetime()
+        alerts = []
+        while self.heap and self.heap[0][0] <= now:
+            _, order_id, kind = heapq.heappop(self.heap)
+            key = (order_id, kind)
+            if key not in self.deadlines:
+                continue
+            deadline, _ = self.deadlines[key]
+            level = self.level_at(deadline, now)
+            if level != self.levels.get(key):
+                self.levels[key] = level
+                alerts.append(self._alert(key, level, now))
+            crossing = self._next_crossing(deadline, level)
+            if crossing is not None:
+                heapq.heappush(self.heap, (crossing, order_id, kind))
+        return alerts
+
+    def seconds_until_next(self, now=None):
+        """Số giây tới sự kiện gần nhất (None nếu heap rỗng)"""
+        if not self.heap:
+            return None
+        now = now or self.clock()
+        return max(0.0, (self.heap[0][0] - now).total_seconds())
+
+    def _alert(self, key, level, now):
+        order_id, kind = key
+        deadline, platform = self.deadlines[key]
+        hours_left = (deadline - pd.Timestamp(now).to_pydatetime()).total_seconds() / 3600
+        rules = self.monitor.sla_rules
+        overdue = level >= len(self.thresholds)
+        if overdue:
+            message = f"🚨 Đơn {order_id} QUÁ HẠN {DEADLINE_LABELS[kind]} ({rules.label(platform, kind)})"
+        else:
+            message = f"⚠️ Đơn {order_id} sắp hết hạn {DEADLINE_LABELS[kind]} ({hours_left:.1f}h)"
+        return {
+            'type': 'CRITICAL' if overdue else 'WARNING',
+            'platform': rules.name(platform),
+            'order_id': order_id,
+            'deadline_type': kind,
+            'deadline': deadline.isoformat(),
+            'hours_left': round(hours_left, 2),
+            'level': level,
+            'message': message,
+            'time': pd.Timestamp(now).isoformat()
+        }
+
+    def _emit(self, alerts):
+        for alert in alerts:
+            try:
+                self.on_alert(alert)
+            except Exception as e:
+                self.logger.error(f"❌ Error delivering SLA alert: {e}")
+
+    def refresh(self, force=False):
+        """🔄 Nạp lại khi kho đơn hàng có lần scrape mới hoặc sang ngày mới (cửa sổ cutoff đổi)"""
+        now = self.clock()
+        version = self.version()
+        if not force and version == self.loaded_version and now.date() == self.loaded_day:
+            return False
+        self.loaded_version = version
+        self._emit(self.load(self.source(), now))
+        return True
+
+    def run(self, stop_event=None):
+        """
+        ▶️ Vòng lặp chính: ngủ tới sự kiện gần nhất (tối đa poll_seconds để kiểm tra lần scrape mới)
+
+        Args:
+            stop_event (threading.Event): set() để dừng
+        """
+        stop_event = stop_event or threading.Event()
+        self.logger.info("⏰ SLA watcher started")
+        self.refresh(force=True)
+
+        while not stop_event.is_set():
+            try:
+                self.refresh()
+                self._emit(self.process_due())
+                wait = self.seconds_until_next()
+                wait = self.poll_seconds if wait is None else min(wait, self.poll_seconds)
+            except Exception as e:
+                self.logger.error(f"❌ SLA watcher error: {e}")
+                wait = self.poll_seconds
+            stop_event.wait(wait)
+
+        self.logger.info("⏹️ SLA watcher stopped")
+
+
+if __name__ == "__main__":
+    """Test the SLA watcher module"""
+    print("⏰ SLA Watcher Module")
+    print("Use this module to get SLA alerts exactly when deadlines approach, between scrapes")
+    print("Example: SLAWatcher(SLAMonitor(), on_alert=print).run()")
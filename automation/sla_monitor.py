@@ -11,14 +11,23 @@ from datetime import datetime, timedelta
 import logging
 import json
 import os
+import copy
+import argparse
+
+from scripts.order_store import OrderStore, ORDER_STORE_FILE
+from scripts.sla_watcher import SLAWatcher, DEFAULT_POLL_SECONDS
+from scripts.sla_engine import (
+    DEFAULT_SLA_CONFIG, FALLBACK_PLATFORM, compile_sla_rules, evaluate_sla, summarize_platform, sla_alerts
+)
 
 
 class SLAMonitor:
     """Hệ thống giám sát SLA cho các sàn TMĐT"""
 
-    def __init__(self, config_path="config/sla_config.json"):
+    def __init__(self, config_path="config/sla_config.json", sla_rules=None):
         self.setup_logging()
         self.load_sla_config(config_path)
+        self.compile_rules(sla_rules)
         self.current_time = datetime.now()
 
     def setup_logging(self):
@@ -43,21 +52,7 @@ class SLAMonitor:
                     self.sla_config = json.load(f)
             else:
                 # Default SLA configuration
-                self.sla_config = {
-                    "shopee": {
-                        "cutoff_time": "18:00",
-                        "confirm_deadline": "09:00",  # Next day
-                        "handover_deadline": "12:00"  # Next day
-                    },
-                    "tiktok": {
-                        "cutoff_time": "14:00",
-                        "handover_deadline": "21:00"  # Next day
-                    },
-                    "other_platforms": {
-                        "default_deadline": "17:00"  # Same day
-                    },
-                    "warning_hours": [2, 1, 0.5]  # Hours before deadline
-                }
+                self.sla_config = copy.deepcopy(DEFAULT_SLA_CONFIG)
                 self.create_default_config(config_path)
 
             self.logger.info("✅ SLA config loaded successfully")
@@ -66,6 +61,11 @@ class SLAMonitor:
             self.logger.error(f"❌ Error loading SLA config: {e}")
             raise
 
+    def compile_rules(self, sla_rules=None):
+        """Biên dịch luật SLA một lần: config + luật ghi đè (vd. GoogleSheetsConfigService.get_sla_rules())"""
+        self.sla_rules = compile_sla_rules(self.sla_config, sla_rules)
+        self.logger.info(f"📐 SLA rules compiled for: {', '.join(self.sla_rules.platforms)}")
+
     def create_default_config(self, config_path):
         """Create default SLA configuration file"""
         try:
@@ -76,28 +76,39 @@ class SLAMonitor:
         except Exception as e:
             self.logger.error(f"❌ Error creating config: {e}")
 
+    def load_orders(self, db_path=ORDER_STORE_FILE, **filters):
+        """Đọc đơn hàng cần theo dõi SLA từ kho SQLite (lọc theo platform/status/date_from/date_to)"""
+        try:
+            if not os.path.exists(db_path):
+                self.logger.warning(f"⚠️ Chưa có kho đơn hàng: {db_path}")
+                return pd.DataFrame()
+
+            orders_df = OrderStore(db_path).query_orders(**filters)
+            self.logger.info(f"🗄️ Loaded {len(orders_df)} orders from {db_path}")
+            return orders_df
+
+        except Exception as e:
+            self.logger.error(f"❌ Error loading orders from store: {e}")
+            return pd.DataFrame()
+
     def analyze_orders_sla(self, orders_df):
         """Phân tích SLA cho tất cả đơn hàng"""
         try:
             self.logger.info("📊 Bắt đầu phân tích SLA...")
 
-            # Prepare data
-            df = self.prepare_order_data(orders_df)
-
-            # Analyze by platform
-            shopee_analysis = self.analyze_shopee_sla(df)
-            tiktok_analysis = self.analyze_tiktok_sla(df)
-            other_analysis = self.analyze_other_platforms_sla(df)
+            # Prepare data and evaluate SLA columns for all platforms at once
+            df = self.evaluate_sla(self.prepare_order_data(orders_df))
 
-            # Combine results
+            # Analyze by platform (one section per platform in the compiled rules)
             sla_report = {
                 'analysis_time': self.current_time.isoformat(),
-                'total_orders': len(df),
-                'shopee': shopee_analysis,
-                'tiktok': tiktok_analysis,
-                'other_platforms': other_analysis,
-                'alerts': self.generate_alerts(shopee_analysis, tiktok_analysis, other_analysis)
+                'total_orders': len(df)
             }
+            for platform in self.sla_rules.platforms:
+                if platform != FALLBACK_PLATFORM:
+                    sla_report[platform] = self.analyze_platform_sla(df, platform)
+            sla_report['other_platforms'] = self.analyze_other_platforms_sla(df)
+            sla_report['alerts'] = self.generate_alerts(df)
 
             self.logger.info("✅ SLA analysis completed")
             return sla_report
@@ -130,7 +141,7 @@ class SLAMonitor:
 
             # Identify created time column
             time_col = None
-            for col in ['created_datetime', 'created_time', 'date_order', 'scraped_at', 'col_6', 'col_7']:
+            for col in ['created_datetime', 'created_at', 'created_time', 'date_order', 'scraped_at', 'col_6', 'col_7']:
                 if col in df.columns:
                     time_col = col
                     break
@@ -141,11 +152,9 @@ class SLAMonitor:
                 time_col = 'created_datetime'
                 df[time_col] = datetime.now()
 
-            # Standardize platform names
-            df['platform_clean'] = df[platform_col].astype(str).str.lower()
-            df.loc[df['platform_clean'].str.contains('shopee', na=False), 'platform_clean'] = 'shopee'
-            df.loc[df['platform_clean'].str.contains('tiktok', na=False), 'platform_clean'] = 'tiktok'
-            df.loc[~df['platform_clean'].isin(['shopee', 'tiktok']), 'platform_clean'] = 'other'
+            # Standardize platform names against the platforms in the SLA rules
+            df['platform_name'] = df[platform_col].fillna('').astype(str).str.strip()
+            df['platform_clean'] = self.sla_rules.match_platforms(df[platform_col])
 
             # Parse created time
             if time_col == 'created_datetime' and df[time_col].dtype == 'datetime64[ns]':
@@ -155,7 +164,7 @@ class SLAMonitor:
                 df['created_datetime'] = pd.to_datetime(df[time_col], errors='coerce')
 
             # Fill NaT values with current time
-            df['created_datetime'].fillna(datetime.now(), inplace=True)
+            df['created_datetime'] = df['created_datetime'].fillna(datetime.now())
 
             self.logger.info(f"✅ Prepared {len(df)} orders for SLA analysis")
             self.logger.info(f"📊 Platform distribution: {df['platform_clean'].value_counts().to_dict()}")
@@ -165,109 +174,33 @@ class SLAMonitor:
             self.logger.error(f"❌ Error preparing data: {e}")
             return pd.DataFrame()
 
-    def analyze_shopee_sla(self, df):
-        """Phân tích SLA cho Shopee"""
-        try:
-            shopee_df = df[df['platform_clean'] == 'shopee'].copy()
-
-            if shopee_df.empty:
-                return {'total_orders': 0, 'after_cutoff': 0, 'sla_status': []}
+    def evaluate_sla(self, df):
+        """Tính cột SLA (cutoff, deadline, quá hạn, giờ còn lại) cho mọi đơn trong một lượt"""
+        return evaluate_sla(df, self.current_time, self.sla_rules)
 
-            # Get yesterday and today
-            today = self.current_time.date()
-            yesterday = today - timedelta(days=1)
-
-            # Filter orders after 18:00 yesterday
-            cutoff_time = datetime.combine(yesterday, datetime.strptime("18:00", "%H:%M").time())
-            after_cutoff = shopee_df[shopee_df['created_datetime'] > cutoff_time]
-
-            # Calculate SLA deadlines
-            confirm_deadline = datetime.combine(today, datetime.strptime("09:00", "%H:%M").time())
-            handover_deadline = datetime.combine(today, datetime.strptime("12:00", "%H:%M").time())
-
-            # Analyze each order
-            sla_status = []
-            for _, order in after_cutoff.iterrows():
-                status = self.calculate_order_sla_status(
-                    order, confirm_deadline, handover_deadline, 'shopee'
-                )
-                sla_status.append(status)
-
-            # Summary statistics
-            total_after_cutoff = len(after_cutoff)
-            need_confirm = len([s for s in sla_status if s['needs_confirm']])
-            need_handover = len([s for s in sla_status if s['needs_handover']])
-            overdue_confirm = len([s for s in sla_status if s['confirm_overdue']])
-            overdue_handover = len([s for s in sla_status if s['handover_overdue']])
-
-            return {
-                'total_orders': len(shopee_df),
-                'after_cutoff': total_after_cutoff,
-                'need_confirm': need_confirm,
-                'need_handover': need_handover,
-                'overdue_confirm': overdue_confirm,
-                'overdue_handover': overdue_handover,
-                'sla_status': sla_status,
-                'cutoff_time': cutoff_time.isoformat(),
-                'confirm_deadline': confirm_deadline.isoformat(),
-                'handover_deadline': handover_deadline.isoformat()
-            }
+    def analyze_platform_sla(self, df, platform):
+        """Phân tích SLA cho một sàn theo luật đã biên dịch"""
+        try:
+            if 'after_cutoff' not in df.columns:
+                df = self.evaluate_sla(df)
+            return summarize_platform(df, platform, self.current_time, self.sla_rules)
 
         except Exception as e:
-            self.logger.error(f"❌ Error analyzing Shopee SLA: {e}")
+            self.logger.error(f"❌ Error analyzing {platform} SLA: {e}")
             return {}
 
+    def analyze_shopee_sla(self, df):
+        """Phân tích SLA cho Shopee"""
+        return self.analyze_platform_sla(df, 'shopee')
+
     def analyze_tiktok_sla(self, df):
         """Phân tích SLA cho TikTok"""
-        try:
-            tiktok_df = df[df['platform_clean'] == 'tiktok'].copy()
-
-            if tiktok_df.empty:
-                return {'total_orders': 0, 'after_cutoff': 0, 'sla_status': []}
-
-            # Get yesterday and tomorrow
-            today = self.current_time.date()
-            yesterday = today - timedelta(days=1)
-            tomorrow = today + timedelta(days=1)
-
-            # Filter orders after 14:00 yesterday
-            cutoff_time = datetime.combine(yesterday, datetime.strptime("14:00", "%H:%M").time())
-            after_cutoff = tiktok_df[tiktok_df['created_datetime'] > cutoff_time]
-
-            # Calculate handover deadline (21:00 tomorrow)
-            handover_deadline = datetime.combine(tomorrow, datetime.strptime("21:00", "%H:%M").time())
-
-            # Analyze each order
-            sla_status = []
-            for _, order in after_cutoff.iterrows():
-                status = self.calculate_order_sla_status(
-                    order, None, handover_deadline, 'tiktok'
-                )
-                sla_status.append(status)
-
-            # Summary statistics
-            total_after_cutoff = len(after_cutoff)
-            need_handover = len([s for s in sla_status if s['needs_handover']])
-            overdue_handover = len([s for s in sla_status if s['handover_overdue']])
-
-            return {
-                'total_orders': len(tiktok_df),
-                'after_cutoff': total_after_cutoff,
-                'need_handover': need_handover,
-                'overdue_handover': overdue_handover,
-                'sla_status': sla_status,
-                'cutoff_time': cutoff_time.isoformat(),
-                'handover_deadline': handover_deadline.isoformat()
-            }
-
-        except Exception as e:
-            self.logger.error(f"❌ Error analyzing TikTok SLA: {e}")
-            return {}
+        return self.analyze_platform_sla(df, 'tiktok')
 
     def analyze_other_platforms_sla(self, df):
         """Phân tích SLA cho các sàn khác"""
         try:
-            other_df = df[df['platform_clean'] == 'other'].copy()
+            other_df = df[df['platform_clean'] == FALLBACK_PLATFORM].copy()
 
             if other_df.empty:
                 return {'total_orders': 0, 'platforms': {}}
@@ -278,123 +211,42 @@ class SLAMonitor:
             # Filter orders from today
             today_orders = other_df[other_df['created_datetime'].dt.date == today]
 
-            # Group by platform
+            # Group by original platform name
+            group_column = 'platform_name' if 'platform_name' in today_orders.columns else 'platform_clean'
             platforms = {}
-            for platform in today_orders['platform_clean'].unique():
-                platform_orders = today_orders[today_orders['platform_clean'] == platform]
+            for platform, platform_orders in today_orders.groupby(group_column, sort=False):
                 platforms[platform] = {
                     'total_orders': len(platform_orders),
                     'orders': platform_orders.to_dict('records')
                 }
 
-            return {
+            analysis = {}
+            if FALLBACK_PLATFORM in self.sla_rules.platforms and 'after_cutoff' in other_df.columns:
+                # Deadline của mục other_platforms trong config
+                analysis = summarize_platform(other_df, FALLBACK_PLATFORM, self.current_time, self.sla_rules)
+
+            analysis.update({
                 'total_orders': len(other_df),
                 'today_orders': len(today_orders),
                 'platforms': platforms
-            }
+            })
+            return analysis
 
         except Exception as e:
             self.logger.error(f"❌ Error analyzing other platforms SLA: {e}")
             return {}
 
-    def calculate_order_sla_status(self, order, confirm_deadline, handover_deadline, platform):
-        """Tính toán trạng thái SLA cho một đơn hàng"""
-        try:
-            order_id = order.get('id', 'Unknown')
-            created_time = order['created_datetime']
-
-            status = {
-                'order_id': order_id,
-                'platform': platform,
-                'created_time': created_time.isoformat(),
-                'needs_confirm': False,
-                'needs_handover': False,
-                'confirm_overdue': False,
-                'handover_overdue': False,
-                'time_to_confirm': None,
-                'time_to_handover': None
-            }
-
-            # Check confirm deadline (Shopee only)
-            if confirm_deadline:
-                status['needs_confirm'] = True
-                status['confirm_overdue'] = self.current_time > confirm_deadline
-
-                if not status['confirm_overdue']:
-                    time_diff = confirm_deadline - self.current_time
-                    status['time_to_confirm'] = time_diff.total_seconds() / 3600  # hours
-
-            # Check handover deadline
-            if handover_deadline:
-                status['needs_handover'] = True
-                status['handover_overdue'] = self.current_time > handover_deadline
-
-                if not status['handover_overdue']:
-                    time_diff = handover_deadline - self.current_time
-                    status['time_to_handover'] = time_diff.total_seconds() / 3600  # hours
-
-            return status
-
-        except Exception as e:
-            self.logger.error(f"❌ Error calculating SLA status: {e}")
-            return {}
-
-    def generate_alerts(self, shopee_analysis, tiktok_analysis, other_analysis):
-        """Tạo cảnh báo SLA"""
-        alerts = []
-
+    def generate_alerts(self, df):
+        """Tạo cảnh báo SLA từ bảng đơn hàng đã đánh giá (evaluate_sla)"""
         try:
-            # Shopee alerts
-            if shopee_analysis.get('overdue_confirm', 0) > 0:
-                alerts.append({
-                    'type': 'CRITICAL',
-                    'platform': 'Shopee',
-                    'message': f"🚨 {shopee_analysis['overdue_confirm']} đơn hàng QUÁ HẠN xác nhận (9h sáng)",
-                    'count': shopee_analysis['overdue_confirm']
-                })
-
-            if shopee_analysis.get('overdue_handover', 0) > 0:
-                alerts.append({
-                    'type': 'CRITICAL',
-                    'platform': 'Shopee',
-                    'message': f"🚨 {shopee_analysis['overdue_handover']} đơn hàng QUÁ HẠN bàn giao (12h trước)",
-                    'count': shopee_analysis['overdue_handover']
-                })
-
-            # TikTok alerts
-            if tiktok_analysis.get('overdue_handover', 0) > 0:
-                alerts.append({
-                    'type': 'CRITICAL',
-                    'platform': 'TikTok',
-                    'message': f"🚨 {tiktok_analysis['overdue_handover']} đơn hàng QUÁ HẠN bàn giao (21h)",
-                    'count': tiktok_analysis['overdue_handover']
-                })
+            if 'after_cutoff' not in df.columns:
+                df = self.evaluate_sla(df)
 
             # Warning alerts (upcoming deadlines)
-            warning_hours = self.sla_config.get('warning_hours', [2, 1])
-
-            for analysis, platform in [(shopee_analysis, 'Shopee'), (tiktok_analysis, 'TikTok')]:
-                if 'sla_status' in analysis:
-                    for status in analysis['sla_status']:
-                        # Check confirm deadline warnings
-                        if status.get('time_to_confirm') and status['time_to_confirm'] <= max(warning_hours):
-                            alerts.append({
-                                'type': 'WARNING',
-                                'platform': platform,
-                                'message': f"⚠️ Đơn {status['order_id']} sắp hết hạn xác nhận ({status['time_to_confirm']:.1f}h)",
-                                'hours_left': status['time_to_confirm']
-                            })
-
-                        # Check handover deadline warnings
-                        if status.get('time_to_handover') and status['time_to_handover'] <= max(warning_hours):
-                            alerts.append({
-                                'type': 'WARNING',
-                                'platform': platform,
-                                'message': f"⚠️ Đơn {status['order_id']} sắp hết hạn bàn giao ({status['time_to_handover']:.1f}h)",
-                                'hours_left': status['time_to_handover']
-                            })
-
-            return alerts
+            warning_hours = self.sla_config.get(
+                'warning_hours', self.sla_config.get('warning_settings', {}).get('warning_hours', [2, 1])
+            )
+            return sla_alerts(df, warning_hours, self.sla_rules)
 
         except Exception as e:
             self.logger.error(f"❌ Error generating alerts: {e}")
@@ -492,29 +344,44 @@ class SLAMonitor:
 
 
 def main():
-    """Test SLA Monitor"""
-    try:
-        print("🧪 Testing SLA Monitor...")
+    """Test SLA Monitor (--watch: chạy SLA watcher liên tục trên kho đơn hàng)"""
+    parser = argparse.ArgumentParser(description='SLA Monitor')
+    parser.add_argument('--watch', action='store_true', help='Theo dõi SLA liên tục, cảnh báo khi sắp/quá hạn')
+    parser.add_argument('--poll', type=int, default=DEFAULT_POLL_SECONDS,
+                        help='Chu kỳ (giây) kiểm tra lần scrape mới trong kho đơn hàng')
+    args = parser.parse_args()
 
+    try:
         # Initialize SLA Monitor
         sla_monitor = SLAMonitor()
 
-        # Load sample data (replace with actual data)
-        # orders_df = pd.read_csv('data/orders_latest.csv')
+        if args.watch:
+            try:
+                print("⏰ Watching SLA deadlines... (Ctrl+C to stop)")
+                SLAWatcher(sla_monitor, on_alert=lambda alert: print(f"{alert['type']}: {alert['message']}"),
+                           poll_seconds=args.poll).run()
+            except KeyboardInterrupt:
+                print("⏹️ SLA watcher stopped")
+            return
+
+        print("🧪 Testing SLA Monitor...")
 
-        # For testing, create sample data
-        sample_data = pd.DataFrame({
-            'id': ['503313', '503314', '503315'],
-            'platform': ['Shopee', 'TikTok', 'Other'],
-            'created_datetime': [
-                datetime.now() - timedelta(hours=10),  # Yesterday 18:30
-                datetime.now() - timedelta(hours=8),   # Yesterday 16:00
-                datetime.now() - timedelta(hours=2)    # Today
-            ]
-        })
+        # Load orders from the SQLite order store, fall back to sample data
+        orders_df = sla_monitor.load_orders()
+        if orders_df.empty:
+            # For testing, create sample data
+            orders_df = pd.DataFrame({
+                'id': ['503313', '503314', '503315'],
+                'platform': ['Shopee', 'TikTok', 'Other'],
+                'created_datetime': [
+                    datetime.now() - timedelta(hours=10),  # Yesterday 18:30
+                    datetime.now() - timedelta(hours=8),   # Yesterday 16:00
+                    datetime.now() - timedelta(hours=2)    # Today
+                ]
+            })
 
         # Analyze SLA
-        sla_report = sla_monitor.analyze_orders_sla(sample_data)
+        sla_report = sla_monitor.analyze_orders_sla(orders_df)
 
         # Export reports
         export_files = sla_monitor.export_sla_report(sla_report)
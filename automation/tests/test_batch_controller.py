@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.batch_controller import AdaptiveBatchController
+
+
+class TestAdaptiveBatchController(unittest.TestCase):
+    def setUp(self):
+        self.state_file = os.path.join(tempfile.mkdtemp(), 'batch_tuning.json')
+
+    def test_additive_increase_multiplicative_decrease(self):
+        controller = AdaptiveBatchController('ep', initial_size=50, step=10, max_size=80,
+                                             state_file=self.state_file)
+        controller.record_success(50)
+        controller.record_success(60)
+        self.assertEqual(controller.batch_size, 70)
+
+        controller.record_failure(70)
+        self.assertEqual(controller.batch_size, 35)
+
+        # Batch nhỏ hơn (gửi trước khi giảm) thành công không kéo size lên
+        controller.record_success(20)
+        self.assertEqual(controller.batch_size, 35)
+
+        for _ in range(10):
+            controller.record_success(controller.batch_size)
+        self.assertEqual(controller.batch_size, 80)
+
+    def test_never_below_min_size(self):
+        controller = AdaptiveBatchController('ep', initial_size=2, state_file=self.state_file)
+        controller.record_failure(2)
+        controller.record_failure(1)
+        self.assertEqual(controller.batch_size, 1)
+
+    def test_persist_per_endpoint(self):
+        first = AdaptiveBatchController('a', initial_size=40, state_file=self.state_file)
+        first.record_failure(40)
+        first.save()
+        second = AdaptiveBatchController('b', initial_size=90, state_file=self.state_file)
+        second.save()
+
+        self.assertEqual(AdaptiveBatchController.load('a', state_file=self.state_file).batch_size, 20)
+        self.assertEqual(AdaptiveBatchController.load('b', state_file=self.state_file).batch_size, 90)
+        self.assertEqual(AdaptiveBatchController.load('c', initial_size=7, state_file=self.state_file).batch_size, 7)
+
+    def test_concurrent_saves_keep_every_endpoint(self):
+        controllers = [AdaptiveBatchController(f'ep{i}', initial_size=10 + i, state_file=self.state_file)
+                       for i in range(8)]
+        threads = [threading.Thread(target=lambda c=c: [c.save() for _ in range(20)]) for c in controllers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Không ghi xen vào cùng file tạm, không mất endpoint, không để lại file .tmp
+        for i in range(8):
+            self.assertEqual(AdaptiveBatchController.load(f'ep{i}', state_file=self.state_file).batch_size, 10 + i)
+        self.assertEqual(os.listdir(os.path.dirname(self.state_file)), ['batch_tuning.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import sys
+import os
+import time
+import tempfile
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.columnar_export import (
+    parquet_engine, to_columnar_frame, write_columnar, read_columnar, read_latest, to_records
+)
+
+
+def dashboard_orders():
+    return pd.DataFrame({
+        'order_id': ['SO001', 'SO002', 'SO003'],
+        'order_date': ['2026-10-18 09:00:00', '', '2026-10-17 19:30:00'],
+        'status': ['confirmed', 'pending', 'confirmed'],
+        'region': ['TP.HCM', 'Hà Nội', 'TP.HCM'],
+        'order_value': ['1,250,000', '', '300000'],
+        'platform': ['Shopee', 'Tiktok', ' Shopee'],
+        'customer_name': ['A', 3, None]
+    })
+
+
+class TestColumnarExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.parquet_path = os.path.join(self.tmp.name, 'orders_latest.parquet')
+        self.csv_path = os.path.join(self.tmp.name, 'orders_latest.csv')
+
+    def test_columns_are_typed_and_dictionary_encoded(self):
+        frame = to_columnar_frame(dashboard_orders())
+
+        for column in ('status', 'region', 'platform'):
+            self.assertEqual(frame[column].dtype.name, 'category')
+        self.assertEqual(sorted(frame['platform'].cat.categories), ['Shopee', 'Tiktok'])
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(frame['order_date']))
+        self.assertTrue(pd.isna(frame.loc[1, 'order_date']))
+        self.assertEqual(frame['order_value'].tolist()[0], 1250000.0)
+        self.assertEqual(frame['customer_name'].tolist()[1], '3')
+
+        records = to_records(frame)
+        self.assertEqual(records[0]['order_date'], '2026-10-18T09:00:00')
+        self.assertIsNone(records[1]['order_value'])
+
+    @unittest.skipIf(parquet_engine() is not None, "Parquet engine installed")
+    def test_without_engine_falls_back_to_csv(self):
+        dashboard_orders().to_csv(self.csv_path, index=False)
+
+        self.assertIsNone(write_columnar(dashboard_orders(), self.parquet_path))
+        self.assertFalse(os.path.exists(self.parquet_path))
+
+        df, source = read_latest(self.parquet_path, self.csv_path, columns=['order_id', 'status', 'missing'])
+        self.assertEqual(source, self.csv_path)
+        self.assertEqual(list(df.columns), ['order_id', 'status'])
+
+    @unittest.skipUnless(parquet_engine(), "pyarrow/fastparquet not installed")
+    def test_round_trip_with_projection(self):
+        self.assertEqual(write_columnar(dashboard_orders(), self.parquet_path), self.parquet_path)
+
+        df = read_columnar(self.parquet_path, columns=['platform', 'order_value', 'missing'])
+
+        self.assertEqual(list(df.columns), ['platform', 'order_value'])
+        self.assertEqual(df['platform'].dtype.name, 'category')
+        self.assertEqual(df['order_value'].tolist()[0], 1250000.0)
+
+    @unittest.skipUnless(parquet_engine(), "pyarrow/fastparquet not installed")
+    def test_latest_prefers_parquet_unless_csv_is_newer(self):
+        write_columnar(dashboard_orders(), self.parquet_path)
+        dashboard_orders().to_csv(self.csv_path, index=False)
+        stamp = time.time()
+        os.utime(self.parquet_path, (stamp, stamp))
+        os.utime(self.csv_path, (stamp - 60, stamp - 60))
+
+        _, source = read_latest(self.parquet_path, self.csv_path)
+        self.assertEqual(source, self.parquet_path)
+
+        os.utime(self.csv_path, (stamp + 60, stamp + 60))
+        _, source = read_latest(self.parquet_path, self.csv_path)
+        self.assertEqual(source, self.csv_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
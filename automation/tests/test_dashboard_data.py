@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+import tempfile
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.dashboard_data import DashboardData, load_orders, orders_version
+from scripts.order_store import OrderStore
+
+
+def dashboard_orders():
+    return pd.DataFrame({
+        'order_id': ['SO1', 'SO2', 'SO3', 'SO4', 'SO5'],
+        'platform': ['Shopee', 'Tiktok', 'Shopee ', 'Shopee', None],
+        'status': ['confirmed', 'confirmed', 'pending', 'confirmed', 'pending'],
+        'order_value': ['1,000', '2000', '', '500', '10'],
+        'created_at': ['2026-10-17 08:00:00', '2026-10-18 09:00:00', '2026-10-18 10:00:00', '', '2026-10-18 11:00:00'],
+        'col_30': ['x'] * 5
+    })
+
+
+class TestDashboardData(unittest.TestCase):
+    def test_indexes_and_filters(self):
+        data = DashboardData(dashboard_orders(), 'v1')
+
+        self.assertEqual(data.options('platform'), ['Shopee', 'Tiktok'])
+        self.assertIsInstance(data.df['status'].dtype, pd.CategoricalDtype)
+        self.assertEqual(data.df['order_value'].sum(), 3510.0)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(data.df['created_at']))
+
+        self.assertEqual(data.filter(platform='Shopee', status='confirmed')['order_id'].tolist(), ['SO1', 'SO4'])
+        self.assertEqual(data.filter(status='pending')['order_id'].tolist(), ['SO3', 'SO5'])
+        self.assertTrue(data.filter(platform='Lazada').empty)
+        self.assertIs(data.filter(platform=None), data.df)
+
+    def test_loads_only_dashboard_columns_keyed_on_version(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        os.makedirs('data')
+
+        self.assertIsNone(orders_version())
+        dashboard_orders().to_csv('data/orders_latest.csv', index=False)
+        csv_version = orders_version()
+        df, source = load_orders()
+        self.assertEqual(source, 'data/orders_latest.csv')
+        self.assertNotIn('col_30', df.columns)
+
+        OrderStore('data/orders.db').upsert_orders(pd.DataFrame({
+            'id': ['7'], 'col_7': ['Xác nhận'], 'col_18': ['Shopee'], 'col_19': ['2026-10-18 08:00']
+        }))
+        self.assertNotEqual(orders_version(), csv_version)
+        df, source = load_orders()
+        self.assertEqual(source, 'data/orders.db')
+        self.assertEqual(DashboardData(df).options('platform'), ['Shopee'])
+        # Giá trị giống orders_latest.csv: status đã map, order_id = mã đơn khi có
+        self.assertEqual(DashboardData(df).options('status'), ['confirmed'])
+        self.assertEqual(df['region'].tolist(), ['TP.HCM'])
+
+
+if __name__ == '__main__':
+    unittest.main()
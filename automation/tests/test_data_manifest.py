@@ -0,0 +1,113 @@
+import unittest
+import sys
+import os
+import time
+import tempfile
+import multiprocessing
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.data_manifest import DataManifest, ManifestWatcher, classify
+
+
+def touch(path, content='x', mtime=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def register_many(data_dir, prefix, count):
+    """Exporter ở process riêng: ghi rồi register từng file"""
+    manifest = DataManifest(data_dir)
+    for index in range(count):
+        manifest.register(touch(os.path.join(data_dir, f'orders_{prefix}_{index}.csv')))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestDataManifest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def test_classify(self):
+        kinds = {
+            'orders_export_20250701_110523.csv': 'orders',
+            'orders_dashboard_20250701_110523.csv': 'dashboard',
+            'orders_latest.parquet': 'dashboard',
+            'products_detail_20250701_113535.csv': 'products',
+            'sla_summary_20250701_113535.txt': 'sla_summary',
+            'june_2025_enhanced_page_01_20250701_121540.json': 'json_page',
+            'enhanced_summary_20250701_113535.txt': 'summary',
+            'dashboard_config.json': 'json',
+            'orders.db-wal': None,
+            'orders_latest.parquet.tmp': None,
+            'manifest.json': None
+        }
+        self.assertEqual({name: classify(name) for name in kinds}, kinds)
+
+    def test_latest_of_kind(self):
+        now = time.time()
+        touch(self.path('orders_export_20250701_110523.csv'), mtime=now - 30)
+        touch(self.path('orders_dashboard_20250701_110523.csv'), mtime=now - 20)
+        touch(self.path('orders_latest.parquet'), mtime=now - 10)
+        touch(self.path('notes.md'))
+        manifest = DataManifest(self.data_dir)
+
+        self.assertEqual(manifest.latest('dashboard', '.csv')['name'], 'orders_dashboard_20250701_110523.csv')
+        self.assertEqual(manifest.latest('dashboard')['name'], 'orders_latest.parquet')
+        self.assertEqual(manifest.latest('orders')['timestamp'], '2025-07-01T11:05:23')
+        self.assertEqual(manifest.latest_path(('dashboard', 'orders'), ext='.csv'),
+                         f"{self.data_dir}/orders_dashboard_20250701_110523.csv")
+        self.assertNotIn('notes.md', manifest.entries)
+
+        # Exporter ghi file mới → register; process khác thấy qua manifest.json
+        touch(self.path('orders_export_20250702_080000.csv'), mtime=now)
+        manifest.register(self.path('orders_export_20250702_080000.csv'))
+        reader = DataManifest(self.data_dir)
+        self.assertEqual(reader.latest_path(('dashboard', 'orders'), ext='.csv'),
+                         f"{self.data_dir}/orders_export_20250702_080000.csv")
+
+        # File bị xoá khi không có watcher → bỏ qua và chọn file kế tiếp
+        os.remove(self.path('orders_export_20250702_080000.csv'))
+        self.assertEqual(reader.latest_path(('dashboard', 'orders'), ext='.csv'),
+                         f"{self.data_dir}/orders_dashboard_20250701_110523.csv")
+
+    def test_concurrent_processes_do_not_lose_updates(self):
+        DataManifest(self.data_dir).rebuild()
+        context = multiprocessing.get_context('spawn')
+        workers = [context.Process(target=register_many, args=(self.data_dir, f'p{n}', 15)) for n in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(60)
+
+        self.assertEqual([worker.exitcode for worker in workers], [0] * 4)
+        self.assertEqual(len(DataManifest(self.data_dir).files('orders')), 60)
+
+    def test_watcher_tracks_directory(self):
+        manifest = DataManifest(self.data_dir)
+        watcher = ManifestWatcher(manifest).start()
+        self.addCleanup(watcher.stop)
+
+        touch(self.path('sla_summary_20250701_113535.txt'), 'report')
+        self.assertTrue(wait_for(lambda: manifest.latest('sla_summary') is not None))
+        self.assertEqual(manifest.latest('sla_summary')['size'], 6)
+
+        os.remove(self.path('sla_summary_20250701_113535.txt'))
+        self.assertTrue(wait_for(lambda: manifest.latest('sla_summary') is None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import driver_pool
+from scripts.driver_pool import DriverPool, get_driver_pool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+        self.quit_called = False
+        self.cookies_cleared = False
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("driver crashed")
+        return 1
+
+    def get(self, url):
+        if not self.alive:
+            raise RuntimeError("driver crashed")
+
+    def delete_all_cookies(self):
+        self.cookies_cleared = True
+
+    def quit(self):
+        self.quit_called = True
+
+
+class TestDriverPool(unittest.TestCase):
+    def make_pool(self, **kwargs):
+        self.created = []
+
+        def factory():
+            driver = FakeDriver()
+            self.created.append(driver)
+            return driver
+
+        return DriverPool(factory=factory, **kwargs)
+
+    def test_warm_up_and_reuse(self):
+        pool = self.make_pool(size=2)
+        self.assertEqual(pool.warm_up(), 2)
+
+        driver = pool.acquire()
+        pool.release(driver)
+        again = pool.acquire()
+
+        self.assertEqual(len(self.created), 2)
+        self.assertIn(again, self.created)
+
+    def test_recycle_after_max_uses(self):
+        pool = self.make_pool(size=1, max_uses=1)
+        first = pool.acquire()
+        pool.release(first)
+
+        second = pool.acquire()
+        self.assertIsNot(first, second)
+        self.assertTrue(first.quit_called)
+
+    def test_crashed_driver_is_replaced(self):
+        pool = self.make_pool(size=1)
+        first = pool.acquire()
+        first.alive = False
+        pool.release(first)
+
+        second = pool.acquire()
+        self.assertIsNot(first, second)
+        self.assertTrue(first.quit_called)
+
+    def test_reset_session_clears_cookies(self):
+        pool = self.make_pool(size=1)
+        driver = pool.acquire()
+        pool.release(driver, reset_session=True)
+        self.assertTrue(driver.cookies_cleared)
+
+    def test_acquire_times_out_when_exhausted(self):
+        pool = self.make_pool(size=1)
+        pool.acquire()
+        with self.assertRaises(TimeoutError):
+            pool.acquire(timeout=0.1)
+
+    def test_shutdown_quits_idle_drivers(self):
+        pool = self.make_pool(size=2)
+        pool.warm_up()
+        pool.shutdown()
+        self.assertTrue(all(d.quit_called for d in self.created))
+
+
+class TestSharedDriverPool(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(driver_pool, '_pool', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.options = []
+
+        def fake_create(**kwargs):
+            self.options.append(kwargs)
+            return FakeDriver()
+
+        patcher = patch.object(driver_pool, 'create_chrome_driver', fake_create)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_options_reach_factory_and_larger_size_grows_pool(self):
+        pool = get_driver_pool({'size': 1}, headless=False, user_agent='UA-test')
+        self.addCleanup(pool.shutdown)
+        pool.acquire()
+
+        self.assertEqual(self.options[0]['headless'], False)
+        self.assertEqual(self.options[0]['user_agent'], 'UA-test')
+
+        # Lần gọi sau dùng lại pool; size lớn hơn → nới pool, size nhỏ hơn / không có settings → giữ nguyên
+        self.assertIs(get_driver_pool({'size': 3}), pool)
+        self.assertEqual(pool.size, 3)
+        get_driver_pool({'size': 2})
+        get_driver_pool()
+        self.assertEqual(pool.size, 3)
+        self.assertEqual(pool.warm_up(), 2)
+
+
+
+class TestChromedriverCache(unittest.TestCase):
+    def test_cache_is_anchored_and_reused(self):
+        automation_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(driver_pool.DRIVER_CACHE_FILE, os.path.join(automation_dir, 'data', 'driver_cache.json'))
+
+        tmp = tempfile.mkdtemp()
+        chromedriver = os.path.join(tmp, 'chromedriver')
+        with open(chromedriver, 'w') as f:
+            f.write('')
+        os.chmod(chromedriver, 0o755)
+        cache_file = os.path.join(tmp, 'data', 'driver_cache.json')
+
+        with patch.object(driver_pool, 'ChromeDriverManager') as manager:
+            manager.return_value.install.return_value = chromedriver
+            self.assertEqual(driver_pool.resolve_chromedriver_path(cache_file), chromedriver)
+            self.assertEqual(driver_pool.resolve_chromedriver_path(cache_file), chromedriver)
+
+        # Thư mục data/ được tạo khi ghi; lần sau đọc cache, không gọi ChromeDriverManager
+        self.assertTrue(os.path.exists(cache_file))
+        self.assertEqual(manager.return_value.install.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
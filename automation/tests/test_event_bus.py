@@ -0,0 +1,60 @@
+import unittest
+import sys
+import os
+import json
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.event_bus import EventBus, sse_stream, sse_format, last_event_id
+
+
+class TestEventBus(unittest.TestCase):
+    def test_publish_fans_out_and_replays(self):
+        bus = EventBus(history_size=2)
+        live = bus.subscribe('job1', replay=False)
+        everything = bus.subscribe('*')
+
+        for index in range(3):
+            bus.publish('job1', {'event': 'progress', 'index': index})
+        bus.publish('job2', {'event': 'progress'})
+
+        self.assertEqual([live.get(0.1)['index'] for _ in range(3)], [0, 1, 2])
+        self.assertEqual([everything.get(0.1)['topic'] for _ in range(4)], ['job1', 'job1', 'job1', 'job2'])
+        self.assertIsNone(live.get(0.01))
+
+        # Subscriber đến muộn chỉ nhận history_size sự kiện cuối; Last-Event-ID bỏ các sự kiện đã nhận
+        late = bus.subscribe('job1')
+        self.assertEqual([late.get(0.1)['index'] for _ in range(2)], [1, 2])
+        resumed = bus.subscribe('job1', after_id=2)
+        self.assertEqual(resumed.get(0.1)['index'], 2)
+        self.assertIsNone(resumed.get(0.01))
+
+        bus.drop('job1')
+        self.assertEqual(bus.history('job1'), [])
+
+    def test_sse_stream_ends_on_condition(self):
+        bus = EventBus()
+        subscription = bus.subscribe('job1')
+        publisher = threading.Timer(0.05, lambda: [bus.publish('job1', {'event': name}) for name in
+                                                   ('progress', 'finished', 'ignored')])
+        publisher.start()
+        self.addCleanup(publisher.cancel)
+
+        chunks = list(sse_stream(subscription, until=lambda event: event['event'] == 'finished', heartbeat=0.02))
+
+        self.assertEqual(chunks[0], 'retry: 2000\n\n')
+        self.assertIn(': heartbeat\n\n', chunks)
+        events = [chunk for chunk in chunks if chunk.startswith('id:')]
+        self.assertEqual(events[-1].splitlines()[1], 'event: finished')
+        self.assertEqual(json.loads(events[0].splitlines()[2][len('data: '):])['event'], 'progress')
+        # Generator đóng → đã hủy đăng ký
+        self.assertEqual(bus._subscribers, {})
+
+        self.assertTrue(sse_format({'id': 7, 'event': 'stage'}).startswith('id: 7\nevent: stage\n'))
+        self.assertEqual(last_event_id('12'), 12)
+        self.assertIsNone(last_event_id('abc'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import sys
+import os
+import logging
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation_enhanced import EnhancedOneAutomationSystem
+from scripts.excel_export import column_widths, write_excel, ORDERS_SHEET, PRODUCTS_SHEET
+
+
+def legacy_widths(worksheet):
+    """Vòng lặp autofit cũ: len(str(cell.value)) cho từng ô"""
+    widths = []
+    for column in worksheet.columns:
+        widths.append(min(max(len(str(cell.value)) for cell in column) + 2, 50))
+    return widths
+
+
+def sample_orders(count=50):
+    rng = np.random.default_rng(11)
+    return pd.DataFrame({
+        'id': np.arange(count).astype(str),
+        'customer': rng.choice(['Nguyễn Văn A', 'B', 'Khách hàng có tên rất dài ' * 3], count),
+        'col_16': rng.integers(1000, 10_000_000, count),
+        'scraped_at': pd.Timestamp('2026-10-18 09:00') + pd.to_timedelta(np.arange(count), unit='min')
+    })
+
+
+class TestExcelExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'orders.xlsx')
+
+    def test_widths_match_cell_loop(self):
+        orders = sample_orders()
+        orders.to_excel(self.path, index=False)
+
+        expected = legacy_widths(load_workbook(self.path).active)
+
+        widths = column_widths(orders)
+        # Ô thời gian: str(datetime) khớp str(Timestamp)
+        self.assertEqual(widths, expected)
+        self.assertEqual(widths[1], 50)
+
+    def test_orders_and_products_in_one_file(self):
+        orders = sample_orders(5)
+        orders.loc[2, 'customer'] = None
+        products = pd.DataFrame({'order_id': ['0', '0', '1'], 'product_name': ['Áo', 'Quần', 'Mũ'],
+                                 'quantity': [1, 2, 3]})
+
+        written = write_excel(self.path, {ORDERS_SHEET: orders, PRODUCTS_SHEET: products, 'Trống': pd.DataFrame()})
+
+        self.assertEqual(written, {ORDERS_SHEET: 5, PRODUCTS_SHEET: 3})
+        workbook = load_workbook(self.path)
+        self.assertEqual(workbook.sheetnames, [ORDERS_SHEET, PRODUCTS_SHEET])
+        sheet = workbook[ORDERS_SHEET]
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(rows[0], ('id', 'customer', 'col_16', 'scraped_at'))
+        self.assertIsNone(rows[3][1])
+        self.assertEqual(rows[1][3], datetime(2026, 10, 18, 9, 0))
+        self.assertAlmostEqual(sheet.column_dimensions['B'].width, column_widths(orders)[1], delta=1)
+        self.assertEqual(list(workbook[PRODUCTS_SHEET].iter_rows(values_only=True))[3], ('1', 'Mũ', 3))
+
+    def test_export_data_writes_products_sheet(self):
+        system = EnhancedOneAutomationSystem.__new__(EnhancedOneAutomationSystem)
+        system.logger = logging.getLogger('test_excel_export')
+        system.config = {'export': {'excel': {'enabled': True}, 'summary': {'enabled': False},
+                                    'parquet': {'enabled': False}},
+                         'order_store': {'enabled': True}}
+        system.products_df = pd.DataFrame({'order_id': ['1'], 'product_name': ['Áo'], 'quantity': [2]})
+        orders = pd.DataFrame({'id': ['1', '2'], 'order_code': ['SO1', 'SO2'], 'customer': ['A', 'B'],
+                               'scraped_at': ['2026-10-18 09:00:00'] * 2})
+
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            files = system.export_data(orders)
+            workbook = load_workbook(files['excel'])
+        finally:
+            os.chdir(cwd)
+
+        rows = list(workbook[PRODUCTS_SHEET].iter_rows(values_only=True))
+        self.assertEqual(rows[1][:5], ('1', 'SO1', 'A', 'Áo', 2))
+        self.assertEqual(workbook[ORDERS_SHEET].max_row, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
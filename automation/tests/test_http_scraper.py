@@ -0,0 +1,52 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.http_scraper import add_commas, record_to_cells, parse_table_rows
+
+
+class TestHttpScraper(unittest.TestCase):
+    def test_add_commas(self):
+        self.assertEqual(add_commas(1234567), '1,234,567')
+        self.assertEqual(add_commas('1500.5'), '1,500.5')
+        self.assertEqual(add_commas(None), '')
+
+    def test_record_matches_table_columns(self):
+        record = {
+            'id': 12345, 'name': 'SO12345', 'customer_name': 'Nguyen Van A',
+            'is_express': 1, 'state_name': 'Đơn bán', 'transporter': 'GHN',
+            'total': 250000, 'cod': 0, 'source': 'Shopee',
+        }
+        cells = record_to_cells(record)
+
+        # Vị trí col_N giống hệt khi Selenium đọc innerText của #orderTB
+        self.assertEqual(len(cells), 23)
+        self.assertEqual(cells[1], '12345')          # id
+        self.assertEqual(cells[2], 'SO12345')        # order_code
+        self.assertEqual(cells[4], 'Nguyen Van A')   # customer
+        self.assertEqual(cells[5], 'HOẢ TỐC')
+        self.assertEqual(cells[6], 'Đơn bán')        # col_7 status
+        self.assertEqual(cells[12], 'GHN')           # col_13 transporter
+        self.assertEqual(cells[15], '250,000')       # col_16 total
+        self.assertEqual(cells[17], 'Shopee')        # col_18 platform
+
+    def test_total_row(self):
+        cells = record_to_cells({'id': 0, 'total': 1000})
+        self.assertEqual(cells[1], '')
+        self.assertEqual(cells[2], 'Tổng cộng')
+
+    def test_parse_table_rows(self):
+        page = """
+        <table><thead><tr><th>ID</th></tr></thead>
+        <tbody>
+            <tr><td><input type="checkbox"></td><td>1</td><td> <a href="#">SO1</a> </td></tr>
+            <tr></tr>
+        </tbody></table>
+        """
+        self.assertEqual(parse_table_rows(page), [['', '1', 'SO1']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.incremental import (
+    WatermarkStore, merge_incremental_orders, load_incremental_store, save_incremental_store
+)
+
+
+def make_orders(rows):
+    return pd.DataFrame(rows, columns=['id', 'col_7', 'col_18', 'col_19', 'col_20'])
+
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.watermark_file = os.path.join(self.tmp_dir, 'watermark.json')
+
+    def test_watermark_per_platform_and_window(self):
+        store = WatermarkStore(self.watermark_file)
+        self.assertIsNone(store.window_start())
+
+        store.update_from_orders(make_orders([
+            ['101', 'Đơn bán', 'Shopee', '2025-06-10 08:00:00', '2025-06-10 08:05:00'],
+            ['105', 'Đơn bán', 'Shopee', '2025-06-12 09:00:00', '2025-06-12 09:01:00'],
+            ['103', 'Đơn bán', 'Tiktok', '', '2025-06-11 20:00:00'],
+        ]))
+        store.save()
+
+        reloaded = WatermarkStore(self.watermark_file)
+        self.assertEqual(reloaded.get('Shopee')['last_order_id'], 105)
+        self.assertEqual(reloaded.get('Tiktok')['last_created_at'], '2025-06-11T20:00:00')
+
+        # Cửa sổ bắt đầu từ watermark cũ nhất (Tiktok) trừ overlap
+        self.assertEqual(reloaded.window_start(overlap_hours=2), datetime(2025, 6, 11, 18, 0))
+
+    def test_watermark_never_moves_backwards(self):
+        store = WatermarkStore(self.watermark_file)
+        store.update_from_orders(make_orders([['200', '', 'Shopee', '2025-06-12 09:00:00', '']]))
+        store.update_from_orders(make_orders([['150', '', 'Shopee', '2025-06-01 09:00:00', '']]))
+
+        self.assertEqual(store.get('Shopee')['last_order_id'], 200)
+        self.assertEqual(store.get('Shopee')['last_created_at'], '2025-06-12T09:00:00')
+
+    def test_empty_run_moves_window_forward(self):
+        store = WatermarkStore(self.watermark_file)
+        store.update_from_orders(make_orders([
+            ['100', '', 'Shopee', '2025-06-10 09:00:00', ''],
+            ['101', '', 'Tiktok', '2025-06-12 09:00:00', ''],
+        ]))
+
+        store.mark_checked(datetime(2025, 6, 15, 8, 0))
+        store.mark_checked(datetime(2025, 6, 14, 8, 0))  # Không lùi lại
+        store.save()
+
+        reloaded = WatermarkStore(self.watermark_file)
+        self.assertEqual(reloaded.get('Shopee')['last_order_id'], 100)
+        self.assertEqual(reloaded.window_start(overlap_hours=2), datetime(2025, 6, 15, 6, 0))
+
+    def test_count_new_orders(self):
+        store = WatermarkStore(self.watermark_file)
+        store.update_from_orders(make_orders([['100', '', 'Shopee', '2025-06-12 09:00:00', '']]))
+
+        delta = make_orders([
+            ['99', '', 'Shopee', '', ''],
+            ['101', '', 'Shopee', '', ''],
+            ['5', '', 'Lazada', '', ''],
+        ])
+        self.assertEqual(store.count_new_orders(delta), 2)
+
+    def test_merge_overwrites_by_id_and_drops_total_row(self):
+        previous = make_orders([
+            ['1', 'Đơn bán', 'Shopee', '', ''],
+            ['2', 'Đơn bán', 'Shopee', '', ''],
+        ])
+        delta = make_orders([
+            ['2', 'Đã giao', 'Shopee', '', ''],
+            ['3', 'Đơn bán', 'Tiktok', '', ''],
+            ['', '', '', '', ''],  # Dòng "Tổng cộng"
+        ])
+
+        merged = merge_incremental_orders(previous, delta)
+
+        self.assertEqual(merged['id'].tolist(), ['1', '2', '3'])
+        self.assertEqual(merged.set_index('id').loc['2', 'col_7'], 'Đã giao')
+
+    def test_store_round_trip(self):
+        store_file = os.path.join(self.tmp_dir, 'orders.csv')
+        self.assertTrue(load_incremental_store(store_file).empty)
+
+        save_incremental_store(make_orders([['1', 'Đơn bán', 'Shopee', '', '']]), store_file)
+        loaded = load_incremental_store(store_file)
+        self.assertEqual(loaded.loc[0, 'id'], '1')
+        self.assertEqual(loaded.loc[0, 'col_19'], '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+
+from scripts.invoice_fetcher import AsyncInvoiceFetcher, chunk_ids
+from scripts.batch_controller import AdaptiveBatchController
+
+
+class FakeInvoiceServer:
+    """Server /so/invoiceJSON chạy trong thread riêng để test fetcher thật qua HTTP"""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.cookies_seen = set()
+
+    async def invoice_json(self, request):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.05)
+            self.cookies_seen.add(request.cookies.get('laravel_session'))
+            ids = request.query['id'].split(',')
+            if '999' in ids:
+                return web.Response(text='<html>login</html>', content_type='text/html')
+            if len(ids) > 3:
+                return web.Response(status=414)
+            data = [{'id': int(i), 'detail': f'SP{i}(1)'} for i in ids]
+            return web.json_response({'error': False, 'data': data})
+        finally:
+            self.active -= 1
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            app = web.Application()
+            app.router.add_get('/so/invoiceJSON', self.invoice_json)
+            self.runner = web.AppRunner(app)
+            self.loop.run_until_complete(self.runner.setup())
+            site = web.TCPSite(self.runner, '127.0.0.1', 0)
+            self.loop.run_until_complete(site.start())
+            self.port = site._server.sockets[0].getsockname()[1]
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        ready.wait(5)
+        return f"http://127.0.0.1:{self.port}"
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+
+class TestInvoiceFetcher(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeInvoiceServer()
+        self.base_url = self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_concurrent_batches_stream_results(self):
+        fetcher = AsyncInvoiceFetcher({'laravel_session': 'abc'}, base_url=self.base_url, max_concurrency=4)
+        received = []
+
+        failed = fetcher.fetch([str(i) for i in range(1, 31)], batch_size=3,
+                               on_batch=lambda ids, records, error: received.extend(records or []))
+
+        self.assertEqual(failed, [])
+        self.assertEqual(sorted(r['id'] for r in received), list(range(1, 31)))
+        self.assertGreater(self.server.max_active, 1)
+        self.assertLessEqual(self.server.max_active, 4)
+        self.assertEqual(self.server.cookies_seen, {'abc'})
+
+    def test_failed_batches_are_returned(self):
+        fetcher = AsyncInvoiceFetcher({}, base_url=self.base_url, max_concurrency=2)
+
+        failed = fetcher.fetch(['1', '2', '999', '4', '5', '6'], batch_size=3)
+        self.assertEqual(failed, [['1', '2', '999']])  # HTML thay vì JSON
+
+        failed = fetcher.fetch(['1', '2', '3', '4', '5'], batch_size=4)
+        self.assertEqual(failed, [['1', '2', '3', '4']])  # 414 URI too long
+
+    def test_adaptive_splits_only_failed_batch_and_persists(self):
+        state_file = os.path.join(tempfile.mkdtemp(), 'batch_tuning.json')
+        controller = AdaptiveBatchController('invoice', initial_size=8, step=1, state_file=state_file)
+        fetcher = AsyncInvoiceFetcher({}, base_url=self.base_url, max_concurrency=2, controller=controller)
+        received = []
+
+        failed = fetcher.fetch([str(i) for i in range(1, 21)],
+                               on_batch=lambda ids, records, error: received.extend(records or []))
+
+        # Server trả 414 cho batch > 3 id → batch bị chia đôi đến khi lọt, không mất id nào
+        self.assertEqual(failed, [])
+        self.assertEqual(sorted(r['id'] for r in received), list(range(1, 21)))
+        self.assertLessEqual(controller.batch_size, 4)
+        self.assertGreater(controller.failures, 0)
+
+        learned = AdaptiveBatchController.load('invoice', initial_size=50, state_file=state_file)
+        self.assertEqual(learned.batch_size, controller.batch_size)
+
+    def test_adaptive_login_page_is_not_split_and_not_persisted(self):
+        state_file = os.path.join(tempfile.mkdtemp(), 'batch_tuning.json')
+        controller = AdaptiveBatchController('invoice', initial_size=3, state_file=state_file)
+        fetcher = AsyncInvoiceFetcher({}, base_url=self.base_url, max_concurrency=2, controller=controller)
+
+        # Trang login (phiên hết hạn) → lỗi xác thực, không chia nhỏ, không lưu batch size
+        failed = fetcher.fetch(['1', '2', '999'])
+        self.assertEqual(failed, [['1', '2', '999']])
+        self.assertEqual(controller.batch_size, 3)
+        self.assertEqual(controller.failures, 0)
+        self.assertFalse(os.path.exists(state_file))
+
+    def test_adaptive_split_depth_is_capped(self):
+        controller = AdaptiveBatchController('invoice', initial_size=8, state_file=None)
+        fetcher = AsyncInvoiceFetcher({}, base_url=self.base_url, max_concurrency=2, controller=controller)
+
+        with patch('scripts.invoice_fetcher.MAX_SPLIT_DEPTH', 1):
+            failed = fetcher.fetch([str(i) for i in range(1, 9)])
+
+        # 8 → 2 batch 4 id (vẫn 414) → dừng chia, trả về lỗi
+        self.assertEqual(sorted(failed), [['1', '2', '3', '4'], ['5', '6', '7', '8']])
+        self.assertEqual(controller.failures, 1)
+
+    def test_chunk_ids(self):
+        self.assertEqual(chunk_ids(['1', '2', '3', '4', '5'], 2), [['1', '2'], ['3', '4'], ['5']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import sys
+import os
+import json
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+
+from scripts.job_runner import JobRunner, JobLimitError, run_command_job, _stage_rows
+import api_server
+
+
+def staged_job(progress_callback, rows):
+    """Target giả lập run_automation(): các bước có percent và số dòng"""
+    progress_callback("Khởi tạo quy trình", 5)
+    time.sleep(0.05)
+    progress_callback("Đang xử lý dữ liệu...", 60)
+    _stage_rows(rows)  # metrics_callback mà run_automation_job truyền cho run_automation()
+    progress_callback("Hoàn thành quy trình", 100)
+    _stage_rows(rows)
+    return {'success': True, 'order_count': rows, 'start_time': time.time()}
+
+
+def crashing_job(progress_callback):
+    """Target giả lập worker chết giữa chừng (Chrome / OOM kill process)"""
+    progress_callback("Khởi tạo quy trình", 5)
+    os._exit(1)
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestJobRunner(unittest.TestCase):
+    def setUp(self):
+        self.runner = JobRunner(max_concurrency=1)
+        self.addCleanup(self.runner.shutdown)
+        self.events = []
+        self.runner.listeners.append(self.events.append)
+
+    def finished(self, job_id):
+        return lambda: self.runner.get(job_id)['status'] in ('succeeded', 'failed')
+
+    def test_job_returns_immediately_and_tracks_result(self):
+        finished_jobs = []
+        job = self.runner.submit('command', run_command_job, on_finish=finished_jobs.append,
+                                 command='echo first; echo second')
+
+        self.assertEqual(job['status'], 'queued')
+        self.assertTrue(wait_for(self.finished(job['id'])))
+        job = self.runner.get(job['id'])
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['progress'], 100)
+        self.assertEqual(job['result']['output'][-2:], ['first', 'second'])
+        self.assertIsNotNone(job['started_at'])
+        self.assertEqual(finished_jobs[0]['id'], job['id'])
+        self.assertTrue(wait_for(lambda: [e['event'] for e in self.events].count('progress') >= 2))
+        self.assertIn('finished', [event['event'] for event in self.events])
+
+    def test_failure_and_concurrency_limit(self):
+        job = self.runner.submit('command', run_command_job, command='sleep 0.5; exit 3')
+
+        with self.assertRaises(JobLimitError):
+            self.runner.submit('command', run_command_job, command='echo again')
+
+        self.assertTrue(wait_for(self.finished(job['id'])))
+        job = self.runner.get(job['id'])
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['result']['returncode'], 3)
+        self.assertIn('3', job['error'])
+        # Job trước đã xong → nhận job mới
+        self.assertIn(self.runner.submit('command', run_command_job, command='true')['status'], ('queued', 'running'))
+
+    def test_crashed_worker_pool_is_recreated(self):
+        job = self.runner.submit('automation', crashing_job)
+        self.assertTrue(wait_for(self.finished(job['id'])))
+        job = self.runner.get(job['id'])
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('BrokenProcessPool', job['error'])
+
+        # Pool hỏng đã bị bỏ → job tiếp theo chạy trên worker mới
+        job = self.runner.submit('command', run_command_job, command='echo alive')
+        self.assertTrue(wait_for(self.finished(job['id'])))
+        job = self.runner.get(job['id'])
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['result']['output'][-1], 'alive')
+
+    def test_stage_timings_and_sse(self):
+        self.addCleanup(api_server.job_runner.shutdown)
+        job = api_server.job_runner.submit('automation', staged_job, rows=42)
+        client = api_server.app.test_client()
+
+        response = client.get(f"/api/jobs/{job['id']}/events")
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        events = [json.loads(line[len('data: '):]) for line in response.get_data(as_text=True).splitlines()
+                  if line.startswith('data: ')]
+
+        names = [event['event'] for event in events]
+        self.assertEqual(names[0], 'queued')
+        self.assertEqual(names[-1], 'finished')
+        stages = [event for event in events if event['event'] == 'stage']
+        self.assertEqual([stage['rows'] for stage in stages], [None, 42, 42])
+        self.assertGreaterEqual(stages[0]['duration_ms'], 50)
+        self.assertEqual(events[-1]['stages'], api_server.job_runner.get(job['id'])['stages'])
+        self.assertEqual(events[-1]['status'], 'succeeded')
+
+        # Kết nối lại sau sự kiện cuối → chỉ còn lại 'finished' nếu Last-Event-ID trước nó
+        response = client.get(f"/api/jobs/{job['id']}/events", headers={'Last-Event-ID': str(events[-2]['id'])})
+        self.assertEqual(response.get_data(as_text=True).count('data: '), 1)
+
+    def test_job_endpoints(self):
+        client = api_server.app.test_client()
+
+        self.assertEqual(client.get('/api/jobs/missing').status_code, 404)
+        self.assertEqual(client.post('/api/run', json={'action': 'unknown'}).status_code, 400)
+        self.assertTrue(client.get('/api/jobs').get_json()['success'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+
+from scripts.ndjson_stream import dumps, iter_ndjson, iter_json_array, frame_records
+from scripts.order_store import OrderStore
+import api_server
+import automation_bridge
+
+
+def store_orders(count):
+    return pd.DataFrame({
+        'id': [str(index) for index in range(count)],
+        'order_code': [f'SO{index}' for index in range(count)],
+        'col_7': ['Xác nhận'] * count,
+        'col_18': ['Shopee' if index % 2 else 'Tiktok' for index in range(count)],
+        'col_19': [f'2026-10-18 {index % 24:02d}:00' for index in range(count)]
+    })
+
+
+class TestNDJSONStream(unittest.TestCase):
+    def test_serializer_handles_pandas_values(self):
+        line = dumps({'value': np.int64(3), 'price': float('nan'), 'at': pd.Timestamp('2026-10-18 09:00'),
+                      'missing': pd.NaT})
+
+        self.assertEqual(json.loads(line), {'value': 3, 'price': None, 'at': '2026-10-18T09:00:00', 'missing': None})
+
+    def test_chunks_are_bounded(self):
+        records = ({'id': index} for index in range(1001))
+
+        chunks = list(iter_ndjson(records, chunk_rows=500))
+
+        self.assertEqual(len(chunks), 3)
+        lines = b''.join(chunks).splitlines()
+        self.assertEqual(len(lines), 1001)
+        self.assertEqual(json.loads(lines[-1]), {'id': 1000})
+
+        array = b''.join(iter_json_array(({'id': index} for index in range(7)), chunk_rows=3))
+        self.assertEqual(json.loads(array), [{'id': index} for index in range(7)])
+        self.assertEqual(json.loads(b''.join(iter_json_array(iter([])))), [])
+
+    def test_frame_records_in_slices(self):
+        df = pd.DataFrame({'id': range(5), 'at': pd.to_datetime(['2026-10-18'] * 5)})
+
+        records = list(frame_records(df, chunk_rows=2))
+
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0]['at'], '2026-10-18T00:00:00')
+
+
+class TestStreamingEndpoints(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.addCleanup(os.chdir, self.cwd)
+        os.makedirs('data')
+        api_server.dataset_cache.clear()
+
+    def test_store_rows_stream_from_cursor(self):
+        store = OrderStore('data/orders.db')
+        store.upsert_orders(store_orders(1200))
+
+        iterator = store.iter_orders(platform='Shopee', batch_size=100)
+        self.assertEqual(next(iterator)['platform'], 'Shopee')
+        self.assertEqual(sum(1 for _ in iterator), 599)
+
+        client = api_server.app.test_client()
+        response = client.get('/api/orders?stream=ndjson&platform=Shopee&fields=order_id,platform')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertTrue(response.is_streamed)
+        rows = [json.loads(line) for line in response.data.splitlines()]
+        self.assertEqual(len(rows), 600)
+        self.assertEqual(set(rows[0]), {'order_id', 'platform'})
+
+    def test_csv_dataset_streams_json_array(self):
+        pd.DataFrame({'order_id': ['SO1', 'SO2'], 'platform': ['Shopee', 'Tiktok']}).to_csv(
+            'data/orders_latest.csv', index=False)
+        client = api_server.app.test_client()
+
+        response = client.get('/api/orders?stream=json&platform=Tiktok')
+        self.assertEqual(json.loads(response.data), [{'order_id': 'SO2', 'platform': 'Tiktok'}])
+
+        response = client.get('/api/orders', headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(len(response.data.splitlines()), 2)
+        self.assertEqual(client.get('/api/orders?stream=xml').status_code, 400)
+
+    def test_bridge_streams_storage(self):
+        automation_bridge.orders_storage[:] = [{'id': index, 'at': pd.Timestamp('2026-10-18')} for index in range(3)]
+        self.addCleanup(automation_bridge.orders_storage.clear)
+        client = TestClient(automation_bridge.app)
+
+        response = client.get('/api/orders?stream=ndjson')
+        self.assertEqual([json.loads(line)['id'] for line in response.text.splitlines()], [0, 1, 2])
+
+        body = client.get('/api/orders').json()
+        self.assertEqual(body['data']['count'], 3)
+        self.assertEqual(body['data']['orders'][0]['at'], '2026-10-18T00:00:00')
+        self.assertEqual(client.get('/api/orders?stream=xml').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api'))
+
+from scripts.order_query import DatasetCache, OrderDataset, file_version
+from scripts.order_store import OrderStore
+import api_server
+
+
+def dashboard_orders():
+    return pd.DataFrame({
+        'order_id': ['SO1', 'SO2', 'SO3', 'SO4'],
+        'order_date': ['2026-10-16 08:00:00', '2026-10-18 09:00:00', '2026-10-17 19:00:00', ''],
+        'status': ['confirmed', 'pending', 'confirmed', 'confirmed'],
+        'platform': ['Shopee', 'Tiktok', 'Shopee', 'Lazada'],
+        'order_value': [100.0, 200.0, None, 50.0]
+    })
+
+
+class TestOrderDataset(unittest.TestCase):
+    def test_filters_projection_and_pages(self):
+        dataset = OrderDataset(dashboard_orders(), 'v1')
+
+        # Mới nhất trước, dòng không có ngày ở cuối
+        data, total = dataset.query()
+        self.assertEqual([row['order_id'] for row in data], ['SO2', 'SO3', 'SO1', 'SO4'])
+        self.assertIsNone(data[1]['order_value'])
+
+        data, total = dataset.query(platform='Shopee,Lazada', status='confirmed', fields='order_id,missing',
+                                    limit=2, offset=1)
+        self.assertEqual(total, 3)
+        self.assertEqual(data, [{'order_id': 'SO1'}, {'order_id': 'SO4'}])
+
+        data, total = dataset.query(date_from='2026-10-17', date_to='2026-10-17')
+        self.assertEqual([row['order_id'] for row in data], ['SO3'])
+
+        self.assertIs(dataset.query(limit=2)[0], dataset.query(limit=2)[0])
+        self.assertNotEqual(dataset.etag('limit=2'), OrderDataset(dashboard_orders(), 'v2').etag('limit=2'))
+
+    def test_grouped_stats(self):
+        dataset = OrderDataset(dashboard_orders(), 'v1')
+
+        stats = dataset.stats(group_by='platform,status', metrics='count,sum:order_value')
+        self.assertEqual(stats['groups'][0], {'platform': 'Lazada', 'status': 'confirmed', 'count': 1,
+                                              'sum:order_value': 50.0})
+        self.assertEqual(stats['totals'], {'count': 4, 'sum:order_value': 350.0})
+        self.assertIs(dataset.stats(group_by='platform,status', metrics='count,sum:order_value'), stats)
+
+        stats = dataset.stats(group_by='date', metrics='count,max:order_value', platform='Shopee',
+                              date_from='2026-10-17')
+        self.assertEqual(stats['groups'], [{'date': '2026-10-17', 'count': 1, 'max:order_value': None}])
+        self.assertEqual(stats['rows'], 1)
+
+        with self.assertRaises(ValueError):
+            dataset.stats(group_by='region')
+        with self.assertRaises(ValueError):
+            dataset.stats(metrics='median:order_value')
+
+    def test_cache_reloads_only_when_file_changes(self):
+        path = os.path.join(tempfile.mkdtemp(), 'orders_latest.csv')
+        dashboard_orders().to_csv(path, index=False)
+        cache = DatasetCache()
+
+        def load():
+            return pd.read_csv(path), path
+
+        first = cache.get('orders', file_version(path), load)
+        self.assertIs(cache.get('orders', file_version(path), load), first)
+        self.assertEqual(cache.loads, 1)
+
+        dashboard_orders().head(2).to_csv(path, index=False)
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+        second = cache.get('orders', file_version(path), load)
+        self.assertEqual(cache.loads, 2)
+        self.assertEqual(len(second), 2)
+
+
+class TestOrdersAPI(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.addCleanup(os.chdir, self.cwd)
+        os.makedirs('data')
+        api_server.dataset_cache.clear()
+        self.client = api_server.app.test_client()
+
+    def test_csv_pages_and_etag(self):
+        dashboard_orders().to_csv('data/orders_latest.csv', index=False)
+
+        response = self.client.get('/api/orders?platform=Shopee&limit=1&fields=order_id,platform')
+        body = response.get_json()
+        self.assertEqual(body['data'], [{'order_id': 'SO3', 'platform': 'Shopee'}])
+        self.assertEqual((body['total'], body['next_offset']), (2, 1))
+
+        etag = response.headers['ETag'].strip('"')
+        cached = self.client.get('/api/orders?platform=Shopee&limit=1&fields=order_id,platform',
+                                 headers={'If-None-Match': f'"{etag}"'})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(api_server.dataset_cache.loads, 1)
+
+        self.assertEqual(self.client.get('/api/orders?from=not-a-date').status_code, 400)
+
+    def test_stats_endpoint(self):
+        OrderStore('data/orders.db').upsert_orders(pd.DataFrame({
+            'id': ['7', '8', '9'], 'col_7': ['Xác nhận', 'Hủy', 'Xác nhận'], 'col_16': ['1,000', '250', '500'],
+            'col_18': ['Shopee', 'Tiktok', 'Shopee'], 'col_19': ['2026-10-17 08:00', '2026-10-18 09:00', '2026-10-18 10:00']
+        }))
+
+        response = self.client.get('/api/orders/stats?group_by=platform&metric=count,sum:order_value&from=2026-10-18')
+        body = response.get_json()
+        self.assertEqual(body['groups'], [{'platform': 'Shopee', 'count': 1, 'sum:order_value': 500.0},
+                                          {'platform': 'Tiktok', 'count': 1, 'sum:order_value': 250.0}])
+        self.assertLess(len(response.data), 1000)
+
+        cached = self.client.get('/api/orders/stats?group_by=platform&metric=count,sum:order_value&from=2026-10-18',
+                                 headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get('/api/orders/stats?metric=median:order_value').status_code, 400)
+
+    def test_stats_by_region_from_store(self):
+        OrderStore('data/orders.db').upsert_orders(pd.DataFrame({
+            'id': ['7', '8', '9'], 'col_7': ['Xác nhận', 'Hủy', 'Xác nhận'], 'col_16': ['1,000', '250', '500'],
+            'col_18': ['Shopee', 'Tiktok', 'MIA.vn website'], 'col_19': ['2026-10-17 08:00', '2026-10-18 09:00', '']
+        }))
+
+        # Kho không lưu region → suy ra từ sàn khi đọc, giống orders_latest.csv
+        response = self.client.get('/api/orders/stats?group_by=region&metric=count,sum:order_value')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['groups'], [
+            {'region': 'Hà Nội', 'count': 1, 'sum:order_value': 250.0},
+            {'region': 'TP.HCM', 'count': 2, 'sum:order_value': 1500.0}])
+
+    def test_store_is_preferred(self):
+        OrderStore('data/orders.db').upsert_orders(pd.DataFrame({
+            'id': ['7', '8'], 'order_code': ['SO7', 'SO8'], 'col_7': ['Xác nhận', 'Hủy'],
+            'col_18': ['Shopee', 'Tiktok'], 'col_19': ['2026-10-18 08:00', '2026-10-18 09:00']
+        }))
+
+        body = self.client.get('/api/orders?status=cancelled').get_json()
+
+        # Đơn từ kho giữ hợp đồng của orders_latest.csv: mã đơn, status đã map, region theo sàn
+        self.assertEqual(body['source'], 'data/orders.db')
+        self.assertEqual([row['order_id'] for row in body['data']], ['SO8'])
+        self.assertEqual((body['data'][0]['status'], body['data'][0]['region']), ('cancelled', 'Hà Nội'))
+
+        rows = [json.loads(line) for line in
+                self.client.get('/api/orders?stream=ndjson&status=confirmed').data.splitlines()]
+        self.assertEqual([(row['order_id'], row['status']) for row in rows], [('SO7', 'confirmed')])
+
+    def test_products(self):
+        pd.DataFrame({'order_id': ['1', '1'], 'product_name': ['Áo', 'Quần'], 'quantity': [1, 2]}).to_csv(
+            'data/products_latest.csv', index=False)
+
+        body = self.client.get('/api/products?offset=1').get_json()
+
+        self.assertEqual(body['data'], [{'order_id': 1, 'product_name': 'Quần', 'quantity': 2}])
+        self.assertIsNone(body['next_offset'])
+
+
+if __name__ == '__main__':
+    unittest.main()
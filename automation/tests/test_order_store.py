@@ -0,0 +1,99 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+from unittest.mock import patch
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.order_store import OrderStore, open_order_store
+
+
+def make_orders(rows):
+    """rows: (id, platform, status, created, total)"""
+    return pd.DataFrame([{
+        'id': order_id,
+        'order_code': f'SO{order_id}',
+        'customer': f'Khach {order_id}',
+        'col_7': status,
+        'col_16': total,
+        'col_18': platform,
+        'col_19': created,
+        'scraped_at': '2025-07-01T10:00:00'
+    } for order_id, platform, status, created, total in rows])
+
+
+class TestOrderStore(unittest.TestCase):
+    def setUp(self):
+        self.db_path = os.path.join(tempfile.mkdtemp(), 'orders.db')
+        self.store = OrderStore(self.db_path)
+
+    def test_wal_mode_and_indexes(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            indexes = {row[1] for row in conn.execute("PRAGMA index_list(orders)")}
+        finally:
+            conn.close()
+        self.assertTrue({'idx_orders_platform', 'idx_orders_status', 'idx_orders_created_at'} <= indexes)
+
+    def test_schema_setup_runs_once_per_db(self):
+        with patch.object(OrderStore, '_connect', wraps=self.store._connect) as connect:
+            OrderStore(self.db_path)
+        connect.assert_not_called()
+
+        # File bị xoá (dọn data/) → lần tạo sau dựng lại schema
+        os.remove(self.db_path)
+        OrderStore(self.db_path).upsert_orders(make_orders([('1', 'Shopee', 'Chờ xử lý', '', '1')]))
+        self.assertEqual(OrderStore(self.db_path).count_orders(), 1)
+
+    def test_upsert_updates_existing_orders(self):
+        self.store.upsert_orders(make_orders([
+            ('1', 'Shopee', 'Chờ xử lý', '2025-07-01 08:00:00', '1,200,000'),
+            ('2', 'Tiktok', 'Chờ xử lý', '2025-07-01 09:00:00', '350,000'),
+            ('', '', '', '', '1,550,000'),  # dòng "Tổng cộng"
+        ]))
+        first = self.store.query_orders(order_ids=['1']).iloc[0]
+
+        stored = self.store.upsert_orders(make_orders([
+            ('1', 'Shopee', 'Xác nhận', '2025-07-01 08:00:00', '1,200,000'),
+            ('3', 'Shopee', 'Chờ xử lý', '2025-07-02 10:00:00', '90,000'),
+        ]))
+
+        self.assertEqual(stored, 2)
+        self.assertEqual(self.store.count_orders(), 3)
+        order = self.store.query_orders(order_ids=['1']).iloc[0]
+        self.assertEqual(order['status'], 'Xác nhận')
+        self.assertEqual(order['order_value'], 1200000)
+        self.assertEqual(order['created_at'], '2025-07-01T08:00:00')
+        self.assertEqual(order['first_seen_at'], first['first_seen_at'])
+
+    def test_query_filters(self):
+        self.store.upsert_orders(make_orders([
+            ('1', 'Shopee', 'Chờ xử lý', '2025-07-01 08:00:00', '100'),
+            ('2', 'Tiktok', 'Chờ xử lý', '2025-07-01 09:00:00', '200'),
+            ('3', 'Shopee', 'Xác nhận', '2025-07-02 10:00:00', '300'),
+        ]))
+
+        self.assertEqual(self.store.query_orders(platform='Shopee')['order_id'].tolist(), ['3', '1'])
+        self.assertEqual(self.store.query_orders(status=['Xác nhận'])['order_id'].tolist(), ['3'])
+        self.assertEqual(self.store.query_orders(date_to='2025-07-01')['order_id'].tolist(), ['2', '1'])
+        self.assertEqual(self.store.count_orders(platform='Shopee', date_from='2025-07-02'), 1)
+        self.assertEqual(self.store.query_orders(limit=1, offset=1)['order_id'].tolist(), ['2'])
+        self.assertEqual(self.store.query_orders(offset=1)['order_id'].tolist(), ['2', '1'])
+        self.assertEqual([order['order_id'] for order in self.store.iter_orders(offset=2)], ['1'])
+
+        with_payload = self.store.query_orders(order_ids=['2'], include_payload=True)
+        self.assertEqual(with_payload.iloc[0]['col_18'], 'Tiktok')
+
+    def test_open_order_store_respects_config(self):
+        self.assertIsNone(open_order_store({'order_store': {'enabled': False}}))
+        store = open_order_store({'order_store': {'enabled': True, 'db_path': self.db_path}})
+        self.assertEqual(store.db_path, self.db_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
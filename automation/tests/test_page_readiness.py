@@ -0,0 +1,63 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.page_readiness import PageReadiness, WAIT_SCRIPT
+
+
+class SliceDriver:
+    """Driver giả: execute_async_script trả ready sau `ready_after` lần gọi"""
+
+    def __init__(self, ready_after):
+        self.ready_after = ready_after
+        self.async_calls = []
+        self.scripts = []
+
+    def execute_async_script(self, script, *args):
+        self.async_calls.append(args)
+        return {'ready': len(self.async_calls) >= self.ready_after, 'mutations': 0}
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        return True
+
+
+class TestPageReadiness(unittest.TestCase):
+    def test_returns_as_soon_as_page_reports_ready(self):
+        driver = SliceDriver(ready_after=3)
+        readiness = PageReadiness(driver, slice_seconds=0.5)
+
+        self.assertTrue(readiness.wait_for_table_ready(timeout=10))
+        self.assertEqual(len(driver.async_calls), 3)
+
+        # Mỗi lần gọi chỉ chờ tối đa 1 slice, không vượt script timeout của driver
+        self.assertTrue(all(args[4] <= 500 for args in driver.async_calls))
+
+    def test_change_wait_uses_armed_key(self):
+        driver = SliceDriver(ready_after=1)
+        readiness = PageReadiness(driver)
+        clicked = []
+
+        self.assertTrue(readiness.wait_for_change(lambda: clicked.append(True)))
+        key, selector, require_change = driver.async_calls[0][:3]
+        self.assertEqual(clicked, [True])
+        self.assertTrue(require_change)
+        self.assertEqual(selector, "#orderTB tbody")
+        self.assertTrue(key)
+
+    def test_timeout_returns_false(self):
+        driver = SliceDriver(ready_after=10 ** 9)
+        readiness = PageReadiness(driver, slice_seconds=0.01)
+
+        self.assertFalse(readiness.wait_for_ajax_idle(timeout=0.05))
+        self.assertNotIn(WAIT_SCRIPT, driver.scripts)  # observer được gỡ bằng DISARM_SCRIPT
+
+    def test_driver_without_async_support(self):
+        readiness = PageReadiness(object())
+        self.assertFalse(readiness.wait_for_ajax_idle(timeout=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
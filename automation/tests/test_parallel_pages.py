@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import queue
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from one_automation import JuneFreshSessionWithProducts
+
+
+class TestParallelPages(unittest.TestCase):
+    def test_merge_deduplicates_by_order_id(self):
+        processor = JuneFreshSessionWithProducts()
+        page_results = {
+            2: [{'order_id_clean': '3'}, {'order_id_clean': '2'}],
+            1: [{'order_id_clean': '1'}, {'order_id_clean': '2'}],
+        }
+
+        merged, duplicates = processor.merge_and_deduplicate(page_results)
+
+        self.assertEqual([o['order_id_clean'] for o in merged], ['1', '2', '3'])
+        self.assertEqual(duplicates, 1)
+
+    def test_workers_drain_shared_queue(self):
+        processor = JuneFreshSessionWithProducts(workers=3, page_delay=0)
+        processor.process_single_page = lambda page_num, label: (
+            None if page_num == 4 else [{'order_id_clean': str(page_num)}]
+        )
+
+        page_queue = queue.Queue()
+        for page_num in range(1, 7):
+            page_queue.put(page_num)
+        page_results, failed_pages, worker_stats = {}, [], {}
+
+        processor._page_worker(1, page_queue, page_results, failed_pages, worker_stats)
+
+        self.assertEqual(sorted(page_results), [1, 2, 3, 5, 6])
+        self.assertEqual(failed_pages, [4])
+        self.assertEqual(worker_stats['W1']['pages'], 5)
+        self.assertEqual(worker_stats['W1']['orders'], 5)
+
+    def test_each_worker_has_own_session_file(self):
+        processor = JuneFreshSessionWithProducts(workers=2, page_delay=0)
+        session_files = []
+        processor.login_and_setup = lambda session_file=None: (
+            session_files.append(session_file) or (None, None, None, None, None))
+
+        processor.process_single_page(1, 'W1')
+        processor.process_single_page(2, 'W2')
+        processor.process_single_page(3)
+
+        self.assertEqual(session_files, ['session_data_w1.pkl', 'session_data_w2.pkl', None])
+
+
+if __name__ == '__main__':
+    unittest.main()
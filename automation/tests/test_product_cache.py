@@ -0,0 +1,76 @@
+import unittest
+import sys
+import os
+import sqlite3
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.product_cache import ProductDetailCache, statuses_from_orders
+from one_automation import JuneFreshSessionWithProducts
+
+
+def details(order_id):
+    return {'products': [{'name': f'SP{order_id}', 'quantity': 1}], 'product_count': 1, 'raw_detail': f'SP{order_id}(1)'}
+
+
+class TestProductDetailCache(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'product_cache.db')
+        self.cache = ProductDetailCache(self.path, ttl_hours=24)
+
+    def test_only_misses_are_returned_for_fetching(self):
+        self.cache.put_many({'1': details('1'), '2': details('2')}, {'1': 'Chờ xử lý', '2': 'Chờ xử lý'})
+
+        cached, missing = self.cache.get_many(['1', '2', '3'], {'1': 'Chờ xử lý', '2': 'Chờ xử lý'})
+
+        self.assertEqual(sorted(cached), ['1', '2'])
+        self.assertEqual(cached['1']['products'][0]['name'], 'SP1')
+        self.assertEqual(missing, ['3'])
+        self.assertEqual(self.cache.stats()['hit_ratio'], round(2 / 3, 4))
+
+    def test_status_change_invalidates_entry(self):
+        self.cache.put_many({'1': details('1')}, {'1': 'Chờ xử lý'})
+
+        cached, missing = self.cache.get_many(['1'], {'1': 'Đã đóng gói'})
+
+        self.assertEqual(cached, {})
+        self.assertEqual(missing, ['1'])
+        self.assertEqual(self.cache.stats()['invalidated'], 1)
+
+    def test_expired_entries_are_refetched_and_purged(self):
+        self.cache.put_many({'1': details('1')})
+        conn = sqlite3.connect(self.path)
+        with conn:
+            conn.execute("UPDATE product_details SET fetched_at = '2000-01-01T00:00:00'")
+        conn.close()
+
+        cached, missing = self.cache.get_many(['1'])
+
+        self.assertEqual(missing, ['1'])
+        self.assertEqual(self.cache.stats()['expired'], 1)
+        self.assertEqual(self.cache.purge_expired(), 1)
+
+    def test_database_created_lazily(self):
+        path = os.path.join(tempfile.mkdtemp(), 'lazy.db')
+        ProductDetailCache(path)
+        self.assertFalse(os.path.exists(path))
+
+    def test_statuses_from_orders(self):
+        orders = [{'id': '1', 'col_7': 'Xác nhận '}, {'id': '', 'col_7': 'Tổng'}, {'id': '2'}]
+        self.assertEqual(statuses_from_orders(orders), {'1': 'Xác nhận', '2': ''})
+
+    def test_page_processor_skips_network_on_full_hit(self):
+        processor = JuneFreshSessionWithProducts(use_cache=False)
+        processor.product_cache = self.cache
+        self.cache.put_many({'1': details('1'), '2': details('2')})
+
+        # driver=None: mọi đơn đều có trong cache nên không được đụng tới trình duyệt / API
+        product_details = processor.extract_product_details_batch(['1', '2'], None, None)
+
+        self.assertEqual(sorted(product_details), ['1', '2'])
+        self.assertEqual(self.cache.stats()['hits'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import sys
+import os
+import json
+import logging
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation_enhanced import EnhancedOneAutomationSystem
+from one_automation import JuneFreshSessionWithProducts
+from scripts.product_parser import build_product_details
+
+
+class TestEnhancedMerge(unittest.TestCase):
+    def make_system(self):
+        system = EnhancedOneAutomationSystem.__new__(EnhancedOneAutomationSystem)
+        system.logger = logging.getLogger('test_product_merge')
+        system.products_df = pd.DataFrame()
+        return system
+
+    def test_merge_returns_frame_and_long_products_table(self):
+        system = self.make_system()
+        orders = [
+            {'id': '10', 'order_code': 'SO10', 'customer': 'Khach 10', 'scraped_at': 't1'},
+            {'id': '11', 'order_code': 'SO11', 'customer': 'Khach 11', 'scraped_at': 't2'},
+        ]
+        product_details = build_product_details([{'id': 10, 'detail': 'Ao(2), Quan(1)', 'phone': '090'}])
+
+        df = system.merge_product_details(orders, product_details)
+
+        self.assertNotIn('products', df.columns)
+        self.assertEqual(df['product_count'].tolist(), [2, 0])
+        self.assertEqual(df['product_summary'].tolist(), ['Ao; Quan', 'Details not available'])
+        self.assertEqual(df['api_phone'].iloc[0], '090')
+
+        export_df = system.create_products_export(df)
+        self.assertEqual(list(export_df.columns),
+                         ['order_id', 'order_code', 'customer', 'product_name', 'quantity', 'scraped_at'])
+        self.assertEqual(export_df.values.tolist(), [
+            ['10', 'SO10', 'Khach 10', 'Ao', 2, 't1'],
+            ['10', 'SO10', 'Khach 10', 'Quan', 1, 't1'],
+        ])
+
+
+class TestPageProducts(unittest.TestCase):
+    def test_merged_products_follow_deduplicated_orders(self):
+        processor = JuneFreshSessionWithProducts(use_cache=False)
+        processor.page_products = {
+            1: pd.DataFrame({'order_id': ['1', '2'], 'product_name': ['A', 'B'], 'quantity': [1, 2]}),
+            2: pd.DataFrame({'order_id': ['2', '3'], 'product_name': ['B', 'C'], 'quantity': [2, 3]}),
+        }
+        merged_orders, _ = processor.merge_and_deduplicate({
+            1: [{'order_id_clean': '1', 'page_number': 1}, {'order_id_clean': '2', 'page_number': 1}],
+            2: [{'order_id_clean': '2', 'page_number': 2}, {'order_id_clean': '3', 'page_number': 2}],
+        })
+
+        products = processor.merge_page_products(merged_orders)
+
+        self.assertEqual(products.values.tolist(), [['1', 'A', 1], ['2', 'B', 2], ['3', 'C', 3]])
+        json.dumps(products.to_dict('records'))
+
+
+if __name__ == '__main__':
+    unittest.main()
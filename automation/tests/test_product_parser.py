@@ -0,0 +1,127 @@
+import unittest
+import sys
+import os
+import re
+import random
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.product_parser import (
+    parse_product_details, summarize_products, products_by_order, build_product_details,
+    product_details_frame, products_table, join_product_details
+)
+
+
+def legacy_parse(detail_string):
+    """Vòng lặp parse_product_detail() cũ (đã bỏ) - dùng làm chuẩn so sánh"""
+    products = []
+    for item in detail_string.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        quantity_match = re.search(r'\((\d+)\)$', item)
+        if quantity_match:
+            quantity = int(quantity_match.group(1))
+            product_name = item[:quantity_match.start()].strip()
+        else:
+            quantity = 1
+            product_name = item
+        if product_name:
+            products.append({'name': product_name, 'quantity': quantity})
+    return products
+
+
+def random_details(count, seed=7):
+    rng = random.Random(seed)
+    names = ['Áo thun', 'Quần jean', 'Mũ (bảo hiểm)', 'Giày', 'Tất cổ cao', 'Balo 20L']
+    details = []
+    for _ in range(count):
+        items = []
+        for _ in range(rng.randint(0, 6)):
+            name = rng.choice(names)
+            items.append(f"{name}({rng.randint(1, 9)})" if rng.random() < 0.8 else name)
+        if rng.random() < 0.1:
+            items.append(' ')
+        details.append(', '.join(items))
+    return details
+
+
+class TestProductParser(unittest.TestCase):
+    def test_long_table_and_summary(self):
+        details = pd.Series(['Áo thun(2), Quần jean , Mũ (bảo hiểm)(3),,(4)', 'A(1),B(1),C(1),D(5)'],
+                            index=['1', '2'])
+
+        products = parse_product_details(details)
+        self.assertEqual(list(products.columns), ['order_id', 'product_name', 'quantity'])
+        self.assertEqual(products[products['order_id'] == '1']['product_name'].tolist(),
+                         ['Áo thun', 'Quần jean', 'Mũ (bảo hiểm)'])
+        self.assertEqual(products[products['order_id'] == '1']['quantity'].tolist(), [2, 1, 3])
+
+        summary = summarize_products(products)
+        self.assertEqual(summary.loc['1', 'product_count'], 3)
+        self.assertEqual(summary.loc['1', 'total_items'], 6)
+        self.assertEqual(summary.loc['2', 'product_summary'], 'A; B; C')
+
+    def test_matches_legacy_parser(self):
+        details = random_details(500)
+        order_ids = [str(i) for i in range(len(details))]
+
+        products = products_by_order(parse_product_details(pd.Series(details, index=order_ids)))
+
+        for order_id, detail in zip(order_ids, details):
+            self.assertEqual(products.get(order_id, []), legacy_parse(detail), detail)
+
+    def test_build_product_details(self):
+        records = [
+            {'id': 503313, 'detail': 'SP A(2), SP B', 'customer': 'Khach 1'},
+            {'id': 503314, 'detail': ''},
+            {'id': None, 'detail': 'SP C(1)'},
+            {'id': 503315, 'detail': ', ,'},
+        ]
+
+        details = build_product_details(records)
+
+        self.assertEqual(sorted(details), ['503313', '503315'])
+        self.assertNotIn('products', details['503313'])
+        self.assertEqual(details['503313']['product_count'], 2)
+        self.assertEqual(details['503313']['total_items'], 3)
+        self.assertEqual(details['503313']['product_summary'], 'SP A; SP B')
+        self.assertEqual(details['503313']['customer'], 'Khach 1')
+        self.assertEqual(details['503315']['product_count'], 0)
+        self.assertEqual(details['503315']['product_summary'], 'No products')
+
+    def test_join_keeps_order_rows_and_defaults(self):
+        details_df = product_details_frame(build_product_details([
+            {'id': 1, 'detail': 'SP A(2), SP B', 'transporter': 'GHN'},
+            {'id': 2, 'detail': ', ,'},
+        ]))
+        orders = pd.DataFrame({'id': ['2', ' 1', '3'], 'customer': ['B', 'A', 'C']})
+
+        merged = join_product_details(orders, details_df, indicator='has_product_details')
+
+        self.assertEqual(merged['customer'].tolist(), ['B', 'A', 'C'])
+        self.assertEqual(merged['product_count'].tolist(), [0, 2, 0])
+        self.assertEqual(merged['total_items'].tolist(), [0, 3, 0])
+        self.assertEqual(merged['product_summary'].tolist(), ['No products', 'SP A; SP B', 'Details not available'])
+        self.assertEqual(merged['api_transporter'].tolist()[1], 'GHN')
+        self.assertEqual(merged['has_product_details'].tolist(), [True, True, False])
+
+        products = products_table(details_df)
+        self.assertEqual(products.values.tolist(), [['1', 'SP A', 2], ['1', 'SP B', 1]])
+
+    def test_large_batch_is_fast(self):
+        details = pd.Series(random_details(20000), index=[str(i) for i in range(20000)])
+
+        start = time.perf_counter()
+        summary = summarize_products(parse_product_details(details))
+        elapsed = time.perf_counter() - start
+
+        self.assertGreater(len(summary), 0)
+        self.assertLess(elapsed, 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+import sys
+import os
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.sla_engine import (
+    evaluate_sla, summarize_platform, sla_alerts, compile_sla_rules, DEFAULT_SLA_RULES
+)
+from sla_monitor import SLAMonitor
+
+
+NOW = datetime(2026, 10, 18, 10, 30)
+
+
+def prepared_orders():
+    return pd.DataFrame({
+        'id': ['1', '2', '3', '4', '5', '6'],
+        'platform_clean': ['shopee', 'shopee', 'tiktok', 'tiktok', 'other', 'shopee'],
+        'created_datetime': pd.to_datetime([
+            '2026-10-17 19:00',  # sau 18h hôm qua
+            '2026-10-17 17:00',  # trước cutoff
+            '2026-10-17 15:00',  # sau 14h hôm qua
+            '2026-10-18 08:00',
+            '2026-10-16 09:00',  # sàn khác: chỉ theo dõi đơn hôm nay
+            '2026-10-18 10:00'
+        ])
+    })
+
+
+class TestSLAEngine(unittest.TestCase):
+    def test_deadlines_and_overdue_flags(self):
+        evaluated = evaluate_sla(prepared_orders(), NOW)
+
+        self.assertEqual(evaluated['after_cutoff'].tolist(), [True, False, True, True, False, True])
+        # Shopee: 9h đã quá hạn, còn 1.5h tới hạn bàn giao 12h
+        self.assertTrue(evaluated.loc[0, 'confirm_overdue'])
+        self.assertTrue(np.isnan(evaluated.loc[0, 'time_to_confirm']))
+        self.assertAlmostEqual(evaluated.loc[0, 'time_to_handover'], 1.5)
+        # TikTok: đơn sau 14h ngày N (hoặc trước 14h ngày N+1) → bàn giao trước 21h ngày N+1
+        self.assertEqual(evaluated.loc[2, 'handover_deadline'], pd.Timestamp('2026-10-18 21:00'))
+        self.assertEqual(evaluated.loc[3, 'handover_deadline'], pd.Timestamp('2026-10-18 21:00'))
+        self.assertFalse(evaluated.loc[2, 'needs_confirm'])
+        self.assertFalse(evaluated.loc[4, 'needs_handover'])
+        # Đơn hôm nay (trước 18h) vẫn thuộc lô hôm qua, nhưng tạo sau 9h → hạn xác nhận 9h hôm sau
+        self.assertEqual(evaluated.loc[5, 'confirm_deadline'], pd.Timestamp('2026-10-19 09:00'))
+        self.assertEqual(evaluated.loc[5, 'handover_deadline'], pd.Timestamp('2026-10-18 12:00'))
+
+    def test_deadline_is_after_creation_between_deadline_and_cutoff(self):
+        created = pd.date_range('2026-10-18 00:00', '2026-10-18 23:59', freq='15min')
+        orders = pd.DataFrame({'platform_clean': ['shopee'] * len(created) + ['tiktok'] * len(created),
+                               'created_datetime': created.append(created)})
+
+        evaluated = evaluate_sla(orders, NOW)
+
+        for kind in ('confirm', 'handover'):
+            deadline = evaluated[f'{kind}_deadline'].dropna()
+            self.assertTrue((deadline > evaluated.loc[deadline.index, 'created_datetime']).all(), kind)
+        # Shopee 10h: lô hôm qua đã qua hạn 9h → không quá hạn ngay khi vừa tạo
+        ten = evaluated[evaluated['created_datetime'] == pd.Timestamp('2026-10-18 10:00')].iloc[0]
+        self.assertEqual(ten['confirm_deadline'], pd.Timestamp('2026-10-19 09:00'))
+
+    def test_platform_summary_matches_report_format(self):
+        evaluated = evaluate_sla(prepared_orders(), NOW)
+
+        shopee = summarize_platform(evaluated, 'shopee', NOW)
+        self.assertEqual(shopee['total_orders'], 3)
+        self.assertEqual(shopee['after_cutoff'], 2)
+        self.assertEqual(shopee['overdue_confirm'], 1)
+        self.assertEqual(shopee['overdue_handover'], 0)
+        self.assertEqual(shopee['confirm_deadline'], '2026-10-18T09:00:00')
+        status = shopee['sla_status'][0]
+        self.assertEqual(status['order_id'], '1')
+        self.assertIsNone(status['time_to_confirm'])
+        self.assertEqual(status['handover_deadline'], '2026-10-18T12:00:00')
+        json.dumps(shopee)
+
+        tiktok = summarize_platform(evaluated, 'tiktok', NOW)
+        self.assertNotIn('need_confirm', tiktok)
+        self.assertEqual(tiktok['need_handover'], 2)
+
+    def test_alerts_from_masks(self):
+        evaluated = evaluate_sla(prepared_orders(), NOW)
+
+        alerts = sla_alerts(evaluated, [2, 1])
+
+        self.assertEqual([a['type'] for a in alerts], ['CRITICAL', 'WARNING', 'WARNING'])
+        self.assertEqual(alerts[0]['count'], 1)
+        self.assertEqual(alerts[0]['message'], '🚨 1 đơn hàng QUÁ HẠN xác nhận (9h sáng)')
+        self.assertEqual(alerts[1]['message'], '⚠️ Đơn 1 sắp hết hạn bàn giao (1.5h)')
+
+    def test_monitor_report(self):
+        monitor = SLAMonitor(config_path=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                      'config', 'sla_config.json'))
+        monitor.current_time = NOW
+        orders = prepared_orders().rename(columns={'platform_clean': 'platform'})
+
+        report = monitor.analyze_orders_sla(orders)
+
+        self.assertEqual(report['shopee']['after_cutoff'], 2)
+        self.assertEqual(report['tiktok']['after_cutoff'], 2)
+        self.assertEqual(report['other_platforms']['today_orders'], 0)
+        self.assertEqual(len(report['alerts']), 3)
+
+    def test_rules_compiled_from_config_sources(self):
+        config = {
+            'shopee': {'name': 'Shopee', 'cutoff_time': '18:00',
+                       'rules': {'confirm_deadline': '09:00', 'handover_deadline': '12:00'}},
+            'lazada': {'name': 'Lazada', 'cutoff_time': '16:00', 'rules': {'handover_deadline': '10:00+2'}},
+            'other_platforms': {'rules': {'default_deadline': '17:00'}},
+            'warning_settings': {'warning_hours': [2, 1]}
+        }
+        # Dạng phẳng của GoogleSheetsConfigService.get_sla_rules(): ghi đè hạn xác nhận Shopee
+        sheets = {'shopee': {'confirm_hours': 6}, 'sendo': {'handover_hours': 48}}
+
+        rules = compile_sla_rules(config, sheets)
+
+        self.assertEqual(rules.platforms, ['shopee', 'lazada', 'other', 'sendo'])
+        orders = pd.DataFrame({'id': ['1', '2', '3', '4'], 'platform': ['Shopee Mall', 'LAZADA', 'Sendo', 'Tiki']})
+        platform_clean = rules.match_platforms(orders['platform'])
+        self.assertEqual(platform_clean.tolist(), ['shopee', 'lazada', 'sendo', 'other'])
+
+        orders['platform_clean'] = platform_clean
+        orders['created_datetime'] = pd.to_datetime(['2026-10-18 08:00', '2026-10-17 17:00',
+                                                     '2026-10-18 01:00', '2026-10-18 02:00'])
+        evaluated = evaluate_sla(orders, NOW, rules)
+
+        self.assertEqual(evaluated.loc[0, 'confirm_deadline'], pd.Timestamp('2026-10-18 14:00'))
+        self.assertEqual(evaluated.loc[0, 'handover_deadline'], pd.Timestamp('2026-10-18 12:00'))
+        self.assertEqual(evaluated.loc[1, 'handover_deadline'], pd.Timestamp('2026-10-19 10:00'))
+        self.assertEqual(evaluated.loc[2, 'handover_deadline'], pd.Timestamp('2026-10-20 01:00'))
+        self.assertEqual(evaluated.loc[3, 'handover_deadline'], pd.Timestamp('2026-10-18 17:00'))
+        self.assertTrue(evaluated['after_cutoff'].all())
+        # Mốc của từng ngày chỉ tính một lần
+        self.assertIs(rules.for_day(NOW), rules.for_day(NOW.replace(hour=23)))
+        # Sheets đổi hạn xác nhận Shopee sang 6h → nhãn tự sinh, không giữ nhãn của config
+        self.assertEqual(rules.label('shopee', 'confirm'), '6h')
+        self.assertEqual(DEFAULT_SLA_RULES.label('shopee', 'handover'), '12h trước')
+
+    def test_invalid_rule_time_is_rejected(self):
+        with self.assertRaises(ValueError):
+            compile_sla_rules({'shopee': {'cutoff_time': '6pm'}})
+
+    def test_full_day_is_sub_second(self):
+        count = 100000
+        rng = np.random.default_rng(3)
+        orders = pd.DataFrame({
+            'id': np.arange(count).astype(str),
+            'platform_clean': rng.choice(['shopee', 'tiktok', 'other'], count),
+            'created_datetime': pd.Timestamp(NOW) - pd.to_timedelta(rng.integers(0, 36 * 3600, count), unit='s')
+        })
+
+        start = time.perf_counter()
+        evaluated = evaluate_sla(orders, NOW)
+        alerts = sla_alerts(evaluated, [2, 1, 0.5])
+        elapsed = time.perf_counter() - start
+
+        self.assertGreater(len(alerts), 0)
+        self.assertLess(elapsed, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
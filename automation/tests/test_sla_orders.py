@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation_enhanced import EnhancedOneAutomationSystem
+from scripts.sla_engine import order_sla_table, attach_sla_columns
+
+
+def legacy_add_sla_info(orders_df, sla_report):
+    """Vòng lặp mask cũ của add_sla_info_to_orders() - dùng làm chuẩn so sánh"""
+    orders_df['sla_platform'] = 'other'
+    orders_df['sla_deadline'] = None
+    orders_df['sla_status'] = 'normal'
+    orders_df['sla_priority'] = 'low'
+    for platform, urgent_hours in (('shopee', 2), ('tiktok', 4)):
+        for status in sla_report.get(platform, {}).get('sla_status', []):
+            mask = orders_df['id'] == status.get('order_id')
+            orders_df.loc[mask, 'sla_platform'] = platform
+            orders_df.loc[mask, 'sla_deadline'] = status.get('handover_deadline', '')
+            if status.get('handover_overdue') or status.get('confirm_overdue'):
+                orders_df.loc[mask, 'sla_status'] = 'overdue'
+                orders_df.loc[mask, 'sla_priority'] = 'critical'
+            elif status.get('time_to_handover', 24) < urgent_hours:
+                orders_df.loc[mask, 'sla_status'] = 'urgent'
+                orders_df.loc[mask, 'sla_priority'] = 'high'
+    return orders_df
+
+
+def make_report(count, seed=5):
+    rng = np.random.default_rng(seed)
+    order_ids = np.arange(count).astype(str)
+    report = {'shopee': {'sla_status': []}, 'tiktok': {'sla_status': []}}
+    for order_id, platform, overdue, hours in zip(order_ids, rng.choice(['shopee', 'tiktok', 'other'], count),
+                                                  rng.random(count) < 0.2, rng.random(count) * 6):
+        if platform == 'other':
+            continue
+        report[platform]['sla_status'].append({
+            'order_id': order_id,
+            'confirm_overdue': False,
+            'handover_overdue': bool(overdue),
+            'time_to_handover': None if overdue else float(hours),
+            'handover_deadline': f'2026-10-18T{12 if platform == "shopee" else 21}:00:00'
+        })
+    return pd.DataFrame({'id': order_ids, 'customer': 'Khach'}), report
+
+
+class TestOrderSLAColumns(unittest.TestCase):
+    def test_matches_legacy_loop(self):
+        orders, report = make_report(400)
+
+        expected = legacy_add_sla_info(orders.copy(), report)
+        actual = attach_sla_columns(orders.copy(), order_sla_table(report))
+
+        pd.testing.assert_frame_equal(actual, expected)
+
+    def test_other_platforms_section_keeps_other_label(self):
+        report = {'other_platforms': {'sla_status': [{'order_id': '1', 'handover_overdue': True}]}}
+
+        table = order_sla_table(report)
+
+        self.assertEqual(table.loc['1', 'sla_platform'], 'other')
+        self.assertEqual(table.loc['1', 'sla_status'], 'overdue')
+
+    def test_enhanced_system_uses_keyed_update(self):
+        system = EnhancedOneAutomationSystem.__new__(EnhancedOneAutomationSystem)
+        system.logger = logging.getLogger('test_sla_orders')
+        orders = pd.DataFrame({'id': ['1', ' 2', '3']})
+        report = {'tiktok': {'sla_status': [{'order_id': '2', 'handover_overdue': False,
+                                             'time_to_handover': 3.0, 'handover_deadline': 'D'}]}}
+
+        result = system.add_sla_info_to_orders(orders, report)
+
+        self.assertEqual(result['sla_platform'].tolist(), ['other', 'tiktok', 'other'])
+        self.assertEqual(result['sla_status'].tolist(), ['normal', 'urgent', 'normal'])
+        self.assertEqual(result['sla_deadline'].tolist(), [None, 'D', None])
+
+    def test_scales_linearly(self):
+        def best_time(count):
+            orders, report = make_report(count)
+            timings = []
+            for _ in range(3):
+                start = time.perf_counter()
+                attach_sla_columns(orders.copy(), order_sla_table(report))
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        small, large = best_time(20000), best_time(80000)
+
+        # 4x số đơn: tuyến tính ~4x, vòng lặp mask O(n·m) cũ ~16x
+        self.assertLess(large / small, 8)
+        self.assertLess(large, 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
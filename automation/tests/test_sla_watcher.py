@@ -0,0 +1,119 @@
+import unittest
+import sys
+import os
+import logging
+import tempfile
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sla_monitor import SLAMonitor
+from scripts.sla_watcher import SLAWatcher
+from scripts.order_store import OrderStore
+
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'sla_config.json')
+START = datetime(2026, 10, 18, 8, 0)
+
+
+def open_orders():
+    return pd.DataFrame({
+        'id': ['1', '2'],
+        'platform': ['Shopee', 'TikTok'],
+        'created_datetime': pd.to_datetime(['2026-10-17 19:00', '2026-10-17 15:00'])
+    })
+
+
+class TestSLAWatcher(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger('SLAMonitor').setLevel(logging.WARNING)
+        self.monitor = SLAMonitor(config_path=CONFIG_PATH)
+        self.now = START
+        self.version = 'v1'
+        self.alerts = []
+        self.watcher = SLAWatcher(self.monitor, on_alert=self.alerts.append, warning_hours=[2, 1, 0.5],
+                                  source=open_orders, version=lambda: self.version, clock=lambda: self.now)
+
+    def test_initial_load_reports_current_state_once(self):
+        alerts = self.watcher.load(open_orders(), START)
+
+        # Shopee: xác nhận 9h còn 1h → ngưỡng 1h; bàn giao 12h còn 4h → chưa cảnh báo
+        self.assertEqual([(a['order_id'], a['deadline_type'], a['level']) for a in alerts], [('1', 'confirm', 2)])
+        # Sự kiện gần nhất: còn 0.5h tới hạn xác nhận (8:30)
+        self.assertEqual(self.watcher.seconds_until_next(START), 30 * 60)
+        self.assertEqual(self.watcher.process_due(START), [])
+
+    def test_events_fire_only_on_state_change(self):
+        self.watcher.load(open_orders(), START)
+
+        fired = []
+        for minute in range(0, 14 * 60, 5):
+            fired.extend(self.watcher.process_due(START + timedelta(minutes=minute)))
+
+        summary = [(a['order_id'], a['deadline_type'], a['type'], a['level']) for a in fired]
+        self.assertEqual(summary, [
+            ('1', 'confirm', 'WARNING', 3),     # 8:30 còn 0.5h
+            ('1', 'confirm', 'CRITICAL', 4),    # 9:00 quá hạn
+            ('1', 'handover', 'WARNING', 1),    # 10:00 còn 2h
+            ('1', 'handover', 'WARNING', 2),
+            ('1', 'handover', 'WARNING', 3),
+            ('1', 'handover', 'CRITICAL', 4),   # 12:00
+            ('2', 'handover', 'WARNING', 1),    # 19:00 còn 2h tới 21h
+            ('2', 'handover', 'WARNING', 2),
+            ('2', 'handover', 'WARNING', 3),
+            ('2', 'handover', 'CRITICAL', 4),   # 21:00
+        ])
+        self.assertIn('QUÁ HẠN xác nhận (9h sáng)', fired[1]['message'])
+
+    def test_refresh_reloads_on_new_scrape_without_repeating_alerts(self):
+        self.assertTrue(self.watcher.refresh(force=True))
+        self.assertEqual(len(self.alerts), 1)
+
+        self.assertFalse(self.watcher.refresh())
+
+        self.version = 'v2'
+        self.assertTrue(self.watcher.refresh())
+        self.assertEqual(len(self.alerts), 1)
+
+
+class TestSLAWatcherStore(unittest.TestCase):
+    def setUp(self):
+        logging.getLogger('SLAMonitor').setLevel(logging.WARNING)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def test_default_loader_keys_alerts_by_order_id_and_skips_closed(self):
+        store = OrderStore('data/orders.db')
+        store.upsert_orders(pd.DataFrame({
+            'id': ['5001', '5002', '5003'],
+            'col_7': ['Xác nhận', 'Hủy', 'Hoàn thành'],
+            'col_18': ['Shopee'] * 3,
+            'col_19': ['2026-10-17 19:00'] * 3
+        }))
+        alerts = []
+        watcher = SLAWatcher(SLAMonitor(config_path=CONFIG_PATH), on_alert=alerts.append,
+                             warning_hours=[2, 1, 0.5], clock=lambda: START)
+
+        watcher.refresh(force=True)
+
+        self.assertEqual([(a['order_id'], a['deadline_type']) for a in alerts], [('5001', 'confirm')])
+        self.assertIn('Đơn 5001', alerts[0]['message'])
+        self.assertEqual({order_id for order_id, _ in watcher.deadlines}, {'5001'})
+
+        # Lần scrape sau: đơn đã huỷ → không còn hạn nào, đơn mới không có id bị bỏ qua
+        store.upsert_orders(pd.DataFrame({'id': ['5001'], 'col_7': ['Đã hủy'], 'col_18': ['Shopee'],
+                                          'col_19': ['2026-10-17 19:00']}))
+        watcher.load(watcher.monitor.load_orders(), START)
+        self.assertEqual(watcher.deadlines, {})
+        self.assertEqual(watcher.load(pd.DataFrame({'id': ['', None], 'platform': ['Shopee'] * 2,
+                                                    'created_datetime': pd.to_datetime(['2026-10-17 19:00'] * 2)}),
+                                      START), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import unittest
+import sys
+import os
+import logging
+import tempfile
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from automation import OneAutomationSystem
+from scripts.incremental import WatermarkStore
+
+
+class WindowDriver:
+    """Driver giả: trả về bảng theo từng cửa sổ dòng dạng chuỗi phân tách như ROW_WINDOW_SCRIPT"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.window_calls = []
+
+    def execute_script(self, script, *args):
+        if script == OneAutomationSystem.ROW_COUNT_SCRIPT:
+            return len(self.rows)
+        start, end = args
+        self.window_calls.append((start, end))
+        return '\x1e'.join('\x1f'.join(cells) for cells in self.rows[start:end])
+
+
+class TestStreamingRows(unittest.TestCase):
+    def make_system(self, rows, window_size=2):
+        system = OneAutomationSystem.__new__(OneAutomationSystem)
+        system.config = {'data_processing': {'row_window_size': window_size, 'enable_fast_mode': False}}
+        system.logger = logging.getLogger('test_streaming_rows')
+        system.driver = WindowDriver(rows)
+        return system
+
+    def test_rows_are_read_in_windows(self):
+        rows = [['', str(i), f'SO{i}', '', f'Khach {i}'] for i in range(1, 6)]
+        system = self.make_system(rows)
+
+        orders = system.scrape_order_data(stream=True)
+        first = next(orders)
+
+        # Chỉ cửa sổ đầu tiên được đọc trước khi order đầu tiên được trả ra
+        self.assertEqual(system.driver.window_calls, [(0, 2)])
+        self.assertEqual(first['id'], '1')
+        self.assertEqual(first['order_code'], 'SO1')
+        self.assertEqual(first['customer'], 'Khach 1')
+
+        remaining = list(orders)
+        self.assertEqual([o['id'] for o in remaining], ['2', '3', '4', '5'])
+        self.assertEqual(system.driver.window_calls, [(0, 2), (2, 4), (4, 6)])
+
+    def test_process_order_data_consumes_generator(self):
+        rows = [['', str(i), f'SO{i}'] for i in range(1, 8)]
+        system = self.make_system(rows, window_size=3)
+
+        df = system.process_order_data(system.scrape_order_data(stream=True))
+
+        self.assertEqual(len(df), 7)
+        self.assertEqual(sorted(df['id'].tolist()), [str(i) for i in range(1, 8)])
+
+    def test_empty_stream_gives_empty_frame(self):
+        system = self.make_system([])
+        system.driver.find_elements = lambda by, selector: []
+
+        df = system.process_order_data(system.scrape_order_data(stream=True))
+        self.assertTrue(df.empty)
+
+
+class TestStreamingRun(unittest.TestCase):
+    def make_system(self, rows):
+        system = TestStreamingRows.make_system(None, rows)
+        system.driver.find_elements = lambda by, selector: []
+        system.setup_driver = system.login_to_one = system.navigate_to_orders = lambda: True
+        system.get_incremental_window = lambda: None
+        system.store_orders = lambda df: len(df)
+        system.export_data = lambda df: {}
+        system.send_notification = lambda result: None
+        system.release_driver = lambda: None
+        return system
+
+    def test_run_with_progress_callback_on_stream(self):
+        system = self.make_system([['', str(i), f'SO{i}'] for i in range(1, 4)])
+        events = []
+
+        # Callback 2 tham số như cũ vẫn chạy được; số dòng đi qua metrics_callback
+        result = system.run_automation(progress_callback=lambda message, percent: events.append(percent),
+                                       metrics_callback=events.append)
+
+        self.assertTrue(result['success'], result['error'])
+        self.assertEqual(result['order_count'], 3)
+        self.assertEqual(events[events.index(80) + 1], 3)
+
+    def test_empty_stream_fails_with_scrape_error(self):
+        result = self.make_system([]).run_automation()
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], "Không lấy được dữ liệu đơn hàng")
+
+
+    def test_empty_incremental_delta_is_success(self):
+        watermark_file = os.path.join(tempfile.mkdtemp(), 'watermark.json')
+        watermarks = WatermarkStore(watermark_file)
+        watermarks.update_from_orders(pd.DataFrame({
+            'id': ['100'], 'col_18': ['Shopee'], 'col_19': ['2026-10-16 09:00:00']
+        }))
+        watermarks.save()
+        system = self.make_system([])
+        system.config['incremental'] = {'enabled': True, 'watermark_file': watermark_file}
+        system.get_incremental_window = lambda: ('2026-10-16', '2026-10-18')
+        system.apply_date_window = lambda date_from, date_to: True
+
+        result = system.run_automation()
+
+        self.assertTrue(result['success'], result['error'])
+        self.assertEqual((result['order_count'], result['delta_count']), (0, 0))
+        self.assertIsNotNone(WatermarkStore(watermark_file).get('Shopee')['last_checked_at'])
+
+    def test_failed_incremental_read_is_not_an_empty_delta(self):
+        system = self.make_system([])
+        system.get_incremental_window = lambda: ('2026-10-16', '2026-10-18')
+        system.apply_date_window = lambda date_from, date_to: True
+
+        def broken_rows(window_size):
+            raise RuntimeError("table detached")
+            yield
+
+        system.iter_table_rows = broken_rows
+        result = system.run_automation()
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], "Không lấy được dữ liệu đơn hàng")
+
+
+    def test_stream_failing_midway_does_not_store_partial_table(self):
+        watermark_file = os.path.join(tempfile.mkdtemp(), 'watermark.json')
+        system = self.make_system([])
+        system.config['incremental'] = {'enabled': True, 'watermark_file': watermark_file}
+        stored = []
+        system.store_orders = lambda df: stored.append(df) or len(df)
+        system.export_data = lambda df: stored.append(df) or {}
+
+        def partial_rows(window_size):
+            yield ['', '1', 'SO1']
+            raise RuntimeError("table detached")
+
+        system.iter_table_rows = partial_rows
+        result = system.run_automation()
+
+        self.assertFalse(result['success'])
+        self.assertIn("table detached", result['error'])
+        self.assertEqual(stored, [])
+        self.assertFalse(os.path.exists(watermark_file))
+
+
+    def test_http_empty_delta_does_not_start_browser(self):
+        watermark_file = os.path.join(tempfile.mkdtemp(), 'watermark.json')
+        system = self.make_system([])
+        system.config['scraper'] = {'backend': 'http'}
+        system.config['incremental'] = {'enabled': True, 'watermark_file': watermark_file}
+        system.get_incremental_window = lambda: ('2026-10-16', '2026-10-18')
+        system.scrape_order_data_http = lambda date_from, date_to: []
+        system.apply_date_window = lambda date_from, date_to: True
+        browser_calls = []
+        system.setup_driver = lambda: browser_calls.append('setup') or True
+
+        result = system.run_automation()
+
+        self.assertTrue(result['success'], result['error'])
+        self.assertEqual(browser_calls, [])
+
+        # None = HTTP thất bại → fallback sang Selenium như cũ
+        system.scrape_order_data_http = lambda date_from, date_to: None
+        system.driver.rows = [['', '1', 'SO1']]
+        self.assertEqual(system.run_automation()['order_count'], 1)
+        self.assertEqual(browser_calls, ['setup'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -82,7 +82,7 @@ class AutomationUtils:
 
             if data_files:
                 latest_file = max(data_files, key=os.path.getctime)
-                latest_data = pd.read_csv(latest_file)
+                latest_data = self._read_latest_orders(latest_file)
 
             # Tạo HTML dashboard
             html_content = f"""<!DOCTYPE html>
@@ -158,6 +158,16 @@ class AutomationUtils:
         except Exception as e:
             return f'Lỗi tạo dashboard: {e}'
 
+    def _read_latest_orders(self, csv_file):
+        """Đọc orders_latest.parquet (có kiểu, nhỏ hơn) nếu không cũ hơn CSV, ngược lại đọc CSV"""
+        parquet_file = f"{self.data_dir}/orders_latest.parquet"
+        if os.path.exists(parquet_file) and os.path.getmtime(parquet_file) >= os.path.getmtime(csv_file):
+            try:
+                return pd.read_parquet(parquet_file)
+            except ImportError:
+                pass  # Chưa cài pyarrow/fastparquet
+        return pd.read_csv(csv_file)
+
     def _generate_data_table(self, df):
         """Tạo bảng HTML từ DataFrame"""
         if df is None or df.empty:
@@ -182,22 +192,41 @@ class AutomationUtils:
 
         return html
 
+    def _manifest_files(self):
+        """
+        Danh sách (tên, size, mtime) từ data/manifest.json do automation ghi (mới nhất trước)
+
+        Returns None nếu chưa có manifest → quét thư mục như cũ
+        """
+        manifest_file = f"{self.data_dir}/manifest.json"
+        try:
+            with open(manifest_file, 'r', encoding='utf-8') as f:
+                entries = json.load(f).get('files', {}).values()
+        except (OSError, ValueError):
+            return None
+
+        files = [(entry['name'], entry['size'], entry['mtime']) for entry in entries
+                 if entry.get('ext') in ('.csv', '.parquet', '.xlsx', '.json')]
+        return sorted(files, key=lambda item: item[2], reverse=True)
+
     def _generate_file_list(self):
         """Tạo danh sách files"""
-        files = []
+        files = self._manifest_files()
 
-        # Data files
-        for ext in ['*.csv', '*.xlsx', '*.json']:
-            files.extend(glob.glob(f"{self.data_dir}/{ext}"))
+        if files is None:
+            # Data files
+            paths = []
+            for ext in ['*.csv', '*.parquet', '*.xlsx', '*.json']:
+                paths.extend(glob.glob(f"{self.data_dir}/{ext}"))
+            files = sorted(((os.path.basename(path), os.path.getsize(path), os.path.getctime(path)) for path in paths),
+                           key=lambda item: item[2], reverse=True)
 
         if not files:
             return "<p>Chưa có file dữ liệu</p>"
 
         html = "<ul>"
-        for file_path in sorted(files, key=os.path.getctime, reverse=True):
-            file_name = os.path.basename(file_path)
-            file_size = os.path.getsize(file_path)
-            file_time = datetime.fromtimestamp(os.path.getctime(file_path))
+        for file_name, file_size, file_mtime in files:
+            file_time = datetime.fromtimestamp(file_mtime)
 
             html += f"<li><strong>{file_name}</strong> - {file_size} bytes - {file_time.strftime('%Y-%m-%d %H:%M')}</li>"
 